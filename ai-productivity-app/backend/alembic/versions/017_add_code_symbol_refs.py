@@ -0,0 +1,44 @@
+"""Add code_symbol_refs cross-reference index
+
+Revision ID: 017_add_code_symbol_refs
+Revises: 016_add_latest_ai_models
+Create Date: 2025-07-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '017_add_code_symbol_refs'
+down_revision = '016_add_latest_ai_models'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'code_symbol_refs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(200), nullable=False),
+        sa.Column('kind', sa.String(20), nullable=False),
+        sa.Column('symbol_type', sa.String(50), nullable=True),
+        sa.Column('line', sa.Integer(), nullable=False),
+        sa.Column('column', sa.Integer(), nullable=False),
+        sa.Column('end_line', sa.Integer(), nullable=True),
+        sa.Column('context', sa.String(500), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['document_id'], ['code_documents.id'], ondelete='CASCADE'),
+        sa.CheckConstraint("kind IN ('definition', 'reference', 'import')", name='valid_ref_kind'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_index('idx_code_symbol_refs_lookup', 'code_symbol_refs', ['project_id', 'name', 'kind'])
+    op.create_index('idx_code_symbol_refs_location', 'code_symbol_refs', ['document_id', 'line'])
+
+
+def downgrade():
+    op.drop_index('idx_code_symbol_refs_location', table_name='code_symbol_refs')
+    op.drop_index('idx_code_symbol_refs_lookup', table_name='code_symbol_refs')
+    op.drop_table('code_symbol_refs')
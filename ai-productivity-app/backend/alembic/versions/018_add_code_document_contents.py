@@ -0,0 +1,40 @@
+"""Add code_document_contents for full-file grep
+
+Revision ID: 018_add_code_document_contents
+Revises: 017_add_code_symbol_refs
+Create Date: 2025-07-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '018_add_code_document_contents'
+down_revision = '017_add_code_symbol_refs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'code_document_contents',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['document_id'], ['code_documents.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('document_id')
+    )
+
+    op.create_index(
+        'idx_code_document_contents_project_updated',
+        'code_document_contents',
+        ['project_id', 'updated_at'],
+    )
+
+
+def downgrade():
+    op.drop_index('idx_code_document_contents_project_updated', table_name='code_document_contents')
+    op.drop_table('code_document_contents')
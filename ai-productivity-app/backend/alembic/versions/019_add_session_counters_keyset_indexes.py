@@ -0,0 +1,76 @@
+"""Denormalised chat session counters and keyset pagination indexes
+
+Revision ID: 019_add_session_counters_keyset_indexes
+Revises: 018_add_code_document_contents
+Create Date: 2025-07-03 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '019_add_session_counters_keyset_indexes'
+down_revision = '018_add_code_document_contents'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'chat_sessions',
+        sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.add_column(
+        'chat_sessions',
+        sa.Column(
+            'last_activity_at', sa.DateTime(), nullable=False, server_default=sa.func.now()
+        ),
+    )
+
+    # Backfill from existing messages
+    op.execute("""
+        UPDATE chat_sessions AS s
+        SET message_count = agg.cnt,
+            last_activity_at = agg.last_at
+        FROM (
+            SELECT session_id, COUNT(*) AS cnt, MAX(created_at) AS last_at
+            FROM chat_messages
+            WHERE is_deleted = false
+            GROUP BY session_id
+        ) AS agg
+        WHERE agg.session_id = s.id
+    """)
+    op.execute("""
+        UPDATE chat_sessions
+        SET last_activity_at = created_at
+        WHERE message_count = 0
+    """)
+
+    op.create_index(
+        'idx_chat_sessions_project_activity',
+        'chat_sessions',
+        ['project_id', 'last_activity_at', 'id'],
+    )
+    op.create_index(
+        'idx_chat_sessions_activity', 'chat_sessions', ['last_activity_at', 'id']
+    )
+    op.create_index(
+        'idx_chat_messages_session_keyset',
+        'chat_messages',
+        ['session_id', 'created_at', 'id'],
+        postgresql_where=sa.text('is_deleted = false'),
+    )
+    op.create_index(
+        'idx_timeline_events_project_keyset',
+        'timeline_events',
+        ['project_id', 'created_at', 'id'],
+    )
+
+
+def downgrade():
+    op.drop_index('idx_timeline_events_project_keyset', table_name='timeline_events')
+    op.drop_index('idx_chat_messages_session_keyset', table_name='chat_messages')
+    op.drop_index('idx_chat_sessions_activity', table_name='chat_sessions')
+    op.drop_index('idx_chat_sessions_project_activity', table_name='chat_sessions')
+    op.drop_column('chat_sessions', 'last_activity_at')
+    op.drop_column('chat_sessions', 'message_count')
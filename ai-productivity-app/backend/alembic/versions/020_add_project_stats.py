@@ -0,0 +1,76 @@
+"""Per-project statistics rollup
+
+Revision ID: 020_add_project_stats
+Revises: 019_add_session_counters_keyset_indexes
+Create Date: 2025-07-04 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '020_add_project_stats'
+down_revision = '019_add_session_counters_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'project_stats',
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('files', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('chunks', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('indexed_files', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pending_files', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('timeline_events', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('storage_bytes', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+        sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('project_id'),
+    )
+
+    # Backfill one row per existing project
+    op.execute("""
+        INSERT INTO project_stats (
+            project_id, files, chunks, indexed_files, pending_files,
+            timeline_events, storage_bytes, last_activity_at, reconciled_at
+        )
+        SELECT
+            p.id,
+            COALESCE(d.files, 0),
+            COALESCE(c.chunks, 0),
+            COALESCE(d.indexed_files, 0),
+            COALESCE(d.files, 0) - COALESCE(d.indexed_files, 0),
+            COALESCE(t.events, 0),
+            COALESCE(d.storage_bytes, 0),
+            t.last_at,
+            now()
+        FROM projects AS p
+        LEFT JOIN (
+            SELECT project_id,
+                   COUNT(*) AS files,
+                   SUM(CASE WHEN is_indexed THEN 1 ELSE 0 END) AS indexed_files,
+                   SUM(COALESCE(file_size, 0)) AS storage_bytes
+            FROM code_documents
+            GROUP BY project_id
+        ) AS d ON d.project_id = p.id
+        LEFT JOIN (
+            SELECT cd.project_id, COUNT(*) AS chunks
+            FROM code_embeddings AS ce
+            JOIN code_documents AS cd ON cd.id = ce.document_id
+            GROUP BY cd.project_id
+        ) AS c ON c.project_id = p.id
+        LEFT JOIN (
+            SELECT project_id, COUNT(*) AS events, MAX(created_at) AS last_at
+            FROM timeline_events
+            GROUP BY project_id
+        ) AS t ON t.project_id = p.id
+    """)
+
+
+def downgrade():
+    op.drop_table('project_stats')
@@ -0,0 +1,56 @@
+"""Delta-chain document versions
+
+Revision ID: 021_add_document_versions
+Revises: 020_add_project_stats
+Create Date: 2025-07-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '021_add_document_versions'
+down_revision = '020_add_project_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'document_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('version_number', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('content_size', sa.Integer(), nullable=False),
+        sa.Column('change_type', sa.String(length=20), nullable=False),
+        sa.Column('change_summary', sa.Text(), nullable=True),
+        sa.Column('changed_by', sa.String(length=100), nullable=True),
+        sa.Column('change_timestamp', sa.DateTime(), nullable=True),
+        sa.Column('lines_added', sa.Integer(), nullable=True),
+        sa.Column('lines_deleted', sa.Integer(), nullable=True),
+        sa.Column('lines_modified', sa.Integer(), nullable=True),
+        sa.Column('delta', sa.LargeBinary(), nullable=False),
+        sa.Column('snapshot', sa.LargeBinary(), nullable=True),
+        sa.Column('keyframe_version', sa.Integer(), nullable=False),
+        sa.Column('commit_hash', sa.String(length=40), nullable=True),
+        sa.Column('branch_name', sa.String(length=100), nullable=True),
+        sa.Column('tags', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['document_id'], ['code_documents.id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_document_versions_id', 'document_versions', ['id'])
+    op.create_index(
+        'idx_document_versions_doc_version',
+        'document_versions',
+        ['document_id', 'version_number'],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index('idx_document_versions_doc_version', table_name='document_versions')
+    op.drop_index('ix_document_versions_id', table_name='document_versions')
+    op.drop_table('document_versions')
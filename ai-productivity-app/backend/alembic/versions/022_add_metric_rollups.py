@@ -0,0 +1,48 @@
+"""Persistent per-minute metric rollups
+
+Revision ID: 022_add_metric_rollups
+Revises: 021_add_document_versions
+Create Date: 2025-07-06 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '022_add_metric_rollups'
+down_revision = '021_add_document_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'metric_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('metric_name', sa.String(length=200), nullable=False),
+        sa.Column('label_key', sa.String(length=500), nullable=False, server_default=''),
+        sa.Column('labels', sa.JSON(), nullable=True),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('bucket_seconds', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('sum', sa.Float(), nullable=False),
+        sa.Column('min', sa.Float(), nullable=False),
+        sa.Column('max', sa.Float(), nullable=False),
+        sa.Column('p50', sa.Float(), nullable=True),
+        sa.Column('p95', sa.Float(), nullable=True),
+        sa.Column('p99', sa.Float(), nullable=True),
+        sa.Column('sketch', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'idx_metric_rollups_series_bucket',
+        'metric_rollups',
+        ['metric_name', 'label_key', 'bucket_start'],
+    )
+    op.create_index('idx_metric_rollups_bucket', 'metric_rollups', ['bucket_start'])
+
+
+def downgrade():
+    op.drop_index('idx_metric_rollups_bucket', table_name='metric_rollups')
+    op.drop_index('idx_metric_rollups_series_bucket', table_name='metric_rollups')
+    op.drop_table('metric_rollups')
@@ -0,0 +1,57 @@
+"""Durable knowledge ingestion queue columns
+
+Revision ID: 023_add_knowledge_ingestion
+Revises: 022_add_metric_rollups
+Create Date: 2025-07-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '023_add_knowledge_ingestion'
+down_revision = '022_add_metric_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('knowledge_documents', sa.Column('tags', sa.JSON(), nullable=True))
+    op.add_column(
+        'knowledge_documents',
+        sa.Column('ingest_status', sa.String(length=20), nullable=False, server_default='pending'),
+    )
+    op.add_column(
+        'knowledge_documents',
+        sa.Column('ingest_attempts', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.add_column('knowledge_documents', sa.Column('ingest_error', sa.Text(), nullable=True))
+    op.add_column(
+        'knowledge_documents',
+        sa.Column('chunk_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.add_column('knowledge_documents', sa.Column('indexed_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'idx_knowledge_ingest_queue',
+        'knowledge_documents',
+        ['ingest_status', 'created_at'],
+    )
+    # Existing documents default to 'pending' and are re-indexed at chunk
+    # granularity; drop their old whole-document vectors.
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql' and sa.inspect(bind).has_table('embeddings'):
+        op.execute(
+            "DELETE FROM embeddings "
+            "WHERE metadata->>'document_type' = 'knowledge' "
+            "OR metadata->'metadata'->>'document_type' = 'knowledge'"
+        )
+
+
+def downgrade():
+    op.drop_index('idx_knowledge_ingest_queue', table_name='knowledge_documents')
+    op.drop_column('knowledge_documents', 'indexed_at')
+    op.drop_column('knowledge_documents', 'chunk_count')
+    op.drop_column('knowledge_documents', 'ingest_error')
+    op.drop_column('knowledge_documents', 'ingest_attempts')
+    op.drop_column('knowledge_documents', 'ingest_status')
+    op.drop_column('knowledge_documents', 'tags')
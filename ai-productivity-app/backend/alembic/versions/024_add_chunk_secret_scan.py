@@ -0,0 +1,32 @@
+"""Persist index-time secret scan results on code chunks
+
+Revision ID: 024_add_chunk_secret_scan
+Revises: 023_add_knowledge_ingestion
+Create Date: 2025-07-09 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '024_add_chunk_secret_scan'
+down_revision = '023_add_knowledge_ingestion'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing chunks keep NULL and are scanned at query time as before
+    op.add_column(
+        'code_embeddings',
+        sa.Column('secret_scan_version', sa.Integer(), nullable=True),
+    )
+    op.add_column(
+        'code_embeddings',
+        sa.Column('secret_findings', sa.JSON(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column('code_embeddings', 'secret_findings')
+    op.drop_column('code_embeddings', 'secret_scan_version')
@@ -0,0 +1,27 @@
+"""Track which messages the incremental chat summary covers
+
+Revision ID: 025_add_chat_summary_watermark
+Revises: 024_add_chunk_secret_scan
+Create Date: 2025-07-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '025_add_chat_summary_watermark'
+down_revision = '024_add_chunk_secret_scan'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL: nothing folded yet, the first refresh summarizes from the start
+    op.add_column(
+        'chat_sessions',
+        sa.Column('summary_message_id', sa.Integer(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column('chat_sessions', 'summary_message_id')
@@ -0,0 +1,60 @@
+"""Hourly/daily analytics rollups
+
+Revision ID: 026_add_analytics_rollups
+Revises: 025_add_chat_summary_watermark
+Create Date: 2025-07-11 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '026_add_analytics_rollups'
+down_revision = '025_add_chat_summary_watermark'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'analytics_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=8), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('dimension', sa.String(length=200), nullable=False, server_default=''),
+        sa.Column('user_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('tokens_in', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('tokens_out', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('min', sa.Float(), nullable=True),
+        sa.Column('max', sa.Float(), nullable=True),
+        sa.Column('p50', sa.Float(), nullable=True),
+        sa.Column('p95', sa.Float(), nullable=True),
+        sa.Column('sketch', sa.Text(), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'granularity', 'kind', 'dimension', 'user_id', 'bucket_start',
+            name='uq_analytics_rollups_bucket',
+        ),
+    )
+    op.create_index(
+        'idx_analytics_rollups_lookup',
+        'analytics_rollups',
+        ['kind', 'granularity', 'user_id', 'bucket_start'],
+    )
+    # Rollups are recomputed from here; the raw per-model table is only
+    # scanned by hour
+    op.create_index(
+        'idx_model_usage_period_start',
+        'model_usage_metrics',
+        ['period_start'],
+    )
+
+
+def downgrade():
+    op.drop_index('idx_model_usage_period_start', table_name='model_usage_metrics')
+    op.drop_index('idx_analytics_rollups_lookup', table_name='analytics_rollups')
+    op.drop_table('analytics_rollups')
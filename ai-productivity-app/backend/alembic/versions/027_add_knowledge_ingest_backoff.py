@@ -0,0 +1,25 @@
+"""Retry backoff for the knowledge ingestion queue
+
+Revision ID: 027_add_knowledge_ingest_backoff
+Revises: 026_add_analytics_rollups
+Create Date: 2025-07-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '027_add_knowledge_ingest_backoff'
+down_revision = '026_add_analytics_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'knowledge_documents', sa.Column('next_attempt_at', sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column('knowledge_documents', 'next_attempt_at')
@@ -2,8 +2,8 @@
 # flake8: noqa: E501  -- deliberate: long strings & URLs are acceptable here
 """Authentication and security utilities.
 
-This module bundles password hashing, JWT handling, CSRF helpers and a tiny
-in-memory rate-limiter.  Heavy dependencies (*passlib*, *python-jose*) are
+This module bundles password hashing, JWT handling, CSRF helpers and the
+login rate limit (token buckets from :mod:`app.utils.rate_limiter`).  Heavy dependencies (*passlib*, *python-jose*) are
 loaded lazily; lightweight stubs keep unit-tests running inside restricted
 sandboxes that lack wheels.
 
@@ -73,6 +73,8 @@ except ModuleNotFoundError:  # pragma: no cover – fallback stubs
 
 from fastapi import HTTPException, status
 
+from app.utils.rate_limiter import Bucket, LocalBucketStore, limiter_disabled
+
 # SlowAPI limiter will use Redis so that limits are shared across gunicorn
 # workers.  We dynamically derive the connection URL from the same helper that
 # the rest of the application uses to talk to Redis to avoid configuration
@@ -183,9 +185,9 @@ except ModuleNotFoundError:  # pragma: no cover
     jwt = _FakeJWTModule()  # type: ignore
 
 # -----------------------------------------------------------------------------
-# Rate-limiting (simple in-memory token bucket for unit-tests)
+# Rate-limiting (synchronous, process-local token buckets)
 # -----------------------------------------------------------------------------
-_AUTH_RATE_LIMIT: Dict[str, list[float]] = {}
+_AUTH_RATE_LIMIT = LocalBucketStore()
 _RATE_WINDOW_SECONDS = 60.0
 _RATE_MAX_ATTEMPTS = 5
 
@@ -193,16 +195,21 @@ _RATE_MAX_ATTEMPTS = 5
 def enforce_rate_limit(
     key: str, *, limit: int = _RATE_MAX_ATTEMPTS, window: float = _RATE_WINDOW_SECONDS
 ) -> None:
-    """Raise 429 if *key* exceeds *limit* hits in the preceding *window* seconds."""
-    now = time.time()
-    bucket = _AUTH_RATE_LIMIT.setdefault(key, [])
-    bucket[:] = [ts for ts in bucket if now - ts < window]  # purge old entries
-    if len(bucket) >= limit:
+    """Raise 429 if *key* exceeds *limit* hits in the preceding *window* seconds.
+
+    Sync callers only – async code should use
+    :func:`app.utils.redis_client.rate_limit`, which shares buckets across
+    workers.
+    """
+    if limiter_disabled():
+        return
+    decision = _AUTH_RATE_LIMIT.apply([Bucket.per_window(key, limit, window)])
+    if not decision.allowed:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail=f"Too many attempts. Please wait {int(window/60)} minute(s) before trying again.",
+            headers={"Retry-After": str(decision.retry_after_seconds)},
         )
-    bucket.append(now)
 
 
 # -----------------------------------------------------------------------------
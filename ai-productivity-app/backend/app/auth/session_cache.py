@@ -0,0 +1,241 @@
+# backend/app/auth/session_cache.py
+"""Short-lived, revocation-aware cache behind ``get_current_user``.
+
+Authenticating a request used to cost two queries – ``is_session_active``
+for the token's ``jti`` and ``db.get(User, …)`` – on a session checked out
+only for that purpose.  Both answers are now cached for a few seconds:
+
+* ``jti → user_id`` for sessions found active (never for revoked ones), and
+  never past the token's own ``exp``;
+* ``user_id → column snapshot`` for active users, re-attached to the
+  request's DB session with ``merge(load=False)`` (no SQL).
+
+Invalidation is push-based.  The flush hook in :mod:`app.auth.utils` drops
+affected entries locally as soon as a session is revoked or a user row is
+changed/deleted, and queues a Postgres ``NOTIFY`` delivered on commit; every
+replica ``LISTEN``\\s and evicts the same keys.  While the ``LISTEN``
+connection is down on Postgres the cache is bypassed, so a missed
+revocation can never outlive :data:`AUTH_CACHE_TTL_SECONDS`.
+
+A generation counter bumped by every invalidation keeps a request that
+read the database *before* a revocation from re-populating a stale entry.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "auth_revocations"
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+RECONNECT_SECONDS = 5.0
+LISTEN_CHECK_SECONDS = 10.0
+
+
+class _LRU:
+    """Bounded ``key → (expires_at, value)`` map, oldest entries evicted."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key, now: float):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item[1]
+
+    def put(self, key, value, expires_at: float) -> None:
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        self._data.pop(key, None)
+
+    def drop_values(self, value) -> None:
+        for key in [k for k, (_, v) in self._data.items() if v == value]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SessionCache:
+    """Positive auth results keyed by ``jti`` and user id."""
+
+    def __init__(
+        self,
+        ttl: float = AUTH_CACHE_TTL_SECONDS,
+        max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+        clock=time.time,
+    ):
+        self.ttl = ttl
+        self.clock = clock
+        self._sessions = _LRU(max_entries)
+        self._users = _LRU(max_entries)
+        self._lock = threading.Lock()
+        self.generation = 0
+        # Off while a Postgres LISTEN connection is expected but not up
+        self.enabled = ttl > 0
+        self.hits = 0
+        self.misses = 0
+
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ------------------------------------------------------------ lookups
+    def get_session(self, jti: str) -> Optional[int]:
+        """User id of a recently validated active session, if cached."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            user_id = self._sessions.get(jti, self.clock())
+        self._count(user_id is not None)
+        return user_id
+
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Column snapshot of a recently loaded active user, if cached."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            values = self._users.get(user_id, self.clock())
+        self._count(values is not None)
+        return values
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    # -------------------------------------------------------------- stores
+    def put_session(
+        self,
+        jti: str,
+        user_id: int,
+        generation: int,
+        token_exp: Optional[float] = None,
+    ) -> None:
+        """Cache an active session unless an invalidation ran since *generation*."""
+        now = self.clock()
+        expires_at = now + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        with self._lock:
+            if self.enabled and generation == self.generation and expires_at > now:
+                self._sessions.put(jti, user_id, expires_at)
+
+    def put_user(self, user_id: int, values: Dict[str, Any], generation: int) -> None:
+        with self._lock:
+            if self.enabled and generation == self.generation:
+                self._users.put(user_id, values, self.clock() + self.ttl)
+
+    # -------------------------------------------------------- invalidation
+    def invalidate(
+        self, jti: Optional[str] = None, user_id: Optional[int] = None
+    ) -> None:
+        """Forget a session and/or a user together with all its sessions."""
+        with self._lock:
+            self.generation += 1
+            if jti is not None:
+                self._sessions.pop(jti)
+            if user_id is not None:
+                self._users.pop(user_id)
+                self._sessions.drop_values(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._sessions.clear()
+            self._users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl,
+                "sessions": len(self._sessions),
+                "users": len(self._users),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    # ------------------------------------------------------ cross-replica
+    @staticmethod
+    def payload(jti: Optional[str] = None, user_id: Optional[int] = None) -> str:
+        return json.dumps({"jti": jti, "user_id": user_id}, separators=(",", ":"))
+
+    def apply_payload(self, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            jti, user_id = data.get("jti"), data.get("user_id")
+        except (TypeError, ValueError, AttributeError):
+            self.clear()  # unknown message – be conservative
+            return
+        self.invalidate(jti=jti, user_id=user_id)
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        self.apply_payload(payload)
+
+    async def start(self) -> None:
+        from app.database import async_engine
+
+        if async_engine.dialect.name != "postgresql" or self.ttl <= 0:
+            return  # single-database dev setups: local invalidation only
+        self.enabled = False
+        self._task = asyncio.create_task(self._listen(), name="auth-revocations")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        """Hold a ``LISTEN`` connection; bypass the cache whenever it drops."""
+        from app.database import async_engine
+
+        while True:
+            try:
+                async with async_engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    driver = raw.driver_connection
+                    await driver.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                    self.enabled = True
+                    logger.info("Auth revocation listener connected")
+                    while not driver.is_closed():
+                        await asyncio.sleep(LISTEN_CHECK_SECONDS)
+                    raise ConnectionError("LISTEN connection closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Auth revocation LISTEN unavailable: %s", exc)
+            finally:
+                # Revocations may be missed from here on
+                self.enabled = False
+                self.clear()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+
+session_cache = SessionCache()
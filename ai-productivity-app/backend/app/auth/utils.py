@@ -6,12 +6,17 @@ Contains:
 • verify_credentials – check username/email + password against DB
 • create_session      – persist login session and return it
 • get_current_user    – FastAPI dependency to retrieve authenticated user
+
+Session and user lookups behind ``get_current_user`` are served from
+:mod:`app.auth.session_cache`; the flush hook at the bottom of this module
+keeps that cache in step with revocations and user changes.
 """
 
 from __future__ import annotations
 
+import copy
 import datetime
-from typing import Annotated, Optional
+from typing import Annotated, Any, Dict, Optional
 
 from fastapi import (
     Cookie,
@@ -22,14 +27,15 @@ from fastapi import (
     status,
     WebSocket,
 )
-from sqlalchemy import or_
-from sqlalchemy.orm import Session as DBSession
+from sqlalchemy import event, inspect, or_, text
+from sqlalchemy.orm import Session as DBSession, make_transient_to_detached
 
 from app.config import settings
 from app.database import get_db
 from app.models.session import Session
 from app.models.user import User
 from . import security
+from .session_cache import NOTIFY_CHANNEL, SessionCache, session_cache
 
 ###############################################################################
 # Password / credential helpers
@@ -229,6 +235,55 @@ def validate_invite_code(code: str) -> None:  # noqa: D401 – simple helper
 ###############################################################################
 
 
+def _user_snapshot(user: User) -> Dict[str, Any]:
+    """Loaded column values of *user* (what the cache keeps)."""
+    state = inspect(user)
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+def _attach_cached_user(db: DBSession, values: Dict[str, Any]) -> User:
+    """Rebuild a cached user inside *db* without emitting SQL."""
+    user = inspect(User).class_manager.new_instance()
+    # Mutable JSON columns are copied so request code cannot edit the cache
+    inspect(user).dict.update(copy.deepcopy(values))
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def _resolve_user(
+    db: DBSession,
+    user_id: int,
+    jti: Optional[str] = None,
+    token_exp: Optional[float] = None,
+) -> Optional[User]:
+    """Active user for a validated token, or None if revoked/inactive."""
+    generation = session_cache.generation
+
+    if jti and session_cache.get_session(jti) != user_id:
+        if not is_session_active(db, jti):
+            return None
+        cache_session = True
+    else:
+        cache_session = False
+
+    values = session_cache.get_user(user_id)
+    if values is not None:
+        user = _attach_cached_user(db, values)
+    else:
+        user = db.get(User, user_id)
+        if not user or not user.is_active:
+            return None
+        session_cache.put_user(user_id, _user_snapshot(user), generation)
+
+    if cache_session:
+        session_cache.put_session(jti, user_id, generation, token_exp)
+    return user
+
+
 def get_current_user(
     request: Request,  # noqa: W0613
     db: Annotated[DBSession, Depends(get_db)],
@@ -265,41 +320,19 @@ def get_current_user(
         )
 
     if token.startswith("test_token_") and token[11:].isdigit():
-        user_id = int(token[11:])
         # Skip session validation for test tokens
-        user: User | None = db.get(User, user_id)
-        if not user or not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid credentials",
-            )
-        return user
+        user = _resolve_user(db, int(token[11:]))
     else:
         payload = security.decode_access_token(token)
         user_id = security.token_sub_identity(payload)
-        jti = payload.get("jti")
-
-        # Validate session is active
-        if jti and not is_session_active(db, jti):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid credentials",
-            )
+        user = _resolve_user(db, user_id, payload.get("jti"), payload.get("exp"))
 
-        user: User | None = db.get(User, user_id)
-        if not user or not user.is_active:
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid credentials",
-                )
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid credentials",
-                )
-
-        return user
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials",
+        )
+    return user
 
 
 async def get_current_user_ws(
@@ -311,23 +344,47 @@ async def get_current_user_ws(
     try:
         # Handle test tokens
         if token.startswith("test_token_") and token[11:].isdigit():
-            user_id = int(token[11:])
-            user = db.get(User, user_id)
-            return user if user and user.is_active else None
+            return _resolve_user(db, int(token[11:]))
 
         payload = security.decode_access_token(token)
         user_id = security.token_sub_identity(payload)
-        jti = payload.get("jti")
+        return _resolve_user(db, user_id, payload.get("jti"), payload.get("exp"))
+    except Exception:  # Broad exception is acceptable here for JWT decoding
+        return None
 
-        # Validate session is active
-        if jti and not is_session_active(db, jti):
-            return None
 
-        user = db.get(User, user_id)
+###############################################################################
+# Cache invalidation: session revocation, user updates / deactivation
+###############################################################################
 
-        if not user or not user.is_active:
-            return None
 
-        return user
-    except Exception:  # Broad exception is acceptable here for JWT decoding
-        return None
+def _announce_invalidation(
+    db: DBSession, jti: Optional[str] = None, user_id: Optional[int] = None
+) -> None:
+    """Evict locally now; tell every replica once the transaction commits."""
+    session_cache.invalidate(jti=jti, user_id=user_id)
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    db.connection().execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": NOTIFY_CHANNEL, "payload": SessionCache.payload(jti, user_id)},
+    )
+
+
+def _on_flush(db: DBSession, _flush_context) -> None:
+    for obj in db.dirty:
+        if isinstance(obj, Session):
+            revoked = inspect(obj).attrs.revoked_at.history.added
+            if revoked and obj.revoked_at is not None:
+                _announce_invalidation(db, jti=obj.jti)
+        elif isinstance(obj, User) and db.is_modified(obj, include_collections=False):
+            _announce_invalidation(db, user_id=obj.id)
+    for obj in db.deleted:
+        if isinstance(obj, User):
+            _announce_invalidation(db, user_id=obj.id)
+        elif isinstance(obj, Session):
+            _announce_invalidation(db, jti=obj.jti)
+
+
+event.listen(DBSession, "after_flush", _on_flush)
@@ -4,7 +4,7 @@ from typing import Dict, List, Optional, Callable, Any, Tuple
 from sqlalchemy.orm import Session
 import logging
 
-from app.models.code import CodeDocument, CodeEmbedding
+from app.models.code import CodeDocument
 from app.models.project import Project
 
 # Optional integrations (import guarded to avoid hard dependency during testing)
@@ -210,70 +210,91 @@ Format it as a proper GitHub PR description."""
 class GrepCommand(SlashCommand):
     """Search codebase for pattern."""
 
+    MAX_MATCHES = 50
+
     def __init__(self):
         super().__init__(
             name="grep",
             description="Search code for pattern",
-            usage="/grep [pattern] [--type=python]",
+            usage="/grep [pattern] [--type=python] [--regex] [--case] [--after=cursor]",
         )
 
     async def execute(self, args: str, context: Dict, db: Session) -> Dict:
+        from app.services.code_grep import grep_engine
+
         # Parse arguments
         parts = args.split()
         if not parts:
             return {
                 "success": False,
-                "message": "Usage: /grep pattern [--type=language]",
+                "message": "Usage: /grep pattern [--type=language] [--regex] [--case]",
             }
 
         pattern = parts[0]
         language = None
+        regex = False
+        ignore_case = True
+        cursor = None
 
-        # Check for type flag
         for part in parts[1:]:
             if part.startswith("--type="):
                 language = part.split("=")[1]
+            elif part == "--regex":
+                regex = True
+            elif part == "--case":
+                ignore_case = False
+            elif part.startswith("--after="):
+                cursor = part.split("=", 1)[1]
 
         project_id = context.get("project_id")
 
-        # Search in chunks
-        query = (
-            db.query(CodeEmbedding)
-            .join(CodeDocument)
-            .filter(
-                CodeDocument.project_id == project_id,
-                CodeEmbedding.chunk_content.like(f"%{pattern}%"),
+        try:
+            page = await grep_engine.search(
+                db,
+                project_id,
+                pattern,
+                regex=regex,
+                ignore_case=ignore_case,
+                language=language,
+                cursor=cursor,
+                limit=self.MAX_MATCHES,
             )
-        )
-
-        if language:
-            query = query.filter(CodeDocument.language == language)
-
-        results = query.limit(10).all()
-
-        if not results:
-            return {"success": True, "message": f"No matches found for '{pattern}'"}
-
-        # Format results
-        output = [f"Found {len(results)} matches for '{pattern}':\n"]
-
-        for chunk in results:
-            # Find matching lines
-            lines = chunk.chunk_content.split("\n")
-            matches = []
-
-            for i, line in enumerate(lines):
-                if pattern.lower() in line.lower():
-                    line_num = chunk.start_line + i
-                    matches.append(f"{line_num}: {line.strip()}")
+        except re.error as exc:
+            return {"success": False, "message": f"Invalid regex '{pattern}': {exc}"}
+
+        notes = []
+        if page.get("timed_out"):
+            notes.append("the search timed out, results are incomplete")
+        if page.get("unindexed_files"):
+            notes.append(f"{page['unindexed_files']} files are not indexed yet")
+        note = f"\n\nNote: {'; '.join(notes)}." if notes else ""
+
+        matches = page["matches"]
+        if not matches:
+            return {
+                "success": True,
+                "message": f"No matches found for '{pattern}'{note}",
+            }
 
-            if matches:
-                output.append(f"\n{chunk.document.file_path}:")
-                output.extend(matches[:3])  # First 3 matches
-                if len(matches) > 3:
-                    output.append(f"  ... and {len(matches) - 3} more matches")
+        # Format results grouped by file
+        output = [f"Found {len(matches)} matches for '{pattern}':"]
+        current_file = None
+        for match in matches:
+            if match["file_path"] != current_file:
+                current_file = match["file_path"]
+                output.append(f"\n{current_file}:")
+            output.append(f"{match['line']}:{match['column']}: {match['text'].strip()}")
+
+        if page["next_cursor"]:
+            output.append(
+                f"\n... more matches: /grep {args.strip()} --after={page['next_cursor']}"
+            )
 
-        return {"success": True, "message": "\n".join(output), "requires_llm": False}
+        return {
+            "success": True,
+            "message": "\n".join(output) + note,
+            "requires_llm": False,
+        }
 
 
 class CommandRegistry:
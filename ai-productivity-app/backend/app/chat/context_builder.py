@@ -21,8 +21,9 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.code import CodeDocument, CodeEmbedding
-from app.models.chat import ChatMessage
+from app.models.chat import ChatMessage, ChatSession
 from app.services.content_filter import content_filter
+from app.services.xref_index import definitions_stmt
 
 logger = logging.getLogger(__name__)
 
@@ -206,6 +207,24 @@ class ContextBuilder:
         chunks = result.scalars().all()
 
         if not chunks:
+            # Definition site from the cross-reference index → the chunk
+            # covering it (catches methods / nested symbols that have no
+            # chunk of their own).  Both sides are index lookups.
+            defs = definitions_stmt(project_id, [symbol]).subquery()
+            stmt = (
+                select(CodeEmbedding)
+                .join(defs, defs.c.document_id == CodeEmbedding.document_id)
+                .where(
+                    CodeEmbedding.start_line <= defs.c.line,
+                    CodeEmbedding.end_line >= defs.c.line,
+                )
+                .limit(5)
+            )
+            result = await self.db.execute(stmt)
+            chunks = result.scalars().all()
+
+        if not chunks:
+            # Last resort for documents ingested before the xref index existed.
             stmt = (
                 select(CodeEmbedding)
                 .join(CodeDocument, CodeDocument.id == CodeEmbedding.document_id)
@@ -281,6 +300,18 @@ class ContextBuilder:
     async def get_conversation_summary(
         self, session_id: int, up_to_message_id: Optional[int] = None
     ) -> Optional[str]:
+        # Incrementally maintained summary (see ConversationSummarizer)
+        stored = (
+            await self.db.execute(
+                select(ChatSession.summary).where(
+                    ChatSession.id == session_id,
+                    ChatSession.summary_message_id.is_not(None),
+                )
+            )
+        ).scalar_one_or_none()
+        if stored:
+            return stored
+
         stmt = (
             select(ChatMessage)
             .where(
@@ -346,4 +377,5 @@ class ContextBuilder:
             "start_line": chunk.start_line,
             "end_line": chunk.end_line,
             "content": chunk.chunk_content,
+            "secret_scan": chunk.secret_scan,
         }
@@ -34,11 +34,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ..config import settings
 from ..llm.client import llm_client
 from ..llm.streaming import StreamingHandler, EnhancedStreamingHandler
+from ..llm import prompt_cache
 from ..llm import tools as llm_tools
 from ..models.chat import ChatMessage, ChatSession
 from ..services.chat_service import ChatService
 from ..services.knowledge_service import KnowledgeService
 from ..services.confidence_service import ConfidenceService
+from ..services.summarization_service import conversation_summarizer
 from ..services.unified_config_service import UnifiedConfigService
 from ..embeddings.generator import EmbeddingGenerator
 from ..websocket.manager import connection_manager
@@ -133,6 +135,7 @@ class ChatProcessor:
             session.project_id,
         )
         context["project_id"] = session.project_id
+        context["user_id"] = message.user_id
 
         # 2a. Frontend context is now handled through structured fields
         # The metadata from WebSocket is decomposed into referenced_files, referenced_chunks, etc.
@@ -376,6 +379,9 @@ class ChatProcessor:
                 else None
             ),
             max_tokens=cfg.get("max_tokens"),
+            user_id=context.get("user_id"),
+            project_id=context.get("project_id"),
+            feature="chat",
         )
 
         # Use enhanced handler for streaming with tool support
@@ -413,6 +419,9 @@ class ChatProcessor:
                 tools=tools_to_use if rounds < MAX_TOOL_CALL_ROUNDS - 1 else None,
                 tool_choice="auto" if rounds < MAX_TOOL_CALL_ROUNDS - 1 else None,
                 max_tokens=cfg.get("max_tokens"),
+                user_id=context.get("user_id"),
+                project_id=context.get("project_id"),
+                feature="chat",
             )
 
             # Continue streaming
@@ -441,6 +450,9 @@ class ChatProcessor:
             broadcast=True,  # This will be the only broadcast for this message
         )
 
+        # fold messages leaving the prompt window into the session summary
+        conversation_summarizer.schedule(ai_msg.session_id)
+
         # analytics (fire-and-forget)
         asyncio.create_task(
             self._track_response_quality(
@@ -603,21 +615,30 @@ class ChatProcessor:
             "- Provide clear, actionable explanations and suggestions\n"
             "- When generating tests, ensure comprehensive coverage of edge cases"
         )
-        messages: list[dict[str, str]] = [{"role": "system", "content": system_prompt}]
+        # Segments are tagged for provider prompt caching: the LLM client puts
+        # the stable ones first and the retrieved context after the history.
+        messages: list[dict[str, str]] = [
+            prompt_cache.tag(
+                {"role": "system", "content": system_prompt}, prompt_cache.STATIC
+            )
+        ]
 
         # -------------------------------------------------------------- #
         # Knowledge-base context
         # -------------------------------------------------------------- #
         if context.get("knowledge"):
             messages.append(
-                {
-                    "role": "system",
-                    "content": self._format_knowledge_context(context),
-                }
+                prompt_cache.tag(
+                    {
+                        "role": "system",
+                        "content": self._format_knowledge_context(context),
+                    },
+                    prompt_cache.CONTEXT,
+                )
             )
 
-        # optional conversation summary
-        if len(conversation) >= 15:
+        # optional conversation summary of messages older than the window
+        if conversation:
             oldest_id = conversation[0]["id"]
             summary = await self.context_builder.get_conversation_summary(
                 session_id=session_id,
@@ -625,14 +646,20 @@ class ChatProcessor:
             )
             if summary:
                 messages.append(
-                    {"role": "system", "content": f"Previous summary: {summary}"},
+                    prompt_cache.tag(
+                        {"role": "system", "content": f"Previous summary: {summary}"},
+                        prompt_cache.SESSION,
+                    )
                 )
 
         # code embeddings
         if context.get("chunks"):
             code_ctx = llm_client.prepare_code_context(context["chunks"])
             messages.append(
-                {"role": "system", "content": f"Relevant code context:\n{code_ctx}"},
+                prompt_cache.tag(
+                    {"role": "system", "content": f"Relevant code context:\n{code_ctx}"},
+                    prompt_cache.CONTEXT,
+                )
             )
 
         # historical dialogue
@@ -9,8 +9,9 @@ not crash the whole application – we can still operate with a heuristic token
 estimator.
 """
 
-# Note: *Any* is intentionally not imported to avoid an unused import warning.
-from typing import List, Dict, Optional
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import List, Dict, Sequence
 
 # The import is optional – fall back to *None* when the package is absent so
 # that the rest of the application can continue to work.
@@ -23,6 +24,58 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+class _LineTokens:
+    """Prefix sums of per-line token counts.
+
+    Every line is tokenized exactly once; the size of any line range is then
+    a subtraction, so chunk construction stays linear in the file size.
+    Each line is charged one extra unit for its newline.  Without an
+    encoder the units are characters and a token is four of them, which
+    reproduces the former ``len(content) // 4`` estimate exactly.
+    """
+
+    def __init__(self, lines: Sequence[str], encoder=None):
+        if encoder is not None:
+            counts = [len(t) for t in encoder.encode_ordinary_batch(list(lines))]
+            self.divisor = 1
+        else:
+            counts = [len(line) for line in lines]
+            self.divisor = 4
+        self.prefix = [0] * (len(counts) + 1)
+        total = 0
+        for i, count in enumerate(counts):
+            total += count + 1
+            self.prefix[i + 1] = total
+
+    def __len__(self) -> int:
+        return len(self.prefix) - 1
+
+    def count(self, start: int, end: int) -> int:
+        """Tokens of lines ``start`` … ``end - 1`` joined by newlines."""
+        if end <= start:
+            return 0
+        return (self.prefix[end] - self.prefix[start] - 1) // self.divisor
+
+    def fit(self, start: int, budget: int) -> int:
+        """Largest exclusive end whose range from *start* fits *budget*."""
+        limit = self.prefix[start] + (budget + 1) * self.divisor
+        end = bisect_right(self.prefix, limit, lo=start + 1) - 1
+        return max(end, start + 1)  # a single overlong line still forms a chunk
+
+
+@dataclass
+class _File:
+    """Per-call state shared by the chunk builders."""
+
+    lines: List[str]
+    tokens: _LineTokens
+    # Where a window may end: nested symbols first, blank lines second
+    symbol_starts: List[int]
+    blank_lines: List[int]
+    file_path: str
+    language: str
+
+
 class SemanticChunker:
     """Create semantic chunks from parsed code for embedding generation."""
 
@@ -60,159 +113,161 @@ class SemanticChunker:
     def create_chunks(
         self, content: str, symbols: List[Dict], language: str, file_path: str = ""
     ) -> List[Dict]:
-        """Create semantic chunks based on code structure."""
-        chunks = []
+        """Create semantic chunks based on code structure.
+
+        Symbols larger than ``max_tokens`` – and large headers, gaps and
+        symbol-less files – are covered completely by overlapping windows
+        instead of being truncated.
+        """
         lines = content.split("\n")
+        ctx = _File(
+            lines=lines,
+            tokens=_LineTokens(lines, self.encoder),
+            symbol_starts=sorted({s["start_line"] for s in symbols}),
+            blank_lines=[i for i, line in enumerate(lines) if not line.strip()],
+            file_path=file_path,
+            language=language,
+        )
+
+        chunks = []
 
         # First, create chunks for each symbol
         for symbol in symbols:
-            chunk = self._create_symbol_chunk(lines, symbol, file_path, language)
-            if chunk:
-                chunks.append(chunk)
+            chunks.extend(self._create_symbol_chunks(ctx, symbol))
 
-        # Add file header chunk if it contains imports or module docstring
-        header_chunk = self._create_header_chunk(lines, symbols, file_path, language)
-        if header_chunk:
-            chunks.insert(0, header_chunk)
+        # Add file header chunks if the file has imports or a module docstring
+        chunks[:0] = self._create_header_chunks(ctx, symbols)
 
         # Handle orphaned code (code not in any symbol)
-        orphan_chunks = self._create_orphan_chunks(lines, symbols, file_path, language)
-        chunks.extend(orphan_chunks)
+        chunks.extend(self._create_orphan_chunks(ctx, symbols))
 
         return chunks
 
-    def _create_symbol_chunk(
-        self, lines: List[str], symbol: Dict, file_path: str, language: str
-    ) -> Optional[Dict]:
-        """Create a chunk for a specific symbol."""
-        start_line = symbol["start_line"]
-        end_line = symbol["end_line"] + 1
-
-        # Extract symbol lines
-        symbol_lines = lines[start_line:end_line]
-        chunk_content = "\n".join(symbol_lines)
-
-        # Check token count
-        if self.encoder:
-            tokens = len(self.encoder.encode(chunk_content))
-        else:
-            # Rough estimate: 4 chars per token
-            tokens = len(chunk_content) // 4
-
-        # If too large, split into smaller chunks
-        if tokens > self.max_tokens:
-            return self._split_large_symbol(lines, symbol, file_path, language)
-
-        return {
-            "content": chunk_content,
-            "symbol_name": symbol["name"],
-            "symbol_type": symbol["type"],
-            "start_line": start_line,
-            "end_line": end_line - 1,
-            "tokens": tokens,
-            "file_path": file_path,
-            "language": language,
-            "chunk_type": "symbol",
-        }
-
-    def _split_large_symbol(
-        self, lines: List[str], symbol: Dict, file_path: str, language: str
-    ) -> Dict:
-        """Split large symbols into smaller chunks."""
-        # For now, just truncate - could be improved with better splitting
-        start_line = symbol["start_line"]
-        end_line = symbol["end_line"] + 1
-
-        # Take first N lines that fit in token limit
-        chunk_lines = []
-        current_tokens = 0
-
-        for i in range(start_line, end_line):
-            line = lines[i] if i < len(lines) else ""
-            line_tokens = (
-                len(self.encoder.encode(line)) if self.encoder else len(line) // 4
-            )
-
-            if current_tokens + line_tokens > self.max_tokens and chunk_lines:
+    def _create_symbol_chunks(self, ctx: _File, symbol: Dict) -> List[Dict]:
+        """Chunks for a specific symbol – one, or windows when too large."""
+        return self._window_chunks(
+            ctx,
+            symbol["start_line"],
+            symbol["end_line"],
+            symbol_name=symbol["name"],
+            symbol_type=symbol["type"],
+            chunk_type="symbol",
+        )
+
+    def _window_chunks(
+        self,
+        ctx: _File,
+        first: int,
+        last: int,
+        *,
+        symbol_name: str,
+        symbol_type: str,
+        chunk_type: str,
+    ) -> List[Dict]:
+        """Cover lines ``first`` … ``last`` with chunks of ``max_tokens``.
+
+        A range that fits becomes one chunk.  Otherwise windows end just
+        before a nested symbol when one starts in the second half of the
+        window, else after a blank line, else at the token limit; the next
+        window repeats up to ``overlap_tokens`` of the previous one.
+        """
+        index = ctx.tokens
+        last = min(last, len(index) - 1)
+        if last < first:
+            return []
+
+        windows = []
+        start = first
+        while True:
+            end = index.fit(start, self.max_tokens)  # exclusive
+            if end > last:
+                end = last + 1
+            else:
+                end = self._cut(ctx, start, end)
+            windows.append((start, end))
+            if end > last:
                 break
-
-            chunk_lines.append(line)
-            current_tokens += line_tokens
-
-        return {
-            "content": "\n".join(chunk_lines),
-            "symbol_name": symbol["name"],
-            "symbol_type": symbol["type"],
-            "start_line": start_line,
-            "end_line": start_line + len(chunk_lines) - 1,
-            "tokens": current_tokens,
-            "file_path": file_path,
-            "language": language,
-            "chunk_type": "symbol_partial",
-        }
-
-    def _create_header_chunk(
-        self, lines: List[str], symbols: List[Dict], file_path: str, language: str
-    ) -> Optional[Dict]:
-        """Create chunk for file header (imports, module docstring)."""
+            # Step back over up to ``overlap_tokens`` but always move forward
+            nxt = end
+            while nxt - 1 > start and index.count(nxt - 1, end) <= self.overlap_tokens:
+                nxt -= 1
+            start = nxt
+
+        partial = len(windows) > 1
+        return [
+            {
+                "content": "\n".join(ctx.lines[a:b]),
+                "symbol_name": symbol_name,
+                "symbol_type": symbol_type,
+                "start_line": a,
+                "end_line": b - 1,
+                "tokens": index.count(a, b),
+                "file_path": ctx.file_path,
+                "language": ctx.language,
+                "chunk_type": f"{chunk_type}_partial" if partial else chunk_type,
+                **({"part": part, "parts": len(windows)} if partial else {}),
+            }
+            for part, (a, b) in enumerate(windows)
+        ]
+
+    def _cut(self, ctx: _File, start: int, end: int) -> int:
+        """Best exclusive end ≤ *end* for a window starting at *start*."""
+        index, symbol_starts, blank_lines = ctx.tokens, ctx.symbol_starts, ctx.blank_lines
+        half = index.count(start, end) // 2
+
+        # Last nested symbol starting inside the window (not at its top)
+        i = bisect_right(symbol_starts, end - 1) - 1
+        if i >= 0 and symbol_starts[i] > start:
+            cut = symbol_starts[i]
+            if index.count(start, cut) >= half:
+                return cut
+
+        # Last blank line inside the window: cut right after it
+        i = bisect_left(blank_lines, end) - 1
+        if i >= 0 and blank_lines[i] >= start:
+            cut = blank_lines[i] + 1
+            if cut > start and index.count(start, cut) >= half:
+                return cut
+
+        return end
+
+    def _create_header_chunks(self, ctx: _File, symbols: List[Dict]) -> List[Dict]:
+        """Create chunks for the file header (imports, module docstring)."""
+        lines, index = ctx.lines, ctx.tokens
         if not symbols:
-            # No symbols, whole file might be header
-            first_lines = lines[:20]  # First 20 lines
-            content = "\n".join(first_lines)
-
-            if self.encoder:
-                tokens = len(self.encoder.encode(content))
-            else:
-                tokens = len(content) // 4
-
-            if tokens > 10:  # Only if substantial
-                return {
-                    "content": content,
-                    "symbol_name": "__file_header__",
-                    "symbol_type": "header",
-                    "start_line": 0,
-                    "end_line": len(first_lines) - 1,
-                    "tokens": tokens,
-                    "file_path": file_path,
-                    "language": language,
-                    "chunk_type": "header",
-                }
-            return None
+            # No symbols: the whole file is header and must stay searchable
+            if index.count(0, len(index)) <= 10:  # Only if substantial
+                return []
+            return self._window_chunks(
+                ctx,
+                0,
+                len(index) - 1,
+                symbol_name="__file_header__",
+                symbol_type="header",
+                chunk_type="header",
+            )
 
         # Find first symbol
         first_symbol_line = min(s["start_line"] for s in symbols)
-
-        if first_symbol_line > 0:
-            header_lines = lines[:first_symbol_line]
-            header_content = "\n".join(header_lines)
-
-            # Skip if just whitespace
-            if not header_content.strip():
-                return None
-
-            if self.encoder:
-                tokens = len(self.encoder.encode(header_content))
-            else:
-                tokens = len(header_content) // 4
-
-            return {
-                "content": header_content,
-                "symbol_name": "__file_header__",
-                "symbol_type": "header",
-                "start_line": 0,
-                "end_line": first_symbol_line - 1,
-                "tokens": tokens,
-                "file_path": file_path,
-                "language": language,
-                "chunk_type": "header",
-            }
-
-        return None
-
-    def _create_orphan_chunks(
-        self, lines: List[str], symbols: List[Dict], file_path: str, language: str
-    ) -> List[Dict]:
+        if first_symbol_line <= 0:
+            return []
+
+        # Skip if just whitespace
+        if not any(line.strip() for line in lines[:first_symbol_line]):
+            return []
+
+        return self._window_chunks(
+            ctx,
+            0,
+            first_symbol_line - 1,
+            symbol_name="__file_header__",
+            symbol_type="header",
+            chunk_type="header",
+        )
+
+    def _create_orphan_chunks(self, ctx: _File, symbols: List[Dict]) -> List[Dict]:
         """Create chunks for code not contained in any symbol."""
+        lines = ctx.lines
         chunks = []
 
         # Sort symbols by start line
@@ -224,54 +279,34 @@ class SemanticChunker:
             next_start = sorted_symbols[i + 1]["start_line"]
 
             if next_start - current_end > 2:  # More than just whitespace
-                gap_lines = lines[current_end + 1 : next_start]
-                gap_content = "\n".join(gap_lines)
-
-                if gap_content.strip():  # Has actual content
-                    if self.encoder:
-                        tokens = len(self.encoder.encode(gap_content))
-                    else:
-                        tokens = len(gap_content) // 4
-
-                    chunks.append(
-                        {
-                            "content": gap_content,
-                            "symbol_name": f"__orphan_{i}__",
-                            "symbol_type": "orphan",
-                            "start_line": current_end + 1,
-                            "end_line": next_start - 1,
-                            "tokens": tokens,
-                            "file_path": file_path,
-                            "language": language,
-                            "chunk_type": "orphan",
-                        }
+                # Has actual content
+                if any(line.strip() for line in lines[current_end + 1 : next_start]):
+                    chunks.extend(
+                        self._window_chunks(
+                            ctx,
+                            current_end + 1,
+                            next_start - 1,
+                            symbol_name=f"__orphan_{i}__",
+                            symbol_type="orphan",
+                            chunk_type="orphan",
+                        )
                     )
 
         # Check after last symbol
         if sorted_symbols:
             last_symbol_end = sorted_symbols[-1]["end_line"]
-            if last_symbol_end < len(lines) - 1:
-                tail_lines = lines[last_symbol_end + 1 :]
-                tail_content = "\n".join(tail_lines)
-
-                if tail_content.strip():
-                    if self.encoder:
-                        tokens = len(self.encoder.encode(tail_content))
-                    else:
-                        tokens = len(tail_content) // 4
-
-                    chunks.append(
-                        {
-                            "content": tail_content,
-                            "symbol_name": "__file_tail__",
-                            "symbol_type": "tail",
-                            "start_line": last_symbol_end + 1,
-                            "end_line": len(lines) - 1,
-                            "tokens": tokens,
-                            "file_path": file_path,
-                            "language": language,
-                            "chunk_type": "tail",
-                        }
+            if last_symbol_end < len(lines) - 1 and any(
+                line.strip() for line in lines[last_symbol_end + 1 :]
+            ):
+                chunks.extend(
+                    self._window_chunks(
+                        ctx,
+                        last_symbol_end + 1,
+                        len(lines) - 1,
+                        symbol_name="__file_tail__",
+                        symbol_type="tail",
+                        chunk_type="tail",
                     )
+                )
 
         return chunks
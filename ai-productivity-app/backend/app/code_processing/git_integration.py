@@ -1,5 +1,11 @@
 # backend/app/code_processing/git_integration.py
-"""Git repository management for code ingestion."""
+"""Git repository management for code ingestion.
+
+GitPython is imported inside the methods that need it: importing it probes
+the ``git`` binary, which is not worth paying on every worker start.
+"""
+from __future__ import annotations
+
 from pathlib import Path
 import os
 import tempfile
@@ -8,12 +14,14 @@ import shutil
 import logging
 import asyncio
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-import git
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 import aiofiles
 import fnmatch
 import contextlib
 
+if TYPE_CHECKING:  # pragma: no cover
+    import git
+
 logger = logging.getLogger(__name__)
 
 
@@ -96,6 +104,8 @@ class GitManager:
         """Clone a repository and return file list."""
         # Inject personal-access token for HTTPS URLs when provided ----------------
 
+        import git
+
         repo_url = self._inject_token(repo_url, token)
 
         repo_name = self._extract_repo_name(repo_url)
@@ -191,6 +201,8 @@ class GitManager:
         exclude_patterns: List[str] = None,
     ) -> List[Dict]:
         """Get list of processable files from repository."""
+        import git
+
         files = []
 
         # Get all files from git
@@ -372,6 +384,8 @@ class GitManager:
         self, repo_path: str, file_path: str, from_commit: Optional[str] = None
     ) -> Optional[str]:
         """Get diff for a file since a specific commit."""
+        import git
+
         repo = git.Repo(repo_path)
 
         try:
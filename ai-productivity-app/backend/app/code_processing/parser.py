@@ -37,6 +37,57 @@ except ModuleNotFoundError:  # pragma: no cover – environment without the dep
 
 logger = logging.getLogger(__name__)
 
+# Node types that introduce a named symbol, per language.
+_SYMBOL_TYPES: dict[str, dict[str, str]] = {
+    "python": {
+        "function_definition": "function",
+        "class_definition": "class",
+        "decorated_definition": "decorated",
+    },
+    "javascript": {
+        "function_declaration": "function",
+        "class_declaration": "class",
+        "method_definition": "method",
+        "arrow_function": "arrow_function",
+        "function": "function",
+    },
+    "typescript": {
+        "function_declaration": "function",
+        "class_declaration": "class",
+        "method_definition": "method",
+        "interface_declaration": "interface",
+        "type_alias_declaration": "type",
+    },
+    "tsx": {
+        "function_declaration": "function",
+        "class_declaration": "class",
+        "method_definition": "method",
+        "interface_declaration": "interface",
+        "jsx_element": "component",
+    },
+}
+
+# Node types that represent import statements, per language.
+_IMPORT_TYPES: dict[str, list[str]] = {
+    "python": ["import_statement", "import_from_statement"],
+    "javascript": ["import_statement", "import_clause"],
+    "typescript": ["import_statement", "import_clause"],
+    "tsx": ["import_statement", "import_clause"],
+}
+
+# Leaf node types that name something – used for the cross-reference index.
+_IDENTIFIER_TYPES = frozenset(
+    {
+        "identifier",
+        "property_identifier",
+        "type_identifier",
+        "shorthand_property_identifier",
+    }
+)
+
+# Guardrail against generated / minified files producing millions of rows.
+MAX_REFERENCES_PER_FILE = 20_000
+
 
 # =============================================================================
 # Public facing parser class (real implementation if possible, otherwise stub)
@@ -176,6 +227,7 @@ if _TREE_SITTER_AVAILABLE:  # -------------------------------------------------
                 return {
                     "symbols": [],
                     "imports": [],
+                    "references": [],
                     "tree": None,
                     "error": f"Language {language} not supported",
                 }
@@ -202,12 +254,19 @@ if _TREE_SITTER_AVAILABLE:  # -------------------------------------------------
                 return {
                     "symbols": self._extract_symbols(tree, language, content),
                     "imports": self._extract_imports(tree, language, content),
+                    "references": self._extract_references(tree, language, content),
                     "tree": tree,
                     "error": None,
                 }
             except Exception as exc:  # pragma: no cover
                 logger.exception("Parse error for %s", language)
-                return {"symbols": [], "imports": [], "tree": None, "error": str(exc)}
+                return {
+                    "symbols": [],
+                    "imports": [],
+                    "references": [],
+                    "tree": None,
+                    "error": str(exc),
+                }
 
         # ------------------------------------------------------------------
         # AST visitors (internal)
@@ -218,36 +277,7 @@ if _TREE_SITTER_AVAILABLE:  # -------------------------------------------------
         ) -> List[Dict]:
             symbols: list[dict[str, Any]] = []
 
-            symbol_types: dict[str, dict[str, str]] = {
-                "python": {
-                    "function_definition": "function",
-                    "class_definition": "class",
-                    "decorated_definition": "decorated",
-                },
-                "javascript": {
-                    "function_declaration": "function",
-                    "class_declaration": "class",
-                    "method_definition": "method",
-                    "arrow_function": "arrow_function",
-                    "function": "function",
-                },
-                "typescript": {
-                    "function_declaration": "function",
-                    "class_declaration": "class",
-                    "method_definition": "method",
-                    "interface_declaration": "interface",
-                    "type_alias_declaration": "type",
-                },
-                "tsx": {
-                    "function_declaration": "function",
-                    "class_declaration": "class",
-                    "method_definition": "method",
-                    "interface_declaration": "interface",
-                    "jsx_element": "component",
-                },
-            }
-
-            types_to_extract = symbol_types.get(language, {})
+            types_to_extract = _SYMBOL_TYPES.get(language, {})
 
             def traverse(node: Node) -> None:  # noqa: WPS430 (nested)
                 if node.type in types_to_extract:
@@ -294,14 +324,7 @@ if _TREE_SITTER_AVAILABLE:  # -------------------------------------------------
         ) -> List[Dict]:
             imports: list[dict[str, Any]] = []
 
-            import_types: dict[str, list[str]] = {
-                "python": ["import_statement", "import_from_statement"],
-                "javascript": ["import_statement", "import_clause"],
-                "typescript": ["import_statement", "import_clause"],
-                "tsx": ["import_statement", "import_clause"],
-            }
-
-            types_to_extract = import_types.get(language, [])
+            types_to_extract = _IMPORT_TYPES.get(language, [])
 
             def traverse(node: Node) -> None:  # noqa: WPS430 (nested)
                 if node.type in types_to_extract:
@@ -336,6 +359,92 @@ if _TREE_SITTER_AVAILABLE:  # -------------------------------------------------
             traverse(tree.root_node)
             return imports
 
+        def _extract_references(
+            self, tree: tree_sitter.Tree, language: str, content: str
+        ) -> List[Dict]:
+            """Return every identifier occurrence classified for the xref index.
+
+            Each entry has ``name``, ``kind`` (``definition`` / ``import`` /
+            ``reference``), ``symbol_type`` (definitions only), 0-based
+            ``line`` / ``column`` and the stripped source line as ``context``.
+            """
+            definition_types = _SYMBOL_TYPES.get(language, {})
+            import_types = set(_IMPORT_TYPES.get(language, []))
+            source = content.encode()
+            lines = content.split("\n")
+            refs: list[dict[str, Any]] = []
+
+            # Iterative DFS – deeply nested JS files overflow the recursion
+            # limit otherwise.  ``in_import`` is carried down the stack.
+            stack: list[tuple[Node, bool]] = [(tree.root_node, False)]
+            while stack and len(refs) < MAX_REFERENCES_PER_FILE:
+                node, in_import = stack.pop()
+                in_import = in_import or node.type in import_types
+
+                if node.type in _IDENTIFIER_TYPES:
+                    parent = node.parent
+                    symbol_type = self._defined_symbol_type(
+                        node, parent, definition_types
+                    )
+                    if symbol_type is not None:
+                        kind = "definition"
+                    else:
+                        kind = "import" if in_import else "reference"
+                        symbol_type = None
+
+                    line = node.start_point[0]
+                    refs.append(
+                        {
+                            "name": source[node.start_byte : node.end_byte].decode(
+                                errors="ignore"
+                            ),
+                            "kind": kind,
+                            "symbol_type": symbol_type,
+                            "line": line,
+                            "column": node.start_point[1],
+                            "end_line": (
+                                parent.end_point[0] if kind == "definition" else line
+                            ),
+                            "context": (
+                                lines[line].strip()[:500] if line < len(lines) else ""
+                            ),
+                        }
+                    )
+
+                for child in reversed(node.children):
+                    stack.append((child, in_import))
+
+            return refs
+
+        @staticmethod
+        def _defined_symbol_type(
+            node: Node, parent: Node | None, definition_types: dict[str, str]
+        ) -> str | None:
+            """Symbol type when *node* is the name a definition introduces.
+
+            Only the ``name`` field counts: an anonymous ``arrow_function`` or
+            ``function`` expression names nothing, so its parameters and body
+            identifiers stay references.  Those get the name of the variable
+            they are assigned to (``const f = () => …``).
+            """
+            if parent is None:
+                return None
+            if parent.type == "variable_declarator":
+                value = parent.child_by_field_name("value")
+                if (
+                    value is not None
+                    and value.type in definition_types
+                    and parent.child_by_field_name("name") == node
+                ):
+                    return definition_types[value.type]
+                return None
+            if (
+                parent.type in definition_types
+                and parent.child_by_field_name("name") == node
+            ):
+                return definition_types[parent.type]
+            return None
+
         def _extract_bases(self, arg_list_node: Node, content: str) -> List[str]:
             bases: list[str] = []
             for child in arg_list_node.children:
@@ -365,6 +474,7 @@ else:  # ---------------------------------------------------------------------
             return {
                 "symbols": [],
                 "imports": [],
+                "references": [],
                 "tree": None,
                 "error": "tree_sitter not installed",
             }
@@ -13,6 +13,8 @@ Key points
 3.  Exposes
         • engine, SessionLocal, get_db()        → synchronous
         • async_engine, AsyncSessionLocal, get_async_db()  → asynchronous
+        • engines (EngineRegistry), session_for(workload)  → per-workload
+          pools (request / worker / vector / analytics), all instrumented
 4.  Keeps legacy helpers:  `transactions.atomic`,  `get_engine_sync()`.
 5.  Automatically chooses the correct PostgreSQL driver and creates the
     matching async DSN variant (asyncpg / aiosqlite).
@@ -26,17 +28,24 @@ import importlib
 import logging
 import os
 import sys
+import threading
 import types
 from contextlib import asynccontextmanager, contextmanager
-from typing import AsyncGenerator, Generator
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, Generator, List
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
 from sqlalchemy import CheckConstraint, create_engine
+from sqlalchemy.engine import Engine
 # SQLAlchemy <2.0 does not expose `async_sessionmaker` – fall back to
 # plain `sessionmaker(class_=AsyncSession)` when the symbol is missing so
 # that the remainder of this module continues to work on both 1.4 and 2.x
 # releases.
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # type: ignore
+from sqlalchemy.ext.asyncio import (  # type: ignore
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
 
 # Attempt to import `async_sessionmaker`; define a compatible shim if the
 # import fails (e.g. SQLAlchemy 1.4.x in CI).
@@ -54,6 +63,7 @@ from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from app.config import settings
+from app.monitoring.db_instrumentation import instrument_engine, pool_class
 
 logger = logging.getLogger(__name__)
 
@@ -130,25 +140,14 @@ def _async_dsn(url: str) -> str:
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 3.  Synchronous engine & session
+# 3.  Connection URLs
 # ─────────────────────────────────────────────────────────────────────────────
 SYNC_URL = _use_psycopg_driver(settings.database_url)
-
-engine = create_engine(
-    SYNC_URL,
-    echo=settings.database_echo,
-    pool_pre_ping=True,
-    connect_args={"check_same_thread": False} if SYNC_URL.startswith("sqlite") else {},
-)
-
-SessionLocal: sessionmaker[Session] = sessionmaker(
-    bind=engine, autocommit=False, autoflush=False
-)
+ASYNC_URL = _async_dsn(SYNC_URL)
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 4.  Asynchronous engine & session
+# 4.  Async driver availability
 # ─────────────────────────────────────────────────────────────────────────────
-ASYNC_URL = _async_dsn(SYNC_URL)
 
 # Ensure the async driver libs are present; fail loudly otherwise
 # Ensure optional async drivers are present – create lightweight stubs when
@@ -210,17 +209,170 @@ if ASYNC_URL.startswith("sqlite+aiosqlite"):
 elif ASYNC_URL.startswith("postgresql+asyncpg"):
     _ensure_module("asyncpg")
 
-async_engine = create_async_engine(
-    ASYNC_URL,
-    echo=settings.database_echo,
-    pool_pre_ping=True,
-    connect_args={"ssl": True} if ASYNC_URL.startswith("postgresql+asyncpg") else {},
-)
+# ─────────────────────────────────────────────────────────────────────────────
+# 4b. Engine registry – one pool per workload (sync + async)
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class PoolSpec:
+    size: int
+    max_overflow: int
+    timeout: float
+    recycle: int = 1800
+
+
+# Defaults; override per workload with DB_POOL_<WORKLOAD>_{SIZE,OVERFLOW,TIMEOUT}
+_POOL_DEFAULTS: Dict[str, PoolSpec] = {
+    "request": PoolSpec(size=10, max_overflow=10, timeout=10.0),
+    "worker": PoolSpec(size=3, max_overflow=2, timeout=30.0),
+    "vector": PoolSpec(size=5, max_overflow=5, timeout=10.0),
+    "analytics": PoolSpec(size=2, max_overflow=2, timeout=30.0),
+}
+WORKLOADS = tuple(_POOL_DEFAULTS)
+
+
+def _pool_spec(workload: str) -> PoolSpec:
+    base = _POOL_DEFAULTS[workload]
+    prefix = f"DB_POOL_{workload.upper()}_"
+    return PoolSpec(
+        size=int(os.getenv(prefix + "SIZE", base.size)),
+        max_overflow=int(os.getenv(prefix + "OVERFLOW", base.max_overflow)),
+        timeout=float(os.getenv(prefix + "TIMEOUT", base.timeout)),
+        recycle=int(os.getenv(prefix + "RECYCLE", base.recycle)),
+    )
+
+
+class EngineRegistry:
+    """Lazily creates and caches one sync and one async engine per workload.
+
+    Workloads get separate, explicitly sized pools so a burst in one (say,
+    the embedding worker) cannot starve request handlers.  Every engine is
+    instrumented by :mod:`app.monitoring.db_instrumentation`.
+    """
 
-AsyncSessionLocal: async_sessionmaker[AsyncSession] = async_sessionmaker(
-    bind=async_engine, expire_on_commit=False, autoflush=False, autocommit=False
+    def __init__(self, sync_url: str, async_url: str):
+        self.sync_url = sync_url
+        self.async_url = async_url
+        self._sync: Dict[str, Engine] = {}
+        self._async: Dict[str, AsyncEngine] = {}
+        self._sessionmakers: Dict[str, sessionmaker] = {}
+        self._async_sessionmakers: Dict[str, async_sessionmaker] = {}
+        self._lock = threading.Lock()
+
+    def _pool_kwargs(self, url: str, workload: str, *, is_async: bool) -> Dict:
+        if url.startswith("sqlite"):
+            return {}  # SQLite keeps SQLAlchemy's default (file/singleton) pools
+        spec = _pool_spec(workload)
+        return {
+            "poolclass": pool_class(workload, is_async=is_async),
+            "pool_size": spec.size,
+            "max_overflow": spec.max_overflow,
+            "pool_timeout": spec.timeout,
+            "pool_recycle": spec.recycle,
+        }
+
+    def sync(self, workload: str = "request") -> Engine:
+        eng = self._sync.get(workload)
+        if eng is not None:
+            return eng
+        with self._lock:
+            if workload not in self._sync:
+                eng = create_engine(
+                    self.sync_url,
+                    echo=settings.database_echo,
+                    pool_pre_ping=True,
+                    connect_args=(
+                        {"check_same_thread": False}
+                        if self.sync_url.startswith("sqlite")
+                        else {}
+                    ),
+                    **self._pool_kwargs(self.sync_url, workload, is_async=False),
+                )
+                instrument_engine(eng, workload)
+                self._sync[workload] = eng
+            return self._sync[workload]
+
+    def async_(self, workload: str = "request") -> AsyncEngine:
+        eng = self._async.get(workload)
+        if eng is not None:
+            return eng
+        with self._lock:
+            if workload not in self._async:
+                eng = create_async_engine(
+                    self.async_url,
+                    echo=settings.database_echo,
+                    pool_pre_ping=True,
+                    connect_args=(
+                        {"ssl": True}
+                        if self.async_url.startswith("postgresql+asyncpg")
+                        else {}
+                    ),
+                    **self._pool_kwargs(self.async_url, workload, is_async=True),
+                )
+                instrument_engine(eng.sync_engine, workload)
+                self._async[workload] = eng
+            return self._async[workload]
+
+    def sessionmaker(self, workload: str = "request") -> sessionmaker:
+        maker = self._sessionmakers.get(workload)
+        if maker is None:
+            maker = self._sessionmakers[workload] = sessionmaker(
+                bind=self.sync(workload), autocommit=False, autoflush=False
+            )
+        return maker
+
+    def async_sessionmaker(self, workload: str = "request") -> async_sessionmaker:
+        maker = self._async_sessionmakers.get(workload)
+        if maker is None:
+            maker = self._async_sessionmakers[workload] = async_sessionmaker(
+                bind=self.async_(workload),
+                expire_on_commit=False,
+                autoflush=False,
+                autocommit=False,
+            )
+        return maker
+
+    def pool_status(self) -> List[Dict]:
+        """Snapshot of every created pool (for ``/health/db`` and gauges)."""
+        out = []
+        for kind, engines in (("sync", self._sync), ("async", self._async)):
+            for workload, eng in engines.items():
+                pool = eng.pool if kind == "sync" else eng.sync_engine.pool
+                entry = {"workload": workload, "engine": kind, "pool": pool.status()}
+                for field_name in ("size", "checkedout", "overflow", "checkedin"):
+                    fn = getattr(pool, field_name, None)
+                    if callable(fn):
+                        entry[field_name] = fn()
+                out.append(entry)
+        return out
+
+    async def dispose(self) -> None:
+        for eng in self._async.values():
+            await eng.dispose()
+        for eng in self._sync.values():
+            eng.dispose()
+
+
+engines = EngineRegistry(SYNC_URL, ASYNC_URL)
+
+# Request-path defaults (the names the rest of the code base imports)
+engine = engines.sync("request")
+SessionLocal: sessionmaker[Session] = engines.sessionmaker("request")
+
+async_engine = engines.async_("request")
+AsyncSessionLocal: async_sessionmaker[AsyncSession] = engines.async_sessionmaker(
+    "request"
 )
 
+
+def session_for(workload: str) -> Session:
+    """New sync session on *workload*'s pool – for background/threaded code."""
+    return engines.sessionmaker(workload)()
+
+
+def async_session_for(workload: str) -> AsyncSession:
+    return engines.async_sessionmaker(workload)()
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 5.  Declarative base
 # ─────────────────────────────────────────────────────────────────────────────
@@ -7,6 +7,7 @@ token limits, preventing oversized batch errors that lead to infinite retry loop
 from __future__ import annotations
 
 import re
+from dataclasses import dataclass
 from typing import Iterator, List, Protocol
 
 import logging
@@ -27,6 +28,36 @@ def simple_tokenizer_estimate(text: str) -> int:
     return len(text) // 4
 
 
+def _pack(
+    pieces: List[str],
+    sep: str,
+    max_tokens: int,
+    tokenizer_fn,
+    split_piece,
+) -> Iterator[str]:
+    """Greedily join *pieces* with *sep* into chunks of at most *max_tokens*.
+
+    Token counts are summed per piece (plus one per separator) instead of
+    re-measuring the growing chunk, which keeps the split linear in the
+    length of the text.  Pieces that are too long on their own are handed
+    to *split_piece*.
+    """
+    current: List[str] = []
+    tokens = 0
+    for piece in pieces:
+        piece_tokens = tokenizer_fn(piece)
+        if current and tokens + 1 + piece_tokens > max_tokens:
+            yield sep.join(current)
+            current, tokens = [], 0
+        if piece_tokens > max_tokens:
+            yield from split_piece(piece)
+            continue
+        tokens += piece_tokens + (1 if current else 0)
+        current.append(piece)
+    if current:
+        yield sep.join(current)
+
+
 def split_long_text(
     text: str, max_tokens: int, tokenizer_fn=simple_tokenizer_estimate
 ) -> Iterator[str]:
@@ -47,83 +78,124 @@ def split_long_text(
     # Try splitting by paragraphs first
     paragraphs = text.split("\n\n")
     if len(paragraphs) > 1:
-        current_chunk = ""
-        for para in paragraphs:
-            # Check if adding this paragraph would exceed the limit
-            test_chunk = current_chunk + ("\n\n" + para if current_chunk else para)
-            if tokenizer_fn(test_chunk) > max_tokens:
-                # Yield current chunk if it has content
-                if current_chunk:
-                    yield current_chunk
-                    current_chunk = ""
-
-                # If the paragraph itself is too long, split it further
-                if tokenizer_fn(para) > max_tokens:
-                    yield from split_long_text(para, max_tokens, tokenizer_fn)
-                else:
-                    current_chunk = para
-            else:
-                current_chunk = test_chunk
-
-        # Yield any remaining content
-        if current_chunk:
-            yield current_chunk
+        yield from _pack(
+            paragraphs,
+            "\n\n",
+            max_tokens,
+            tokenizer_fn,
+            lambda para: split_long_text(para, max_tokens, tokenizer_fn),
+        )
         return
 
     # Fallback: split by sentences
     sentences = re.split(r"[.!?]+\s+", text)
     if len(sentences) > 1:
-        current_chunk = ""
-        for sentence in sentences:
-            test_chunk = current_chunk + (" " + sentence if current_chunk else sentence)
-            if tokenizer_fn(test_chunk) > max_tokens:
-                if current_chunk:
-                    yield current_chunk
-                    current_chunk = ""
-
-                if tokenizer_fn(sentence) > max_tokens:
-                    # Even single sentence is too long, split by words
-                    yield from _split_by_words(sentence, max_tokens, tokenizer_fn)
-                else:
-                    current_chunk = sentence
-            else:
-                current_chunk = test_chunk
-
-        if current_chunk:
-            yield current_chunk
+        # Even single sentence is too long, split by words
+        yield from _pack(
+            sentences,
+            " ",
+            max_tokens,
+            tokenizer_fn,
+            lambda sentence: _split_by_words(sentence, max_tokens, tokenizer_fn),
+        )
         return
 
     # Final fallback: split by words
     yield from _split_by_words(text, max_tokens, tokenizer_fn)
 
 
+def _truncate_word(word: str, max_tokens: int, tokenizer_fn) -> Iterator[str]:
+    # If even a single word is too long, truncate it
+    while tokenizer_fn(word) > max_tokens and len(word) > 10:
+        word = word[: len(word) // 2]
+    logger.warning("Truncated oversized word to fit token limit")
+    yield word
+
+
 def _split_by_words(
     text: str, max_tokens: int, tokenizer_fn=simple_tokenizer_estimate
 ) -> Iterator[str]:
     """Split text by words as a last resort."""
-    words = text.split()
-    current_chunk = ""
-
-    for word in words:
-        test_chunk = current_chunk + (" " + word if current_chunk else word)
-        if tokenizer_fn(test_chunk) > max_tokens:
-            if current_chunk:
-                yield current_chunk
-                current_chunk = ""
-
-            # If even a single word is too long, truncate it
-            if tokenizer_fn(word) > max_tokens:
-                # Truncate the word to fit
-                while tokenizer_fn(word) > max_tokens and len(word) > 10:
-                    word = word[: len(word) // 2]
-                logger.warning("Truncated oversized word to fit token limit")
-
-            current_chunk = word
-        else:
-            current_chunk = test_chunk
-
-    if current_chunk:
-        yield current_chunk
+    yield from _pack(
+        text.split(),
+        " ",
+        max_tokens,
+        tokenizer_fn,
+        lambda word: _truncate_word(word, max_tokens, tokenizer_fn),
+    )
+
+
+@dataclass
+class TextSection:
+    """One embeddable piece of a structured document."""
+
+    index: int
+    text: str
+    # Markdown heading breadcrumb ("Setup > Docker"), empty before the first
+    heading: str = ""
+
+
+_ATX_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def _iter_sections(text: str) -> Iterator[tuple[str, str]]:
+    """``(heading breadcrumb, body)`` per Markdown section; fences are opaque."""
+    stack: List[str] = []
+    body: List[str] = []
+    in_fence = False
+    for line in text.splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _ATX_HEADING.match(line)
+        if match is None:
+            body.append(line)
+            continue
+        yield " > ".join(stack), "\n".join(body)
+        body = []
+        level = len(match.group(1))
+        stack = stack[: level - 1] + [match.group(2)]
+    yield " > ".join(stack), "\n".join(body)
+
+
+def split_structured_text(
+    text: str, max_tokens: int, tokenizer_fn=simple_tokenizer_estimate
+) -> List[TextSection]:
+    """Split a document along headings, then paragraphs, then token windows.
+
+    Paragraphs of one section are packed together up to *max_tokens*; a
+    paragraph that is too long on its own goes through
+    :func:`split_long_text`.  Chunks never span two sections, so every
+    chunk can be labelled with the heading it belongs to.
+    """
+    sections: List[TextSection] = []
+
+    def emit(heading: str, chunk: str) -> None:
+        if chunk.strip():
+            sections.append(TextSection(len(sections), chunk.strip(), heading))
+
+    for heading, body in _iter_sections(text):
+        current: List[str] = []
+        current_tokens = 0
+        for para in _PARAGRAPH_BREAK.split(body):
+            para = para.strip()
+            if not para:
+                continue
+            para_tokens = tokenizer_fn(para)
+            if para_tokens > max_tokens:
+                emit(heading, "\n\n".join(current))
+                current, current_tokens = [], 0
+                for part in split_long_text(para, max_tokens, tokenizer_fn):
+                    emit(heading, part)
+                continue
+            if current and current_tokens + para_tokens > max_tokens:
+                emit(heading, "\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(para)
+            current_tokens += para_tokens + 1
+        emit(heading, "\n\n".join(current))
+    return sections
 
 
 def iter_token_limited_batches(
@@ -0,0 +1,148 @@
+# backend/app/embeddings/coalescer.py
+"""Micro-batching front for single-text (query) embeddings.
+
+Search, knowledge lookup and chat each embed one query at a time, so under
+load every user paid for a provider round-trip of their own.
+:class:`EmbeddingCoalescer` collects the texts requested within a short
+window (``EMBEDDING_COALESCE_WINDOW_MS``) and sends them as **one**
+``embeddings.create`` call, then hands each caller its own vector:
+
+* identical texts already waiting or in flight share one future, so a
+  burst of the same query costs one input;
+* a window flushes early once ``EMBEDDING_COALESCE_MAX_BATCH`` distinct
+  texts are waiting;
+* a failed call fails every caller of that batch, and a caller that is
+  cancelled never cancels the others.
+
+One coalescer exists per model configuration (:func:`coalescer_for`), so
+the many ``EmbeddingGenerator`` instances created by routers and services
+all feed the same batches.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.monitoring.metrics import (
+    embedding_query_batch_size,
+    embedding_query_latency_seconds,
+    embedding_query_requests_total,
+)
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = float(os.getenv("EMBEDDING_COALESCE_WINDOW_MS", "5")) / 1000
+MAX_BATCH = int(os.getenv("EMBEDDING_COALESCE_MAX_BATCH", "32"))
+
+EmbedFn = Callable[[Sequence[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingCoalescer:
+    """Merge concurrent single-text embedding requests into batch calls."""
+
+    def __init__(
+        self,
+        embed: EmbedFn,
+        *,
+        window: float = WINDOW_SECONDS,
+        max_batch: int = MAX_BATCH,
+    ):
+        self._embed = embed
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        # Texts waiting for the next flush, and every unresolved future
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.calls = 0
+        self.requests = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """Embedding of *text*, batched with concurrent requests."""
+        started = time.perf_counter()
+        self.requests += 1
+        future = self._inflight.get(text)
+        if future is not None:
+            embedding_query_requests_total.labels(outcome="shared").inc()
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[text] = future
+            self._pending[text] = future
+            embedding_query_requests_total.labels(outcome="batched").inc()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    self.window, self._flush
+                )
+        try:
+            # Shielded: one caller giving up must not cancel the batch
+            return await asyncio.shield(future)
+        finally:
+            embedding_query_latency_seconds.observe(time.perf_counter() - started)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch = list(self._pending.items())
+        self._pending = {}
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        self.calls += 1
+        embedding_query_batch_size.observe(len(texts))
+        try:
+            vectors = await self._embed(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(
+                    f"Expected {len(texts)} embeddings, got {len(vectors)}"
+                )
+        except BaseException as exc:  # noqa: BLE001 – handed to every caller
+            embedding_query_requests_total.labels(outcome="error").inc(len(texts))
+            for text, future in batch:
+                self._resolve(text, future, exc=exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for (text, future), vector in zip(batch, vectors):
+            self._resolve(text, future, vector)
+
+    def _resolve(self, text, future, vector=None, exc=None) -> None:
+        if self._inflight.get(text) is future:
+            del self._inflight[text]
+        if future.done():
+            return
+        if isinstance(exc, Exception):
+            future.set_exception(exc)
+            # Callers that already gave up never retrieve it
+            future.exception()
+        elif exc is not None:
+            future.cancel()
+        else:
+            future.set_result(vector)
+
+
+_COALESCERS: Dict[Tuple, EmbeddingCoalescer] = {}
+
+
+def coalescer_for(key: Tuple, embed: EmbedFn) -> EmbeddingCoalescer:
+    """Shared coalescer for one model configuration *key*.
+
+    The first generator registering a key supplies the batch function; any
+    generator with the same key would produce identical vectors.
+    """
+    coalescer = _COALESCERS.get(key)
+    if coalescer is None:
+        coalescer = _COALESCERS[key] = EmbeddingCoalescer(embed)
+    return coalescer
@@ -119,6 +119,10 @@ from app.models.code import CodeEmbedding  # pylint: disable=wrong-import-positi
 from app.embeddings.cache import (
     EMBEDDING_CACHE,
 )  # pylint: disable=wrong-import-position
+from app.embeddings.coalescer import (  # pylint: disable=wrong-import-position
+    EmbeddingCoalescer,
+    coalescer_for,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -387,7 +391,7 @@ class EmbeddingGenerator:
             ) from exc
 
     async def generate_single_embedding(self, text: str) -> List[float]:
-        """Convenience wrapper for a single input with caching."""
+        """Convenience wrapper for a single input with caching and coalescing."""
         # Create cache key from model and text
         cache_key = (self.deployment_name, text)
 
@@ -397,9 +401,9 @@ class EmbeddingGenerator:
             logger.debug(f"Cache hit for embedding: {len(text)} chars")
             return cached_result
 
-        # Generate embedding
-        out = await self.generate_embeddings([text])
-        result = out[0] if out else []
+        # Concurrent requests share one provider call (and identical texts
+        # one input) through the coalescer for this model configuration
+        result = await self._query_coalescer().embed(text)
 
         # Cache the result
         if result:
@@ -408,6 +412,15 @@ class EmbeddingGenerator:
 
         return result
 
+    def _query_coalescer(self) -> EmbeddingCoalescer:
+        key = (
+            type(self.client).__name__,
+            self.deployment_name,
+            self.dimensions,
+            self.encoding_format,
+        )
+        return coalescer_for(key, self.generate_embeddings)
+
     async def generate_and_store(
         self, chunks: List[CodeEmbedding], db: Session, vector_store=None  # type: ignore [name-defined]
     ) -> None:
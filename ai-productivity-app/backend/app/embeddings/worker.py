@@ -14,7 +14,7 @@ from typing import Optional
 
 
 from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import selectinload
 
 from app.config import settings
@@ -295,6 +295,7 @@ class EmbeddingWorker:
                     "symbol_type": chunk.symbol_type,
                     "start_line": chunk.start_line,
                     "end_line": chunk.end_line,
+                    "secret_scan": chunk.secret_scan,
                 },
             }
             embeddings_to_insert.append(embedding_data)
@@ -381,52 +382,11 @@ def start_background_loop() -> None:
         logger.warning("Embedding worker already initialized")
         return
 
-    # -------------------------------------------------------------------
-    # Create async engine – reuse central helper to ensure the generated URL
-    # is compatible with *asyncpg* (strip unsupported query params like
-    # ``sslmode``).
-    # -------------------------------------------------------------------
-
-    # Ensure the async driver is used: convert postgresql:// to postgresql+asyncpg:// if necessary.
-    db_url = settings.database_url
-    if db_url and db_url.startswith("postgresql://"):
-        async_db_url = "postgresql+asyncpg://" + db_url[len("postgresql://") :]
-    else:
-        async_db_url = db_url
-
-    # Remove asyncpg-incompatible parameters from URL
-    if async_db_url and "?" in async_db_url:
-        from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-        parsed = urlparse(async_db_url)
-        query_params = parse_qs(parsed.query)
-        
-        # Remove asyncpg-incompatible parameters
-        incompatible_params = ['sslmode', 'channel_binding']
-        for param in incompatible_params:
-            query_params.pop(param, None)
-        
-        # Reconstruct URL with cleaned parameters
-        new_query = urlencode(query_params, doseq=True)
-        async_db_url = urlunparse((
-            parsed.scheme,
-            parsed.netloc,
-            parsed.path,
-            parsed.params,
-            new_query,
-            parsed.fragment
-        ))
-
-    connect_args: dict[str, object] = {}
-    if async_db_url.startswith("postgresql+asyncpg"):
-        # Ensure SSL is used when connecting to Neon / Cloud Postgres.
-        connect_args["ssl"] = True
-
-    engine = create_async_engine(
-        async_db_url,
-        echo=settings.debug_sql,
-        connect_args=connect_args,
-    )
-    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    # Dedicated, size-limited pool so embedding batches cannot starve
+    # request handlers (see ``app.database.EngineRegistry``).
+    from app.database import engines
+
+    session_maker = engines.async_sessionmaker("worker")
 
     # Initialize worker
     _worker = EmbeddingWorker(session_maker)
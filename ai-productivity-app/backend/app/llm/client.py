@@ -25,8 +25,15 @@ import json  # Add json import for logging
 import time
 from datetime import datetime, timezone
 
-from typing import Any, Dict, List, Sequence, AsyncIterator, Optional
+from typing import Any, Dict, List, Mapping, Sequence, AsyncIterator, Optional
 from app.config import settings
+from app.exceptions import LLMRateLimitException
+from app.llm import prompt_cache
+from app.monitoring.metrics import (
+    llm_prompt_tokens_total,
+    llm_time_to_first_token_seconds,
+)
+from app.utils.rate_limiter import estimate_tokens, llm_buckets, rate_limiter
 
 # Retry imports for resilient LLM calls
 from tenacity import (
@@ -285,6 +292,141 @@ def _sanitize_messages(messages: Sequence[Dict[str, Any]]) -> List[Dict[str, Any
 # ---------------------------------------------------------------------------
 
 
+def _usage_tokens(response: Any) -> tuple[int, int]:
+    """``(input, output)`` tokens reported by any supported provider."""
+    input_tokens = 0
+    output_tokens = 0
+
+    if hasattr(response, "usage"):
+        usage = response.usage
+        if hasattr(usage, "input_tokens"):
+            # Anthropic format – cache reads/writes are reported separately
+            input_tokens = usage.input_tokens
+            output_tokens = usage.output_tokens
+            if not hasattr(usage, "input_tokens_details"):  # not Responses API
+                read, written = prompt_cache.cached_tokens(usage)
+                if read or written:
+                    input_tokens += read + written
+        elif hasattr(usage, "prompt_tokens"):
+            # OpenAI format
+            input_tokens = usage.prompt_tokens
+            output_tokens = usage.completion_tokens
+        elif hasattr(usage, "total_tokens"):
+            # Fallback - estimate input/output split
+            total_tokens = usage.total_tokens
+            input_tokens = int(total_tokens * 0.7)  # Rough estimate
+            output_tokens = total_tokens - input_tokens
+
+    # Handle Azure Responses API usage format
+    elif hasattr(response, "output") and response.output:
+        # Try to extract from output items
+        for output_item in response.output:
+            if hasattr(output_item, "usage"):
+                usage = output_item.usage
+                if hasattr(usage, "input_tokens"):
+                    input_tokens += usage.input_tokens
+                    output_tokens += usage.output_tokens
+                elif hasattr(usage, "prompt_tokens"):
+                    input_tokens += usage.prompt_tokens
+                    output_tokens += usage.completion_tokens
+
+    return input_tokens, output_tokens
+
+
+class _StreamUsage:
+    """Usage and time to first token of a streamed completion.
+
+    Streams report usage in events – Anthropic ``message_start`` /
+    ``message_delta``, the final Chat Completions chunk (``include_usage``),
+    the Responses API ``response.completed`` – so it is collected while the
+    stream is consumed and recorded when it ends.  The request's cost tracking
+    session is closed by then; recording uses a fresh one.
+    """
+
+    def __init__(
+        self,
+        client: "LLMClient",
+        model: str,
+        usage_event_data: Optional[Dict[str, Any]],
+        start_time: float,
+    ) -> None:
+        self.client = client
+        self.provider = client.provider
+        self.model = model
+        self.usage_event_data = usage_event_data
+        self.start_time = start_time
+        self.usage: Any = None
+        self.first_token_at: Optional[float] = None
+
+    def observe(self, chunk: Any) -> None:
+        kind = getattr(chunk, "type", None)
+        if kind == "message_start":
+            usage = getattr(getattr(chunk, "message", None), "usage", None)
+            self.usage = types.SimpleNamespace(
+                **{
+                    name: getattr(usage, name, 0) or 0
+                    for name in (
+                        "input_tokens",
+                        "output_tokens",
+                        "cache_read_input_tokens",
+                        "cache_creation_input_tokens",
+                    )
+                }
+            )
+        elif kind == "message_delta" and self.usage is not None:
+            output = getattr(getattr(chunk, "usage", None), "output_tokens", None)
+            if isinstance(output, int):
+                self.usage.output_tokens = output
+        elif kind == "response.completed":
+            self.usage = getattr(getattr(chunk, "response", None), "usage", None)
+        else:
+            usage = getattr(chunk, "usage", None)
+            if isinstance(getattr(usage, "prompt_tokens", None), int):
+                self.usage = usage
+
+    async def watch(self, response: Any) -> AsyncIterator[Any]:
+        async for chunk in response:
+            self.observe(chunk)
+            yield chunk
+
+    async def track(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        try:
+            async for text in chunks:
+                if self.first_token_at is None:
+                    self.first_token_at = time.time()
+                yield text
+        finally:
+            await self.finish()
+
+    async def finish(self) -> None:
+        try:
+            if self.first_token_at is not None:
+                read, _ = prompt_cache.cached_tokens(self.usage)
+                llm_time_to_first_token_seconds.labels(
+                    provider=self.provider, prompt_cache="hit" if read else "miss"
+                ).observe(self.first_token_at - self.start_time)
+
+            if self.usage is None or self.usage_event_data is None:
+                return
+            from app.database import session_for
+            from app.services.cost_tracking import CostTrackingService
+
+            db = session_for("analytics")
+            try:
+                await self.client._record_usage_metrics(
+                    CostTrackingService(db),
+                    self.usage_event_data,
+                    types.SimpleNamespace(usage=self.usage),
+                    self.model,
+                    self.provider,
+                    self.start_time,
+                )
+            finally:
+                db.close()
+        except Exception as exc:  # noqa: BLE001 – never break the stream
+            logger.warning("Failed to record streamed usage: %s", exc)
+
+
 class LLMClient:  # pylint: disable=too-many-instance-attributes
     """Thin wrapper around *Async(OpenAI|AzureOpenAI)* that normalises the API.
 
@@ -305,8 +447,6 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
     _DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
 
     def __init__(self) -> None:
-        from datetime import timedelta
-
         # Get initial config from unified config service
         config = self._get_current_config()
 
@@ -332,10 +472,6 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
         # Underlying OpenAI SDK client – differs for public vs. Azure.
         self.client: Any | None = None
 
-        # TTL Cache for runtime config
-        self._config_cache: Dict[str, tuple[Any, datetime]] = {}
-        self._cache_ttl = timedelta(seconds=5)
-
         # Default generation parameters
         self.default_temperature: float | None = None
         self.default_max_tokens: int | None = None
@@ -357,102 +493,25 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
 
     def _get_current_config(self):
         """Get current unified configuration."""
-        try:
-            from app.services.unified_config_service import UnifiedConfigService
-            from app.database import SessionLocal
+        from app.services.config_snapshot import config_snapshot
 
-            with SessionLocal() as db:
-                unified_service = UnifiedConfigService(db)
-                return unified_service.get_current_config()
-        except Exception as e:
-            logger.debug(f"Failed to load unified config: {e}")
-            # Fallback to creating a config from static settings
-            from app.schemas.generation import UnifiedModelConfig
-
-            # ``settings.llm_model`` is deprecated – rely on *llm_default_model*
-            if settings.llm_provider.lower() == "azure":
-                # For Azure v1 API, use model IDs directly (no deployment names)
-                fallback_model = settings.llm_default_model or "o3"
-            else:
-                fallback_model = settings.llm_default_model or "o3"
+        return config_snapshot.get().unified
 
-            return UnifiedModelConfig(
-                provider=settings.llm_provider,
-                model_id=fallback_model,
-                use_responses_api=_is_responses_api_enabled(fallback_model),
-            )
+    def _get_runtime_config(self) -> Mapping[str, Any]:
+        """Get current runtime configuration (read-only, no I/O).
 
-    def _get_runtime_config(self) -> Dict[str, Any]:
-        """Get current runtime configuration, falling back to static settings."""
-        # Check cache with TTL
-        if "runtime_config" in self._config_cache:
-            value, timestamp = self._config_cache["runtime_config"]
-            if datetime.utcnow() - timestamp < self._cache_ttl:
-                return value
+        Served from the process-wide config snapshot, which falls back to
+        static settings while the database is unavailable.
+        """
+        from app.services.config_snapshot import config_snapshot
 
-        try:
-            from app.services.unified_config_service import UnifiedConfigService
-            from app.database import SessionLocal
-
-            with SessionLocal() as db:
-                unified_service = UnifiedConfigService(db)
-                current_config = unified_service.get_current_config()
-                # Convert to legacy format for backward compatibility
-                config = current_config.to_runtime_config()
-                self._config_cache["runtime_config"] = (config, datetime.utcnow())
-                return config
-        except Exception as e:
-            logger.debug(f"Failed to load config from cache: {e}")
-            # Final fallback to static settings
-            return {
-                "provider": settings.llm_provider,
-                "chat_model": settings.llm_default_model,
-                "use_responses_api": False,
-            }
+        return config_snapshot.get().runtime_config
 
-    def _get_model_info(self, model_id: str) -> Optional[Dict[str, Any]]:
-        """Get model information from database."""
-        cache_key = f"model_info_{model_id}"
+    def _get_model_info(self, model_id: str) -> Optional[Mapping[str, Any]]:
+        """Get model information from the config snapshot."""
+        from app.services.config_snapshot import config_snapshot
 
-        # Check cache
-        if cache_key in self._config_cache:
-            value, timestamp = self._config_cache[cache_key]
-            if datetime.utcnow() - timestamp < self._cache_ttl:
-                return value
-
-        try:
-            from app.services.unified_config_service import UnifiedConfigService
-            from app.database import SessionLocal
-
-            with SessionLocal() as db:
-                unified_service = UnifiedConfigService(db)
-                model_info = unified_service.get_model_info(model_id)
-
-                if model_info:
-                    # Convert to dict for easier access
-                    info_dict = {
-                        "provider": model_info.provider,
-                        "capabilities": model_info.capabilities.model_dump() if model_info.capabilities else {},  # type: ignore[attr-defined]
-                        "cost_per_1k_input": model_info.cost_per_1k_input_tokens,
-                        "cost_per_1k_output": model_info.cost_per_1k_output_tokens,
-                        "max_tokens": model_info.capabilities.max_output_tokens if model_info.capabilities else 4096,  # type: ignore[attr-defined]
-                        "supports_reasoning": getattr(
-                            model_info.capabilities, "supports_reasoning", False
-                        ),
-                        "supports_streaming": getattr(
-                            model_info.capabilities, "supports_streaming", True
-                        ),
-                        "supports_functions": getattr(
-                            model_info.capabilities, "supports_functions", True
-                        ),
-                    }
-                    self._config_cache[cache_key] = (info_dict, datetime.utcnow())
-                    return info_dict
-
-        except Exception as e:
-            logger.debug(f"Failed to get model info for {model_id}: {e}")
-
-        return None
+        return config_snapshot.get().model_info.get(model_id)
 
     def _should_reinitialize(self, new_provider: str) -> bool:
         """Check if client needs reinitialization due to provider change."""
@@ -523,9 +582,6 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
         # Store any additional generation parameters
         self.generation_params = kwargs
 
-        # Clear config cache to force reload on next request
-        self._config_cache.clear()
-
         logger.info(
             "LLM client reconfigured - Provider: %s, Model: %s, ResponsesAPI: %s, Generation params updated: %s",
             self.provider,
@@ -619,21 +675,40 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
         tools: Any | None = None,
         tool_choice: str | Dict[str, Any] | None = None,
         thinking: Dict[str, Any] | None = None,
+        cost_tracking_service: Any | None = None,
+        usage_event_data: Dict[str, Any] | None = None,
+        start_time: float | None = None,
     ) -> Any:
         """Handle Anthropic Claude API requests."""
 
         if self.client is None:
             raise RuntimeError("Anthropic client not initialized")
 
-        # Extract system message from messages
-        system_message = None
-        filtered_messages = []
+        start_time = start_time or time.time()
 
-        for msg in messages:
-            if msg.get("role") == "system":
-                system_message = msg.get("content", "")
-            else:
-                filtered_messages.append(msg)
+        # Convert tools first: the cache breakpoint goes on the final schema
+        anthropic_tools = None
+        if tools:
+            anthropic_tools = []
+            for tool in tools:
+                if "function" in tool:
+                    # Convert OpenAI format to Anthropic format
+                    func = tool["function"]
+                    anthropic_tools.append(
+                        {
+                            "name": func["name"],
+                            "description": func.get("description", ""),
+                            "input_schema": func.get("parameters", {}),
+                        }
+                    )
+                else:
+                    # Already in Anthropic format or legacy format
+                    anthropic_tools.append(tool)
+
+        # System blocks and turns with prompt-cache breakpoints
+        system_message, filtered_messages, anthropic_tools = (
+            prompt_cache.anthropic_request(messages, anthropic_tools)
+        )
 
         # Build request parameters
         request_params = {
@@ -663,24 +738,7 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
                 f"Enabled Claude thinking with budget: {thinking_config['budget_tokens']} tokens"
             )
 
-        # Handle tools if provided
-        if tools:
-            anthropic_tools = []
-            for tool in tools:
-                if "function" in tool:
-                    # Convert OpenAI format to Anthropic format
-                    func = tool["function"]
-                    anthropic_tools.append(
-                        {
-                            "name": func["name"],
-                            "description": func.get("description", ""),
-                            "input_schema": func.get("parameters", {}),
-                        }
-                    )
-                else:
-                    # Already in Anthropic format or legacy format
-                    anthropic_tools.append(tool)
-
+        if anthropic_tools:
             request_params["tools"] = anthropic_tools
 
         # Log API request for debugging
@@ -702,19 +760,22 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
                 if hasattr(response, "usage"):
                     logger.debug(f"Token Usage: {response.usage}")
 
+            if stream:
+                tracker = _StreamUsage(self, model, usage_event_data, start_time)
+                return tracker.track(
+                    self._stream_anthropic_response(tracker.watch(response))
+                )
+
             # Record usage for cost tracking (Anthropic)
-            if track_usage and cost_tracking_service and usage_event_data:
+            if cost_tracking_service and usage_event_data:
                 await self._record_usage_metrics(
                     cost_tracking_service,
                     usage_event_data,
                     response,
-                    active_model,
+                    model,
                     self.provider,
                     start_time,
                 )
-
-            if stream:
-                return self._stream_anthropic_response(response)
             return response
 
         except Exception as exc:
@@ -753,6 +814,51 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
     # Public helpers
     # ---------------------------------------------------------------------
 
+    async def complete(
+        self,
+        messages: Sequence[Dict[str, Any]] | None = None,
+        *,
+        project_id: Optional[int] = None,  # Scope of the project token budget
+        **kwargs: Any,
+    ) -> Any | AsyncIterator[str]:
+        """Charge the caller's token budgets, then run :meth:`_complete`.
+
+        The estimated prompt + completion tokens are taken from the user,
+        project and model buckets in one round trip *before* the retry loop,
+        so a rejected call raises :class:`LLMRateLimitException` immediately
+        and retries are not charged twice.  A failed call is refunded; a
+        non-streaming one is settled against the reported usage.
+        """
+        budget = llm_buckets(
+            user_id=kwargs.get("user_id"),
+            project_id=project_id,
+            model=kwargs.get("model")
+            or self._get_runtime_config().get("chat_model")
+            or self.active_model,
+            tokens=estimate_tokens(
+                kwargs.get("input") or messages, kwargs.get("max_tokens")
+            ),
+        )
+        decision = await rate_limiter.acquire(budget)
+        if not decision.allowed:
+            logger.info(
+                "LLM token budget %s exhausted, retry in %.1fs",
+                decision.failed.key if decision.failed else "?",
+                decision.retry_after,
+            )
+            raise LLMRateLimitException(retry_after=decision.retry_after_seconds)
+
+        try:
+            response = await self._complete(messages, **kwargs)
+        except Exception:
+            await rate_limiter.refund(budget)
+            raise
+        if budget and not kwargs.get("stream"):
+            used = sum(_usage_tokens(response))
+            if used:
+                await rate_limiter.settle(budget, budget[0].cost, used)
+        return response
+
     @retry(
         stop=stop_after_attempt(getattr(settings, "llm_max_retries", 3)),
         wait=wait_exponential(
@@ -764,7 +870,7 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
         before_sleep=before_sleep_log(logger, logging.WARNING),
         reraise=True,
     )
-    async def complete(  # noqa: PLR0913 – long but mirrors OpenAI params
+    async def _complete(  # noqa: PLR0913 – long but mirrors OpenAI params
         self,
         messages: Sequence[Dict[str, Any]] | None = None,  # Deprecated, use input
         *,
@@ -822,10 +928,10 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
         if track_usage:
             try:
                 from app.services.cost_tracking import CostTrackingService, UsageEvent
-                from app.database import SessionLocal
+                from app.database import session_for
 
-                # Get database session for cost tracking
-                db = SessionLocal()
+                # Cost tracking uses the analytics pool
+                db = session_for("analytics")
                 cost_tracking_service = CostTrackingService(db)
 
                 # Prepare usage event data (will be completed after API call)
@@ -906,6 +1012,8 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
                 # Convert string input to message format
                 messages = [{"role": "user", "content": chat_turns}]
             else:
+                # Stable, cacheable segments first (drops the cache tags)
+                chat_turns = prompt_cache.arrange(chat_turns)
                 # Convert messages into canonical list – some callers might pass
                 # tuples / generators.
                 # For Azure Responses API, we need to handle function_call_output differently
@@ -981,6 +1089,9 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
                     tools=tools,
                     tool_choice=tool_choice,
                     thinking=thinking_config,
+                    cost_tracking_service=cost_tracking_service if track_usage else None,
+                    usage_event_data=usage_event_data if track_usage else None,
+                    start_time=start_time,
                 )
 
             elif self.use_responses_api:
@@ -1290,7 +1401,9 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
                 # Handle streaming response - check actual stream value used in request
                 actual_stream = responses_kwargs.get("stream", False)
                 if actual_stream:
-                    return self._stream_response(response)
+                    return self._tracked_stream(
+                        response, active_model, usage_event_data, start_time
+                    )
                 return response
 
             # -----------------------------------------------------------------
@@ -1329,6 +1442,9 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
                 # Regular models use max_tokens and support temperature/streaming
                 call_kwargs["temperature"] = active_temperature
                 call_kwargs["stream"] = stream
+                if stream:
+                    # Final chunk carries usage, including cached prompt tokens
+                    call_kwargs["stream_options"] = {"include_usage": True}
                 if active_max_tokens:
                     call_kwargs["max_tokens"] = active_max_tokens
 
@@ -1418,7 +1534,9 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
                 # Handle streaming response - check actual stream value used in request
                 actual_stream = clean_kwargs.get("stream", False)
                 if actual_stream:
-                    return self._stream_response(response)
+                    return self._tracked_stream(
+                        response, active_model, usage_event_data, start_time
+                    )
                 return response
             except (
                 Exception
@@ -1567,50 +1685,34 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
             # Calculate response time
             response_time_ms = (time.time() - start_time) * 1000
 
-            # Extract token usage from response
-            input_tokens = 0
-            output_tokens = 0
-
-            if hasattr(response, "usage"):
-                usage = response.usage
-                if hasattr(usage, "input_tokens"):
-                    # Anthropic format
-                    input_tokens = usage.input_tokens
-                    output_tokens = usage.output_tokens
-                elif hasattr(usage, "prompt_tokens"):
-                    # OpenAI format
-                    input_tokens = usage.prompt_tokens
-                    output_tokens = usage.completion_tokens
-                elif hasattr(usage, "total_tokens"):
-                    # Fallback - estimate input/output split
-                    total_tokens = usage.total_tokens
-                    input_tokens = int(total_tokens * 0.7)  # Rough estimate
-                    output_tokens = total_tokens - input_tokens
-
-            # Handle Azure Responses API usage format
-            elif hasattr(response, "output") and response.output:
-                # Try to extract from output items
-                for output_item in response.output:
-                    if hasattr(output_item, "usage"):
-                        usage = output_item.usage
-                        if hasattr(usage, "input_tokens"):
-                            input_tokens += usage.input_tokens
-                            output_tokens += usage.output_tokens
-                        elif hasattr(usage, "prompt_tokens"):
-                            input_tokens += usage.prompt_tokens
-                            output_tokens += usage.completion_tokens
+            input_tokens, output_tokens = _usage_tokens(response)
 
             # Skip recording if no token usage found
             if input_tokens == 0 and output_tokens == 0:
                 logger.debug("No token usage found in response, skipping cost tracking")
                 return
 
+            cached, cache_written = prompt_cache.cached_tokens(
+                getattr(response, "usage", None)
+            )
+            for outcome, tokens in (
+                ("read", cached),
+                ("write", cache_written),
+                ("uncached", max(input_tokens - cached - cache_written, 0)),
+            ):
+                if tokens:
+                    llm_prompt_tokens_total.labels(
+                        provider=provider, cache=outcome
+                    ).inc(tokens)
+
             # Create usage event
             usage_event = UsageEvent(
                 model_id=model_id,
                 provider=provider,
                 input_tokens=input_tokens,
                 output_tokens=output_tokens,
+                cached_input_tokens=cached,
+                cache_write_tokens=cache_written,
                 response_time_ms=response_time_ms,
                 success=True,
                 **usage_event_data,
@@ -1630,6 +1732,17 @@ class LLMClient:  # pylint: disable=too-many-instance-attributes
     # Streaming helpers
     # ------------------------------------------------------------------
 
+    def _tracked_stream(
+        self,
+        response: Any,
+        model: str,
+        usage_event_data: Optional[Dict[str, Any]],
+        start_time: float,
+    ) -> AsyncIterator[str]:
+        """:meth:`_stream_response` that records usage and TTFT at the end."""
+        tracker = _StreamUsage(self, model, usage_event_data, start_time)
+        return tracker.track(self._stream_response(tracker.watch(response)))
+
     async def _stream_response(self, response: Any) -> AsyncIterator[str]:
         """Convert OpenAI/Azure streaming response to string chunks."""
         logger.debug(
@@ -0,0 +1,171 @@
+# backend/app/llm/prompt_cache.py
+"""Provider-side prompt caching.
+
+Both provider families bill (and process) a repeated prompt prefix at a
+fraction of the normal price, but only when the prefix is byte-identical:
+
+* OpenAI / Azure cache the longest previously seen prefix automatically;
+* Anthropic caches up to explicit ``cache_control`` breakpoints (max. 4).
+
+Callers tag the messages they build with :data:`CACHE_KEY` – ``static``
+(system prompt), ``session`` (conversation summary) or ``context``
+(retrieved knowledge / code).  :func:`arrange` puts the stable segments
+first and the retrieved context right before the latest user turn: it
+changes with nearly every query, so placing it ahead of the history would
+invalidate the cached history on every turn.  :func:`anthropic_request`
+then converts the arranged list into Messages API ``system`` blocks and
+messages with breakpoints after the tool schemas, the system prompt and
+the conversation history.
+
+Cached token counts are read back from the usage block with
+:func:`cached_tokens` and priced by ``CostTrackingService``.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+ENABLED = os.getenv("LLM_PROMPT_CACHE", "true").lower() not in {
+    "0",
+    "false",
+    "no",
+    "off",
+}
+
+CACHE_KEY = "cache_segment"
+STATIC, SESSION, CONTEXT = "static", "session", "context"
+_HEAD_RANK = {STATIC: 0, SESSION: 1}
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def tag(message: Dict[str, Any], segment: str) -> Dict[str, Any]:
+    """Return *message* marked as belonging to cache *segment*."""
+    return {**message, CACHE_KEY: segment}
+
+
+def _untag(message: Any) -> Any:
+    if isinstance(message, dict) and CACHE_KEY in message:
+        message = {k: v for k, v in message.items() if k != CACHE_KEY}
+    return message
+
+
+def arrange(messages: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order *messages* from most to least stable and drop the cache tags.
+
+    Untagged messages keep their relative order, so lists built without tags
+    pass through unchanged.
+    """
+    messages = list(messages)
+    tagged = [isinstance(m, dict) and m.get(CACHE_KEY) for m in messages]
+    if not ENABLED or not any(tagged):
+        return [_untag(m) for m in messages]
+
+    head = sorted(
+        (m for m, t in zip(messages, tagged) if t in _HEAD_RANK),
+        key=lambda m: _HEAD_RANK[m[CACHE_KEY]],
+    )
+    context = [m for m, t in zip(messages, tagged) if t == CONTEXT]
+    rest = [
+        m for m, t in zip(messages, tagged) if t not in _HEAD_RANK and t != CONTEXT
+    ]
+    last_user = max(
+        (i for i, m in enumerate(rest) if m.get("role") == "user"),
+        default=len(rest),
+    )
+    ordered = head + rest[:last_user] + context + rest[last_user:]
+    return [_untag(m) for m in ordered]
+
+
+# ---------------------------------------------------------------------------
+# Anthropic Messages API
+# ---------------------------------------------------------------------------
+
+
+def _blocks(content: Any) -> List[Dict[str, Any]]:
+    if isinstance(content, list):
+        return [dict(block) for block in content]
+    return [{"type": "text", "text": str(content)}]
+
+
+def _mark_last(blocks: List[Dict[str, Any]]) -> None:
+    if blocks:
+        blocks[-1] = {**blocks[-1], "cache_control": EPHEMERAL}
+
+
+def anthropic_request(
+    messages: Sequence[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[Optional[List[Dict[str, Any]]], List[Dict[str, Any]], Optional[list]]:
+    """``(system, messages, tools)`` for ``messages.create``.
+
+    The leading run of system messages becomes the ``system`` blocks.  Later
+    system messages – the retrieved context after :func:`arrange` – are
+    folded into the following user turn, as the Messages API has no system
+    role.  Breakpoints go on the last tool, the last system block and the
+    last message before the current user turn.
+    """
+    messages = arrange(messages)
+
+    system: List[Dict[str, Any]] = []
+    idx = 0
+    while idx < len(messages) and messages[idx].get("role") == "system":
+        system.extend(_blocks(messages[idx].get("content", "")))
+        idx += 1
+
+    turns: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+    for msg in messages[idx:]:
+        if msg.get("role") == "system":
+            pending.extend(_blocks(msg.get("content", "")))
+        elif pending and msg.get("role") == "user":
+            turns.append({**msg, "content": pending + _blocks(msg.get("content"))})
+            pending = []
+        else:
+            turns.append(msg)
+    system.extend(pending)  # context after the last user turn
+
+    if ENABLED:
+        if tools:
+            tools = list(tools)
+            tools[-1] = {**tools[-1], "cache_control": EPHEMERAL}
+        _mark_last(system)
+        last_user = max(
+            (i for i, m in enumerate(turns) if m.get("role") == "user"), default=0
+        )
+        if last_user:
+            history_end = turns[last_user - 1]
+            content = _blocks(history_end.get("content", ""))
+            _mark_last(content)
+            turns[last_user - 1] = {**history_end, "content": content}
+
+    return system or None, turns, tools
+
+
+# ---------------------------------------------------------------------------
+# Usage
+# ---------------------------------------------------------------------------
+
+
+def _count(value: Any) -> int:
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def cached_tokens(usage: Any) -> Tuple[int, int]:
+    """``(read, written)`` prompt-cache tokens reported in a usage block.
+
+    Anthropic reports ``cache_read_input_tokens`` and
+    ``cache_creation_input_tokens`` *next to* ``input_tokens``; OpenAI and
+    Azure report ``cached_tokens`` as part of the prompt tokens (there is no
+    separate write charge).
+    """
+    if usage is None:
+        return 0, 0
+    read = _count(getattr(usage, "cache_read_input_tokens", 0))
+    written = _count(getattr(usage, "cache_creation_input_tokens", 0))
+    for name in ("prompt_tokens_details", "input_tokens_details"):
+        details = getattr(usage, name, None)
+        if details is not None:
+            read += _count(getattr(details, "cached_tokens", 0))
+    return read, written
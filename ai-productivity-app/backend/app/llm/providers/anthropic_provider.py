@@ -5,6 +5,7 @@ import logging
 from anthropic import AsyncAnthropic
 
 from app.config import settings
+from app.llm.prompt_cache import anthropic_request
 from .base import LLMProvider
 
 logger = logging.getLogger(__name__)
@@ -40,15 +41,10 @@ class AnthropicProvider(LLMProvider):
     ) -> Any:
         """Execute Anthropic completion."""
 
-        # Extract system message
-        system_message = None
-        filtered_messages = []
-
-        for msg in messages:
-            if msg["role"] == "system":
-                system_message = msg["content"]
-            else:
-                filtered_messages.append(msg)
+        # System blocks, turns and tools with prompt-cache breakpoints
+        system_message, filtered_messages, anthropic_tools = anthropic_request(
+            messages, self.validate_tools(tools) if tools else None
+        )
 
         # Build request
         params = {
@@ -79,8 +75,8 @@ class AnthropicProvider(LLMProvider):
 
             params["thinking"] = thinking_params
 
-        if tools:
-            params["tools"] = self.validate_tools(tools)
+        if anthropic_tools:
+            params["tools"] = anthropic_tools
 
         params.update(kwargs)
         params = {k: v for k, v in params.items() if v is not None}
@@ -2,6 +2,8 @@
 
 from typing import Any, Dict, List, Optional
 
+from app.llm.prompt_cache import arrange
+
 
 def validate_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Convert tools to OpenAI format if necessary."""
@@ -97,7 +99,8 @@ def build_openai_chat_params(
     """Build parameters for OpenAI-compatible chat completion requests."""
     params = {
         "model": model,
-        "messages": messages,
+        # Stable prefix first so the provider's automatic prompt cache hits
+        "messages": arrange(messages),
         "temperature": temperature,
         "stream": stream,
     }
@@ -60,6 +60,10 @@ TOOL_SCHEMAS: List[Dict[str, Any]] = [
                         "minimum": 1,
                         "maximum": 20,
                     },
+                    "grep": {
+                        "type": "boolean",
+                        "description": "Treat query as a regular expression and return exact file/line/column matches instead of semantic snippets",
+                    },
                 },
                 "required": ["query", "project_id", "k"],
                 "additionalProperties": False,
@@ -185,6 +189,10 @@ TOOL_SCHEMAS: List[Dict[str, Any]] = [
                         "type": "integer",
                         "description": "Specific line number to get blame for",
                     },
+                    "end_line": {
+                        "type": "integer",
+                        "description": "Optional last line (inclusive) to blame a range starting at line_number",
+                    },
                     "project_id": {
                         "type": "integer",
                         "description": "Current project identifier",
@@ -352,6 +360,19 @@ async def _tool_file_search(
     project_id: int = int(args["project_id"])
     k: int = int(args.get("k", 5))
 
+    if args.get("grep"):
+        import re
+
+        from app.services.code_grep import grep_engine
+
+        try:
+            page = await grep_engine.search(
+                db, project_id, query, regex=True, limit=max(k, 20)
+            )
+        except re.error as exc:
+            return {"error": f"Invalid regular expression: {exc}"}
+        return page
+
     ctx_builder = ContextBuilder(db)  # type: ignore[arg-type]
     ctx = await ctx_builder.extract_context(query, project_id)
     chunks = ctx.get("chunks", [])[:k]
@@ -516,6 +537,7 @@ async def _tool_git_blame(
     file_path: str = args["file_path"]
     project_id: int = int(args["project_id"])
     line_number: int = args.get("line_number")
+    end_line: int | None = args.get("end_line")
 
     try:
         # Get project to find repository path
@@ -535,7 +557,9 @@ async def _tool_git_blame(
 
         git_searcher = GitHistorySearcher(repo_path)
 
-        if line_number:
+        if line_number and end_line and end_line > line_number:
+            blame_info = git_searcher.get_blame_range(file_path, line_number, end_line)
+        elif line_number:
             blame_info = git_searcher.get_blame(file_path, line_number)
         else:
             # Get blame for entire file (first 50 lines)
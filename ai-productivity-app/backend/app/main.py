@@ -3,8 +3,13 @@ FastAPI application entry point with middleware and lifespan management.
 """
 
 # Standard library
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+from importlib import import_module
+
+# Cold-start profiling hooks must be in place before anything heavy loads
+from .startup import startup
 
 # ---------------------------------------------------------------------------
 # Ensure noisy 3rd-party libraries are set to INFO in production before any of
@@ -30,69 +35,43 @@ from .utils.redis_client import close_redis
 from .middleware.correlation_id import CorrelationIdMiddleware
 from .middleware.security import register_security_middleware
 from .middleware.config_error_handler import ConfigurationErrorMiddleware
-from .routers import auth, projects, monitoring
-from .routers import code as code_router
-from .routers import email as email_router
-from .routers import notifications as notify_router
-from .routers import import_git as import_git_router
-from .routers import chat as chat_router
-from .routers import timeline as timeline_router
-from .routers import search as search_router
-from .routers import analytics as analytics_router
-from .routers import knowledge as knowledge_router
-from .routers import rendering as rendering_router
-from .routers import copilot as copilot_router
-from .routers import prompts as prompts_router
-from .routers import repositories as repositories_router
-from .routers import project_search as project_search_router
-from .routers import feedback as feedback_router
-
-# AI config websocket router
-from .routers import config_ws as config_ws_router
-from .chat import admin_routes as admin_router
-from .chat import confidence_routes as confidence_router
-
-# Import unified config router
-# Unified AI configuration router (new path)
-# Unified AI configuration router
-from .routers.ai_config import ai_config_router as config_router
-
-
-@asynccontextmanager
-async def lifespan(_app: FastAPI):  # pylint: disable=unused-argument
-    """Application lifespan manager.
 
-    The parameter is required by the FastAPI lifespan hook but
-    is not used directly within this function.
-    """
-    # Startup
-    # Initialize database extensions first
-    from .database_init import init_database_extensions
-    init_database_extensions()
-    
-    init_db()
-
-    # Start embedding worker background loop
-    from app.embeddings.worker import start_background_loop
+# (module, attribute, include_router kwargs).  Imported one at a time so the
+# cost of every router – and the SDKs it drags in – is reported by
+# ``/health/startup``.
+_ROUTERS = (
+    (".routers.auth", "router", {}),
+    (".routers.projects", "router", {}),
+    (".routers.monitoring", "router", {}),
+    (".routers.code", "router", {}),
+    (".routers.chat", "router", {}),
+    (".routers.email", "router", {}),
+    (".routers.notifications", "router", {}),
+    (".routers.import_git", "router", {}),
+    (".routers.timeline", "router", {}),
+    (".routers.search", "router", {}),
+    (".routers.analytics", "router", {}),
+    (".routers.knowledge", "router", {}),
+    (".routers.rendering", "router", {}),
+    (".routers.copilot", "router", {}),
+    (".routers.prompts", "router", {}),
+    (".routers.repositories", "router", {}),
+    (".routers.project_search", "router", {}),
+    (".routers.feedback", "router", {}),
+    # AI config websocket router
+    (".routers.config_ws", "router", {}),
+    (".chat.admin_routes", "router", {"prefix": "/admin", "tags": ["Admin"]}),
+    (
+        ".chat.confidence_routes",
+        "router",
+        {"prefix": "/confidence", "tags": ["Confidence"]},
+    ),
+    # Unified AI configuration router
+    (".routers.ai_config", "ai_config_router", {}),
+)
 
-    start_background_loop()
 
-    # Initialize vector store based on configuration
-    from app.services.vector_service import vector_service
-
-    try:
-        await vector_service.initialize()
-        logger.info(
-            "Vector store (%s) initialized successfully", settings.vector_store_type
-        )
-    except Exception as exc:
-        logger.error(
-            "Failed to initialize vector store (%s): %s",
-            settings.vector_store_type,
-            exc,
-        )
-
-    # Initialize unified configuration
+def _initialize_config_defaults() -> None:
     from app.services.unified_config_service import UnifiedConfigService
     from app.database import SessionLocal
 
@@ -100,21 +79,15 @@ async def lifespan(_app: FastAPI):  # pylint: disable=unused-argument
         service = UnifiedConfigService(db)
         service.initialize_defaults()
 
-    # Seed model catalogue if empty (quick-win – avoids empty dropdown)
+
+async def _seed_model_catalogue() -> None:
+    """Seed model catalogue if empty (quick-win – avoids empty dropdown)."""
     try:
         from app.cli.seed_models import seed_models  # local import to avoid heavy deps
 
-        # ``seed_models`` is a synchronous helper.  Calling it with *await*
-        # raises a ``TypeError`` at runtime which, in turn, aborts the
-        # seeding routine and leaves the *model_configurations* table empty.
-        # Execute it **directly** to ensure the fixture rows are inserted
-        # during application start-up so that the `/models` endpoint returns
-        # the available catalogue.
-
-        # First ensure at least the *initial* catalogue entries exist so that
-        # follow-up update routines have rows to work with.  The helper is
-        # idempotent – it inserts fixture rows only when the table is empty.
-        seed_models()  # noqa: SLF001 – util helper
+        # ``seed_models`` is a synchronous helper that inserts the initial
+        # fixture rows only when the table is empty; run it off the event loop.
+        await asyncio.to_thread(seed_models)  # noqa: SLF001 – util helper
 
         # -----------------------------------------------------------------
         # Keep catalogue in sync with the *latest* fixture
@@ -128,14 +101,126 @@ async def lifespan(_app: FastAPI):  # pylint: disable=unused-argument
 
         from app.cli.update_models import update_models  # type: ignore
 
-        # ``update_models`` is *async* – invoke it with ``await`` inside the
-        # lifespan coroutine so it executes in the existing event-loop.
         await update_models()  # noqa: SLF001 – util helper
     except Exception as exc:  # pragma: no cover – non-critical
         logger.warning("Model seeding skipped: %s", exc)
 
+
+def _warm_code_parser() -> None:
+    from app.routers.code import get_code_parser
+
+    get_code_parser()
+
+
+def _warm_chunker() -> None:
+    from app.routers.code import get_chunker
+
+    get_chunker()
+
+
+async def _warm_up() -> None:
+    """Everything ``/health/ready`` waits for, plus optional parallel warmers.
+
+    Runs after the lifespan has yielded, so the server already accepts
+    connections (liveness, startup and readiness probes) while it executes.
+    """
+    # Heavy, optional subsystems load in worker threads alongside the chain
+    # below and are never awaited by the readiness gate.
+    startup.background("warm_code_parser", _warm_code_parser)
+    startup.background("warm_chunker", _warm_chunker)
+    startup.background("warm_jedi", lambda: import_module("jedi"))
+    startup.background("warm_pil", lambda: import_module("PIL.Image"))
+
+    # Vector store connects lazily on first use; initialise it eagerly but
+    # without holding up readiness.
+    from app.services.vector_service import vector_service
+
+    startup.background("vector_store", vector_service.initialize, thread=False)
+
+    # Start embedding worker background loop
+    from app.embeddings.worker import start_background_loop
+
+    await startup.run("embedding_worker", start_background_loop)
+
+    # Chunked knowledge-document ingestion (durable queue in the database)
+    from app.services.knowledge_ingest import knowledge_ingest_worker
+
+    await startup.run("knowledge_ingest", knowledge_ingest_worker.start)
+
+    # Initialize unified configuration, then the model catalogue
+    if not await startup.run(
+        "config_defaults", _initialize_config_defaults, thread=True
+    ):
+        return
+    await startup.run("model_catalogue", _seed_model_catalogue, required=False)
+
+    # Shared runtime-config snapshot (after seeding so it includes the
+    # catalogue) + cross-replica change listener
+    from app.services.config_snapshot import config_snapshot
+
+    await startup.run("config_snapshot", config_snapshot.start)
+
+    # Periodic recount of the per-project statistics rollup
+    from app.services.project_stats import project_stats_reconciler
+
+    await startup.run("project_stats_reconciler", project_stats_reconciler.start)
+
+    # Hourly/daily analytics rollups and concurrent materialized-view refresh
+    from app.services.analytics_rollups import analytics_rollup_scheduler
+
+    await startup.run("analytics_rollups", analytics_rollup_scheduler.start)
+
+    # Stored function behind SEARCH_FUSION=sql, installed on its own
+    # connection so search requests never run DDL
+    from app.services.postgresql_functions import PostgreSQLFunctions
+
+    await startup.run(
+        "fused_search_function",
+        PostgreSQLFunctions.install_fused_search,
+        thread=True,
+        required=False,
+    )
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):  # pylint: disable=unused-argument
+    """Application lifespan manager.
+
+    The parameter is required by the FastAPI lifespan hook but
+    is not used directly within this function.  Only the schema and cheap
+    task spawns run before ``yield``; the rest is the background
+    :func:`_warm_up`, and ``/health/ready`` reports 503 until its required
+    steps have finished.
+    """
+    # Startup
+    # Database extensions first, then schema.  Requests need both, so they
+    # complete (with retries) before the server accepts any traffic – even
+    # when no readiness probe holds it back.
+    from .database_init import init_database_extensions
+
+    for name, step in (
+        ("database_extensions", init_database_extensions),
+        ("init_db", init_db),
+    ):
+        if not await startup.run(name, step, thread=True):
+            raise RuntimeError(f"Required startup step {name} failed")
+
+    # Background flusher for deferred search-history inserts
+    from app.services.search_history_writer import search_history_writer
+
+    await startup.run("search_history_writer", search_history_writer.start)
+
+    # Cross-replica eviction for the auth session/user cache
+    from app.auth.session_cache import session_cache
+
+    await startup.run("auth_session_cache", session_cache.start)
+
+    startup.begin(_warm_up)
+
     yield
     # Shutdown
+    await startup.stop()
+
     await close_redis()  # Close Redis connection pool
 
     # Stop embedding worker
@@ -143,6 +228,35 @@ async def lifespan(_app: FastAPI):  # pylint: disable=unused-argument
 
     await stop_background_loop()
 
+    from app.services.knowledge_ingest import knowledge_ingest_worker
+
+    await knowledge_ingest_worker.stop()
+
+    # Persist any search-history rows still buffered
+    await search_history_writer.stop()
+
+    from app.services.config_snapshot import config_snapshot
+    from app.services.project_stats import project_stats_reconciler
+    from app.services.analytics_rollups import analytics_rollup_scheduler
+
+    await config_snapshot.stop()
+
+    await project_stats_reconciler.stop()
+
+    await analytics_rollup_scheduler.stop()
+
+    await session_cache.stop()
+
+    # Multimodal extraction worker processes (created on first large upload)
+    from app.services.multimodal_service import multimodal_processor
+
+    await multimodal_processor.shutdown()
+
+    # Close every workload pool
+    from app.database import engines
+
+    await engines.dispose()
+
 
 # Create FastAPI application
 app = FastAPI(
@@ -160,7 +274,8 @@ app = FastAPI(
 # Middleware stack
 #   1. CORS – must run first so that OPTIONS pre-flights are answered quickly.
 #   2. Correlation ID – attaches X-Request-ID header and contextvar.
-#   3. Security / SlowAPI – rate-limiting, security headers, CSRF.
+#   3. Security – security headers, CSRF and 429 responses (rate limits
+#      are Redis token buckets checked per route, see app.utils.rate_limiter).
 # ---------------------------------------------------------------------------
 
 # 1. CORS
@@ -172,6 +287,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # 2. Correlation IDs (skip when explicitly disabled)
@@ -181,35 +297,14 @@ if not settings.disable_correlation_id:
 # 3. Configuration error handler
 app.add_middleware(ConfigurationErrorMiddleware)
 
-# 4. Security headers & SlowAPI rate-limiter
+# 4. Security headers, CSRF & token-bucket 429 handler
 register_security_middleware(app)
 
 # Include routers
-app.include_router(auth.router)
-# Note: the "models_router" shim may be missing when unified config is enabled
-# Include only when present to avoid FastAPI errors.
-app.include_router(projects.router)
-app.include_router(monitoring.router)
-app.include_router(code_router.router)
-app.include_router(chat_router.router)
-app.include_router(email_router.router)
-app.include_router(notify_router.router)
-app.include_router(import_git_router.router)
-app.include_router(timeline_router.router)
-app.include_router(search_router.router)
-app.include_router(analytics_router.router)
-app.include_router(knowledge_router.router)
-app.include_router(rendering_router.router)
-app.include_router(copilot_router.router)
-app.include_router(prompts_router.router)
-app.include_router(repositories_router.router)
-app.include_router(project_search_router.router)
-app.include_router(feedback_router.router)
-app.include_router(config_ws_router.router)
-app.include_router(admin_router.router, prefix="/admin", tags=["Admin"])
-app.include_router(confidence_router.router, prefix="/confidence", tags=["Confidence"])
-
-app.include_router(config_router)
+for _module, _attr, _kwargs in _ROUTERS:
+    with startup.timed(f"import {_module.lstrip('.')}"):
+        _router_module = import_module(_module, __package__)
+    app.include_router(getattr(_router_module, _attr), **_kwargs)
 
 
 @app.get("/health")
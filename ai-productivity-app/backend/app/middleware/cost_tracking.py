@@ -10,7 +10,7 @@ from fastapi.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.base import RequestResponseEndpoint
 
 from app.services.cost_tracking import CostTrackingService, UsageEvent
-from app.database import SessionLocal
+from app.database import session_for
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
@@ -181,8 +181,9 @@ class CostTrackingMiddleware(BaseHTTPMiddleware):
             if not llm_usage:
                 return
 
-            # Create usage event for request-level tracking
-            db = SessionLocal()
+            # Create usage event for request-level tracking (analytics pool,
+            # so accounting writes never compete with request handlers)
+            db = session_for("analytics")
             cost_tracking_service = CostTrackingService(db)
 
             try:
@@ -3,7 +3,9 @@ Security middleware for Phase 2.
 
 Features
 --------
-• Integrates SlowAPI rate-limiting middleware (limiter is defined in `app.auth.security`).
+• Renders rate-limit rejections as 429 JSON.  Limits themselves are Redis
+  token buckets (`app.utils.rate_limiter`) applied by the routes and the LLM
+  client, not by middleware.
 • Adds secure HTTP headers (HSTS, X-Frame-Options, X-Content-Type-Options, Referrer-Policy).
 • Performs CSRF validation on state-changing requests (POST, PUT, PATCH, DELETE).
 """
@@ -15,7 +17,7 @@ from typing import Awaitable, Callable
 from fastapi import FastAPI, Request, Response, status
 
 # ---------------------------------------------------------------------------
-# Optional dependencies – Starlette (via FastAPI) & SlowAPI rate-limiter
+# Optional dependencies – Starlette (via FastAPI) & SlowAPI exceptions
 # ---------------------------------------------------------------------------
 # The sandbox may not ship the full Starlette or SlowAPI libraries.  Provide
 # graceful fallbacks so the middleware remains importable and unit-tests can
@@ -165,12 +167,15 @@ def _rate_limit_handler(request: Request, exc: RateLimitExceeded):  # noqa: D401
 
 def register_security_middleware(app: FastAPI) -> None:
     """
-    Register SlowAPI rate-limiting + security headers middleware on the given app.
+    Register the security headers / CSRF middleware and the 429 handler.
+
+    Rate limits are Redis token buckets from ``app.utils.rate_limiter``,
+    checked by the routes themselves; no rate-limiting middleware runs here.
     """
-    # SlowAPI rate-limiter (uses limiter defined in `app.auth.security`)
+    # The legacy SlowAPI limiter stays on ``app.state`` for third-party
+    # ``@limiter.limit`` decorators; none of our routes use it.
     app.state.limiter = security.limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_handler)
-    app.add_middleware(SlowAPIMiddleware)
 
     # Security headers & CSRF
     app.add_middleware(SecurityHeadersMiddleware)
@@ -26,8 +26,9 @@ from __future__ import annotations
 from .base import Base, TimestampMixin
 from .user import User
 from .session import Session
-from .project import Project, ProjectStatus
-from .code import CodeDocument, CodeEmbedding
+from .project import Project, ProjectStatsRollup, ProjectStatus
+from .code import CodeDocument, CodeDocumentContent, CodeEmbedding, CodeSymbolRef
+from .document_version import DocumentVersion
 from .embedding import EmbeddingMetadata
 from .search_history import SearchHistory
 from .import_job import ImportJob, ImportStatus
@@ -36,6 +37,8 @@ from .timeline import TimelineEvent
 from .config import RuntimeConfig, ConfigHistory
 from .prompt import PromptTemplate
 from .feedback import UserFeedback, FeedbackSummary
+from .metric_rollup import MetricRollup
+from .analytics_rollup import AnalyticsRollup
 
 __all__ = [
     # infrastructure
@@ -47,8 +50,12 @@ __all__ = [
     # project & code
     "Project",
     "ProjectStatus",
+    "ProjectStatsRollup",
     "CodeDocument",
     "CodeEmbedding",
+    "CodeDocumentContent",
+    "CodeSymbolRef",
+    "DocumentVersion",
     # embeddings / search
     "EmbeddingMetadata",
     "SearchHistory",
@@ -65,6 +72,9 @@ __all__ = [
     # feedback
     "UserFeedback",
     "FeedbackSummary",
+    # monitoring
+    "MetricRollup",
+    "AnalyticsRollup",
 ]
 
 # --------------------------------------------------------------------------- #
@@ -0,0 +1,74 @@
+# backend/app/models/analytics_rollup.py
+"""Hourly and daily analytics rollups maintained by the rollup scheduler."""
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    JSON,
+    String,
+    Text,
+    UniqueConstraint,
+)
+
+from .base import Base
+
+
+class AnalyticsRollup(Base):
+    """One aggregate per kind/dimension/user over one hour or day.
+
+    ``kind`` is ``usage``, ``cost``, ``search``, ``rag`` or ``quality``;
+    ``dimension`` names what is counted within it (a model id, a metric, a
+    search type).  ``user_id`` 0 stands for all users.  A single ``meta``
+    row records how far the scheduler has got.  Analytics endpoints read only these
+    rows, so their cost depends on the number of buckets, not on history.
+    """
+
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity",
+            "kind",
+            "dimension",
+            "user_id",
+            "bucket_start",
+            name="uq_analytics_rollups_bucket",
+        ),
+        Index(
+            "idx_analytics_rollups_lookup",
+            "kind",
+            "granularity",
+            "user_id",
+            "bucket_start",
+        ),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String(8), nullable=False)  # hour | day
+    kind = Column(String(20), nullable=False)
+    dimension = Column(String(200), nullable=False, default="")
+    user_id = Column(Integer, nullable=False, default=0)
+    bucket_start = Column(DateTime, nullable=False)
+
+    count = Column(BigInteger, nullable=False, default=0)
+    # Sum of the values (the cost for ``cost`` rows)
+    total = Column(Float, nullable=False, default=0.0)
+    tokens_in = Column(BigInteger, nullable=False, default=0)
+    tokens_out = Column(BigInteger, nullable=False, default=0)
+    min = Column(Float, nullable=True)
+    max = Column(Float, nullable=True)
+    p50 = Column(Float, nullable=True)
+    p95 = Column(Float, nullable=True)
+    # Quantile sketch, so hours merge into days with correct percentiles
+    sketch = Column(Text, nullable=True)
+    data = Column(JSON, nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<AnalyticsRollup {self.kind}/{self.dimension}[{self.user_id}] "
+            f"{self.granularity}@{self.bucket_start} n={self.count}>"
+        )
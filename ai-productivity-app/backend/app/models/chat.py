@@ -19,6 +19,7 @@ from __future__ import annotations
 
 # Standard library
 import os
+from datetime import datetime
 
 # Third-party
 from sqlalchemy import (
@@ -34,6 +35,7 @@ from sqlalchemy import (
     text,
     CheckConstraint,
     DECIMAL,
+    func,
 )
 
 # ``sqlalchemy-utils`` is not available in the sandbox.  The package usually
@@ -80,6 +82,14 @@ class ChatSession(Base, TimestampMixin):
             "updated_at",
             postgresql_where=text("is_active = true"),
         ),
+        # Keyset pagination of session lists (most recently active first)
+        Index(
+            "idx_chat_sessions_project_activity",
+            "project_id",
+            "last_activity_at",
+            "id",
+        ),
+        Index("idx_chat_sessions_activity", "last_activity_at", "id"),
         Index(
             "idx_chat_sessions_summary_search",
             "summary",
@@ -104,6 +114,15 @@ class ChatSession(Base, TimestampMixin):
     # Optional summarisation field for list views
     summary = Column(Text, nullable=True)
     summary_updated_at = Column(DateTime, nullable=True)
+    # Newest message folded into ``summary`` by the conversation summarizer
+    summary_message_id = Column(Integer, nullable=True)
+
+    # Denormalised list-view counters, maintained by ChatService on message
+    # create / soft-delete so listings never COUNT(*) chat_messages.
+    message_count = Column(Integer, nullable=False, server_default=text("0"))
+    last_activity_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, server_default=func.now()
+    )
 
     # Full-text search vector for PostgreSQL
     search_vector = Column(
@@ -166,6 +185,14 @@ class ChatMessage(Base, TimestampMixin):
             "applied_commands",
             postgresql_using="gin",
         ),
+        # Keyset pagination of a session's messages (created_at, id)
+        Index(
+            "idx_chat_messages_session_keyset",
+            "session_id",
+            "created_at",
+            "id",
+            postgresql_where=text("is_deleted = false"),
+        ),
         # Partial indexes for common queries
         Index(
             "idx_chat_messages_active",
@@ -6,6 +6,8 @@ semantic search capabilities.
 """
 from pathlib import Path, PurePosixPath
 import re
+from typing import Any, Dict, Optional
+
 from sqlalchemy import (
     Column,
     Integer,
@@ -272,9 +274,27 @@ class CodeEmbedding(Base, TimestampMixin):
         JSONB, default=dict, comment="Functions/classes this chunk depends on"
     )
 
+    # Index-time secret scan (offsets only, see app.chat.secret_scanner)
+    secret_scan_version = Column(
+        Integer, comment="SCANNER_VERSION the findings were produced with"
+    )
+    secret_findings = Column(
+        JSON, comment="Secret findings in chunk_content: type/category/offsets"
+    )
+
     # Relationships
     document = relationship("CodeDocument", back_populates="embeddings")
 
+    @property
+    def secret_scan(self) -> Optional[Dict[str, Any]]:
+        """Persisted scan in the shape ``ContentFilter`` consumes."""
+        if self.secret_scan_version is None:
+            return None
+        return {
+            "version": self.secret_scan_version,
+            "findings": self.secret_findings or [],
+        }
+
     @validates("chunk_content")
     def validate_chunk_content(self, key, content):
         """Validate chunk content."""
@@ -296,6 +316,97 @@ class CodeEmbedding(Base, TimestampMixin):
         )
 
 
+class CodeDocumentContent(Base, TimestampMixin):
+    """Full source text of a code document.
+
+    Kept out of ``code_documents`` so that listing queries never load file
+    bodies.  Feeds the trigram grep index in
+    :pymod:`app.services.code_grep`, which needs whole files because chunk
+    boundaries hide matches.
+    """
+
+    __tablename__ = "code_document_contents"
+    __table_args__ = (
+        Index("idx_code_document_contents_project_updated", "project_id", "updated_at"),
+        {"extend_existing": True},
+    )
+
+    document_id = Column(
+        Integer,
+        ForeignKey("code_documents.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="Owning document",
+    )
+    project_id = Column(
+        Integer,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="Denormalised for per-project index builds",
+    )
+    content = Column(Text, nullable=False, comment="Full file content")
+
+    def __repr__(self):
+        return f"<CodeDocumentContent(document_id={self.document_id})>"
+
+
+class CodeSymbolRef(Base):
+    """Cross-reference index entry: one identifier occurrence in a file.
+
+    Rows are extracted by :class:`~app.code_processing.parser.CodeParser`
+    during ``_process_code_file`` and replace per-request Jedi analysis for
+    find-usages / go-to-definition.  Lines and columns are 0-based, matching
+    ``CodeDocument.symbols`` and ``CodeEmbedding.start_line``.
+    """
+
+    __tablename__ = "code_symbol_refs"
+    __table_args__ = (
+        Index("idx_code_symbol_refs_lookup", "project_id", "name", "kind"),
+        Index("idx_code_symbol_refs_location", "document_id", "line"),
+        CheckConstraint(
+            "kind IN ('definition', 'reference', 'import')", name="valid_ref_kind"
+        ),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(
+        Integer,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="Denormalised from the document for project-wide lookups",
+    )
+    document_id = Column(
+        Integer,
+        ForeignKey("code_documents.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="Document containing the occurrence",
+    )
+    name = Column(String(200), nullable=False, comment="Identifier text")
+    kind = Column(
+        String(20), nullable=False, comment="definition, reference or import"
+    )
+    symbol_type = Column(String(50), comment="Symbol type for definitions")
+    line = Column(Integer, nullable=False, comment="0-based line")
+    column = Column(Integer, nullable=False, comment="0-based column")
+    end_line = Column(Integer, comment="Last line of the definition body")
+    context = Column(String(500), comment="Stripped source line")
+
+    document = relationship("CodeDocument", back_populates="symbol_refs")
+
+    def __repr__(self):
+        return (
+            f"<CodeSymbolRef(name='{self.name}', kind={self.kind}, "
+            f"doc={self.document_id}, line={self.line})>"
+        )
+
+
+CodeDocument.symbol_refs = relationship(
+    "CodeSymbolRef",
+    back_populates="document",
+    cascade="all, delete-orphan",
+    passive_deletes=True,
+)
+
 # Update Project model relationship
 Project.code_documents = relationship(
     "CodeDocument", back_populates="project", cascade="all, delete-orphan"
@@ -1,4 +1,10 @@
-"""Document version control and change tracking models."""
+"""Document version control models.
+
+Each version is a single row holding a compressed line delta against the
+previous version (see :mod:`app.utils.line_delta`).  Every few versions the
+row also carries a compressed full-content *keyframe*, so any version can be
+rebuilt by applying at most ``keyframe_interval`` deltas.
+"""
 
 from datetime import datetime
 from sqlalchemy import (
@@ -7,9 +13,10 @@ from sqlalchemy import (
     String,
     Text,
     DateTime,
-    Boolean,
     ForeignKey,
+    Index,
     JSON,
+    LargeBinary,
 )
 from sqlalchemy.orm import relationship
 from .base import Base
@@ -19,9 +26,20 @@ class DocumentVersion(Base):
     """Track versions of documents with change history."""
 
     __tablename__ = "document_versions"
+    __table_args__ = (
+        Index(
+            "idx_document_versions_doc_version",
+            "document_id",
+            "version_number",
+            unique=True,
+        ),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("code_documents.id"), nullable=False)
+    document_id = Column(
+        Integer, ForeignKey("code_documents.id", ondelete="CASCADE"), nullable=False
+    )
     version_number = Column(Integer, nullable=False)  # Incremental version
     content_hash = Column(String(64), nullable=False)  # SHA256 of content
     content_size = Column(Integer, nullable=False)
@@ -37,100 +55,24 @@ class DocumentVersion(Base):
     lines_deleted = Column(Integer, default=0)
     lines_modified = Column(Integer, default=0)
 
+    # Storage – delta against the previous version, plus a full snapshot on
+    # keyframes.  ``keyframe_version`` points at the keyframe this version is
+    # rebuilt from (itself for keyframes).
+    delta = Column(LargeBinary, nullable=False)
+    snapshot = Column(LargeBinary, nullable=True)
+    keyframe_version = Column(Integer, nullable=False)
+
     # Metadata
     commit_hash = Column(String(40), nullable=True)  # Git commit hash if available
     branch_name = Column(String(100), nullable=True)  # Git branch
     tags = Column(JSON, nullable=True)  # Version tags like "stable", "beta"
 
-    # Relationships
-    document = relationship("CodeDocument", back_populates="versions")
-    changes = relationship("DocumentChange", back_populates="version")
-
-    def __repr__(self):
-        return f"<DocumentVersion {self.document_id} v{self.version_number}>"
-
-
-class DocumentChange(Base):
-    """Individual changes within a document version."""
-
-    __tablename__ = "document_changes"
-
-    id = Column(Integer, primary_key=True, index=True)
-    version_id = Column(Integer, ForeignKey("document_versions.id"), nullable=False)
-
-    # Change details
-    change_type = Column(
-        String(20), nullable=False
-    )  # line_added, line_deleted, line_modified
-    line_number = Column(Integer, nullable=True)
-    old_content = Column(Text, nullable=True)
-    new_content = Column(Text, nullable=True)
-
-    # Context
-    function_name = Column(
-        String(200), nullable=True
-    )  # Function/method containing change
-    class_name = Column(String(200), nullable=True)  # Class containing change
-    section_type = Column(String(50), nullable=True)  # imports, function, class, etc.
-
-    # Semantic information
-    change_category = Column(
-        String(50), nullable=True
-    )  # bug_fix, feature, refactor, etc.
-    impact_score = Column(Integer, default=1)  # 1-5 scale of change impact
-
-    # Relationships
-    version = relationship("DocumentVersion", back_populates="changes")
-
-    def __repr__(self):
-        return f"<DocumentChange {self.change_type} line {self.line_number}>"
-
-
-class DocumentSnapshot(Base):
-    """Full content snapshots for major versions."""
-
-    __tablename__ = "document_snapshots"
-
-    id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("code_documents.id"), nullable=False)
-    version_id = Column(Integer, ForeignKey("document_versions.id"), nullable=False)
-
-    # Content
-    full_content = Column(Text, nullable=False)
-    content_encoding = Column(String(20), default="utf-8")
-
-    # Metadata
-    snapshot_type = Column(String(20), nullable=False)  # major, backup, milestone
-    created_at = Column(DateTime, default=datetime.utcnow)
-    is_active = Column(Boolean, default=True)
-
     # Relationships
     document = relationship("CodeDocument")
-    version = relationship("DocumentVersion")
-
-    def __repr__(self):
-        return f"<DocumentSnapshot {self.document_id} v{self.version_id}>"
-
 
-class ChangeBaseline(Base):
-    """Baseline points for calculating diffs efficiently."""
-
-    __tablename__ = "change_baselines"
-
-    id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("code_documents.id"), nullable=False)
-
-    # Baseline information
-    baseline_version = Column(Integer, nullable=False)
-    baseline_hash = Column(String(64), nullable=False)
-    baseline_timestamp = Column(DateTime, default=datetime.utcnow)
-
-    # Performance optimization
-    total_versions = Column(Integer, default=0)
-    total_changes = Column(Integer, default=0)
-
-    # Relationships
-    document = relationship("CodeDocument")
+    @property
+    def is_keyframe(self) -> bool:
+        return self.snapshot is not None
 
     def __repr__(self):
-        return f"<ChangeBaseline {self.document_id} v{self.baseline_version}>"
+        return f"<DocumentVersion {self.document_id} v{self.version_number}>"
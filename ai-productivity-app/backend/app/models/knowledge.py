@@ -1,6 +1,6 @@
 """Knowledge document models for storing full-text knowledge base entries."""
 
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
+from sqlalchemy import JSON, Column, DateTime, Integer, String, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship, validates
 
 from .base import Base, TimestampMixin
@@ -15,6 +15,8 @@ class KnowledgeDocument(Base, TimestampMixin):
         # Indexes for efficient queries
         Index("idx_knowledge_project", "project_id"),
         Index("idx_knowledge_title", "title"),
+        # Ingestion queue: pending/processing rows in arrival order
+        Index("idx_knowledge_ingest_queue", "ingest_status", "created_at"),
         {"extend_existing": True},
     )
 
@@ -29,6 +31,21 @@ class KnowledgeDocument(Base, TimestampMixin):
     title = Column(String(500), nullable=False, comment="Document title")
     source = Column(String(500), comment="Source of the knowledge (file, URL, etc.)")
     category = Column(String(100), comment="Knowledge category")
+    tags = Column(JSON, default=list, comment="Tags copied to every chunk vector")
+
+    # Durable ingestion queue (see app.services.knowledge_ingest)
+    ingest_status = Column(
+        String(20),
+        nullable=False,
+        default="pending",
+        server_default="pending",
+        comment="pending | processing | indexed | failed",
+    )
+    ingest_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    ingest_error = Column(Text, comment="Last ingestion error")
+    next_attempt_at = Column(DateTime, comment="Earliest retry after a failure")
+    chunk_count = Column(Integer, nullable=False, default=0, server_default="0")
+    indexed_at = Column(DateTime, comment="When the chunk vectors were written")
 
     # Relationships
     project = relationship("Project", back_populates="knowledge_documents")
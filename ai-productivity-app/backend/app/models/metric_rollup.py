@@ -0,0 +1,50 @@
+# backend/app/models/metric_rollup.py
+"""Per-minute metric rollups flushed from the in-process time-series store."""
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, JSON, String, Text
+
+from .base import Base
+
+
+class MetricRollup(Base):
+    """Aggregate of one metric/label set over one time bucket.
+
+    ``sketch`` holds the serialised quantile sketch so rollups can be merged
+    into longer windows with correct percentiles.  Each worker process
+    flushes its own rows, so a minute may have several rows per series.
+    """
+
+    __tablename__ = "metric_rollups"
+    __table_args__ = (
+        Index(
+            "idx_metric_rollups_series_bucket",
+            "metric_name",
+            "label_key",
+            "bucket_start",
+        ),
+        Index("idx_metric_rollups_bucket", "bucket_start"),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    metric_name = Column(String(200), nullable=False)
+    # Canonical "k=v,k=v" form of ``labels`` used for uniqueness/lookups
+    label_key = Column(String(500), nullable=False, default="")
+    labels = Column(JSON, nullable=True)
+    bucket_start = Column(DateTime, nullable=False)
+    bucket_seconds = Column(Integer, nullable=False)
+
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    p50 = Column(Float, nullable=True)
+    p95 = Column(Float, nullable=True)
+    p99 = Column(Float, nullable=True)
+    sketch = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<MetricRollup {self.metric_name}[{self.label_key}] "
+            f"@{self.bucket_start} n={self.count}>"
+        )
@@ -4,7 +4,18 @@ Includes status tracking, visual customization (color/emoji), tags,
 and relationship to timeline events for comprehensive project management.
 """
 
-from sqlalchemy import Column, Enum, ForeignKey, Index, Integer, JSON, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    String,
+    Text,
+)
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.ext.mutable import MutableList
 
@@ -134,3 +145,50 @@ class Project(Base, TimestampMixin):
         return (
             f"<Project(id={self.id}, title='{self.title}', status={self.status.value})>"
         )
+
+
+class ProjectStatsRollup(Base, TimestampMixin):
+    """Denormalised per-project counters backing the project list/detail views.
+
+    Kept current incrementally by ``app.services.project_stats`` (ORM flush
+    hook) and periodically reconciled against the source tables.
+    """
+
+    __tablename__ = "project_stats"
+    __table_args__ = ({"extend_existing": True},)
+
+    project_id = Column(
+        Integer,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="Project these statistics belong to",
+    )
+    files = Column(Integer, nullable=False, default=0, server_default="0")
+    chunks = Column(Integer, nullable=False, default=0, server_default="0")
+    indexed_files = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Documents whose embeddings have been generated",
+    )
+    pending_files = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Documents still waiting for embeddings",
+    )
+    timeline_events = Column(Integer, nullable=False, default=0, server_default="0")
+    storage_bytes = Column(
+        BigInteger,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Sum of code document sizes",
+    )
+    last_activity_at = Column(DateTime, comment="Most recent timeline event")
+    reconciled_at = Column(DateTime, comment="Last full recount")
+
+    def __repr__(self):
+        return f"<ProjectStatsRollup(project_id={self.project_id}, files={self.files})>"
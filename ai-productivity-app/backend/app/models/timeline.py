@@ -26,7 +26,11 @@ class TimelineEvent(Base, TimestampMixin):
     # first table object instead of raising, making the declaration idempotent
     # and safe under repeated imports.
     #
-    __table_args__ = ({"extend_existing": True},)
+    __table_args__ = (
+        # Keyset pagination (newest first) per project
+        Index("idx_timeline_events_project_keyset", "project_id", "created_at", "id"),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True)
     project_id = Column(
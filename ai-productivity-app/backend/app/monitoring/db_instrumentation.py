@@ -0,0 +1,210 @@
+# backend/app/monitoring/db_instrumentation.py
+"""Statement- and pool-level instrumentation for the engine registry.
+
+Every engine created by :mod:`app.database` gets
+
+* ``before/after_cursor_execute`` hooks that time each statement, count the
+  rows it returned/affected and attribute both to the *call site* – the
+  innermost ``app`` frame that issued it;
+* a pool class whose ``_do_get`` is timed, so connection-checkout waits (pool
+  starvation) show up per workload and, when noticeable, per call site.
+
+Per-workload numbers go to Prometheus (``/health/metrics``).  Call sites are
+unbounded, so they are kept out of metric labels and only aggregated in a
+bounded in-process table served as JSON by the admin-only ``/health/db``.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, exc as sa_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.monitoring.metrics import (
+    db_pool_timeouts_total,
+    db_pool_wait_seconds,
+    db_query_rows_total,
+    db_query_seconds,
+)
+
+try:  # SQLAlchemy's asyncio support runs ORM code in a child greenlet
+    import greenlet  # type: ignore
+except ImportError:  # pragma: no cover
+    greenlet = None  # type: ignore
+
+MAX_CALL_SITES = int(os.getenv("DB_INSTRUMENT_MAX_CALL_SITES", "200"))
+# Pool waits shorter than this are not attributed to a call site
+SITE_WAIT_THRESHOLD = float(os.getenv("DB_INSTRUMENT_SITE_WAIT_THRESHOLD", "0.005"))
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_SKIP_FILES = (
+    os.path.abspath(__file__),
+    os.path.join(_APP_ROOT, "database.py"),
+)
+OTHER_SITE = "other"
+
+
+# ---------------------------------------------------------------------------
+# Call-site resolution
+# ---------------------------------------------------------------------------
+
+
+def _app_frame(frame) -> Optional[str]:
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_ROOT) and filename not in _SKIP_FILES:
+            rel = filename[len(_APP_ROOT) :]
+            return f"{rel}:{frame.f_lineno}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def call_site() -> str:
+    """Innermost application frame on the stack (``path:line:function``)."""
+    site = _app_frame(sys._getframe(1))
+    if site is None and greenlet is not None:
+        # AsyncSession: the awaiting coroutine lives in the parent greenlet
+        parent = greenlet.getcurrent().parent
+        while site is None and parent is not None:
+            site = _app_frame(parent.gr_frame)
+            parent = parent.parent
+    return site or "unknown"
+
+
+# ---------------------------------------------------------------------------
+# Per-call-site aggregation
+# ---------------------------------------------------------------------------
+
+
+class CallSiteStats:
+    """Bounded ``(workload, call site) → totals`` table."""
+
+    FIELDS = ("count", "total_seconds", "max_seconds", "rows", "pool_wait_seconds")
+
+    def __init__(self, max_sites: int = MAX_CALL_SITES):
+        self.max_sites = max_sites
+        self._rows: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, workload: str, site: str) -> Tuple[str, List[float]]:
+        key = (workload, site)
+        row = self._rows.get(key)
+        if row is None:
+            if len(self._rows) >= self.max_sites:
+                site = OTHER_SITE
+                key = (workload, site)
+                row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = [0, 0.0, 0.0, 0, 0.0]
+        return site, row
+
+    def query(self, workload: str, site: str, seconds: float, rows: int) -> str:
+        """Record one statement; returns the (possibly capped) site label."""
+        with self._lock:
+            site, row = self._slot(workload, site)
+            row[0] += 1
+            row[1] += seconds
+            if seconds > row[2]:
+                row[2] = seconds
+            if rows > 0:
+                row[3] += rows
+        return site
+
+    def pool_wait(self, workload: str, site: str, seconds: float) -> str:
+        with self._lock:
+            site, row = self._slot(workload, site)
+            row[4] += seconds
+        return site
+
+    def top(self, limit: int = 25, sort: str = "total_seconds") -> List[Dict]:
+        idx = self.FIELDS.index(sort)
+        with self._lock:
+            items = sorted(self._rows.items(), key=lambda kv: kv[1][idx], reverse=True)
+            items = items[:limit]
+        out = []
+        for (workload, site), row in items:
+            entry = {"workload": workload, "call_site": site}
+            entry.update(zip(self.FIELDS, row))
+            entry["avg_ms"] = round(row[1] / row[0] * 1000, 3) if row[0] else 0.0
+            out.append(entry)
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+
+call_site_stats = CallSiteStats()
+
+
+# ---------------------------------------------------------------------------
+# Pool classes with timed checkout
+# ---------------------------------------------------------------------------
+
+
+class _TimedCheckoutMixin:
+    workload = "default"
+
+    def _do_get(self):  # noqa: D401 – SQLAlchemy internal hook
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        except sa_exc.TimeoutError:
+            db_pool_timeouts_total.labels(workload=self.workload).inc()
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            db_pool_wait_seconds.labels(workload=self.workload).observe(waited)
+            if waited >= SITE_WAIT_THRESHOLD:
+                call_site_stats.pool_wait(self.workload, call_site(), waited)
+
+
+def pool_class(workload: str, *, is_async: bool) -> type:
+    """A ``QueuePool`` subclass bound to *workload* (survives ``recreate()``)."""
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    name = f"Timed{base.__name__}_{workload}"
+    return type(name, (_TimedCheckoutMixin, base), {"workload": workload})
+
+
+# ---------------------------------------------------------------------------
+# Statement hooks
+# ---------------------------------------------------------------------------
+
+
+def instrument_engine(sync_engine, workload: str) -> None:
+    """Attach statement timing hooks to *sync_engine* (idempotent)."""
+    if getattr(sync_engine, "_instrumented_workload", None):
+        return
+    sync_engine._instrumented_workload = workload
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        try:
+            rows = cursor.rowcount
+        except Exception:  # noqa: BLE001 – some drivers raise once closed
+            rows = -1
+        call_site_stats.query(workload, call_site(), elapsed, rows or 0)
+        db_query_seconds.labels(workload=workload).observe(elapsed)
+        if rows and rows > 0:
+            db_query_rows_total.labels(workload=workload).inc(rows)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        if conn is not None:
+            starts = conn.info.get("_query_start")
+            if starts:
+                starts.pop()
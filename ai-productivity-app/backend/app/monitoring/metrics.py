@@ -21,6 +21,9 @@ except ImportError:
 
     # Stub implementations for when Prometheus is not available
     class _StubMetric:
+        def __init__(self, *args, **kwargs):
+            pass
+
         def inc(self, amount=1):
             pass
 
@@ -67,6 +70,121 @@ embedding_errors_total = Counter(
     "embedding_errors_total", "Total number of embedding errors", ["error_type"]
 )
 
+# Coalesced query embeddings (``app.embeddings.coalescer``)
+embedding_query_requests_total = Counter(
+    "embedding_query_requests_total",
+    "Single-text embedding requests by how they reached the provider",
+    ["outcome"],  # batched | shared | error
+)
+
+embedding_query_batch_size = Histogram(
+    "embedding_query_batch_size",
+    "Distinct texts per coalesced provider call",
+    buckets=(1, 2, 4, 8, 16, 32, 50),
+)
+
+embedding_query_latency_seconds = Histogram(
+    "embedding_query_latency_seconds",
+    "Time from request to vector for coalesced query embeddings",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# Inline code completion (``POST /code/copilot``)
+copilot_requests_total = Counter(
+    "copilot_requests_total",
+    "Inline completion requests by outcome",
+    ["outcome"],  # cache_hit | generated | cancelled | error
+)
+
+copilot_latency_seconds = Histogram(
+    "copilot_latency_seconds",
+    "Time from request to the full completion",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0),
+)
+
+copilot_first_line_seconds = Histogram(
+    "copilot_first_line_seconds",
+    "Time from request to the first completed line",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0),
+)
+
+
+# Search query expansion (``app.services.query_expansion``)
+query_expansion_requests_total = Counter(
+    "query_expansion_requests_total",
+    "Query expansion requests by mode and outcome",
+    ["mode", "outcome"],  # expanded | cache_hit | skipped_budget | timeout | error | …
+)
+
+query_expansion_latency_seconds = Histogram(
+    "query_expansion_latency_seconds",
+    "Latency of uncached query expansions",
+    ["mode"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+query_expansion_queries_total = Counter(
+    "query_expansion_queries_total",
+    "Expanded queries executed by search, per expansion technique",
+    ["technique"],
+)
+
+query_expansion_new_results_total = Counter(
+    "query_expansion_new_results_total",
+    "Results found only through an expanded query (recall gain), per technique",
+    ["technique"],
+)
+
+
+# LLM completions (``app.llm.client``)
+llm_prompt_tokens_total = Counter(
+    "llm_prompt_tokens_total",
+    "Prompt tokens by provider and prompt-cache outcome",
+    ["provider", "cache"],  # read | write | uncached
+)
+
+llm_time_to_first_token_seconds = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from request to the first streamed text, by prompt-cache outcome",
+    ["provider", "prompt_cache"],  # hit | miss
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0),
+)
+
+
+# Database engines / pools (see ``app.monitoring.db_instrumentation``)
+# Call sites are unbounded, so they are only reported in-process (/health/db)
+db_query_seconds = Histogram(
+    "db_query_seconds",
+    "SQL statement latency by workload pool",
+    ["workload"],
+    buckets=(0.001, 0.005, 0.025, 0.1, 0.5, 2.5),
+)
+
+db_query_rows_total = Counter(
+    "db_query_rows_total",
+    "Rows returned or affected by SQL statements",
+    ["workload"],
+)
+
+db_pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["workload"],
+    buckets=(0.0005, 0.005, 0.05, 0.25, 1.0, 5.0, 30.0),
+)
+
+db_pool_timeouts_total = Counter(
+    "db_pool_timeouts_total",
+    "Connection checkouts that hit the pool timeout",
+    ["workload"],
+)
+
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Pool connections by state (refreshed on scrape)",
+    ["workload", "engine", "state"],  # state: checked_out | idle | overflow | size
+)
+
 
 def record_success(
     batch_size: int, tokens: int, duration: Optional[float] = None
@@ -0,0 +1,358 @@
+# backend/app/monitoring/timeseries.py
+"""Fixed-memory, in-process time series for application metrics.
+
+Every ``(metric name, label set)`` pair owns a ring buffer of time buckets.
+A bucket keeps ``count/sum/min/max`` and a mergeable quantile sketch rather
+than the raw samples, so
+
+* recording is O(1) and allocates nothing per sample beyond a dict entry,
+* memory is bounded by ``slots × sketch size × series`` no matter the
+  traffic (and the number of series is capped too),
+* a window query merges at most ``window / bucket_seconds`` buckets.
+
+Closed buckets are drained at a coarser resolution (one row per minute per
+series) for persistence – see ``MetricsCollector.flush_metrics``.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+# ---------------------------------------------------------------------------
+# Quantile sketch
+# ---------------------------------------------------------------------------
+
+
+class QuantileSketch:
+    """Log-bucketed relative-error sketch (DDSketch-style), mergeable.
+
+    Any quantile is returned within ``relative_accuracy`` of the true value.
+    Bucket count per sign is capped; beyond it the lowest buckets collapse,
+    which only affects accuracy at the extreme low tail.
+    """
+
+    __slots__ = ("gamma", "_log_gamma", "max_bins", "pos", "neg", "zeros", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 512):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.pos: Dict[int, int] = {}
+        self.neg: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _index(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def _collapse(self, store: Dict[int, int]) -> None:
+        if len(store) <= self.max_bins:
+            return
+        keys = sorted(store)
+        excess = keys[: len(keys) - self.max_bins + 1]
+        store[excess[-1]] = sum(store.pop(k) for k in excess)
+
+    def add(self, value: float, n: int = 1) -> None:
+        self.count += n
+        if value > 1e-12:
+            idx = self._index(value)
+            self.pos[idx] = self.pos.get(idx, 0) + n
+            if len(self.pos) > self.max_bins:
+                self._collapse(self.pos)
+        elif value < -1e-12:
+            idx = self._index(-value)
+            self.neg[idx] = self.neg.get(idx, 0) + n
+            if len(self.neg) > self.max_bins:
+                self._collapse(self.neg)
+        else:
+            self.zeros += n
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for k, c in other.pos.items():
+            self.pos[k] = self.pos.get(k, 0) + c
+        for k, c in other.neg.items():
+            self.neg[k] = self.neg.get(k, 0) + c
+        self.zeros += other.zeros
+        self.count += other.count
+        self._collapse(self.pos)
+        self._collapse(self.neg)
+
+    def quantiles(self, qs: Tuple[float, ...]) -> List[Optional[float]]:
+        """Several quantiles in a single ordered pass."""
+        if not self.count:
+            return [None] * len(qs)
+        ranks = sorted((q * (self.count - 1), i) for i, q in enumerate(qs))
+        out: List[Optional[float]] = [None] * len(qs)
+        seen = 0
+        r = 0
+
+        def _ordered() -> Iterator[Tuple[float, int]]:
+            for k in sorted(self.neg, reverse=True):
+                yield -self._value(k), self.neg[k]
+            if self.zeros:
+                yield 0.0, self.zeros
+            for k in sorted(self.pos):
+                yield self._value(k), self.pos[k]
+
+        for value, c in _ordered():
+            seen += c
+            while r < len(ranks) and ranks[r][0] < seen:
+                out[ranks[r][1]] = value
+                r += 1
+            if r == len(ranks):
+                break
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles((q,))[0]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"g": self.gamma, "p": self.pos, "n": self.neg, "z": self.zeros},
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, raw: str) -> "QuantileSketch":
+        data = json.loads(raw)
+        sketch = cls()
+        sketch.gamma = data["g"]
+        sketch._log_gamma = math.log(sketch.gamma)
+        sketch.pos = {int(k): v for k, v in data["p"].items()}
+        sketch.neg = {int(k): v for k, v in data["n"].items()}
+        sketch.zeros = data["z"]
+        sketch.count = sum(sketch.pos.values()) + sum(sketch.neg.values()) + sketch.zeros
+        return sketch
+
+
+# ---------------------------------------------------------------------------
+# Buckets and ring buffers
+# ---------------------------------------------------------------------------
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class Aggregate:
+    """Mergeable summary of the samples that fell into one time span."""
+
+    start: int = 0
+    count: int = 0
+    total: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sketch.add(value)
+
+    def merge(self, other: "Aggregate") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def summary(self, window_seconds: Optional[float] = None) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        p50, p95, p99 = self.sketch.quantiles(QUANTILES)
+        out = {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+        }
+        if window_seconds:
+            out["rate_per_min"] = self.count * 60.0 / window_seconds
+        return out
+
+
+class RingSeries:
+    """``slots`` buckets of ``bucket_seconds`` each, reused round-robin."""
+
+    __slots__ = ("bucket_seconds", "slots", "_buckets", "flushed_until", "last_seen")
+
+    def __init__(self, bucket_seconds: int, slots: int, now: float):
+        self.bucket_seconds = bucket_seconds
+        self.slots = slots
+        self._buckets: List[Optional[Aggregate]] = [None] * slots
+        start = self._align(now)
+        # Nothing before the series existed needs flushing
+        self.flushed_until = start
+        self.last_seen = now
+
+    def _align(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds) * self.bucket_seconds
+
+    def record(self, value: float, now: float) -> None:
+        start = self._align(now)
+        i = (start // self.bucket_seconds) % self.slots
+        bucket = self._buckets[i]
+        if bucket is None or bucket.start != start:
+            bucket = self._buckets[i] = Aggregate(start=start)
+        bucket.add(value)
+        self.last_seen = now
+
+    def buckets_since(self, since: float) -> Iterator[Aggregate]:
+        """Live buckets that start at or after *since* (at most ``slots``)."""
+        for bucket in self._buckets:
+            if bucket is not None and bucket.start >= since:
+                yield bucket
+
+    def window(self, now: float, seconds: float) -> Aggregate:
+        # Whole buckets covering the last *seconds*, current (partial) included
+        since = min(self._align(now - seconds + self.bucket_seconds), self._align(now))
+        merged = Aggregate()
+        for bucket in self.buckets_since(since):
+            merged.merge(bucket)
+        return merged
+
+    def drain(self, now: float, resolution: int) -> List[Aggregate]:
+        """Merge closed buckets into ``resolution``-second rollups, once each."""
+        closed_until = int(self._align(now) // resolution) * resolution
+        if closed_until <= self.flushed_until:
+            return []
+        rollups: Dict[int, Aggregate] = {}
+        for bucket in self.buckets_since(self.flushed_until):
+            if bucket.start >= closed_until or not bucket.count:
+                continue
+            slot = bucket.start // resolution * resolution
+            agg = rollups.setdefault(slot, Aggregate(start=slot))
+            agg.merge(bucket)
+        self.flushed_until = closed_until
+        return [rollups[k] for k in sorted(rollups)]
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+
+def label_key(labels: Optional[Mapping[str, str]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+class TimeSeriesStore:
+    """Thread-safe collection of :class:`RingSeries` keyed by name + labels."""
+
+    def __init__(
+        self,
+        bucket_seconds: int = 10,
+        slots: int = 360,
+        max_series: int = 2000,
+        clock=time.time,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.slots = slots
+        self.max_series = max_series
+        self.clock = clock
+        self._series: Dict[str, Dict[LabelKey, RingSeries]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def retention_seconds(self) -> int:
+        return self.bucket_seconds * self.slots
+
+    def record(
+        self, name: str, value: float, labels: Optional[Mapping[str, str]] = None
+    ) -> None:
+        now = self.clock()
+        key = label_key(labels)
+        with self._lock:
+            by_label = self._series.get(name)
+            series = by_label.get(key) if by_label is not None else None
+            if series is None:
+                if self._size >= self.max_series:
+                    self.dropped += 1
+                    return
+                series = RingSeries(self.bucket_seconds, self.slots, now)
+                self._series.setdefault(name, {})[key] = series
+                self._size += 1
+            series.record(float(value), now)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._series)
+
+    def window(
+        self,
+        name: str,
+        seconds: float,
+        labels: Optional[Mapping[str, str]] = None,
+    ) -> Aggregate:
+        """Aggregate of *name* over the last *seconds*.
+
+        With ``labels=None`` all label sets of the metric are merged.
+        """
+        now = self.clock()
+        seconds = min(seconds, self.retention_seconds)
+        merged = Aggregate()
+        with self._lock:
+            by_label = self._series.get(name) or {}
+            if labels is None:
+                targets = list(by_label.values())
+            else:
+                one = by_label.get(label_key(labels))
+                targets = [one] if one is not None else []
+            for series in targets:
+                merged.merge(series.window(now, seconds))
+        return merged
+
+    def summary(
+        self, name: str, seconds: float, labels: Optional[Mapping[str, str]] = None
+    ) -> Dict[str, float]:
+        return self.window(name, seconds, labels).summary(
+            min(seconds, self.retention_seconds)
+        )
+
+    def drain(self, resolution: int = 60) -> List[Tuple[str, LabelKey, Aggregate]]:
+        """Closed rollups not yet drained, as ``(name, labels, aggregate)``."""
+        now = self.clock()
+        out = []
+        with self._lock:
+            for name, by_label in self._series.items():
+                for key, series in by_label.items():
+                    for agg in series.drain(now, resolution):
+                        out.append((name, key, agg))
+        return out
+
+    def evict_idle(self) -> int:
+        """Forget series without samples for a whole retention period."""
+        cutoff = self.clock() - self.retention_seconds
+        removed = 0
+        with self._lock:
+            for name in list(self._series):
+                by_label = self._series[name]
+                for key in [k for k, s in by_label.items() if s.last_seen < cutoff]:
+                    del by_label[key]
+                    removed += 1
+                if not by_label:
+                    del self._series[name]
+            self._size -= removed
+        return removed
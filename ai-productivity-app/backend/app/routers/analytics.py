@@ -14,6 +14,10 @@ POST /api/analytics/batch
 
     and returns `{ "success": true, "received": N }`.
 
+GET /api/analytics/usage/history
+    Hourly/daily usage, cost, search, RAG and feedback series served from
+    the ``analytics_rollups`` table.
+
 GET /api/analytics/embedding-metrics
     Returns stubbed embedding processing metrics so that the frontend widgets
     in `EmbeddingMetrics.jsx` render meaningful numbers during the transition
@@ -23,12 +27,20 @@ GET /api/analytics/embedding-metrics
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Query, status
 from pydantic import BaseModel, Field, conlist
 
+from app.dependencies import CurrentUserRequired, DatabaseDep
+from app.services.analytics_rollups import (
+    as_utc,
+    choose_granularity,
+    merge_rollups,
+    read_rollups,
+)
+
 
 logger = logging.getLogger(__name__)
 
@@ -181,6 +193,67 @@ async def get_usage_stats(
 # the API surface explicit.
 # ---------------------------------------------------------------------------
 
+
+class RollupPoint(BaseModel):
+    bucket_start: datetime
+    dimension: str
+    count: int
+    total: float
+    avg: float
+    tokens_in: int = 0
+    tokens_out: int = 0
+    min: float | None = None
+    max: float | None = None
+    p50: float | None = None
+    p95: float | None = None
+
+
+class UsageHistory(BaseModel):
+    kind: str
+    granularity: str
+    points: List[RollupPoint]
+
+
+@router.get("/usage/history", response_model=UsageHistory)
+async def get_usage_history(
+    db: DatabaseDep,
+    current_user: CurrentUserRequired,
+    kind: str = Query("usage", pattern="^(usage|cost|search|rag|quality)$"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    granularity: str | None = Query(None, pattern="^(hour|day)$"),
+    dimension: str | None = None,
+):
+    """Hourly or daily series read from the analytics rollups only.
+
+    Admins see the all-users rows; everyone else only their own (which exist
+    for the ``usage`` and ``cost`` kinds).
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=7)
+    granularity = granularity or choose_granularity(as_utc(start), as_utc(end))
+    rows = read_rollups(
+        db,
+        kind,
+        start,
+        end,
+        user_id=0 if getattr(current_user, "is_admin", False) else current_user.id,
+        dimensions=[dimension] if dimension else None,
+        granularity=granularity,
+    )
+    points = [
+        RollupPoint(
+            bucket_start=bucket,
+            dimension=dim,
+            **agg.to_dict(),
+        )
+        for (bucket, dim), agg in merge_rollups(
+            rows, key=lambda row: (row.bucket_start, row.dimension)
+        ).items()
+    ]
+    return UsageHistory(kind=kind, granularity=granularity, points=points)
+
+
 # ---------------------------------------------------------------------------
 # Stubbed embedding metrics models (placeholder until real pipeline ready)
 # ---------------------------------------------------------------------------
@@ -26,16 +26,6 @@ from typing import Annotated
 from datetime import timedelta
 import logging
 
-# ---------------------------------------------------------------------------
-# Rate limiting via SlowAPI – use the shared *limiter* instance defined in
-# app.auth.security.  When SlowAPI is unavailable or explicitly disabled via
-# the ``DISABLE_RATE_LIMITER`` environment variable the decorator becomes a
-# no-op so that the routes continue to work inside unit-tests and restricted
-# CI sandboxes.
-# ---------------------------------------------------------------------------
-
-from app.auth.security import limiter
-
 # FastAPI & dependencies
 from fastapi import (
     APIRouter,
@@ -51,7 +41,8 @@ from fastapi import (
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
-from app.utils.redis_client import rate_limit
+from app.utils.rate_limiter import Bucket
+from app.utils.redis_client import check_rate_limits, rate_limit
 from app.utils.request_helpers import real_ip
 from app.dependencies import enforce_csrf
 
@@ -81,12 +72,7 @@ AUTH_RATE_LIMIT = 5  # attempts
 AUTH_RATE_WINDOW = 60  # seconds
 ACCESS_TOKEN_TTL_MINUTES = 60 * 24  # 24 h
 
-# Rate-limiting spec string understood by SlowAPI (@limiter.limit decorator)
-# Example: "5/minute" (matches AUTH_RATE_LIMIT/AUTH_RATE_WINDOW above).
-# Keeping the string here avoids accidental drift if the numeric constants
-# change.
-
-_LIMIT_DECORATOR_SPEC = "5/minute"
+LOGOUT_RATE_LIMIT = 10  # per AUTH_RATE_WINDOW, less restrictive
 
 ###############################################################################
 # Utility helpers
@@ -120,7 +106,6 @@ def _issue_token_and_cookie(
     status_code=status.HTTP_201_CREATED,
     response_model=TokenResponse,
 )
-@limiter.limit(_LIMIT_DECORATOR_SPEC)
 async def register(
     request: Request,
     response: Response,
@@ -207,7 +192,6 @@ async def register(
 
 
 @router.post("/login", response_model=TokenResponse)
-@limiter.limit(_LIMIT_DECORATOR_SPEC)
 async def login(
     request: Request,
     response: Response,
@@ -215,25 +199,23 @@ async def login(
     db: DatabaseDep,
 ) -> TokenResponse:
     """User login with enhanced error codes and rate limiting."""
-    # Distributed rate limiting by IP
+    # Distributed rate limiting by IP and by username/email (targeted
+    # attacks), both checked in one round trip
     client_ip = real_ip(request)
-    headers = await rate_limit(
-        key=f"login:{client_ip}",
-        limit=AUTH_RATE_LIMIT,
-        window=AUTH_RATE_WINDOW,
+    headers = await check_rate_limits(
+        [
+            Bucket.per_window(f"login:{client_ip}", AUTH_RATE_LIMIT, AUTH_RATE_WINDOW),
+            Bucket.per_window(
+                f"login:account:{payload.username_or_email.lower()}",
+                AUTH_RATE_LIMIT * 2,  # Slightly more lenient per-account
+                AUTH_RATE_WINDOW * 5,  # Longer window for account-specific
+                detail="Too many login attempts for this account.",
+            ),
+        ],
         error_detail="Too many login attempts. Please try again later.",
     )
     response.headers.update(headers)
 
-    # Also rate limit by username/email to prevent targeted attacks
-    account_headers = await rate_limit(
-        key=f"login:account:{payload.username_or_email.lower()}",
-        limit=AUTH_RATE_LIMIT * 2,  # Slightly more lenient per-account
-        window=AUTH_RATE_WINDOW * 5,  # Longer window for account-specific
-        error_detail="Too many login attempts for this account.",
-    )
-    response.headers.update(account_headers)
-
     # Verify credentials
     user = utils.verify_credentials(
         db, payload.username_or_email.lower(), payload.password
@@ -283,7 +265,6 @@ async def login(
 
 
 @router.post("/logout", dependencies=[Depends(enforce_csrf)])
-@limiter.limit("10/minute")  # less restrictive – session clearing
 def logout(
     request: Request,
     response: Response,
@@ -291,6 +272,9 @@ def logout(
     access_cookie: Annotated[str | None, Cookie(alias="access_token")] = None,
 ) -> None:
     """Revoke session (DB) and clear auth cookie."""
+    security.enforce_rate_limit(
+        f"logout:{real_ip(request)}", limit=LOGOUT_RATE_LIMIT, window=AUTH_RATE_WINDOW
+    )
     # Extract token from cookie or header (same as get_current_user)
     token = None
     authorization = request.headers.get("authorization")
@@ -476,9 +460,6 @@ def _send_reset_email(email: str, token: str) -> None:  # placeholder
     dependencies=[Depends(enforce_csrf)],
     include_in_schema=False,  # deprecated but kept for backward-compat
 )
-# Note: password reset is unauthenticated but still needs brute-force
-# protection.  We set a per-IP limit separate from the global auth bucket.
-@limiter.limit(_LIMIT_DECORATOR_SPEC)
 # NOTE: Alias kept for the public API that the new frontend consumes.
 #       This adheres to the requirements spec naming – `/reset-request`.
 #       Both routes execute the same handler to simplify maintenance.
@@ -500,10 +481,18 @@ async def request_password_reset(
     Step 1: User requests a reset link/token.
     For our small-team scenario, we simply log the token rather than emailing.
     """
-    headers = await rate_limit(
-        key=f"pwreset:{payload.email.lower()}",
-        limit=AUTH_RATE_LIMIT,
-        window=AUTH_RATE_WINDOW * 10,  # 10-minute window
+    # Unauthenticated, so brute-force protection per IP as well as per address
+    headers = await check_rate_limits(
+        [
+            Bucket.per_window(
+                f"pwreset:ip:{real_ip(request)}", AUTH_RATE_LIMIT, AUTH_RATE_WINDOW
+            ),
+            Bucket.per_window(
+                f"pwreset:{payload.email.lower()}",
+                AUTH_RATE_LIMIT,
+                AUTH_RATE_WINDOW * 10,  # 10-minute window
+            ),
+        ]
     )
     response.headers.update(headers)
 
@@ -7,6 +7,7 @@ from fastapi import (
     APIRouter,
     HTTPException,
     Query,
+    Response,
     WebSocket,
     WebSocketDisconnect,
 )
@@ -23,6 +24,7 @@ from app.schemas.chat import (
     MessageResponse,
 )
 from app.services.chat_service import ChatService
+from app.utils import keyset
 from app.websocket.handlers import handle_chat_connection
 from app.auth.utils import get_current_user_ws
 from app.chat.commands import command_registry
@@ -41,21 +43,29 @@ router = APIRouter(prefix="/api/chat", tags=["chat"])
 async def list_sessions(
     current_user: CurrentUserRequired,
     db: DatabaseDep,
+    response: Response,
     project_id: Optional[int] = None,
     is_active: Optional[bool] = None,
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Deprecated – use cursor"),
+    cursor: Optional[str] = None,
 ):
-    """List chat sessions with optional filtering."""
+    """List chat sessions, most recently active first.
+
+    Keyset-paginated: pass the previous page's ``next_cursor`` (also sent as
+    the ``X-Next-Cursor`` header) as ``cursor``.  ``total`` is only computed
+    for the first page.
+    """
     logger.info(
         "Listing chat sessions – user_id=%s project_id=%s is_active=%s "
-        "limit=%s offset=%s",
+        "limit=%s cursor=%s",
         current_user.id,
         project_id,
         is_active,
         limit,
-        offset,
+        cursor,
     )
+    after = keyset.parse_cursor(cursor)
 
     query = db.query(ChatSession)
 
@@ -64,21 +74,30 @@ async def list_sessions(
     if is_active is not None:
         query = query.filter(ChatSession.is_active == is_active)
 
-    total = query.count()
-    sessions = query.offset(offset).limit(limit).all()
-
-    # Add message count
-    items: List[ChatSessionResponse] = []
-    for session in sessions:
-        response = ChatSessionResponse.from_orm(session)
-        response.message_count = (
-            db.query(ChatMessage)
-            .filter_by(session_id=session.id, is_deleted=False)
-            .count()
+    total = query.count() if after is None else None
+
+    if after is not None:
+        query = query.filter(
+            keyset.before(ChatSession.last_activity_at, ChatSession.id, after)
         )
-        items.append(response)
+    elif offset:
+        query = query.offset(offset)
 
-    return ChatSessionListResponse(items=items, total=total)
+    rows = (
+        query.order_by(ChatSession.last_activity_at.desc(), ChatSession.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    sessions, next_cursor = keyset.paginate(
+        rows, limit, lambda s: (s.last_activity_at, s.id)
+    )
+    keyset.set_next_cursor(response, next_cursor)
+
+    return ChatSessionListResponse(
+        items=[ChatSessionResponse.from_orm(s) for s in sessions],
+        total=total,
+        next_cursor=next_cursor,
+    )
 
 
 @router.post("/sessions", response_model=ChatSessionResponse, status_code=201)
@@ -116,12 +135,7 @@ async def get_session(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    response = ChatSessionResponse.from_orm(session)
-    response.message_count = (
-        db.query(ChatMessage).filter_by(session_id=session.id, is_deleted=False).count()
-    )
-
-    return response
+    return ChatSessionResponse.from_orm(session)
 
 
 @router.patch("/sessions/{session_id}", response_model=ChatSessionResponse)
@@ -167,12 +181,21 @@ async def get_messages(
     session_id: int,
     _current_user: CurrentUserRequired,  # unused – keep for auth dependency
     db: DatabaseDep,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
-    before_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    before_id: Optional[int] = Query(None, description="Deprecated – use cursor"),
 ):
-    """Get messages for a chat session."""
+    """Get messages for a chat session (chronological order).
+
+    Returns the latest page by default; the ``X-Next-Cursor`` header carries
+    the cursor for the next *older* page.
+    """
     service = ChatService(db)
-    messages = await service.get_session_messages(session_id, limit, before_id)
+    messages, next_cursor = await service.get_session_messages_page(
+        session_id, limit, cursor=keyset.parse_cursor(cursor), before_id=before_id
+    )
+    keyset.set_next_cursor(response, next_cursor)
 
     # Transform messages to include metadata in the format expected by frontend
     response_messages = []
@@ -20,6 +20,7 @@ import textwrap
 import traceback
 import tempfile
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict
 from pydantic import BaseModel
@@ -34,6 +35,7 @@ from fastapi import (
 )
 from sqlalchemy.orm import Session
 
+from app.chat.secret_scanner import secret_scanner
 from app.code_processing.chunker import SemanticChunker
 from app.code_processing.language_detector import detect_language
 from app.code_processing.parser import CodeParser
@@ -42,20 +44,30 @@ from app.database import get_db
 # Use the new authentication dependency style.
 # ``get_current_user`` enforces authentication and returns the User.
 from app.dependencies import get_current_user
-from app.models.code import CodeDocument, CodeEmbedding
+from app.models.code import CodeDocument, CodeDocumentContent, CodeEmbedding
 from app.models.project import Project
 from app.models.user import User
 from app.config import settings
+from app.services.code_grep import grep_engine
 from app.services.usage_searcher import UsageSearcher
+from app.services.xref_index import XrefIndex, replace_document_refs
 
 logger = logging.getLogger(__name__)
 
 
 router = APIRouter(prefix="/api/code", tags=["code"])
 
-# Instantiate expensive helpers once per worker
-_PARSER = CodeParser()
-_CHUNKER = SemanticChunker()
+
+# Expensive helpers (tree-sitter grammars, tokenizer) are built once per
+# worker on first use – or earlier by the startup warm-up in ``app.main``.
+@lru_cache(maxsize=1)
+def get_code_parser() -> CodeParser:
+    return CodeParser()
+
+
+@lru_cache(maxsize=1)
+def get_chunker() -> SemanticChunker:
+    return SemanticChunker()
 
 
 ###############################################################################
@@ -74,10 +86,10 @@ def _process_code_file(
     and closed by the time this runs.
     """
 
-    # Each background task starts its *own* session
-    from app.database import SessionLocal
+    # Each background task starts its *own* session on the worker pool
+    from app.database import session_for
 
-    session = SessionLocal()
+    session = session_for("worker")
     try:
         doc: CodeDocument | None = (
             session.query(CodeDocument).filter_by(id=doc_id).first()
@@ -87,17 +99,31 @@ def _process_code_file(
             return
 
         # ── Parse ────────────────────────────────────────────────────────────
-        parse_result = _PARSER.parse_file(content, language)
+        parse_result = get_code_parser().parse_file(content, language)
 
         doc.symbols = parse_result.get("symbols", [])
         doc.imports = parse_result.get("imports", [])
 
+        # ── Full content for the trigram grep index ─────────────────────────
+        session.merge(
+            CodeDocumentContent(
+                document_id=doc.id, project_id=doc.project_id, content=content
+            )
+        )
+
+        # ── Cross-reference index (usages / go-to-definition) ───────────────
+        ref_count = replace_document_refs(
+            session, doc.project_id, doc.id, parse_result.get("references", [])
+        )
+
         # ── Chunk ────────────────────────────────────────────────────────────
-        chunks = _CHUNKER.create_chunks(
+        chunks = get_chunker().create_chunks(
             content, doc.symbols or [], language, file_path=doc.file_path
         )
 
         for chunk in chunks:
+            # Scan once here so context assembly reuses the offsets
+            scan = secret_scanner.scan_record(chunk["content"])
             session.add(
                 CodeEmbedding(
                     document_id=doc.id,
@@ -106,6 +132,8 @@ def _process_code_file(
                     symbol_type=chunk.get("symbol_type"),
                     start_line=chunk.get("start_line"),
                     end_line=chunk.get("end_line"),
+                    secret_scan_version=scan["version"],
+                    secret_findings=scan["findings"],
                 )
             )
 
@@ -113,7 +141,12 @@ def _process_code_file(
         doc.is_indexed = False
         session.commit()
 
-        logger.info("Processed file %s (%d chunks)", doc.file_path, len(chunks))
+        logger.info(
+            "Processed file %s (%d chunks, %d xrefs)",
+            doc.file_path,
+            len(chunks),
+            ref_count,
+        )
     except Exception:  # pragma: no cover – log unexpected errors
         logger.exception("Failed to process code file (doc_id=%s)", doc_id)
         session.rollback()
@@ -364,9 +397,14 @@ def delete_file(file_id: int, db: Session = Depends(get_db)):
     if not doc:
         raise HTTPException(status_code=404, detail="File not found")
 
+    project_id = doc.project_id
     db.delete(doc)
     db.commit()
 
+    # Deletions are not visible to the incremental grep refresh – drop the
+    # in-memory index so the next grep rebuilds it.
+    grep_engine.forget(project_id)
+
     return {"status": "deleted"}
 
 
@@ -546,7 +584,12 @@ async def find_symbol_usages(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Find all usages of a symbol at a given location."""
+    """Find all usages of a symbol at a given location.
+
+    Served from the cross-reference index built at ingest time; Jedi is only
+    consulted for Python files indexed before the index existed and whose
+    repository clone is still on disk.
+    """
     # Verify project access
     project = (
         db.query(Project).filter_by(id=project_id, owner_id=current_user.id).first()
@@ -554,8 +597,16 @@ async def find_symbol_usages(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    results = XrefIndex(db).find_usages(
+        project_id, request.file_path, request.line, request.column
+    )
+    if results:
+        return results
+
     # Get project repository path
     project_path = f"repos/project_{project_id}"
+    if not os.path.isdir(project_path):
+        return []
 
     usage_searcher = UsageSearcher(project_path)
     results = usage_searcher.find_usages(
@@ -564,6 +615,25 @@ async def find_symbol_usages(
     return results
 
 
+@router.post("/{project_id}/definition", response_model=List[Dict])
+async def find_symbol_definition(
+    project_id: int,
+    request: UsageRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Resolve the symbol at a given location to its definition site(s)."""
+    project = (
+        db.query(Project).filter_by(id=project_id, owner_id=current_user.id).first()
+    )
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    return XrefIndex(db).goto_definition(
+        project_id, request.file_path, request.line, request.column
+    )
+
+
 @router.post("/execute", response_model=CodeExecResponse)
 async def execute_code(req: CodeExecRequest) -> CodeExecResponse:  # noqa: D401
     """
@@ -16,6 +16,7 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 # ----------------------------------------------------------------------------
 
 from app.dependencies import CurrentUserRequired  # noqa: E402 – after FastAPI
+from app.services.config_snapshot import ConfigSnapshot, config_snapshot  # noqa: E402
 from app.websocket.notify_manager import notify_manager  # noqa: E402
 
 
@@ -24,6 +25,26 @@ from app.websocket.notify_manager import notify_manager  # noqa: E402
 router = APIRouter(prefix="/ws", tags=["ai-configuration"], include_in_schema=False)
 
 
+def _config_event(snapshot: ConfigSnapshot) -> dict:
+    return {
+        "type": "config_update",
+        "version": snapshot.version,
+        "config": snapshot.unified.model_dump(by_alias=True, mode="json"),
+    }
+
+
+async def _push_config_update(snapshot: ConfigSnapshot) -> None:
+    """Fan a new config snapshot out to this replica's connected clients.
+
+    Every replica rebuilds its snapshot on a change (LISTEN/NOTIFY), so each
+    one only needs to notify its own sockets.
+    """
+    await notify_manager.broadcast(_config_event(snapshot))
+
+
+config_snapshot.subscribe(_push_config_update)
+
+
 @router.websocket("/config")
 async def websocket_config_updates(
     websocket: WebSocket,
@@ -37,6 +58,10 @@ async def websocket_config_updates(
     await notify_manager.connect(websocket, current_user.id)
 
     try:
+        # Initial state so the client can detect versions it missed while
+        # disconnected.
+        await websocket.send_json(_config_event(config_snapshot.get()))
+
         # The server currently implements *server-push* only.  Still, we must
         # read incoming frames (e.g. ping/pong or future client messages)
         # otherwise the browser might close the socket after a timeout.
@@ -6,12 +6,19 @@ from typing import Dict, Any, List, Optional
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 
+from app.database import get_db
 from app.models.user import User
-from app.services.cost_tracking import CostTrackingService, UsageAggregates
+from app.services.analytics_rollups import merge_rollups, read_rollups
+from app.services.cost_tracking import CostTrackingService
+from app.services.usage_export import (
+    FORMATS as EXPORT_FORMATS,
+    decode_cursor,
+    export_stream,
+)
 from app.dependencies import get_current_user, get_current_user_optional
 
 logger = logging.getLogger(__name__)
@@ -27,6 +34,8 @@ class CostSummaryResponse(BaseModel):
     totals: Dict[str, Any]
     by_model: Dict[str, Any]
     by_feature: Dict[str, Any]
+    # Prompt-cache read/write tokens, hit ratio and savings
+    prompt_cache: Dict[str, Any]
     currency: str = "USD"
 
 
@@ -160,11 +169,9 @@ async def get_usage_metrics(
             start_date=start_date,
             end_date=end_date,
             user_id=user_id,
+            limit=limit,
         )
 
-        # Limit results
-        aggregates = aggregates[:limit]
-
         return [
             UsageMetricsResponse(
                 model_id=agg.model_id,
@@ -232,33 +239,22 @@ async def get_cost_trends(
     period_days = {"24h": 1, "7d": 7, "30d": 30, "90d": 90}
     start_date = end_date - timedelta(days=period_days[period])
 
-    cost_tracking_service = CostTrackingService(db)
-
     try:
-        # Get aggregated data
-        aggregates = await cost_tracking_service.get_usage_aggregates(
-            start_date=start_date, end_date=end_date, user_id=user_id
+        # One daily rollup row per model (and user) instead of raw hours
+        rows = read_rollups(
+            db, "cost", start_date, end_date, user_id=user_id or 0, granularity="day"
         )
-
-        # Group by day and calculate trends
-        daily_costs = {}
-        for agg in aggregates:
-            day = agg.period_start.date().isoformat()
-            if day not in daily_costs:
-                daily_costs[day] = {
-                    "date": day,
-                    "cost": Decimal("0.00"),
-                    "requests": 0,
-                    "tokens": 0,
-                }
-            daily_costs[day]["cost"] += agg.total_cost
-            daily_costs[day]["requests"] += agg.total_requests
-            daily_costs[day]["tokens"] += (
-                agg.total_input_tokens + agg.total_output_tokens
-            )
-
-        # Sort by date
-        data_points = sorted(daily_costs.values(), key=lambda x: x["date"])
+        daily = merge_rollups(rows, key=lambda row: row.bucket_start.date())
+
+        data_points = [
+            {
+                "date": day.isoformat(),
+                "cost": Decimal(str(round(agg.total, 6))),
+                "requests": agg.count,
+                "tokens": agg.tokens_in + agg.tokens_out,
+            }
+            for day, agg in sorted(daily.items())
+        ]
 
         # Calculate metrics
         total_cost = sum(point["cost"] for point in data_points)
@@ -307,50 +303,34 @@ async def get_model_comparison(
     if not user_id and current_user and not getattr(current_user, "is_admin", False):
         user_id = current_user.id
 
-    cost_tracking_service = CostTrackingService(db)
-
     try:
-        # Get usage aggregates
-        aggregates = await cost_tracking_service.get_usage_aggregates(
-            start_date=start_date, end_date=end_date, user_id=user_id
+        by_model = merge_rollups(
+            read_rollups(db, "cost", start_date, end_date, user_id=user_id or 0)
+        )
+        # Latency and success rate are only tracked per model, for all users
+        overall = (
+            merge_rollups(read_rollups(db, "cost", start_date, end_date))
+            if user_id
+            else by_model
         )
 
-        # Group by model
         model_stats = {}
-        for agg in aggregates:
-            model_id = agg.model_id
-            if model_id not in model_stats:
-                model_stats[model_id] = {
-                    "model_id": model_id,
-                    "total_cost": Decimal("0.00"),
-                    "total_requests": 0,
-                    "total_tokens": 0,
-                    "avg_response_time_ms": 0,
-                    "success_rate": 0,
-                    "response_times": [],
-                    "success_rates": [],
-                }
-
-            stats = model_stats[model_id]
-            stats["total_cost"] += agg.total_cost
-            stats["total_requests"] += agg.total_requests
-            stats["total_tokens"] += agg.total_input_tokens + agg.total_output_tokens
-
-            if agg.avg_response_time_ms:
-                stats["response_times"].append(agg.avg_response_time_ms)
-            if agg.success_rate is not None:
-                stats["success_rates"].append(agg.success_rate)
-
-        # Calculate averages
-        for model_id, stats in model_stats.items():
-            if stats["response_times"]:
-                stats["avg_response_time_ms"] = sum(stats["response_times"]) / len(
-                    stats["response_times"]
-                )
-            if stats["success_rates"]:
-                stats["success_rate"] = sum(stats["success_rates"]) / len(
-                    stats["success_rates"]
-                )
+        for model_id, agg in by_model.items():
+            quality = overall.get(model_id, agg)
+            served = quality.count
+            model_stats[model_id] = stats = {
+                "model_id": model_id,
+                "total_cost": Decimal(str(round(agg.total, 6))),
+                "total_requests": agg.count,
+                "total_tokens": agg.tokens_in + agg.tokens_out,
+                # Request-weighted, unlike the old mean of hourly averages
+                "avg_response_time_ms": (
+                    quality.data.get("latency_ms_sum", 0) / served if served else 0
+                ),
+                "success_rate": (
+                    quality.data.get("successes", 0) / served * 100 if served else 0
+                ),
+            }
 
             # Calculate derived metrics
             stats["avg_cost_per_request"] = (
@@ -364,10 +344,6 @@ async def get_model_comparison(
                 else Decimal("0.00")
             )
 
-            # Clean up temporary arrays
-            del stats["response_times"]
-            del stats["success_rates"]
-
         # Sort models by total cost
         models = sorted(
             model_stats.values(), key=lambda x: x["total_cost"], reverse=True
@@ -426,41 +402,34 @@ async def get_user_usage(
             status_code=403, detail="Access denied: can only view your own usage data"
         )
 
-    cost_tracking_service = CostTrackingService(db)
-
     try:
         # Get user info
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Get usage aggregates for the user
-        aggregates = await cost_tracking_service.get_usage_aggregates(
-            start_date=start_date, end_date=end_date, user_id=user_id
+        # The user's own rollup rows, one per model and bucket
+        by_model = merge_rollups(
+            read_rollups(db, "cost", start_date, end_date, user_id=user_id)
         )
 
         # Calculate totals
-        total_cost = sum(agg.total_cost for agg in aggregates)
-        total_requests = sum(agg.total_requests for agg in aggregates)
-        total_tokens = sum(
-            agg.total_input_tokens + agg.total_output_tokens for agg in aggregates
-        )
+        total_cost = Decimal(str(round(sum(a.total for a in by_model.values()), 6)))
+        total_requests = sum(agg.count for agg in by_model.values())
+        total_tokens = sum(agg.tokens_in + agg.tokens_out for agg in by_model.values())
         avg_cost_per_request = (
             total_cost / total_requests if total_requests > 0 else Decimal("0.00")
         )
 
         # Calculate top models
-        model_usage = {}
-        for agg in aggregates:
-            model_id = agg.model_id
-            if model_id not in model_usage:
-                model_usage[model_id] = {
-                    "model_id": model_id,
-                    "cost": Decimal("0.00"),
-                    "requests": 0,
-                }
-            model_usage[model_id]["cost"] += agg.total_cost
-            model_usage[model_id]["requests"] += agg.total_requests
+        model_usage = {
+            model_id: {
+                "model_id": model_id,
+                "cost": Decimal(str(round(agg.total, 6))),
+                "requests": agg.count,
+            }
+            for model_id, agg in by_model.items()
+        }
 
         top_models = sorted(
             model_usage.values(), key=lambda x: x["cost"], reverse=True
@@ -468,18 +437,16 @@ async def get_user_usage(
 
         # Calculate top features
         feature_usage = {}
-        for agg in aggregates:
-            for key, value in agg.detailed_metrics.items():
-                if key.startswith("feature_"):
-                    feature_name = key.replace("feature_", "")
-                    if feature_name not in feature_usage:
-                        feature_usage[feature_name] = {
-                            "feature": feature_name,
-                            "cost": 0.0,
-                            "requests": 0,
-                        }
-                    feature_usage[feature_name]["cost"] += value.get("cost", 0)
-                    feature_usage[feature_name]["requests"] += value.get("requests", 0)
+        for agg in by_model.values():
+            for feature_name, value in agg.data.get("features", {}).items():
+                if feature_name not in feature_usage:
+                    feature_usage[feature_name] = {
+                        "feature": feature_name,
+                        "cost": 0.0,
+                        "requests": 0,
+                    }
+                feature_usage[feature_name]["cost"] += value.get("cost", 0)
+                feature_usage[feature_name]["requests"] += value.get("requests", 0)
 
         top_features = sorted(
             feature_usage.values(), key=lambda x: x["cost"], reverse=True
@@ -536,14 +503,28 @@ async def cleanup_old_metrics(
 
 @router.get("/export")
 async def export_usage_data(
-    format: str = Query("csv", regex="^(csv|json)$", description="Export format"),
+    format: str = Query(
+        "csv", pattern="^(csv|ndjson|json)$", description="Export format"
+    ),
     start_date: Optional[datetime] = Query(None, description="Start date"),
     end_date: Optional[datetime] = Query(None, description="End date"),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
+    model_id: Optional[str] = Query(None, description="Filter by model ID"),
+    after: Optional[str] = Query(
+        None, description="Resume after this row cursor (from a previous export)"
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, description="Maximum rows in this part of the export"
+    ),
+    gzip: bool = Query(False, description="Gzip-compress the file"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
-    """Export usage data in various formats."""
+    """Stream usage data as CSV, NDJSON or a JSON array.
+
+    Rows are read through a server-side cursor and encoded one at a time, so
+    memory is constant and the first bytes go out immediately.  Every row
+    carries a ``cursor``; pass the last one received as ``after`` to resume.
+    """
 
     # Access control
     if user_id and current_user.id != user_id:
@@ -556,82 +537,28 @@ async def export_usage_data(
     if not user_id and not getattr(current_user, "is_admin", False):
         user_id = current_user.id
 
-    cost_tracking_service = CostTrackingService(db)
-
     try:
-        # Get usage aggregates
-        aggregates = await cost_tracking_service.get_usage_aggregates(
-            start_date=start_date, end_date=end_date, user_id=user_id
-        )
-
-        if format == "csv":
-            # Generate CSV
-            import csv
-            import io
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-
-            # Write header
-            writer.writerow(
-                [
-                    "model_id",
-                    "period_start",
-                    "period_end",
-                    "total_requests",
-                    "total_input_tokens",
-                    "total_output_tokens",
-                    "total_cost",
-                    "avg_response_time_ms",
-                    "success_rate",
-                ]
-            )
-
-            # Write data
-            for agg in aggregates:
-                writer.writerow(
-                    [
-                        agg.model_id,
-                        agg.period_start.isoformat(),
-                        agg.period_end.isoformat(),
-                        agg.total_requests,
-                        agg.total_input_tokens,
-                        agg.total_output_tokens,
-                        float(agg.total_cost),
-                        agg.avg_response_time_ms,
-                        agg.success_rate,
-                    ]
-                )
-
-            # Return CSV response
-            from fastapi.responses import StreamingResponse
-
-            output.seek(0)
-            return StreamingResponse(
-                io.StringIO(output.getvalue()),
-                media_type="text/csv",
-                headers={"Content-Disposition": "attachment; filename=usage_data.csv"},
-            )
-
-        else:  # JSON format
-            data = [
-                {
-                    "model_id": agg.model_id,
-                    "period_start": agg.period_start.isoformat(),
-                    "period_end": agg.period_end.isoformat(),
-                    "total_requests": agg.total_requests,
-                    "total_input_tokens": agg.total_input_tokens,
-                    "total_output_tokens": agg.total_output_tokens,
-                    "total_cost": float(agg.total_cost),
-                    "avg_response_time_ms": agg.avg_response_time_ms,
-                    "success_rate": agg.success_rate,
-                    "detailed_metrics": agg.detailed_metrics,
-                }
-                for agg in aggregates
-            ]
-
-            return JSONResponse(content=data)
-
-    except Exception as e:
-        logger.error(f"Error exporting usage data: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Failed to export usage data")
+        cursor = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"usage_data.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+
+    body = export_stream(
+        format,
+        compress=gzip,
+        start_date=start_date,
+        end_date=end_date,
+        user_id=user_id,
+        model_id=model_id,
+        after=cursor,
+        limit=limit,
+    )
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
@@ -330,6 +330,11 @@ async def _run_import_job(job_id: int) -> None:  # noqa: D401, WPS231, WPS210
             await _notify(phase="failed", message=job.error)
             return
 
+        # Build the trigram grep index now rather than on the first /grep.
+        from app.services.code_grep import grep_engine
+
+        await asyncio.to_thread(grep_engine.sync_index, db, job.project_id)
+
         # ------------------------------------------------------------------
         # 3. Wait until embedding finished (simplified – check flag)
         # ------------------------------------------------------------------
@@ -2,13 +2,17 @@
 Knowledge base API router for search and context building.
 """
 
+import codecs
 import logging
 import hashlib
+import mimetypes
+import os
 import tempfile
+import uuid
 from datetime import datetime, timedelta
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
 from sqlalchemy.orm import Session
 
 from ..database import get_db
@@ -32,6 +36,7 @@ from ..schemas.knowledge import (
     CitationRequest,
     CitationResponse,
 )
+from ..services.knowledge_ingest import knowledge_ingest_worker
 from ..services.knowledge_service import KnowledgeService
 from ..services.vector_service import vector_service
 from ..embeddings.generator import EmbeddingGenerator
@@ -681,225 +686,193 @@ KNOWLEDGE_ALLOWED_MIME_TYPES = {
 }
 
 
-async def _process_knowledge_file(
-    doc_id: int, content: str, title: str, category: str = "general"
-) -> None:
-    """Process a knowledge file and create embeddings."""
-    from app.database import SessionLocal
-    from app.embeddings.generator import EmbeddingGenerator
-    from sqlalchemy import text
-
-    session = SessionLocal()
-    try:
-        from sqlalchemy import select
-
-        stmt = select(KnowledgeDocument).filter_by(id=doc_id)
-        doc: KnowledgeDocument | None = (
-            await session.execute(stmt)
-        ).scalar_one_or_none()
-        if not doc:
-            logger.warning("KnowledgeDocument %s vanished before processing", doc_id)
-            return
-
-        # Generate embedding for the document
-        embedding_generator = EmbeddingGenerator()
-        embedding = await embedding_generator.generate_single_embedding(content)
-
-        # Store in the main embeddings table with proper metadata
-        metadata = {
-            "title": title,
-            "source": "upload",
-            "category": category,
-            "project_id": doc.project_id,
-            "document_type": "knowledge",
-            "knowledge_doc_id": doc_id,
-        }
-
-        insert_sql = """
-        INSERT INTO embeddings (document_id, chunk_id, project_id, embedding, content, content_hash, metadata, created_at)
-        VALUES (:document_id, 1, :project_id, :embedding, :content, :content_hash, :metadata, NOW())
-        """
-
-        import json
-        import hashlib
-
-        content_hash = hashlib.sha256(content.encode()).hexdigest()
-
-        # Convert embedding to pgvector format
-        def to_pgvector(vec):
-            """Convert Python list to pgvector format string."""
-            return "[" + ",".join(f"{x:.6f}" for x in vec) + "]"
-
-        session.execute(
-            text(insert_sql),
-            {
-                "document_id": hash(doc_id)
-                % 2147483647,  # Convert string ID to int within PostgreSQL int range
-                "project_id": doc.project_id,
-                "embedding": to_pgvector(embedding),  # Convert to pgvector format
-                "content": content,
-                "content_hash": content_hash,
-                "metadata": json.dumps(metadata),
-            },
-        )
-
-        session.commit()
-        logger.info("Processed knowledge file %s", title)
+# Binary formats whose text comes from the multimodal extraction pipeline
+MULTIMODAL_MIME_TYPES = {
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
 
-    except Exception:
-        logger.exception("Failed to process knowledge file (doc_id=%s)", doc_id)
-        session.rollback()
-    finally:
-        session.close()
+UPLOAD_READ_BYTES = 1024 * 1024
+
+
+async def _read_upload_text(upload: UploadFile, max_size: int) -> tuple[str, int]:
+    """Decode *upload* incrementally; raises ``ValueError`` past *max_size*."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parts = []
+    total_size = 0
+    while chunk := await upload.read(UPLOAD_READ_BYTES):
+        total_size += len(chunk)
+        if total_size > max_size:
+            raise ValueError(f"File too large: {total_size} > {max_size}")
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), total_size
+
+
+async def _extract_upload_text(upload: UploadFile, max_size: int) -> tuple[str, int]:
+    """Text of a binary (PDF/DOCX) *upload* via the multimodal pipeline."""
+    # Imported here: the module probes PIL, which the startup warm-up loads
+    from ..services.multimodal_service import multimodal_processor
+
+    parts = []
+    total_size = 0
+    while chunk := await upload.read(UPLOAD_READ_BYTES):
+        total_size += len(chunk)
+        if total_size > max_size:
+            raise ValueError(f"File too large: {total_size} > {max_size}")
+        parts.append(chunk)
+
+    # The extractor is chosen by extension; fall back to the MIME type's
+    name = upload.filename or "upload"
+    if not os.path.splitext(name)[1]:
+        name += mimetypes.guess_extension(upload.content_type) or ""
+    result = await multimodal_processor.process_file(
+        name, content=b"".join(parts), mime_type=upload.content_type
+    )
+    if not result.get("success"):
+        error = result.get("error") or result.get("metadata", {}).get("error")
+        raise ValueError(f"Text extraction failed: {error}")
+    return result["extracted_text"], total_size
 
 
 @router.post("/projects/{project_id}/upload")
 async def upload_knowledge_files(
     project_id: int,
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     category: str = "general",
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    """Upload knowledge documents for RAG access."""
+    """Upload knowledge documents for RAG access.
 
-    # Check project exists and user has access
+    Documents are stored in one transaction and queued for chunked
+    embedding by the knowledge ingestion worker; poll
+    ``GET /projects/{project_id}/documents`` for their ``ingest_status``.
+    """
     from sqlalchemy import select
 
+    from app.config import settings
+
     stmt = select(Project).filter_by(id=project_id)
     project = db.execute(stmt).scalar_one_or_none()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    from app.config import settings
+    # Duplicate detection by title, one query for the whole upload
+    titles = [upload.filename for upload in files if upload.filename]
+    existing_titles = set()
+    if titles:
+        existing_titles.update(
+            db.execute(
+                select(KnowledgeDocument.title).where(
+                    KnowledgeDocument.project_id == project_id,
+                    KnowledgeDocument.title.in_(titles),
+                )
+            ).scalars()
+        )
 
     results = []
+    queued = []
 
     for upload in files:
-        try:
-            # MIME type validation
-            if upload.content_type not in KNOWLEDGE_ALLOWED_MIME_TYPES:
-                results.append(
-                    {
-                        "file": upload.filename or "unknown",
-                        "status": "rejected",
-                        "reason": f"Unsupported MIME type: {upload.content_type}",
-                    }
-                )
-                continue
-
-            # Read and validate file size
-            content_chunks = []
-            content_hash = hashlib.sha256()
-            total_size = 0
-
-            while True:
-                chunk = await upload.read(4096)
-                if not chunk:
-                    break
-
-                content_hash.update(chunk)
-                total_size += len(chunk)
-                content_chunks.append(chunk)
-
-                if total_size > settings.max_upload_size:
-                    results.append(
-                        {
-                            "file": upload.filename or "unknown",
-                            "status": "rejected",
-                            "reason": f"File too large: {total_size} > {settings.max_upload_size}",
-                        }
-                    )
-                    break
-            else:
-                # File is acceptable
-                raw = b"".join(content_chunks)
-                content_hash_hex = content_hash.hexdigest()
-
-                # Check for duplicates in knowledge documents
-                from sqlalchemy import select
-
-                stmt = select(KnowledgeDocument).filter_by(
-                    project_id=project_id,
-                    title=upload.filename or f"upload_{content_hash_hex[:8]}",
-                )
-                existing = db.execute(stmt).scalar_one_or_none()
-
-                if existing:
-                    results.append(
-                        {
-                            "file": upload.filename or "unknown",
-                            "status": "duplicate",
-                            "existing_title": existing.title,
-                        }
-                    )
-                    continue
-
-                try:
-                    content_decoded = raw.decode("utf-8", errors="ignore")
-                    title = upload.filename or f"Document_{content_hash_hex[:8]}"
-
-                    # Generate unique ID for knowledge document
-                    import uuid
-
-                    doc_id = f"kb_{uuid.uuid4().hex[:12]}"
-
-                    # Create knowledge document
-                    doc = KnowledgeDocument(
-                        id=doc_id,
-                        project_id=project_id,
-                        title=title,
-                        content=content_decoded,
-                        source="upload",
-                        category=category,
-                    )
-
-                    db.add(doc)
-                    db.commit()
-                    db.refresh(doc)
-
-                    # Queue background processing for embeddings
-                    background_tasks.add_task(
-                        _process_knowledge_file,
-                        doc_id=doc.id,
-                        content=content_decoded,
-                        title=title,
-                        category=category,
-                    )
-
-                    results.append(
-                        {
-                            "file": upload.filename or "unknown",
-                            "status": "success",
-                            "document_id": doc.id,
-                            "title": title,
-                        }
-                    )
-
-                except Exception as e:
-                    logger.error(f"Failed to process file {upload.filename}: {e}")
-                    results.append(
-                        {
-                            "file": upload.filename or "unknown",
-                            "status": "error",
-                            "reason": str(e),
-                        }
-                    )
-
-        except Exception as e:
-            logger.error(f"Unexpected error processing {upload.filename}: {e}")
+        name = upload.filename or "unknown"
+        if upload.content_type not in KNOWLEDGE_ALLOWED_MIME_TYPES:
             results.append(
                 {
-                    "file": upload.filename or "unknown",
-                    "status": "error",
-                    "reason": str(e),
+                    "file": name,
+                    "status": "rejected",
+                    "reason": f"Unsupported MIME type: {upload.content_type}",
                 }
             )
+            continue
+        if upload.filename and upload.filename in existing_titles:
+            results.append(
+                {"file": name, "status": "duplicate", "existing_title": upload.filename}
+            )
+            continue
+
+        try:
+            read = (
+                _extract_upload_text
+                if upload.content_type in MULTIMODAL_MIME_TYPES
+                else _read_upload_text
+            )
+            content, _size = await read(upload, settings.max_upload_size)
+        except ValueError as exc:
+            results.append({"file": name, "status": "rejected", "reason": str(exc)})
+            continue
+        except Exception as e:
+            logger.error(f"Unexpected error reading {upload.filename}: {e}")
+            results.append({"file": name, "status": "error", "reason": str(e)})
+            continue
+
+        if not content.strip():
+            results.append({"file": name, "status": "rejected", "reason": "Empty file"})
+            continue
+
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        title = upload.filename or f"Document_{digest[:8]}"
+        doc = KnowledgeDocument(
+            id=f"kb_{uuid.uuid4().hex[:12]}",
+            project_id=project_id,
+            title=title,
+            content=content,
+            source="upload",
+            category=category,
+            ingest_status="pending",
+        )
+        db.add(doc)
+        existing_titles.add(title)
+        queued.append(doc)
+        results.append(
+            {
+                "file": name,
+                "status": "success",
+                "document_id": doc.id,
+                "title": title,
+                "ingest_status": "pending",
+            }
+        )
+
+    if queued:
+        try:
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to store knowledge uploads: {e}")
+            raise HTTPException(
+                status_code=500, detail=f"Failed to store uploads: {str(e)}"
+            )
+        knowledge_ingest_worker.wake()
 
     return {
         "success": True,
         "results": results,
         "total_files": len(files),
-        "processed": len([r for r in results if r["status"] == "success"]),
+        "processed": len(queued),
     }
+
+
+@router.get("/projects/{project_id}/documents")
+async def list_knowledge_documents(
+    project_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Knowledge documents of a project with their ingestion progress."""
+    from sqlalchemy import select
+
+    rows = db.execute(
+        select(
+            KnowledgeDocument.id,
+            KnowledgeDocument.title,
+            KnowledgeDocument.category,
+            KnowledgeDocument.ingest_status,
+            KnowledgeDocument.chunk_count,
+            KnowledgeDocument.ingest_error,
+            KnowledgeDocument.indexed_at,
+        )
+        .where(KnowledgeDocument.project_id == project_id)
+        .order_by(KnowledgeDocument.created_at.desc())
+    ).all()
+    return {"documents": [dict(row._mapping) for row in rows]}
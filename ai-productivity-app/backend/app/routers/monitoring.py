@@ -49,6 +49,7 @@ except ModuleNotFoundError:  # pragma: no cover – stub
 from fastapi import APIRouter, Depends, status, Response
 from sqlalchemy import text
 from app.database import get_db
+from app.dependencies import AdminRequired
 from app.utils.redis_client import get_redis
 from app.config import settings
 import logging
@@ -323,7 +324,24 @@ async def check_vector_backend() -> Dict[str, Any]:
 
 @router.get("/ready")
 async def readiness_check(response: Response, db=Depends(get_db)) -> Dict[str, Any]:
-    """Comprehensive readiness check for Kubernetes."""
+    """Comprehensive readiness check for Kubernetes.
+
+    Answers 503 until the background startup warm-up (``app.startup``) has
+    finished its required steps, so replicas only receive traffic once they
+    can serve it.
+    """
+    from app.startup import startup
+
+    if not startup.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {
+            "status": HealthStatus.UNHEALTHY,
+            "timestamp": datetime.utcnow().isoformat(),
+            "starting": True,
+            "pending": startup.pending_required(),
+            "failed": startup.failed_required(),
+        }
+
     checks = {}
     overall_healthy = True
     overall_status = HealthStatus.HEALTHY
@@ -396,9 +414,58 @@ async def liveness_check() -> Dict[str, str]:
 
 @router.get("/startup")
 async def startup_check() -> Dict[str, Any]:
-    """Startup probe for Kubernetes - checks if app is ready to serve."""
-    # Basic check that app has started
-    return {"status": "started", "timestamp": datetime.utcnow().isoformat()}
+    """Startup probe for Kubernetes - checks if app is ready to serve.
+
+    The process answers as soon as the lifespan has yielded; the body also
+    carries per-step (and, with ``STARTUP_PROFILE=1``, per-module import)
+    timings.
+    """
+    from app.startup import startup
+
+    return {
+        "status": "started",
+        "timestamp": datetime.utcnow().isoformat(),
+        **startup.report(),
+    }
+
+
+def _refresh_pool_gauges(pools) -> None:
+    from app.monitoring.metrics import db_pool_connections
+
+    for entry in pools:
+        for state, key in (
+            ("checked_out", "checkedout"),
+            ("idle", "checkedin"),
+            ("overflow", "overflow"),
+            ("size", "size"),
+        ):
+            if key in entry:
+                db_pool_connections.labels(
+                    workload=entry["workload"], engine=entry["engine"], state=state
+                ).set(entry[key])
+
+
+@router.get("/db")
+async def database_stats(
+    _admin: AdminRequired, limit: int = 25, sort: str = "total_seconds"
+):
+    """Per-workload pool status and the most expensive SQL call sites.
+
+    Admin only: call sites expose source paths and query volumes.  ``sort``
+    is one of ``count``, ``total_seconds``, ``max_seconds``, ``rows``
+    or ``pool_wait_seconds``.
+    """
+    from app.auth.session_cache import session_cache
+    from app.database import engines
+    from app.monitoring.db_instrumentation import CallSiteStats, call_site_stats
+
+    if sort not in CallSiteStats.FIELDS:
+        sort = "total_seconds"
+    return {
+        "pools": engines.pool_status(),
+        "call_sites": call_site_stats.top(limit=min(limit, 200), sort=sort),
+        "auth_cache": session_cache.stats(),
+    }
 
 
 @router.get("/metrics")
@@ -412,6 +479,9 @@ async def metrics():
         )
 
     try:
+        from app.database import engines
+
+        _refresh_pool_gauges(engines.pool_status())
         metrics_output = generate_latest()
         return Response(content=metrics_output, media_type=CONTENT_TYPE_LATEST)
     except Exception as e:
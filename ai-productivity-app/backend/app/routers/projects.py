@@ -3,7 +3,7 @@
 Provides CRUD operations for projects, timeline events, and filtering.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -23,6 +23,7 @@ from app.schemas.project import (
     UserInfo,
 )
 from app.services.project_service import ProjectService
+from app.utils import keyset
 
 import logging
 
@@ -141,7 +142,7 @@ async def get_project(
     """Get project details."""
     project = get_project_or_404(project_id, db)
     service = ProjectService(db)
-    stats = service._get_project_stats(project.id)
+    stats = service.get_project_stats(project.id)
 
     return ProjectResponse(
         id=project.id,
@@ -221,21 +222,32 @@ async def get_project_timeline(
     project_id: int,
     current_user: CurrentUserRequired,
     db: DatabaseDep,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Deprecated – use cursor"),
+    cursor: Optional[str] = None,
 ):
-    """Get project timeline events."""
+    """Get project timeline events (newest first, keyset-paginated)."""
+    after = keyset.parse_cursor(cursor)
+
     # Verify project exists
     get_project_or_404(project_id, db)
 
-    events = (
-        db.query(TimelineEvent)
-        .filter(TimelineEvent.project_id == project_id)
-        .order_by(TimelineEvent.created_at.desc())
-        .offset(offset)
-        .limit(limit)
+    query = db.query(TimelineEvent).filter(TimelineEvent.project_id == project_id)
+    if after is not None:
+        query = query.filter(
+            keyset.before(TimelineEvent.created_at, TimelineEvent.id, after)
+        )
+    elif offset:
+        query = query.offset(offset)
+
+    rows = (
+        query.order_by(TimelineEvent.created_at.desc(), TimelineEvent.id.desc())
+        .limit(limit + 1)
         .all()
     )
+    events, next_cursor = keyset.paginate(rows, limit, keyset.created_key)
+    keyset.set_next_cursor(response, next_cursor)
 
     return [
         TimelineEventResponse(
@@ -1,5 +1,5 @@
 # Router for prompt template management
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -17,7 +17,7 @@ from app.schemas.prompt import (
     PromptExecuteResponse,
     PromptStatsResponse,
 )
-from app.auth.security import limiter
+from app.utils.redis_client import rate_limit
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,15 +27,19 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/prompts", tags=["prompts"])
 
 
+async def _limit(user_id: int, action: str, per_minute: int) -> None:
+    """Per-user request budget for *action* (HTTP 429 when exhausted)."""
+    await rate_limit(f"prompts:{action}:{user_id}", per_minute, 60)
+
+
 @router.post("/", response_model=PromptTemplateResponse)
-@limiter.limit("10/minute")  # Rate limit template creation
 async def create_template(
-    request: Request,
     template_data: PromptTemplateCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Create a new prompt template"""
+    await _limit(current_user.id, "create", 10)  # Rate limit template creation
     service = PromptService(db)
     template = await service.create_template(template_data, current_user.id)
     return PromptTemplateResponse.from_orm(template)
@@ -95,15 +99,14 @@ async def get_template(
 
 
 @router.put("/{template_id}", response_model=PromptTemplateResponse)
-@limiter.limit("20/minute")  # Rate limit template updates
 async def update_template(
-    request: Request,
     template_id: int,
     template_data: PromptTemplateUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Update an existing template"""
+    await _limit(current_user.id, "update", 20)  # Rate limit template updates
     service = PromptService(db)
     template = await service.update_template(
         template_id, template_data, current_user.id
@@ -124,15 +127,14 @@ async def delete_template(
 
 
 @router.post("/{template_id}/duplicate", response_model=PromptTemplateResponse)
-@limiter.limit("5/minute")  # Rate limit duplications
 async def duplicate_template(
-    request: Request,
     template_id: int,
     duplicate_data: PromptDuplicateRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Duplicate an existing template"""
+    await _limit(current_user.id, "duplicate", 5)  # Rate limit duplications
     service = PromptService(db)
     template = await service.duplicate_template(
         template_id, duplicate_data, current_user.id
@@ -141,15 +143,14 @@ async def duplicate_template(
 
 
 @router.post("/{template_id}/execute", response_model=PromptExecuteResponse)
-@limiter.limit("30/minute")  # Rate limit executions
 async def execute_template(
-    request: Request,
     template_id: int,
     execute_data: PromptExecuteRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Execute a template with provided variables"""
+    await _limit(current_user.id, "execute", 30)  # Rate limit executions
     service = PromptService(db)
     return await service.execute_template(template_id, execute_data, current_user.id)
 
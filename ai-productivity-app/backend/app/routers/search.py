@@ -1,9 +1,15 @@
 """Enhanced search API with hybrid capabilities."""
 
+import json
 import logging
+import re
+from contextlib import aclosing
+from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Query, HTTPException, BackgroundTasks, Depends
+from fastapi.responses import StreamingResponse
 
+from app.database import session_for
 from app.dependencies import DatabaseDep, CurrentUserRequired, CurrentUserOptional
 from app.services.vector_service import (
     get_vector_service,
@@ -14,6 +20,8 @@ from app.services.hybrid_search import HybridSearch
 from app.services.embedding_service import EmbeddingService
 from app.embeddings.generator import EmbeddingGenerator
 from app.schemas.search import (
+    GrepRequest,
+    GrepResponse,
     SearchRequest,
     SearchResponse,
     SearchResult,
@@ -23,6 +31,8 @@ from app.schemas.search import (
 from app.models.search_history import SearchHistory
 from app.models.project import Project
 from app.models.code import CodeDocument
+from app.services.code_grep import GrepTimeout, compile_pattern, grep_engine
+from app.services.search_history_writer import search_history_writer
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +69,12 @@ async def search(
         request.filters.model_dump(exclude_none=True) if request.filters else None
     )
 
+    if request.stream:
+        return StreamingResponse(
+            _stream_search(request, filters_dict, current_user.id, vector_service),
+            media_type="application/x-ndjson",
+        )
+
     # ------------------------------------------------------------------
     # Execute search (may raise).
     # ------------------------------------------------------------------
@@ -70,22 +86,60 @@ async def search(
             filters=filters_dict,
             limit=request.limit,
             search_types=request.search_types,
+            expand=request.expand,
         )
     except Exception as err:  # noqa: BLE001 – translate to HTTP 500
         logger.error("Search failed: %s", err)
         raise HTTPException(status_code=500, detail="Search failed") from err
 
-    # Format results with required fields
+    formatted_results = _format_results(db, raw_results)
+
+    # Assemble response object
+    response_payload = SearchResponse(
+        query=request.query,
+        results=formatted_results,
+        total=len(formatted_results),
+        search_types=request.search_types or ["hybrid"],
+    )
+
+    # Best-effort: record search in history (flushed in the background)
+    search_history_writer.record(
+        current_user.id, request.query, filters_dict, request.project_ids
+    )
+
+    return response_payload
+
+
+def _format_results(db, raw_results: List[Dict]) -> List[SearchResult]:
+    """Turn raw hybrid-search hits into :class:`SearchResult` objects.
+
+    File path / language of the referenced documents are fetched with a
+    single ``IN`` query instead of one lookup per result – and only for hits
+    whose metadata does not already carry both.
+    """
+    doc_ids = set()
+    for r in raw_results:
+        metadata = r.get("metadata") or {}
+        if r.get("document_id") and not (
+            metadata.get("file_path") and metadata.get("language")
+        ):
+            doc_ids.add(r["document_id"])
+    documents = {}
+    if doc_ids:
+        documents = {
+            row.id: row
+            for row in db.query(
+                CodeDocument.id, CodeDocument.file_path, CodeDocument.language
+            ).filter(CodeDocument.id.in_(doc_ids))
+        }
+
     formatted_results = []
     for r in raw_results:
-        # Get document information for file path and language
         document_id = r.get("document_id")
-        document = None
-        if document_id:
-            document = db.query(CodeDocument).filter_by(id=document_id).first()
+        document = documents.get(document_id)
 
         # Extract metadata
-        metadata = r.get("metadata", {})
+        metadata = r.get("metadata") or {}
 
         # Create stable ID
         result_id = (
@@ -94,52 +148,168 @@ async def search(
             else f"result_{len(formatted_results)}"
         )
 
-        formatted_result = SearchResult(
-            id=result_id,
-            file_path=(
-                document.file_path if document else metadata.get("file_path", "unknown")
-            ),
-            start_line=metadata.get("start_line", 1),
-            end_line=metadata.get("end_line", metadata.get("start_line", 1)),
-            language=(
-                document.language if document else metadata.get("language", "unknown")
-            ),
-            content=r["content"],
-            symbol=metadata.get("symbol_name"),
-            search_type=r["type"],
-            score=r["score"],
-            # Legacy fields for backward compatibility
-            type=r["type"],
-            document_id=document_id,
-            chunk_id=r.get("chunk_id"),
-            metadata=metadata,
+        formatted_results.append(
+            SearchResult(
+                id=result_id,
+                file_path=(
+                    document.file_path
+                    if document
+                    else metadata.get("file_path", "unknown")
+                ),
+                start_line=metadata.get("start_line", 1),
+                end_line=metadata.get("end_line", metadata.get("start_line", 1)),
+                language=(
+                    document.language
+                    if document
+                    else metadata.get("language", "unknown")
+                ),
+                content=r["content"],
+                symbol=metadata.get("symbol_name"),
+                search_type=r["type"],
+                score=r["score"],
+                # Legacy fields for backward compatibility
+                type=r["type"],
+                document_id=document_id,
+                chunk_id=r.get("chunk_id"),
+                metadata=metadata,
+            )
         )
-        formatted_results.append(formatted_result)
+    return formatted_results
 
-    # Assemble response object
-    response_payload = SearchResponse(
-        query=request.query,
-        results=formatted_results,
-        total=len(formatted_results),
-        search_types=request.search_types or ["hybrid"],
-    )
 
-    # Best-effort: record search in history
+async def _stream_search(
+    request: SearchRequest,
+    filters_dict: Optional[Dict],
+    user_id: int,
+    vector_service: VectorService,
+    db=None,
+):
+    """NDJSON body for ``stream=true`` searches.
+
+    One ``{"type": "partial", "search_type": …, "results": […]}`` line per
+    modality as soon as it finishes, then a single ``{"type": "final", …}``
+    line carrying the deduplicated, ranked :class:`SearchResponse`.
+
+    The request's session may be closed before a streamed body finishes, so
+    the search runs on its own session unless *db* is given.
+    """
+    own_session = db is None
+    if own_session:
+        db = session_for("request")
+    hybrid_search = HybridSearch(db, vector_service, embedding_generator)
     try:
-        db.add(
-            SearchHistory(
-                user_id=current_user.id,
-                query_text=request.query.strip()[:255],
-                filters=filters_dict,
-                project_ids=request.project_ids,
+        async for modality, raw_results in hybrid_search.iter_search(
+            query=request.query,
+            project_ids=request.project_ids,
+            filters=filters_dict,
+            limit=request.limit,
+            search_types=request.search_types,
+        ):
+            results = _format_results(db, raw_results)
+            if modality != "final":
+                yield json.dumps(
+                    {
+                        "type": "partial",
+                        "search_type": modality,
+                        "results": [r.model_dump(mode="json") for r in results],
+                    }
+                ) + "\n"
+                continue
+
+            payload = SearchResponse(
+                query=request.query,
+                results=results,
+                total=len(results),
+                search_types=request.search_types or ["hybrid"],
             )
+            yield json.dumps({"type": "final", **payload.model_dump(mode="json")}) + "\n"
+    except Exception as err:  # noqa: BLE001 – headers already sent
+        logger.error("Streaming search failed: %s", err)
+        yield json.dumps({"type": "error", "detail": "Search failed"}) + "\n"
+        return
+    finally:
+        if own_session:
+            db.close()
+
+    search_history_writer.record(
+        user_id, request.query, filters_dict, request.project_ids
+    )
+
+
+@router.post("/grep", response_model=GrepResponse)
+async def grep(
+    request: GrepRequest,
+    current_user: CurrentUserRequired,
+    db: DatabaseDep,
+):
+    """Line-level regex / literal grep over full file contents.
+
+    Returns one page (``next_cursor`` continues it) or, with ``stream=true``,
+    an NDJSON stream of matches followed by a final ``{"next_cursor": …}``
+    line so clients can render hits as they are verified.  ``timed_out``
+    flags a search cut short by the verification budget and
+    ``unindexed_files`` the files that are not searchable yet.
+    """
+    project = db.query(Project).filter_by(id=request.project_id).first()
+    if not project or project.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    try:
+        compile_pattern(
+            request.pattern, regex=request.regex, ignore_case=request.ignore_case
+        )
+    except re.error as exc:
+        raise HTTPException(status_code=422, detail=f"Invalid pattern: {exc}")
+
+    options = {
+        "regex": request.regex,
+        "ignore_case": request.ignore_case,
+        "language": request.language,
+        "cursor": request.cursor,
+    }
+
+    if not request.stream:
+        return await grep_engine.search(
+            db, request.project_id, request.pattern, limit=request.limit, **options
         )
-        db.commit()
-    except Exception as exc:  # noqa: BLE001 – don't fail request
-        db.rollback()
-        logger.warning("Failed to persist search history: %s", exc, exc_info=False)
 
-    return response_payload
+    async def _ndjson():
+        # The request session is closed once the response starts streaming
+        stream_db = session_for("request")
+        last = None
+        count = 0
+        next_cursor = None
+        timed_out = False
+        try:
+            matches = grep_engine.iter_matches(
+                stream_db,
+                request.project_id,
+                request.pattern,
+                limit=request.limit + 1,
+                **options,
+            )
+            # Closing the matches stops their queued verification batches
+            async with aclosing(matches):
+                async for match in matches:
+                    if count == request.limit:
+                        next_cursor = last
+                        break
+                    yield json.dumps(match) + "\n"
+                    last = match["cursor"]
+                    count += 1
+        except GrepTimeout:
+            timed_out = True
+        finally:
+            stream_db.close()
+        yield json.dumps(
+            {
+                "next_cursor": next_cursor,
+                "timed_out": timed_out,
+                "unindexed_files": grep_engine.unindexed(request.project_id),
+            }
+        ) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
 
 
 @router.get("/suggestions")
@@ -5,15 +5,16 @@ user has access to (currently: projects they own).  This powers the
 Activity-log view in the frontend.
 """
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.dependencies import DatabaseDep, CurrentUserRequired
 from app.models.timeline import TimelineEvent
 from app.models.project import Project
 from app.schemas.project import TimelineEventResponse, UserInfo
+from app.utils import keyset
 
 router = APIRouter(prefix="/api/timeline", tags=["timeline"])
 
@@ -22,20 +23,37 @@ router = APIRouter(prefix="/api/timeline", tags=["timeline"])
 def list_timeline_events(
     current_user: CurrentUserRequired,
     db: DatabaseDep,
+    response: Response,
     limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Deprecated – use cursor"),
+    cursor: Optional[str] = None,
 ):
-    """Return recent timeline events across all projects the user owns."""
+    """Return recent timeline events across all projects the user owns.
 
-    events = (
+    Keyset-paginated on ``(created_at, id)``; the cursor for the next (older)
+    page is returned in the ``X-Next-Cursor`` header.
+    """
+    after = keyset.parse_cursor(cursor)
+
+    query = (
         db.query(TimelineEvent)
         .join(Project, Project.id == TimelineEvent.project_id)
         .filter(Project.owner_id == current_user.id)
-        .order_by(TimelineEvent.created_at.desc())
-        .offset(offset)
-        .limit(limit)
+    )
+    if after is not None:
+        query = query.filter(
+            keyset.before(TimelineEvent.created_at, TimelineEvent.id, after)
+        )
+    elif offset:
+        query = query.offset(offset)
+
+    rows = (
+        query.order_by(TimelineEvent.created_at.desc(), TimelineEvent.id.desc())
+        .limit(limit + 1)
         .all()
     )
+    events, next_cursor = keyset.paginate(rows, limit, keyset.created_key)
+    keyset.set_next_cursor(response, next_cursor)
 
     def _serialize(event: TimelineEvent) -> TimelineEventResponse:
         return TimelineEventResponse(
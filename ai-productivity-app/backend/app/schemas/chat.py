@@ -201,6 +201,7 @@ class ChatSessionResponse(BaseModel):
     updated_at: datetime
 
     message_count: int = 0
+    last_activity_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -209,4 +210,6 @@ class ChatSessionListResponse(BaseModel):
     """Paginated list wrapper."""
 
     items: List[ChatSessionResponse]
-    total: int
+    # Only computed for the first page (no cursor) – it is a full COUNT.
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
@@ -92,7 +92,11 @@ class ProjectStats(BaseModel):
     """Project statistics."""
 
     files: int = 0
+    chunks: int = 0
+    indexed_files: int = 0
+    pending_files: int = 0
     timeline_events: int = 0
+    storage_bytes: int = 0
     last_activity: Optional[datetime] = None
 
 
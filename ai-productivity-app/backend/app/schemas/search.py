@@ -29,6 +29,14 @@ class SearchRequest(BaseModel):
     filters: Optional[SearchFilters] = None
     limit: int = Field(20, ge=1, le=100)
     search_types: Optional[List[SearchType]] = None
+    stream: bool = Field(
+        False,
+        description="Return NDJSON: per-modality partial results, then the ranked list",
+    )
+    expand: bool = Field(
+        False,
+        description="Also search expanded variants of the query, within the search latency budget",
+    )
 
 
 class SearchResult(BaseModel):
@@ -81,3 +89,40 @@ class IndexResponse(BaseModel):
     document_id: int
     indexed_count: Optional[int] = None
     error_count: Optional[int] = None
+
+
+class GrepRequest(BaseModel):
+    """Regex / literal grep over full file contents."""
+
+    project_id: int
+    pattern: str = Field(..., min_length=1, max_length=500)
+    regex: bool = False
+    ignore_case: bool = True
+    language: Optional[str] = None
+    cursor: Optional[str] = None
+    limit: int = Field(100, ge=1, le=1000)
+    stream: bool = False
+
+
+class GrepMatch(BaseModel):
+    """Single line-level grep hit (1-based line and column)."""
+
+    document_id: int
+    file_path: str
+    language: Optional[str] = None
+    line: int
+    column: int
+    text: str
+    match: str
+    cursor: str
+
+
+class GrepResponse(BaseModel):
+    """One page of grep results."""
+
+    matches: List[GrepMatch]
+    next_cursor: Optional[str] = None
+    # Verification hit GREP_TIMEOUT_SECONDS; matches are partial
+    timed_out: bool = False
+    # Project files without stored contents, not searched yet
+    unindexed_files: int = 0
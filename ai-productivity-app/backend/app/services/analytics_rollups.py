@@ -0,0 +1,603 @@
+# backend/app/services/analytics_rollups.py
+"""Incremental hourly and daily analytics rollups (``analytics_rollups``).
+
+Cost, usage, search and quality dashboards used to aggregate the raw tables
+(``model_usage_metrics``, ``chat_messages``, ``user_feedback`` …) on every
+request, so their cost grew with history and long ranges competed with OLTP
+traffic.  They now read :class:`AnalyticsRollup` rows only – one per
+kind/dimension/user and hour or day – so a 90 day chart touches ~90 rows.
+
+:class:`AnalyticsRollupScheduler` keeps the rollups current.  Every
+``ANALYTICS_ROLLUP_INTERVAL_SECONDS`` it
+
+1. recomputes the hours since the last run (minus a late-arrival margin of
+   ``ANALYTICS_ROLLUP_LATE_HOURS``, and including the still-open hour) from
+   the source tables, one day per transaction, replacing those hourly rows;
+2. rebuilds the daily rows of the touched days from the hourly ones –
+   latency/score percentiles merge through their quantile sketches, daily
+   active users are the distinct users of the day's per-user rows;
+3. every ``ANALYTICS_MATVIEW_REFRESH_SECONDS`` refreshes the materialized
+   views with ``REFRESH … CONCURRENTLY`` so readers are never blocked.
+
+Each step takes a transaction-scoped advisory lock on PostgreSQL, so with
+several replicas only one does the work.  An empty table is backfilled over
+``ANALYTICS_ROLLUP_BACKFILL_DAYS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, text
+
+from app.models.analytics_rollup import AnalyticsRollup
+from app.monitoring.timeseries import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_ROLLUP_INTERVAL_SECONDS", "300"))
+MATVIEW_REFRESH_SECONDS = float(os.getenv("ANALYTICS_MATVIEW_REFRESH_SECONDS", "900"))
+BACKFILL_DAYS = int(os.getenv("ANALYTICS_ROLLUP_BACKFILL_DAYS", "90"))
+LATE_HOURS = int(os.getenv("ANALYTICS_ROLLUP_LATE_HOURS", "2"))
+# Ranges up to this long are read from hourly rows, longer ones from daily
+HOURLY_READ_DAYS = int(os.getenv("ANALYTICS_ROLLUP_HOURLY_READ_DAYS", "2"))
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+EPOCH = datetime(1970, 1, 1)
+
+ROLLUP_LOCK_KEY = 0x616E5F72  # pg advisory lock ids, arbitrary but fixed
+MATVIEW_LOCK_KEY = 0x616E5F76
+
+# Metric-rollup series folded into the ``search`` and ``rag`` kinds
+ROLLED_METRICS = (
+    "search.response_time",
+    "search.results_count",
+    "rag.response_time",
+    "rag.confidence_score",
+    "rag.sources_count",
+)
+
+RollupKey = Tuple[str, str, int, datetime]  # kind, dimension, user_id, bucket
+
+
+def as_utc(ts: datetime) -> datetime:
+    """Naive UTC datetime, the convention of every rollup column."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def floor_hour(ts: datetime) -> datetime:
+    return as_utc(ts).replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(ts: datetime) -> datetime:
+    return floor_hour(ts).replace(hour=0)
+
+
+def choose_granularity(start: datetime, end: datetime) -> str:
+    return "hour" if end - start <= timedelta(days=HOURLY_READ_DAYS) else "day"
+
+
+def _merge_data(dst: Dict[str, Any], src: Dict[str, Any]) -> None:
+    """Numbers add up, nested dicts merge, anything else is overwritten."""
+    for key, value in src.items():
+        if isinstance(value, dict):
+            _merge_data(dst.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            dst[key] = dst.get(key, 0) + value
+        else:
+            dst[key] = value
+
+
+@dataclass
+class RollupAggregate:
+    """Mergeable aggregate behind one rollup row."""
+
+    count: int = 0
+    total: float = 0.0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    sketch: Optional[QuantileSketch] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def add(
+        self,
+        count: int = 0,
+        total: float = 0.0,
+        tokens_in: int = 0,
+        tokens_out: int = 0,
+        lo: Optional[float] = None,
+        hi: Optional[float] = None,
+        sketch: Optional[QuantileSketch] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> "RollupAggregate":
+        self.count += int(count or 0)
+        self.total += float(total or 0.0)
+        self.tokens_in += int(tokens_in or 0)
+        self.tokens_out += int(tokens_out or 0)
+        if lo is not None:
+            self.min = lo if self.min is None else min(self.min, lo)
+        if hi is not None:
+            self.max = hi if self.max is None else max(self.max, hi)
+        if sketch is not None:
+            if self.sketch is None:
+                self.sketch = QuantileSketch()
+            self.sketch.merge(sketch)
+        if data:
+            _merge_data(self.data, data)
+        return self
+
+    def add_row(self, row: AnalyticsRollup) -> "RollupAggregate":
+        return self.add(
+            row.count,
+            row.total,
+            row.tokens_in,
+            row.tokens_out,
+            row.min,
+            row.max,
+            QuantileSketch.from_json(row.sketch) if row.sketch else None,
+            row.data,
+        )
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantiles(self) -> Tuple[Optional[float], Optional[float]]:
+        if self.sketch is None:
+            return None, None
+        p50, p95 = self.sketch.quantiles((0.5, 0.95))
+        return p50, p95
+
+    def row(self, granularity: str, key: RollupKey) -> Dict[str, Any]:
+        kind, dimension, user_id, bucket = key
+        p50, p95 = self.quantiles()
+        return {
+            "granularity": granularity,
+            "kind": kind,
+            "dimension": dimension,
+            "user_id": user_id,
+            "bucket_start": bucket,
+            "count": self.count,
+            "total": self.total,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "min": self.min,
+            "max": self.max,
+            "p50": p50,
+            "p95": p95,
+            "sketch": self.sketch.to_json() if self.sketch is not None else None,
+            "data": self.data or None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95 = self.quantiles()
+        return {
+            "count": self.count,
+            "total": self.total,
+            "avg": self.avg,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "min": self.min,
+            "max": self.max,
+            "p50": p50,
+            "p95": p95,
+        }
+
+
+Accumulator = Dict[RollupKey, RollupAggregate]
+
+
+# ---------------------------------------------------------------------------
+# Collectors: source tables -> hourly aggregates for [start, end)
+# ---------------------------------------------------------------------------
+
+
+def _dialect(db) -> str:
+    return db.get_bind().dialect.name
+
+
+def _hour_expr(db, column):
+    if _dialect(db) == "postgresql":
+        return func.date_trunc("hour", column)
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+
+def _as_hour(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return floor_hour(value)
+
+
+def _collect_cost(db, start: datetime, end: datetime, acc: Accumulator) -> None:
+    from app.models.config import ModelUsageMetrics
+
+    # model_usage_metrics already holds one row per model and hour
+    stmt = select(ModelUsageMetrics).where(
+        ModelUsageMetrics.period_start >= start.replace(tzinfo=timezone.utc),
+        ModelUsageMetrics.period_start < end.replace(tzinfo=timezone.utc),
+    )
+    for metric in db.execute(stmt).scalars():
+        hour = floor_hour(metric.period_start)
+        details = metric.detailed_metrics or {}
+        requests = metric.total_requests or 0
+        success_rate = metric.success_rate if metric.success_rate is not None else 100.0
+        features = {
+            key[len("feature_"):]: value
+            for key, value in details.items()
+            if key.startswith("feature_") and isinstance(value, dict)
+        }
+        acc[("cost", metric.model_id, 0, hour)].add(
+            count=requests,
+            total=metric.total_cost,
+            tokens_in=metric.total_tokens_input,
+            tokens_out=metric.total_tokens_output,
+            data={
+                "provider": details.get("provider", "unknown"),
+                "features": features,
+                # Sums, so averages stay exact when hours merge into days
+                "latency_ms_sum": (metric.avg_response_time_ms or 0.0) * requests,
+                "successes": success_rate / 100.0 * requests,
+                "prompt_cache": details.get("prompt_cache") or {},
+            },
+        )
+        for key, value in details.items():
+            if not key.startswith("user_") or not isinstance(value, dict):
+                continue
+            try:
+                user_id = int(key[len("user_"):])
+            except ValueError:
+                continue
+            acc[("cost", metric.model_id, user_id, hour)].add(
+                count=value.get("requests", 0),
+                total=value.get("cost", 0.0),
+                tokens_in=value.get("tokens_input", 0),
+                tokens_out=value.get("tokens_output", 0),
+                data={
+                    "features": value.get("features") or {},
+                    "prompt_cache": value.get("prompt_cache") or {},
+                },
+            )
+
+
+def _collect_usage(db, start: datetime, end: datetime, acc: Accumulator) -> None:
+    from app.models.chat import ChatMessage, ChatSession
+    from app.models.code import CodeDocument
+
+    hour = _hour_expr(db, ChatMessage.created_at)
+    stmt = (
+        select(hour, ChatMessage.user_id, func.count())
+        .where(ChatMessage.created_at >= start, ChatMessage.created_at < end)
+        .group_by(hour, ChatMessage.user_id)
+    )
+    for bucket, user_id, count in db.execute(stmt):
+        bucket = _as_hour(bucket)
+        acc[("usage", "messages", 0, bucket)].add(count=count)
+        if user_id:
+            acc[("usage", "messages", user_id, bucket)].add(count=count)
+            acc[("usage", "active_users", 0, bucket)].add(count=1)
+
+    for model, dimension in (
+        (ChatSession, "sessions"),
+        (CodeDocument, "documents_updated"),
+    ):
+        column = model.created_at if model is ChatSession else model.updated_at
+        hour = _hour_expr(db, column)
+        stmt = (
+            select(hour, func.count())
+            .where(column >= start, column < end)
+            .group_by(hour)
+        )
+        for bucket, count in db.execute(stmt):
+            acc[("usage", dimension, 0, _as_hour(bucket))].add(count=count)
+
+
+def _collect_metrics(db, start: datetime, end: datetime, acc: Accumulator) -> None:
+    from app.models.metric_rollup import MetricRollup
+
+    stmt = select(MetricRollup).where(
+        MetricRollup.metric_name.in_(ROLLED_METRICS),
+        MetricRollup.bucket_start >= start,
+        MetricRollup.bucket_start < end,
+    )
+    for row in db.execute(stmt).scalars():
+        kind, metric = row.metric_name.split(".", 1)
+        bucket = floor_hour(row.bucket_start)
+        sketch = QuantileSketch.from_json(row.sketch) if row.sketch else None
+        dimensions = [metric]
+        search_type = (row.labels or {}).get("search_type")
+        if search_type:
+            dimensions.append(f"{metric}:{search_type}")
+        for dimension in dimensions:
+            acc[(kind, dimension, 0, bucket)].add(
+                count=row.count, total=row.sum, lo=row.min, hi=row.max, sketch=sketch
+            )
+
+
+def _collect_quality(db, start: datetime, end: datetime, acc: Accumulator) -> None:
+    from app.models.feedback import UserFeedback
+
+    hour = _hour_expr(db, UserFeedback.created_at)
+    helpful = func.sum(case((UserFeedback.helpful.is_(True), 1), else_=0))
+    columns = {
+        "rating": UserFeedback.rating,
+        "accuracy": UserFeedback.accuracy_rating,
+        "clarity": UserFeedback.clarity_rating,
+        "completeness": UserFeedback.completeness_rating,
+        "rag_confidence": UserFeedback.rag_confidence,
+    }
+    aggregates = [helpful]
+    for column in columns.values():
+        aggregates += [func.count(column), func.sum(column)]
+    stmt = (
+        select(hour, func.count(UserFeedback.id), *aggregates)
+        .where(UserFeedback.created_at >= start, UserFeedback.created_at < end)
+        .group_by(hour)
+    )
+    for bucket, feedback, helpful_count, *values in db.execute(stmt):
+        bucket = _as_hour(bucket)
+        acc[("quality", "helpful", 0, bucket)].add(count=feedback, total=helpful_count)
+        for i, dimension in enumerate(columns):
+            acc[("quality", dimension, 0, bucket)].add(
+                count=values[2 * i], total=values[2 * i + 1]
+            )
+
+
+COLLECTORS = (_collect_cost, _collect_usage, _collect_metrics, _collect_quality)
+
+
+# ---------------------------------------------------------------------------
+# Maintenance (sync, runs in a worker thread on the "analytics" pool)
+# ---------------------------------------------------------------------------
+
+
+def _try_lock(db, key: int) -> bool:
+    """Transaction-scoped advisory lock; always granted off PostgreSQL."""
+    if _dialect(db) != "postgresql":
+        return True
+    lock = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key})
+    return bool(lock.scalar())
+
+
+def rollup_window(db, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Hours to recompute: since the last run minus the late margin."""
+    now = as_utc(now or datetime.utcnow())
+    end = floor_hour(now) + HOUR
+    watermark = db.execute(
+        select(AnalyticsRollup.bucket_start).where(
+            AnalyticsRollup.kind == "meta", AnalyticsRollup.dimension == "watermark"
+        )
+    ).scalar()
+    if watermark is None:
+        return floor_day(now - timedelta(days=BACKFILL_DAYS)), end
+    return min(floor_hour(watermark) - timedelta(hours=LATE_HOURS), end - HOUR), end
+
+
+def _days(start: datetime, end: datetime) -> Iterable[datetime]:
+    day = floor_day(start)
+    while day < end:
+        yield day
+        day += DAY
+
+
+def _rebuild_day(db, day: datetime) -> int:
+    """Replace the daily rows of *day* with the merge of its hourly rows."""
+    acc: Accumulator = defaultdict(RollupAggregate)
+    active_users = set()
+    stmt = select(AnalyticsRollup).where(
+        AnalyticsRollup.granularity == "hour",
+        AnalyticsRollup.kind != "meta",
+        AnalyticsRollup.bucket_start >= day,
+        AnalyticsRollup.bucket_start < day + DAY,
+    )
+    for row in db.execute(stmt).scalars():
+        acc[(row.kind, row.dimension, row.user_id, day)].add_row(row)
+        if row.kind == "usage" and row.dimension == "messages" and row.user_id:
+            active_users.add(row.user_id)
+    if active_users:
+        # Hourly distinct counts do not add up; count the day's users instead
+        acc[("usage", "active_users", 0, day)] = RollupAggregate(
+            count=len(active_users)
+        )
+
+    db.execute(
+        delete(AnalyticsRollup).where(
+            AnalyticsRollup.granularity == "day", AnalyticsRollup.bucket_start == day
+        )
+    )
+    rows = [agg.row("day", key) for key, agg in acc.items()]
+    if rows:
+        db.execute(insert(AnalyticsRollup), rows)
+    return len(rows)
+
+
+def rollup_chunk(db, start: datetime, end: datetime) -> Optional[int]:
+    """Recompute the hourly rows of [start, end) and their days, atomically.
+
+    Returns the number of hourly rows written, or ``None`` when another
+    replica holds the lock.
+    """
+    if not _try_lock(db, ROLLUP_LOCK_KEY):
+        db.rollback()
+        return None
+    acc: Accumulator = defaultdict(RollupAggregate)
+    for collect in COLLECTORS:
+        collect(db, start, end, acc)
+
+    db.execute(
+        delete(AnalyticsRollup).where(
+            AnalyticsRollup.granularity == "hour",
+            AnalyticsRollup.kind != "meta",
+            AnalyticsRollup.bucket_start >= start,
+            AnalyticsRollup.bucket_start < end,
+        )
+    )
+    rows = [agg.row("hour", key) for key, agg in acc.items()]
+    if rows:
+        db.execute(insert(AnalyticsRollup), rows)
+    for day in _days(start, end):
+        _rebuild_day(db, day)
+    db.commit()
+    return len(rows)
+
+
+def _set_watermark(db, bucket: datetime) -> None:
+    db.execute(delete(AnalyticsRollup).where(AnalyticsRollup.kind == "meta"))
+    db.execute(
+        insert(AnalyticsRollup),
+        [RollupAggregate().row("hour", ("meta", "watermark", 0, bucket))],
+    )
+    db.commit()
+
+
+def run_rollups(db, now: Optional[datetime] = None) -> int:
+    """Bring the rollups up to date, one day per transaction."""
+    now = as_utc(now or datetime.utcnow())
+    start, end = rollup_window(db, now)
+    db.rollback()  # do not hold the read snapshot across chunks
+    written = 0
+    while start < end:
+        stop = min(floor_day(start) + DAY, end)
+        count = rollup_chunk(db, start, stop)
+        if count is None:
+            logger.debug("Analytics rollup skipped: locked by another worker")
+            return written
+        written += count
+        start = stop
+    _set_watermark(db, floor_hour(now))
+    return written
+
+
+def refresh_materialized_views(db) -> bool:
+    """``REFRESH … CONCURRENTLY`` the analytics views (PostgreSQL only)."""
+    if _dialect(db) != "postgresql" or not _try_lock(db, MATVIEW_LOCK_KEY):
+        return False
+    from app.services.postgresql_functions import PostgreSQLFunctions
+
+    PostgreSQLFunctions(db).refresh_materialized_views(concurrently=True)
+    return True
+
+
+def _rollup_all() -> int:
+    from app.database import session_for
+
+    with session_for("analytics") as db:
+        return run_rollups(db)
+
+
+def _refresh_all() -> bool:
+    from app.database import session_for
+
+    with session_for("analytics") as db:
+        return refresh_materialized_views(db)
+
+
+class AnalyticsRollupScheduler:
+    """Background task that keeps rollups and materialized views current."""
+
+    def __init__(
+        self,
+        interval: float = ROLLUP_INTERVAL_SECONDS,
+        refresh_interval: float = MATVIEW_REFRESH_SECONDS,
+    ):
+        self.interval = interval
+        self.refresh_interval = refresh_interval
+        self._last_refresh = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="analytics-rollups")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                count = await asyncio.to_thread(_rollup_all)
+                logger.debug("Wrote %d hourly analytics rollups", count)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Analytics rollup failed: %s", exc)
+            if (
+                self.refresh_interval > 0
+                and time.monotonic() - self._last_refresh >= self.refresh_interval
+            ):
+                self._last_refresh = time.monotonic()
+                try:
+                    await asyncio.to_thread(_refresh_all)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Materialized view refresh failed: %s", exc)
+            await asyncio.sleep(self.interval)
+
+
+analytics_rollup_scheduler = AnalyticsRollupScheduler()
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+
+def read_rollups(
+    db,
+    kind: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    *,
+    user_id: Optional[int] = 0,
+    dimensions: Optional[Iterable[str]] = None,
+    granularity: Optional[str] = None,
+) -> List[AnalyticsRollup]:
+    """Rollup rows of *kind* overlapping [start, end), oldest first.
+
+    ``user_id`` 0 selects the all-users rows and ``None`` the per-user ones.
+    Without a *granularity*, short ranges read hourly rows and long ones
+    daily rows; buckets are aligned down so the first partial one counts.
+    """
+    end = as_utc(end) if end else datetime.utcnow()
+    start = as_utc(start) if start else EPOCH
+    granularity = granularity or choose_granularity(start, end)
+    align = floor_hour if granularity == "hour" else floor_day
+    stmt = select(AnalyticsRollup).where(
+        AnalyticsRollup.kind == kind,
+        AnalyticsRollup.granularity == granularity,
+        AnalyticsRollup.bucket_start >= align(start),
+        AnalyticsRollup.bucket_start < end,
+    )
+    if user_id is None:
+        stmt = stmt.where(AnalyticsRollup.user_id != 0)
+    else:
+        stmt = stmt.where(AnalyticsRollup.user_id == user_id)
+    if dimensions is not None:
+        stmt = stmt.where(AnalyticsRollup.dimension.in_(list(dimensions)))
+    return list(db.execute(stmt.order_by(AnalyticsRollup.bucket_start)).scalars())
+
+
+def merge_rollups(
+    rows: Iterable[AnalyticsRollup], key=None
+) -> Dict[Any, RollupAggregate]:
+    """Merge rows grouped by *key* (default: their dimension)."""
+    key = key or (lambda row: row.dimension)
+    merged: Dict[Any, RollupAggregate] = defaultdict(RollupAggregate)
+    for row in rows:
+        merged[key(row)].add_row(row)
+    return dict(merged)
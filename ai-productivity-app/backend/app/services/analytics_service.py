@@ -2,35 +2,31 @@
 
 import asyncio
 import logging
+import os
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from collections import defaultdict, Counter
 from dataclasses import dataclass, field
-import json
 import statistics
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy import func
 from app.models.user import User
 from app.models.project import Project
-from app.models.code_document import CodeDocument
-from app.models.chat_session import ChatSession, ChatMessage
-from app.models.feedback import UserFeedback
-from app.core.database import get_db
+from app.models.code import CodeDocument
+from app.monitoring.timeseries import LabelKey, TimeSeriesStore
+from app.services.analytics_rollups import RollupAggregate, merge_rollups, read_rollups
+from app.database import get_db
 
 logger = logging.getLogger(__name__)
 
-
-@dataclass
-class MetricPoint:
-    """Single metric data point."""
-
-    timestamp: datetime
-    metric_name: str
-    value: float
-    labels: Dict[str, str] = field(default_factory=dict)
-    metadata: Dict[str, Any] = field(default_factory=dict)
+BUCKET_SECONDS = int(os.getenv("METRICS_BUCKET_SECONDS", "10"))
+RETENTION_SECONDS = int(os.getenv("METRICS_RETENTION_SECONDS", "3600"))
+MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "2000"))
+ROLLUP_SECONDS = 60
+# Drained rollups kept for the next flush while the database is unavailable
+MAX_UNSAVED_ROLLUPS = int(os.getenv("METRICS_MAX_UNSAVED_ROLLUPS", "20000"))
 
 
 @dataclass
@@ -47,18 +43,58 @@ class AnalyticsReport:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
-class MetricsCollector:
-    """Collects and stores metrics data."""
+def _persist_rollups(rows: List[Tuple[str, LabelKey, Any]], bucket_seconds: int) -> None:
+    """Bulk-insert drained rollups on a fresh session (runs in a thread)."""
+    from app.database import session_for
+    from app.models.metric_rollup import MetricRollup
+
+    mappings = []
+    for name, key, agg in rows:
+        p50, p95, p99 = agg.sketch.quantiles((0.5, 0.95, 0.99))
+        mappings.append(
+            {
+                "metric_name": name,
+                "label_key": ",".join(f"{k}={v}" for k, v in key),
+                "labels": dict(key) or None,
+                "bucket_start": datetime.utcfromtimestamp(agg.start),
+                "bucket_seconds": bucket_seconds,
+                "count": agg.count,
+                "sum": agg.total,
+                "min": agg.min,
+                "max": agg.max,
+                "p50": p50,
+                "p95": p95,
+                "p99": p99,
+                "sketch": agg.sketch.to_json(),
+            }
+        )
+    with session_for("analytics") as db:
+        db.bulk_insert_mappings(MetricRollup, mappings)
+        db.commit()
 
-    def __init__(self):
-        self.metrics_buffer: List[MetricPoint] = []
-        self.buffer_size = 1000
+
+class MetricsCollector:
+    """Collects metrics into fixed-memory ring buffers.
+
+    Samples are folded into per-series time buckets (see
+    :mod:`app.monitoring.timeseries`) instead of being kept individually, so
+    memory stays flat under load and window reads cost O(buckets).  Closed
+    minutes are periodically flushed to the ``metric_rollups`` table; rollups
+    whose write fails are retried with the next flush.
+    """
+
+    def __init__(self, store: Optional[TimeSeriesStore] = None):
+        self.store = store or TimeSeriesStore(
+            bucket_seconds=BUCKET_SECONDS,
+            slots=max(1, RETENTION_SECONDS // BUCKET_SECONDS),
+            max_series=MAX_SERIES,
+        )
         self.flush_interval = 60  # seconds
         self.last_flush = time.time()
-
-        # Real-time metrics
-        self.realtime_metrics = defaultdict(list)
-        self.metric_retention = 3600  # 1 hour for real-time metrics
+        self.metric_retention = self.store.retention_seconds
+        self._flushing = False
+        self._unsaved: List[Tuple[str, LabelKey, Any]] = []
+        self.dropped_rollups = 0
 
     def record_metric(
         self,
@@ -67,72 +103,73 @@ class MetricsCollector:
         labels: Dict[str, str] = None,
         metadata: Dict[str, Any] = None,
     ):
-        """Record a metric point."""
-        metric = MetricPoint(
-            timestamp=datetime.utcnow(),
-            metric_name=metric_name,
-            value=value,
-            labels=labels or {},
-            metadata=metadata or {},
-        )
-
-        self.metrics_buffer.append(metric)
-
-        # Also store in real-time buffer
-        self.realtime_metrics[metric_name].append(metric)
+        """Record a metric point.
 
-        # Auto-flush if buffer is full
-        if len(self.metrics_buffer) >= self.buffer_size:
-            asyncio.create_task(self.flush_metrics())
+        *metadata* is accepted for call-site compatibility but not stored –
+        only numeric aggregates are kept.
+        """
+        self.store.record(metric_name, value, labels)
 
-    async def flush_metrics(self):
-        """Flush metrics buffer to persistent storage."""
-        if not self.metrics_buffer:
+        # Periodic flush of closed buckets
+        if self._flushing or time.time() - self.last_flush < self.flush_interval:
             return
-
         try:
-            # In a real implementation, this would write to a time-series database
-            # For now, we'll just log the metrics
-            logger.info(f"Flushing {len(self.metrics_buffer)} metrics to storage")
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flushing = True
+        loop.create_task(self.flush_metrics())
 
-            # Clear buffer
-            self.metrics_buffer.clear()
+    async def flush_metrics(self):
+        """Flush closed per-minute rollups to persistent storage."""
+        rows = self._unsaved
+        try:
+            rows = rows + self.store.drain(ROLLUP_SECONDS)
+            self._unsaved = []
             self.last_flush = time.time()
-
+            if rows:
+                await asyncio.to_thread(_persist_rollups, rows, ROLLUP_SECONDS)
+                logger.debug("Flushed %d metric rollups", len(rows))
         except Exception as e:
+            # Drained buckets are gone from the store: keep them for the next
+            # flush, dropping the oldest beyond the cap.
+            overflow = max(0, len(rows) - MAX_UNSAVED_ROLLUPS)
+            self._unsaved = rows[overflow:]
+            self.dropped_rollups += overflow
             logger.error(f"Failed to flush metrics: {e}")
+        finally:
+            self._flushing = False
 
     def cleanup_realtime_metrics(self):
-        """Clean up old real-time metrics."""
-        cutoff_time = datetime.utcnow() - timedelta(seconds=self.metric_retention)
-
-        for metric_name in self.realtime_metrics:
-            self.realtime_metrics[metric_name] = [
-                metric
-                for metric in self.realtime_metrics[metric_name]
-                if metric.timestamp > cutoff_time
-            ]
+        """Forget series that have been idle for the whole retention period."""
+        self.store.evict_idle()
 
     def get_realtime_metrics(
-        self, metric_names: List[str] = None, time_window: int = 300
-    ) -> Dict[str, List[MetricPoint]]:
-        """Get real-time metrics for specified time window."""
-        self.cleanup_realtime_metrics()
-
-        cutoff_time = datetime.utcnow() - timedelta(seconds=time_window)
-        result = {}
-
-        metrics_to_get = metric_names or list(self.realtime_metrics.keys())
-
-        for metric_name in metrics_to_get:
-            if metric_name in self.realtime_metrics:
-                result[metric_name] = [
-                    metric
-                    for metric in self.realtime_metrics[metric_name]
-                    if metric.timestamp > cutoff_time
-                ]
+        self,
+        metric_names: List[str] = None,
+        time_window: int = 300,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Dict[str, float]]:
+        """Summaries (count/avg/min/max/p50/p95/p99/rate) over *time_window*.
+
+        Label sets are merged unless *labels* is given.
+        """
+        names = metric_names or self.store.names()
+        return {
+            name: self.store.summary(name, time_window, labels) for name in names
+        }
 
-        return result
+    def operation_summaries(self, time_window: Optional[int] = None) -> Dict[str, Dict]:
+        """Per-operation duration summaries recorded by ``track_operation``."""
+        window = time_window or self.metric_retention
+        out = {}
+        for name in self.store.names():
+            if name.startswith("operation.") and name.endswith(".duration"):
+                operation = name[len("operation.") : -len(".duration")]
+                summary = self.store.summary(name, window)
+                if summary["count"]:
+                    out[operation] = summary
+        return out
 
 
 class AnalyticsService:
@@ -143,8 +180,7 @@ class AnalyticsService:
         self.reports_cache = {}
         self.cache_ttl = 300  # 5 minutes
 
-        # Performance tracking
-        self.operation_times = defaultdict(list)
+        # Performance tracking (durations live in the metrics store)
         self.error_counts = defaultdict(int)
 
         # User behavior tracking
@@ -161,8 +197,6 @@ class AnalyticsService:
             labels={"success": str(success)},
         )
 
-        self.operation_times[operation_name].append(duration)
-
         if not success:
             self.error_counts[operation_name] += 1
             self.metrics_collector.record_metric(
@@ -300,27 +334,22 @@ class AnalyticsService:
     ) -> Dict[str, Any]:
         """Calculate performance-related metrics."""
         # Query response times
-        avg_response_times = {}
-        for operation in self.operation_times:
-            times = self.operation_times[operation]
-            if times:
-                avg_response_times[operation] = {
-                    "avg": statistics.mean(times),
-                    "median": statistics.median(times),
-                    "p95": (
-                        statistics.quantiles(times, n=20)[18]
-                        if len(times) > 10
-                        else max(times)
-                    ),
-                    "count": len(times),
-                }
+        operations = self.metrics_collector.operation_summaries()
+        avg_response_times = {
+            operation: {
+                "avg": summary["avg"],
+                "median": summary["p50"],
+                "p95": summary["p95"],
+                "p99": summary["p99"],
+                "count": summary["count"],
+            }
+            for operation, summary in operations.items()
+        }
 
         # Error rates
         error_rates = {}
         for operation, error_count in self.error_counts.items():
-            total_operations = len(
-                self.operation_times.get(operation, [1])
-            )  # Avoid division by zero
+            total_operations = operations.get(operation, {}).get("count", 0)
             error_rates[operation] = (
                 error_count / total_operations if total_operations > 0 else 0
             )
@@ -339,38 +368,27 @@ class AnalyticsService:
         self, db: Session, start_time: datetime, end_time: datetime
     ) -> Dict[str, Any]:
         """Calculate usage-related metrics."""
-        # Active users
-        active_users = (
-            db.query(func.count(func.distinct(ChatMessage.user_id)))
-            .filter(ChatMessage.created_at.between(start_time, end_time))
-            .scalar()
-            or 0
+        # Hourly/daily rollups instead of scans of the chat tables
+        usage = merge_rollups(read_rollups(db, "usage", start_time, end_time))
+        per_user = read_rollups(
+            db, "usage", start_time, end_time, user_id=None, dimensions=["messages"]
         )
 
+        # Active users
+        active_users = len({row.user_id for row in per_user})
+
         # Total sessions
-        total_sessions = (
-            db.query(func.count(ChatSession.id))
-            .filter(ChatSession.created_at.between(start_time, end_time))
-            .scalar()
-            or 0
-        )
+        total_sessions = usage.get("sessions", RollupAggregate()).count
 
         # Messages per user
         avg_messages = (
-            db.query(func.avg(func.count(ChatMessage.id)))
-            .filter(ChatMessage.created_at.between(start_time, end_time))
-            .group_by(ChatMessage.user_id)
-            .scalar()
-            or 0
+            usage.get("messages", RollupAggregate()).count / active_users
+            if active_users
+            else 0
         )
 
         # Document interactions
-        document_views = (
-            db.query(func.count(CodeDocument.id))
-            .filter(CodeDocument.updated_at.between(start_time, end_time))
-            .scalar()
-            or 0
-        )
+        document_views = usage.get("documents_updated", RollupAggregate()).count
 
         # Feature usage
         feature_usage_metrics = dict(self.feature_usage)
@@ -402,85 +420,39 @@ class AnalyticsService:
         self, db: Session, start_time: datetime, end_time: datetime
     ) -> Dict[str, Any]:
         """Calculate quality-related metrics."""
-        # User feedback metrics
-        feedback_query = db.query(UserFeedback).filter(
-            UserFeedback.created_at.between(start_time, end_time)
-        )
-
-        feedback_count = feedback_query.count()
-
-        if feedback_count > 0:
-            avg_rating = (
-                db.query(func.avg(UserFeedback.rating))
-                .filter(UserFeedback.created_at.between(start_time, end_time))
-                .scalar()
-                or 0
+        # User feedback metrics, from the hourly/daily rollups
+        feedback = merge_rollups(read_rollups(db, "quality", start_time, end_time))
+        helpful = feedback.get("helpful", RollupAggregate())
+        feedback_count = helpful.count
+
+        avg_rating = feedback.get("rating", RollupAggregate()).avg
+        helpful_percentage = helpful.avg * 100
+
+        # Quality ratings breakdown
+        accuracy_rating = feedback.get("accuracy", RollupAggregate()).avg
+        clarity_rating = feedback.get("clarity", RollupAggregate()).avg
+        completeness_rating = feedback.get("completeness", RollupAggregate()).avg
+
+        # Content quality: persisted RAG rollups, or the live window when the
+        # range has not been rolled up yet
+        rag = merge_rollups(
+            read_rollups(
+                db,
+                "rag",
+                start_time,
+                end_time,
+                dimensions=["confidence_score", "sources_count"],
             )
-
-            helpful_percentage = (
-                db.query(
-                    func.count(UserFeedback.id).filter(UserFeedback.helpful == True)
-                )
-                .filter(UserFeedback.created_at.between(start_time, end_time))
-                .scalar()
-                / feedback_count
-                * 100
-            )
-
-            # Quality ratings breakdown
-            accuracy_rating = (
-                db.query(func.avg(UserFeedback.accuracy_rating))
-                .filter(
-                    UserFeedback.created_at.between(start_time, end_time),
-                    UserFeedback.accuracy_rating.isnot(None),
-                )
-                .scalar()
-                or 0
-            )
-
-            clarity_rating = (
-                db.query(func.avg(UserFeedback.clarity_rating))
-                .filter(
-                    UserFeedback.created_at.between(start_time, end_time),
-                    UserFeedback.clarity_rating.isnot(None),
-                )
-                .scalar()
-                or 0
-            )
-
-            completeness_rating = (
-                db.query(func.avg(UserFeedback.completeness_rating))
-                .filter(
-                    UserFeedback.created_at.between(start_time, end_time),
-                    UserFeedback.completeness_rating.isnot(None),
-                )
-                .scalar()
-                or 0
-            )
-        else:
-            avg_rating = 0
-            helpful_percentage = 0
-            accuracy_rating = 0
-            clarity_rating = 0
-            completeness_rating = 0
-
-        # Content quality (based on real-time metrics)
-        rag_metrics = self.metrics_collector.get_realtime_metrics(
-            ["rag.confidence_score", "rag.sources_count"]
         )
-
-        avg_confidence = 0
-        avg_sources = 0
-
-        if "rag.confidence_score" in rag_metrics:
-            confidence_scores = [m.value for m in rag_metrics["rag.confidence_score"]]
-            avg_confidence = (
-                statistics.mean(confidence_scores) if confidence_scores else 0
+        if rag:
+            avg_confidence = rag.get("confidence_score", RollupAggregate()).avg
+            avg_sources = rag.get("sources_count", RollupAggregate()).avg
+        else:
+            rag_metrics = self.metrics_collector.get_realtime_metrics(
+                ["rag.confidence_score", "rag.sources_count"]
             )
-
-        if "rag.sources_count" in rag_metrics:
-            source_counts = [m.value for m in rag_metrics["rag.sources_count"]]
-            avg_sources = statistics.mean(source_counts) if source_counts else 0
+            avg_confidence = rag_metrics["rag.confidence_score"].get("avg", 0)
+            avg_sources = rag_metrics["rag.sources_count"].get("avg", 0)
 
         return {
             "user_feedback": {
@@ -508,11 +480,11 @@ class AnalyticsService:
             total_projects = db.query(func.count(Project.id)).scalar() or 0
 
             # Recent activity
-            recent_messages = (
-                db.query(func.count(ChatMessage.id))
-                .filter(ChatMessage.created_at.between(start_time, end_time))
-                .scalar()
-                or 0
+            recent_messages = sum(
+                row.count
+                for row in read_rollups(
+                    db, "usage", start_time, end_time, dimensions=["messages"]
+                )
             )
 
             return {
@@ -676,18 +648,18 @@ class AnalyticsService:
                 time_window=300  # Last 5 minutes
             )
 
-            # Calculate current rates
-            current_rates = {}
-            for metric_name, metrics in realtime_metrics.items():
-                if metrics:
-                    # Calculate rate per minute
-                    time_span = 300 / 60  # 5 minutes
-                    current_rates[metric_name] = len(metrics) / time_span
+            # Current rates (per minute)
+            current_rates = {
+                name: summary["rate_per_min"]
+                for name, summary in realtime_metrics.items()
+                if summary["count"]
+            }
 
             # System status
             error_count = sum(self.error_counts.values())
             total_operations = sum(
-                len(times) for times in self.operation_times.values()
+                summary["count"]
+                for summary in self.metrics_collector.operation_summaries().values()
             )
             overall_error_rate = (
                 error_count / total_operations if total_operations > 0 else 0
@@ -709,7 +681,13 @@ class AnalyticsService:
                 "active_sessions": active_sessions,
                 "current_rates": current_rates,
                 "recent_metrics": {
-                    name: len(metrics) for name, metrics in realtime_metrics.items()
+                    name: summary["count"]
+                    for name, summary in realtime_metrics.items()
+                },
+                "latency": {
+                    name: {k: summary.get(k) for k in ("p50", "p95", "p99")}
+                    for name, summary in realtime_metrics.items()
+                    if summary["count"] and name.endswith(("duration", "time"))
                 },
                 "error_rate": overall_error_rate,
                 "top_features": dict(Counter(self.feature_usage).most_common(10)),
@@ -723,12 +701,6 @@ class AnalyticsService:
         """Clean up old analytics data."""
         cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
 
-        # Clean up operation times
-        for operation in list(self.operation_times.keys()):
-            # Keep only recent data (simplified cleanup)
-            if len(self.operation_times[operation]) > 1000:
-                self.operation_times[operation] = self.operation_times[operation][-500:]
-
         # Clean up user sessions
         expired_sessions = [
             user_id
@@ -739,8 +711,9 @@ class AnalyticsService:
         for user_id in expired_sessions:
             del self.user_sessions[user_id]
 
-        # Clean up metrics collector
+        # Drop idle metric series and persist pending rollups
         self.metrics_collector.cleanup_realtime_metrics()
+        await self.metrics_collector.flush_metrics()
 
         logger.info(f"Cleaned up analytics data older than {retention_days} days")
 
@@ -0,0 +1,219 @@
+# backend/app/services/blame_cache.py
+"""Precomputed *git blame* tables with O(log n) line lookups.
+
+Running ``git blame`` over a large file takes seconds, and the previous
+implementation of :pymeth:`GitHistorySearcher.get_blame` did so on **every**
+``blame:`` query and ``git_blame`` tool call before scanning the result
+linearly for a single line.
+
+This module stores the blame output of a file as a compact *line-range →
+commit* table:
+
+• ``starts`` / ``ends`` – parallel, sorted lists of 1-based inclusive line
+  ranges, searched with :pyfunc:`bisect.bisect_right`.
+• ``commit_idx``        – index into a de-duplicated commit list so large
+  files touched by few commits stay small in memory.
+
+Tables are keyed by ``(repo_path, commit_sha, file_path)``.  Because the key
+contains the commit the file was blamed at, a table never goes stale – moving
+``HEAD`` simply produces a new key while old entries age out of the LRU.
+
+Tables are built lazily on first access, guarded by a per-key lock so that
+concurrent requests for the same file share one ``git blame`` run.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of per-file tables kept in memory.  A table costs roughly three ints
+# per blame hunk plus one small dict per distinct commit.
+DEFAULT_BLAME_CACHE_SIZE = int(os.getenv("BLAME_CACHE_SIZE", "512"))
+
+BlameKey = Tuple[str, str, str]
+
+
+@dataclass
+class BlameTable:
+    """Line-range → commit table for one file at one commit."""
+
+    starts: List[int] = field(default_factory=list)
+    ends: List[int] = field(default_factory=list)
+    commit_idx: List[int] = field(default_factory=list)
+    commits: List[Dict[str, str]] = field(default_factory=list)
+
+    @property
+    def line_count(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+    @classmethod
+    def from_entries(
+        cls, entries: Iterable[Tuple[int, int, Dict[str, str]]]
+    ) -> "BlameTable":
+        """Build a table from ``(start, end, commit_info)`` tuples.
+
+        Entries may arrive in any order (``git blame --incremental`` emits
+        hunks as it resolves them); adjacent ranges pointing to the same
+        commit are merged.
+        """
+        table = cls()
+        commit_positions: Dict[str, int] = {}
+
+        for start, end, info in sorted(entries, key=lambda e: e[0]):
+            sha = info["commit_hash"]
+            pos = commit_positions.get(sha)
+            if pos is None:
+                pos = len(table.commits)
+                commit_positions[sha] = pos
+                table.commits.append(info)
+
+            if (
+                table.ends
+                and table.commit_idx[-1] == pos
+                and table.ends[-1] + 1 == start
+            ):
+                table.ends[-1] = end
+                continue
+
+            table.starts.append(start)
+            table.ends.append(end)
+            table.commit_idx.append(pos)
+
+        return table
+
+    def lookup(self, line_number: int) -> Optional[Dict[str, str]]:
+        """Return commit info for *line_number* (1-based) or ``None``."""
+        i = bisect_right(self.starts, line_number) - 1
+        if i < 0 or line_number > self.ends[i]:
+            return None
+        return self.commits[self.commit_idx[i]]
+
+    def range(
+        self, start_line: int, end_line: int
+    ) -> List[Tuple[int, int, Dict[str, str]]]:
+        """Return ``(start, end, commit_info)`` hunks overlapping the range.
+
+        Hunk boundaries are clipped to ``[start_line, end_line]``.
+        """
+        if end_line < start_line or not self.starts:
+            return []
+
+        first = max(bisect_right(self.starts, start_line) - 1, 0)
+        last = bisect_left(self.starts, end_line + 1)
+
+        hunks = []
+        for i in range(first, last):
+            lo = max(self.starts[i], start_line)
+            hi = min(self.ends[i], end_line)
+            if lo <= hi:
+                hunks.append((lo, hi, self.commits[self.commit_idx[i]]))
+        return hunks
+
+
+def _commit_info(commit) -> Dict[str, str]:
+    return {
+        "commit_hash": commit.hexsha,
+        "author": commit.author.name,
+        "date": commit.committed_datetime.isoformat(),
+        "message": commit.message,
+    }
+
+
+def build_blame_table(repo, commit_sha: str, file_path: str) -> BlameTable:
+    """Run ``git blame --incremental`` once and compact the output."""
+    commit_cache: Dict[str, Dict[str, str]] = {}
+    entries = []
+
+    for entry in repo.blame_incremental(commit_sha, file_path):
+        linenos = entry.linenos
+        if not linenos:
+            continue
+        info = commit_cache.get(entry.commit.hexsha)
+        if info is None:
+            info = _commit_info(entry.commit)
+            commit_cache[entry.commit.hexsha] = info
+        entries.append((linenos.start, linenos.stop - 1, info))
+
+    return BlameTable.from_entries(entries)
+
+
+class BlameCache:
+    """Process-wide LRU of :class:`BlameTable` objects.
+
+    Thread-safe: tables are built inside ``asyncio.to_thread`` workers, so we
+    guard the LRU with a :class:`threading.Lock` and use one build lock per
+    key to avoid duplicate ``git blame`` runs.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_BLAME_CACHE_SIZE):
+        self.max_size = max_size
+        self._tables: "OrderedDict[BlameKey, BlameTable]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[BlameKey, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: BlameKey) -> Optional[BlameTable]:
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+            return table
+
+    def _put(self, key: BlameKey, table: BlameTable) -> None:
+        with self._lock:
+            self._tables[key] = table
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_size:
+                self._tables.popitem(last=False)
+
+    def get_table(
+        self, repo, repo_path: str, commit_sha: str, file_path: str
+    ) -> BlameTable:
+        """Return the cached table, building it on first access."""
+        key = (repo_path, commit_sha, file_path)
+
+        table = self._get(key)
+        if table is not None:
+            self.hits += 1
+            return table
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Another thread may have finished the build while we waited.
+            table = self._get(key)
+            if table is not None:
+                self.hits += 1
+                return table
+
+            self.misses += 1
+            table = build_blame_table(repo, commit_sha, file_path)
+            self._put(key, table)
+
+        with self._lock:
+            self._build_locks.pop(key, None)
+        return table
+
+    def invalidate(self, repo_path: str) -> None:
+        """Drop every table belonging to *repo_path* (e.g. repo cleanup)."""
+        with self._lock:
+            for key in [k for k in self._tables if k[0] == repo_path]:
+                del self._tables[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = len(self._tables)
+        return {"tables": size, "hits": self.hits, "misses": self.misses}
+
+
+blame_cache = BlameCache()
@@ -1,12 +1,14 @@
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Tuple, Union
 from datetime import datetime
 
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from ..models.chat import ChatSession, ChatMessage
 from ..models.timeline import TimelineEvent
+from ..utils import keyset
+from ..utils.keyset import Cursor
 from ..websocket.manager import connection_manager
 
 # Pydantic request models are not required inside the service layer
@@ -98,28 +100,19 @@ class ChatService:
             ),
         )
 
+        # Insert + denormalised session counters in one transaction
+        bump = self._session_activity_stmt(session_id, +1)
         if self.is_async:
             self.db.add(message)
+            await self.db.flush()
+            await self.db.execute(bump)
             await self.db.commit()
-
-            # Update session timestamp
-            session_result = await self.db.execute(
-                select(ChatSession).where(ChatSession.id == session_id)
-            )
-            session = session_result.scalar_one_or_none()
-            if session:
-                session.updated_at = datetime.utcnow()
-                await self.db.commit()
         else:
             self.db.add(message)
+            self.db.flush()
+            self.db.execute(bump)
             self.db.commit()
 
-            # Update session timestamp
-            session = self.db.query(ChatSession).filter_by(id=session_id).first()
-            if session:
-                session.updated_at = datetime.utcnow()
-                self.db.commit()
-
         # Broadcast to connected clients if requested
         if broadcast:
             await self._broadcast_message(message)
@@ -236,10 +229,13 @@ class ChatService:
             return True  # already deleted – treat as success
 
         message.is_deleted = True
+        drop = self._session_activity_stmt(message.session_id, -1, touch=False)
 
         if self.is_async:
+            await self.db.execute(drop)
             await self.db.commit()
         else:
+            self.db.execute(drop)
             self.db.commit()
 
         # Broadcast deletion
@@ -262,15 +258,36 @@ class ChatService:
     ) -> List[ChatMessage]:
         """Return up to *limit* most recent messages for *session_id*.
 
+        Thin wrapper around :meth:`get_session_messages_page` for callers that
+        do not need the continuation cursor.
+        """
+        messages, _ = await self.get_session_messages_page(
+            session_id, limit, before_id=before_id
+        )
+        return messages
+
+    async def get_session_messages_page(
+        self,
+        session_id: int,
+        limit: int = 50,
+        cursor: Optional[Cursor] = None,
+        before_id: Optional[int] = None,
+    ) -> Tuple[List[ChatMessage], Optional[str]]:
+        """Return ``(messages, next_cursor)`` for one page of *session_id*.
+
         Behaviour:
-        • When *before_id* is ``None`` (initial page load) the **latest**
+        • Without *cursor* / *before_id* (initial page load) the **latest**
           ``limit`` messages are returned so the user always sees the most
           recent conversation after a reload.
-        • When *before_id* is provided (pagination while scrolling **up**) we
-          fetch the next *older* batch.  The consumer expects messages in
-          chronological order (old → new) therefore the slice is first ordered
-          *descending* to efficiently grab the window and then reversed before
-          returning.
+        • With a *cursor* (pagination while scrolling **up**) the next *older*
+          batch is returned.  *before_id* is the legacy form of the same
+          request and is resolved to that message's ``(created_at, id)`` key.
+
+        Pages are keyset-paginated on ``(created_at, id)`` – the same order
+        the rows are sorted by, served by ``idx_chat_messages_session_keyset``.
+        The slice is fetched *descending* and reversed so the consumer gets
+        chronological order (old → new); ``next_cursor`` is ``None`` when no
+        older messages remain.
         """
 
         # In Postgres a boolean column is always stored as the *real* boolean
@@ -281,54 +298,46 @@ class ChatService:
         # usage.
         not_deleted_filter = ChatMessage.is_deleted.is_(False)
 
-        def _reverse_if_needed(rows):
-            """Helper to ensure ascending chronological order."""
-            # Rows are reversed **only** when they were fetched in DESC order.
-            return list(reversed(rows))
-
-        if self.is_async:
-            base_query = select(ChatMessage).where(
-                ChatMessage.session_id == session_id,
-                not_deleted_filter,
-            )
-
-            if before_id is None:
-                # Latest page – order DESC to grab most recent, then reverse
-                # to maintain chronological order.
-                query = base_query.order_by(ChatMessage.created_at.desc()).limit(limit)
-                result = await self.db.execute(query)
-                rows = result.scalars().all()
-                return _reverse_if_needed(rows)
-
-            # Pagination – fetch messages **older** than *before_id*.
-            query = (
-                base_query.where(ChatMessage.id < before_id)
-                .order_by(ChatMessage.created_at.desc())
-                .limit(limit)
+        if cursor is None and before_id is not None:
+            key_stmt = select(ChatMessage.created_at, ChatMessage.id).where(
+                ChatMessage.id == before_id
             )
-            result = await self.db.execute(query)
-            rows = result.scalars().all()
-            return _reverse_if_needed(rows)
-
-        # ---------------------- synchronous (non-async) path -----------------
-
-        base_query = (
-            self.db.query(ChatMessage)
-            .filter(ChatMessage.session_id == session_id)
-            .filter(not_deleted_filter)
+            if self.is_async:
+                row = (await self.db.execute(key_stmt)).first()
+            else:
+                row = self.db.execute(key_stmt).first()
+            if row is None:
+                return [], None
+            cursor = (row.created_at, row.id)
+
+        stmt = select(ChatMessage).where(
+            ChatMessage.session_id == session_id, not_deleted_filter
         )
-
-        if before_id is None:
-            rows = base_query.order_by(ChatMessage.created_at.desc()).limit(limit).all()
-            return _reverse_if_needed(rows)
-
-        rows = (
-            base_query.filter(ChatMessage.id < before_id)
-            .order_by(ChatMessage.created_at.desc())
-            .limit(limit)
-            .all()
+        if cursor is not None:
+            stmt = stmt.where(keyset.before(ChatMessage.created_at, ChatMessage.id, cursor))
+        stmt = stmt.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(
+            limit + 1
         )
-        return _reverse_if_needed(rows)
+
+        if self.is_async:
+            rows = (await self.db.execute(stmt)).scalars().all()
+        else:
+            rows = self.db.execute(stmt).scalars().all()
+
+        page, next_cursor = keyset.paginate(rows, limit, keyset.created_key)
+        return list(reversed(page)), next_cursor
+
+    def _session_activity_stmt(self, session_id: int, delta: int, touch: bool = True):
+        """UPDATE keeping ``message_count`` / ``last_activity_at`` current."""
+        stmt = update(ChatSession).where(ChatSession.id == session_id)
+        if delta < 0:
+            stmt = stmt.where(ChatSession.message_count >= -delta)
+        values = {"message_count": ChatSession.message_count + delta}
+        if touch:
+            now = datetime.utcnow()
+            values["last_activity_at"] = now
+            values["updated_at"] = now
+        return stmt.values(**values)
 
     async def _broadcast_message(self, message: ChatMessage):
         """Broadcast new message to session."""
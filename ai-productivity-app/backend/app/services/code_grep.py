@@ -0,0 +1,662 @@
+# backend/app/services/code_grep.py
+"""Trigram-indexed regex grep over full file contents.
+
+``/grep`` used to run ``chunk_content LIKE '%pattern%'`` with a hard limit of
+10 chunks and then rescan those chunks in Python.  It could not do regexes,
+lost matches across chunk boundaries and only ever saw the first 10 chunks.
+
+This engine follows the classic *trigram index* design (Google Code Search):
+
+1. **Index** – every file is lower-cased and decomposed into its set of
+   3-character substrings; a posting list maps each trigram to the documents
+   containing it.  Built per project from ``code_document_contents`` and kept
+   up to date incrementally via ``updated_at``.  Documents processed before
+   that table existed are backfilled from their stored chunks the first
+   time a project's index is built; files still without contents are
+   reported as ``unindexed_files``.
+2. **Plan**   – the regex is parsed with the stdlib ``re`` parser and turned
+   into a boolean query over trigrams in disjunctive normal form: a list of
+   alternatives, each a set of trigrams that must *all* be present.  Anything
+   the planner cannot reason about weakens the query (never strengthens it),
+   so candidates are always a superset of true matches.
+3. **Verify** – candidate files are scanned with the compiled regex in
+   batches on a bounded thread pool, off the event loop, and results are
+   yielded in ``(file_path, line)`` order so they can be streamed and paged
+   with an opaque cursor.  Verification uses the ``regex`` module, whose
+   matching can be interrupted: a search stops after
+   ``GREP_TIMEOUT_SECONDS`` (returning what it found, flagged ``timed_out``),
+   so a catastrophically backtracking pattern cannot pin the shared pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import groupby
+from typing import (
+    AsyncIterator,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import regex as _regex
+
+try:  # Python ≥ 3.11
+    from re import _parser as sre_parse  # type: ignore[attr-defined]
+    from re import _constants as sre_constants  # type: ignore[attr-defined]
+except ImportError:  # pragma: no cover – older interpreters
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.code import CodeDocument, CodeDocumentContent, CodeEmbedding
+
+logger = logging.getLogger(__name__)
+
+# Projects whose index is kept in memory (LRU).
+GREP_INDEX_MAX_PROJECTS = int(os.getenv("GREP_INDEX_MAX_PROJECTS", "8"))
+# Threads used to verify candidate files.
+GREP_VERIFY_WORKERS = int(os.getenv("GREP_VERIFY_WORKERS", "4"))
+# Candidate files handed to one verification task.
+GREP_VERIFY_BATCH = 32
+# Wall-clock budget for verifying one search (all batches together).
+GREP_TIMEOUT_SECONDS = float(os.getenv("GREP_TIMEOUT_SECONDS", "5"))
+# Upper bound on DNF alternatives before the planner gives up precision.
+_MAX_ALTERNATIVES = 64
+# Matched line text is truncated to keep responses small.
+_MAX_LINE_CHARS = 500
+
+# A query in disjunctive normal form.  ``[frozenset()]`` matches everything.
+TrigramQuery = List[FrozenSet[str]]
+MATCH_ALL: TrigramQuery = [frozenset()]
+
+
+# ---------------------------------------------------------------------------
+# Trigram extraction & query planning
+# ---------------------------------------------------------------------------
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the set of lower-cased trigrams in *text*."""
+    text = text.lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _and(left: TrigramQuery, right: TrigramQuery) -> TrigramQuery:
+    product = [a | b for a in left for b in right]
+    if len(product) <= _MAX_ALTERNATIVES:
+        return product
+    # Too many alternatives – keep the side with fewer, which is a weaker
+    # (but still correct) filter.
+    return left if len(left) <= len(right) else right
+
+
+def _or(queries: List[TrigramQuery]) -> TrigramQuery:
+    merged: TrigramQuery = []
+    for q in queries:
+        if any(not alt for alt in q):
+            return MATCH_ALL
+        merged.extend(q)
+    return merged if len(merged) <= _MAX_ALTERNATIVES else MATCH_ALL
+
+
+def _literal_query(run: str) -> TrigramQuery:
+    return [frozenset(trigrams(run))] if len(run) >= 3 else MATCH_ALL
+
+
+def _plan_items(items) -> TrigramQuery:
+    """Required-trigram query for a parsed ``re`` sub-pattern."""
+    query = MATCH_ALL
+    run: List[str] = []
+
+    def flush() -> None:
+        nonlocal query
+        if run:
+            query = _and(query, _literal_query("".join(run)))
+            run.clear()
+
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(arg))
+        elif op is sre_constants.AT:
+            # Zero-width anchors do not break a literal run.
+            continue
+        elif op is sre_constants.SUBPATTERN:
+            flush()
+            query = _and(query, _plan_items(arg[-1]))
+        elif op is sre_constants.BRANCH:
+            flush()
+            query = _and(query, _or([_plan_items(b) for b in arg[1]]))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            flush()
+            low, _high, body = arg
+            if low >= 1:
+                query = _and(query, _plan_items(body))
+        else:
+            # Character classes, ANY, back-references … – break the run.
+            flush()
+    flush()
+    return query
+
+
+def plan_query(pattern: str, *, regex: bool = True) -> TrigramQuery:
+    """Translate *pattern* into a trigram query (always a superset filter)."""
+    if not regex:
+        return _literal_query(pattern)
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, RecursionError):
+        return MATCH_ALL
+    return _plan_items(parsed)
+
+
+def compile_pattern(pattern: str, *, regex: bool, ignore_case: bool) -> "_regex.Pattern":
+    """Compile the verification regex (raises :class:`re.error`).
+
+    Patterns are validated with ``re`` – the dialect the planner parses –
+    and compiled with the ``regex`` module, which accepts a matching
+    timeout.
+    """
+    source = pattern if regex else re.escape(pattern)
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    re.compile(source, flags)
+    return _regex.compile(
+        source, _regex.MULTILINE | (_regex.IGNORECASE if ignore_case else 0)
+    )
+
+
+class GrepTimeout(Exception):
+    """Verification exceeded ``GREP_TIMEOUT_SECONDS``."""
+
+
+def reassemble_chunks(chunks: Iterable[Tuple[Optional[int], Optional[int], str]]) -> str:
+    """Best-effort file text from ``(start_line, end_line, content)`` chunks.
+
+    Chunks are laid out at their (1-based) start lines; overlapping lines
+    are taken once and gaps are filled with empty lines so reported line
+    numbers match the file.  Chunks without line numbers are appended.
+    """
+    lines: List[str] = []
+    trailing: List[str] = []
+    for start, _end, content in sorted(
+        chunks, key=lambda c: (c[0] is None, c[0] or 0, c[1] or 0)
+    ):
+        if start is None:
+            trailing.append(content)
+            continue
+        chunk_lines = content.split("\n")
+        offset = len(lines) - (start - 1)
+        if offset < 0:
+            lines.extend([""] * -offset)
+            offset = 0
+        lines.extend(chunk_lines[offset:])
+    return "\n".join(lines + trailing)
+
+
+# ---------------------------------------------------------------------------
+# Per-project index
+# ---------------------------------------------------------------------------
+
+
+class ProjectGrepIndex:
+    """Posting lists for one project.  Mutations hold :attr:`lock`."""
+
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+        self.docs: Dict[int, Tuple[str, Optional[str], str]] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.synced_at: Optional[datetime] = None
+        # Project documents without stored contents (not searchable yet)
+        self.unindexed = 0
+        self.lock = threading.Lock()
+
+    def add(
+        self, doc_id: int, file_path: str, language: Optional[str], content: str
+    ) -> None:
+        self.remove(doc_id)
+        self.docs[doc_id] = (file_path, language, content)
+        for tri in trigrams(content):
+            self.postings.setdefault(tri, set()).add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        old = self.docs.pop(doc_id, None)
+        if old is None:
+            return
+        for tri in trigrams(old[2]):
+            posting = self.postings.get(tri)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self.postings[tri]
+
+    def candidates(
+        self, query: TrigramQuery, language: Optional[str] = None
+    ) -> List[int]:
+        """Document ids satisfying *query*, ordered by file path."""
+        with self.lock:
+            return self._candidates(query, language)
+
+    def snapshot(
+        self, query: TrigramQuery, language: Optional[str] = None
+    ) -> Dict[int, Tuple[str, Optional[str], str]]:
+        """``candidates`` with their entries, copied under the lock.
+
+        Searches work on the copy, so a concurrent :meth:`sync_index` in
+        another thread can keep mutating the index.
+        """
+        with self.lock:
+            return {d: self.docs[d] for d in self._candidates(query, language)}
+
+    def path_of(self, doc_id: int) -> Optional[str]:
+        with self.lock:
+            entry = self.docs.get(doc_id)
+        return entry[0] if entry else None
+
+    def _candidates(
+        self, query: TrigramQuery, language: Optional[str]
+    ) -> List[int]:
+        result: Set[int] = set()
+        for alternative in query:
+            if not alternative:
+                result = set(self.docs)
+                break
+            postings = sorted(
+                (self.postings.get(t, set()) for t in alternative), key=len
+            )
+            if not postings[0]:
+                continue
+            hits = set(postings[0])
+            for posting in postings[1:]:
+                hits &= posting
+                if not hits:
+                    break
+            result |= hits
+
+        if language:
+            result = {d for d in result if self.docs[d][1] == language}
+        return sorted(result, key=lambda d: (self.docs[d][0], d))
+
+
+def _scan_document(
+    compiled: "_regex.Pattern",
+    content: str,
+    after_line: int,
+    limit: int,
+    deadline: Optional[float] = None,
+) -> List[Tuple[int, int, str, str]]:
+    """Return ``(line, column, line_text, match)`` tuples (1-based line/col).
+
+    Only the first match per line is reported, like ``grep -n``.  Raises
+    :class:`TimeoutError` once the ``time.monotonic()`` *deadline* passes.
+    """
+    timeout = None
+    if deadline is not None:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            raise TimeoutError("grep deadline exceeded")
+    hits: List[Tuple[int, int, str, str]] = []
+    line_no = 1
+    pos = 0
+    last_line = after_line
+    for m in compiled.finditer(content, timeout=timeout):
+        start = m.start()
+        line_no += content.count("\n", pos, start)
+        pos = start
+        if line_no <= last_line:
+            continue
+        line_start = content.rfind("\n", 0, start) + 1
+        line_end = content.find("\n", start)
+        if line_end == -1:
+            line_end = len(content)
+        hits.append(
+            (
+                line_no,
+                start - line_start + 1,
+                content[line_start:line_end][:_MAX_LINE_CHARS],
+                m.group(0)[:_MAX_LINE_CHARS],
+            )
+        )
+        last_line = line_no
+        if len(hits) >= limit:
+            break
+    return hits
+
+
+# ---------------------------------------------------------------------------
+# Engine (process-wide registry)
+# ---------------------------------------------------------------------------
+
+
+class CodeGrepEngine:
+    """Keeps per-project indexes warm and runs paginated, streamed greps."""
+
+    def __init__(
+        self,
+        max_projects: int = GREP_INDEX_MAX_PROJECTS,
+        workers: int = GREP_VERIFY_WORKERS,
+    ):
+        self.max_projects = max_projects
+        self._indexes: "OrderedDict[int, ProjectGrepIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Projects whose pre-existing documents have been backfilled
+        self._backfilled: Set[int] = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="grep-verify"
+        )
+
+    # ------------------------------------------------------------------ #
+    # Index maintenance (synchronous – call via to_thread / run_sync)
+    # ------------------------------------------------------------------ #
+
+    def _get_index(self, project_id: int) -> ProjectGrepIndex:
+        with self._lock:
+            index = self._indexes.get(project_id)
+            if index is None:
+                index = ProjectGrepIndex(project_id)
+                self._indexes[project_id] = index
+            self._indexes.move_to_end(project_id)
+            while len(self._indexes) > self.max_projects:
+                self._indexes.popitem(last=False)
+            return index
+
+    def backfill_contents(self, project_id: int) -> int:
+        """Store contents for documents processed before
+        ``code_document_contents`` existed, rebuilt from their chunks.
+
+        Runs on a session of its own (the caller's transaction is left
+        alone).  Returns the number of documents written; a concurrent
+        backfill by another worker is not an error.
+        """
+        from app.database import session_for
+
+        session = session_for("worker")
+        try:
+            rows = session.execute(
+                select(
+                    CodeEmbedding.document_id,
+                    CodeEmbedding.start_line,
+                    CodeEmbedding.end_line,
+                    CodeEmbedding.chunk_content,
+                )
+                .join(CodeDocument, CodeDocument.id == CodeEmbedding.document_id)
+                .where(
+                    CodeDocument.project_id == project_id,
+                    ~exists().where(
+                        CodeDocumentContent.document_id == CodeDocument.id
+                    ),
+                )
+                .order_by(CodeEmbedding.document_id)
+            ).all()
+            written = 0
+            for doc_id, chunks in groupby(rows, key=lambda row: row[0]):
+                session.add(
+                    CodeDocumentContent(
+                        document_id=doc_id,
+                        project_id=project_id,
+                        content=reassemble_chunks(c[1:] for c in chunks),
+                    )
+                )
+                written += 1
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            return 0
+        finally:
+            session.close()
+        if written:
+            logger.info(
+                "Grep index for project %s: backfilled %d files from chunks",
+                project_id,
+                written,
+            )
+        return written
+
+    def sync_index(self, db: Session, project_id: int) -> ProjectGrepIndex:
+        """Bring the project index up to date with the database.
+
+        One aggregate query decides whether anything changed.  If so, the
+        current id set drops deleted documents (a delete plus an add leaves
+        the count unchanged) and rows with a newer ``updated_at`` are loaded;
+        only the first sync loads everything – after backfilling documents
+        that have no stored contents yet.
+        """
+        index = self._get_index(project_id)
+        with index.lock:
+            if project_id not in self._backfilled:
+                try:
+                    self.backfill_contents(project_id)
+                    self._backfilled.add(project_id)
+                except Exception as exc:  # noqa: BLE001 – retried next sync
+                    logger.warning("Grep content backfill failed: %s", exc)
+
+            count, newest, documents = db.execute(
+                select(
+                    func.count(CodeDocumentContent.document_id),
+                    func.max(CodeDocumentContent.updated_at),
+                    select(func.count(CodeDocument.id))
+                    .where(CodeDocument.project_id == project_id)
+                    .scalar_subquery(),
+                ).where(CodeDocumentContent.project_id == project_id)
+            ).one()
+            index.unindexed = max(documents - count, 0)
+
+            if count == len(index.docs) and newest == index.synced_at:
+                return index
+
+            full_rebuild = index.synced_at is None
+            stmt = (
+                select(
+                    CodeDocumentContent.document_id,
+                    CodeDocument.file_path,
+                    CodeDocument.language,
+                    CodeDocumentContent.content,
+                    CodeDocumentContent.updated_at,
+                )
+                .join(CodeDocument, CodeDocument.id == CodeDocumentContent.document_id)
+                .where(CodeDocumentContent.project_id == project_id)
+            )
+            if full_rebuild:
+                index.docs.clear()
+                index.postings.clear()
+            else:
+                current = set(
+                    db.execute(
+                        select(CodeDocumentContent.document_id).where(
+                            CodeDocumentContent.project_id == project_id
+                        )
+                    ).scalars()
+                )
+                for doc_id in set(index.docs) - current:
+                    index.remove(doc_id)
+                stmt = stmt.where(CodeDocumentContent.updated_at > index.synced_at)
+
+            loaded = 0
+            for doc_id, path, language, content, updated_at in db.execute(stmt):
+                index.add(doc_id, path, language, content)
+                loaded += 1
+
+            index.synced_at = newest
+            logger.info(
+                "Grep index for project %s: %s %d files (%d trigrams)",
+                project_id,
+                "rebuilt with" if full_rebuild else "refreshed",
+                loaded,
+                len(index.postings),
+            )
+        return index
+
+    def forget(self, project_id: int) -> None:
+        with self._lock:
+            self._indexes.pop(project_id, None)
+
+    async def ensure_index(self, db, project_id: int) -> ProjectGrepIndex:
+        """Async wrapper accepting either a sync or an async session."""
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(self.sync_index, project_id)
+        return await asyncio.to_thread(self.sync_index, db, project_id)
+
+    # ------------------------------------------------------------------ #
+    # Query
+    # ------------------------------------------------------------------ #
+
+    async def iter_matches(
+        self,
+        db,
+        project_id: int,
+        pattern: str,
+        *,
+        regex: bool = False,
+        ignore_case: bool = True,
+        language: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> AsyncIterator[Dict]:
+        """Yield line matches in ``(file_path, line)`` order.
+
+        Each match carries a ``cursor``; passing the last one back resumes the
+        search right after it.  Raises :class:`re.error` for invalid patterns
+        and :class:`GrepTimeout` (after the matches found in time) when
+        verification runs out of ``GREP_TIMEOUT_SECONDS``.
+        """
+        compiled = compile_pattern(pattern, regex=regex, ignore_case=ignore_case)
+        query = plan_query(pattern, regex=regex)
+        index = await self.ensure_index(db, project_id)
+
+        # Lock-protected copy; the lock may be held by a sync in another thread
+        entries = await asyncio.to_thread(index.snapshot, query, language)
+        candidates = list(entries)
+        start_doc, after_line = _parse_cursor(cursor)
+        start_path = index.path_of(start_doc) if start_doc is not None else None
+        if start_path is not None:
+            key = (start_path, start_doc)
+            candidates = [d for d in candidates if (entries[d][0], d) >= key]
+
+        loop = asyncio.get_running_loop()
+        emitted = 0
+        deadline = time.monotonic() + GREP_TIMEOUT_SECONDS
+
+        def verify(
+            batch: List[int], remaining: int
+        ) -> Tuple[List[Tuple[int, list]], bool]:
+            out = []
+            for doc_id in batch:
+                entry = entries[doc_id]
+                skip = after_line if doc_id == start_doc else 0
+                try:
+                    hits = _scan_document(compiled, entry[2], skip, remaining, deadline)
+                except TimeoutError:
+                    return out, True
+                if hits:
+                    out.append((doc_id, hits))
+            return out, False
+
+        batches = [
+            candidates[i : i + GREP_VERIFY_BATCH]
+            for i in range(0, len(candidates), GREP_VERIFY_BATCH)
+        ]
+        # Keep a bounded number of batches in flight; results are consumed in
+        # submission order so output stays sorted.  Batches still queued when
+        # the consumer stops (limit reached, timeout, client disconnect) are
+        # cancelled.
+        pending: List[asyncio.Future] = []
+        next_batch = 0
+        try:
+            while emitted < limit and (pending or next_batch < len(batches)):
+                while (
+                    next_batch < len(batches) and len(pending) < GREP_VERIFY_WORKERS
+                ):
+                    pending.append(
+                        loop.run_in_executor(
+                            self._executor, verify, batches[next_batch], limit
+                        )
+                    )
+                    next_batch += 1
+
+                results, timed_out = await pending.pop(0)
+                for doc_id, hits in results:
+                    path, lang, _ = entries[doc_id]
+                    for line, column, text, match in hits:
+                        yield {
+                            "document_id": doc_id,
+                            "file_path": path,
+                            "language": lang,
+                            "line": line,
+                            "column": column,
+                            "text": text,
+                            "match": match,
+                            "cursor": f"{doc_id}:{line}",
+                        }
+                        emitted += 1
+                        if emitted >= limit:
+                            break
+                    if emitted >= limit:
+                        break
+                if timed_out and emitted < limit:
+                    raise GrepTimeout(
+                        f"Pattern verification exceeded {GREP_TIMEOUT_SECONDS:g}s"
+                    )
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+    def unindexed(self, project_id: int) -> int:
+        """Documents of *project_id* the last sync found without contents."""
+        with self._lock:
+            index = self._indexes.get(project_id)
+        return index.unindexed if index is not None else 0
+
+    async def search(self, db, project_id: int, pattern: str, **kwargs) -> Dict:
+        """Return one page: ``{"matches": [...], "next_cursor": str | None}``.
+
+        ``timed_out`` marks a page cut short by ``GREP_TIMEOUT_SECONDS`` and
+        ``unindexed_files`` counts files that could not be searched yet.
+        """
+        limit = kwargs.pop("limit", 100)
+        matches: List[Dict] = []
+        timed_out = False
+        try:
+            async for m in self.iter_matches(
+                db, project_id, pattern, limit=limit + 1, **kwargs
+            ):
+                matches.append(m)
+        except GrepTimeout as exc:
+            logger.warning("Grep in project %s stopped: %s", project_id, exc)
+            timed_out = True
+        has_more = len(matches) > limit
+        matches = matches[:limit]
+        return {
+            "matches": matches,
+            "next_cursor": matches[-1]["cursor"] if has_more and matches else None,
+            "timed_out": timed_out,
+            "unindexed_files": self.unindexed(project_id),
+        }
+
+
+def _parse_cursor(cursor: Optional[str]) -> Tuple[Optional[int], int]:
+    if not cursor:
+        return None, 0
+    try:
+        doc_id, line = cursor.split(":", 1)
+        return int(doc_id), int(line)
+    except ValueError:
+        return None, 0
+
+
+grep_engine = CodeGrepEngine()
@@ -0,0 +1,504 @@
+# backend/app/services/completion_engine.py
+"""Low-latency inline completion engine for the Monacopilot endpoint.
+
+Editor completions are fired on (debounced) keystrokes, so most requests are
+either superseded by the next keystroke before they finish or ask for text
+the previous suggestion already contained.  The engine therefore:
+
+* keeps **one in-flight generation per user** – a new request cancels the
+  previous one instead of letting both run to completion;
+* caches recent suggestions per ``(user, file, text-after-cursor)`` and
+  answers a request from the cache when the new prefix is the old prefix
+  plus a leading part of the suggestion (the user is typing what was
+  suggested) – the remaining tail is returned without an LLM call;
+* streams from the LLM and hands out the **first line** as soon as it is
+  complete; single-line (``complete``) requests stop reading there;
+* tracks latency percentiles, cache hit rate and cancellation rate
+  (:meth:`CompletionEngine.stats` and the ``copilot_*`` Prometheus metrics).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from app.monitoring.metrics import (
+    copilot_first_line_seconds,
+    copilot_latency_seconds,
+    copilot_requests_total,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = int(os.getenv("COPILOT_MAX_TOKENS", "200"))
+CACHE_TTL_SECONDS = float(os.getenv("COPILOT_CACHE_TTL", "120"))
+CACHE_MAX_FILES = int(os.getenv("COPILOT_CACHE_MAX_FILES", "2048"))
+CACHE_ENTRIES_PER_FILE = int(os.getenv("COPILOT_CACHE_ENTRIES_PER_FILE", "8"))
+LATENCY_WINDOW = 1000
+
+_EXPLANATION_MARKERS = (
+    "this code",
+    "the above",
+    "explanation:",
+    "note:",
+    "// this",
+    "# this",
+)
+_UNWANTED_PREFIXES = (
+    "Here's the completion:",
+    "The completed code is:",
+    "Here's how to complete this:",
+    "```",
+)
+
+
+class CompletionCancelled(Exception):
+    """The request was superseded by a newer one from the same user."""
+
+
+@dataclass
+class CompletionContext:
+    """Editor state of one completion request."""
+
+    user_id: int
+    language: str
+    text_before: str
+    text_after: str = ""
+    filename: Optional[str] = None
+    mode: str = "continue"  # continue | insert | complete
+    technologies: List[str] = field(default_factory=list)
+
+    @property
+    def cache_key(self) -> Tuple[Any, ...]:
+        return (
+            self.user_id,
+            self.filename,
+            self.language,
+            self.mode,
+            hash(self.text_after),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Prompt helpers
+# ---------------------------------------------------------------------------
+
+
+def get_file_extension(language: str) -> str:
+    """Get file extension for language"""
+    extensions = {
+        "javascript": "js",
+        "typescript": "ts",
+        "python": "py",
+        "java": "java",
+        "csharp": "cs",
+        "cpp": "cpp",
+        "c": "c",
+        "go": "go",
+        "rust": "rs",
+        "php": "php",
+        "ruby": "rb",
+        "html": "html",
+        "css": "css",
+        "scss": "scss",
+        "json": "json",
+        "yaml": "yml",
+        "xml": "xml",
+        "markdown": "md",
+        "shell": "sh",
+        "sql": "sql",
+    }
+    return extensions.get(language.lower(), "txt")
+
+
+def build_completion_messages(ctx: CompletionContext) -> List[Dict[str, str]]:
+    """Build the system/user messages for a completion request."""
+    language = ctx.language
+    filename = ctx.filename or f"file.{get_file_extension(language)}"
+
+    tech_context = ""
+    if ctx.technologies:
+        tech_context = f"This is a {', '.join(ctx.technologies)} project. "
+
+    if ctx.mode == "insert":
+        instruction = (
+            "Complete the code at the cursor position. "
+            "Return only the code that should be inserted, without explanations or markdown."
+        )
+        user_prompt = f"""File: {filename}
+
+Code before cursor:
+{ctx.text_before}
+
+Code after cursor:
+{ctx.text_after}
+
+Complete the code at the cursor position:"""
+
+    elif ctx.mode == "complete":
+        instruction = (
+            "Complete the current line or statement. "
+            "Return only the completion text, without explanations or markdown."
+        )
+        user_prompt = f"""File: {filename}
+
+Complete this {language} code:
+{ctx.text_before}"""
+
+    else:  # continue mode
+        instruction = (
+            "Continue writing the code logically from where it left off. "
+            "Return only the next few lines of code, without explanations or markdown."
+        )
+        user_prompt = f"""File: {filename}
+
+Continue this {language} code:
+{ctx.text_before}"""
+
+    system_prompt = (
+        f"You are an AI coding assistant specializing in {language}. "
+        f"{tech_context}{instruction}"
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def clean_completion(completion: str) -> str:
+    """Clean up AI completion response"""
+
+    # Remove markdown code blocks
+    if completion.startswith("```"):
+        lines = completion.split("\n")
+        if len(lines) > 1:
+            # Remove first line (```language) and last line (```)
+            completion = (
+                "\n".join(lines[1:-1])
+                if lines[-1].strip() == "```"
+                else "\n".join(lines[1:])
+            )
+
+    # Remove common unwanted prefixes
+    for prefix in _UNWANTED_PREFIXES:
+        if completion.lower().startswith(prefix.lower()):
+            completion = completion[len(prefix) :].strip()
+
+    # Remove trailing explanations (lines that start with explanation markers)
+    cleaned_lines = []
+    for line in completion.split("\n"):
+        if line.strip().lower().startswith(_EXPLANATION_MARKERS):
+            break
+        cleaned_lines.append(line)
+
+    return "\n".join(cleaned_lines).strip()
+
+
+def _response_text(response: Any) -> str:
+    """Text of a non-streaming LLM response (Chat Completions or Responses API)."""
+    if hasattr(response, "choices") and response.choices:
+        return response.choices[0].message.content or ""
+    if hasattr(response, "output_text"):
+        return response.output_text or ""
+    if hasattr(response, "output"):
+        return response.output or ""
+    return str(response).strip()
+
+
+# ---------------------------------------------------------------------------
+# Cache / in-flight registry
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _CacheEntry:
+    text_before: str
+    completion: str
+    created: float
+
+
+class CompletionCache:
+    """Recent suggestions per file, reusable while the user types them."""
+
+    def __init__(
+        self,
+        max_files: int = CACHE_MAX_FILES,
+        entries_per_file: int = CACHE_ENTRIES_PER_FILE,
+        ttl: float = CACHE_TTL_SECONDS,
+    ):
+        self.max_files = max_files
+        self.entries_per_file = entries_per_file
+        self.ttl = ttl
+        self._files: "OrderedDict[Tuple, Deque[_CacheEntry]]" = OrderedDict()
+
+    def get(self, key: Tuple, text_before: str) -> Optional[str]:
+        """Return the not-yet-typed tail of a cached suggestion, if any."""
+        entries = self._files.get(key)
+        if not entries:
+            return None
+
+        now = time.monotonic()
+        for entry in reversed(entries):  # newest first
+            if now - entry.created > self.ttl:
+                continue
+            if not text_before.startswith(entry.text_before):
+                continue
+            typed = text_before[len(entry.text_before) :]
+            if len(typed) < len(entry.completion) and entry.completion.startswith(
+                typed
+            ):
+                self._files.move_to_end(key)
+                return entry.completion[len(typed) :]
+        return None
+
+    def put(self, key: Tuple, text_before: str, completion: str) -> None:
+        if not completion:
+            return
+        entries = self._files.get(key)
+        if entries is None:
+            entries = self._files[key] = deque(maxlen=self.entries_per_file)
+        entries.append(_CacheEntry(text_before, completion, time.monotonic()))
+        self._files.move_to_end(key)
+        while len(self._files) > self.max_files:
+            self._files.popitem(last=False)
+
+    def clear(self) -> None:
+        self._files.clear()
+
+
+@dataclass
+class _Inflight:
+    task: asyncio.Task
+    superseded: bool = False
+
+
+class InflightRegistry:
+    """At most one running generation per user; newer requests win."""
+
+    def __init__(self):
+        self._by_user: Dict[int, _Inflight] = {}
+
+    def register(self, user_id: int, task: asyncio.Task) -> _Inflight:
+        previous = self._by_user.get(user_id)
+        if previous is not None and not previous.task.done():
+            previous.superseded = True
+            previous.task.cancel()
+        handle = self._by_user[user_id] = _Inflight(task)
+        return handle
+
+    def release(self, user_id: int, handle: _Inflight) -> None:
+        if self._by_user.get(user_id) is handle:
+            del self._by_user[user_id]
+
+    def __len__(self) -> int:
+        return len(self._by_user)
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+_DONE = object()
+
+
+class CompletionEngine:
+    """Cache-first, cancellable, streaming completion generation."""
+
+    def __init__(self, llm=None, cache: Optional[CompletionCache] = None):
+        self._llm = llm
+        self.cache = cache or CompletionCache()
+        self.inflight = InflightRegistry()
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._first_line: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.cache_hits = 0
+        self.cancelled = 0
+        self.errors = 0
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from app.llm.client import llm_client
+
+            self._llm = llm_client
+        return self._llm
+
+    async def complete(self, ctx: CompletionContext) -> Optional[str]:
+        """Return the full suggestion, or ``None`` when superseded."""
+        parts: List[str] = []
+        try:
+            async for part in self.stream(ctx):
+                parts.append(part)
+        except CompletionCancelled:
+            return None
+        return "".join(parts).strip()
+
+    async def stream(self, ctx: CompletionContext) -> AsyncIterator[str]:
+        """Yield the suggestion line by line (first line as early as possible).
+
+        Raises :class:`CompletionCancelled` when a newer request from the
+        same user supersedes this one.
+        """
+        started = time.monotonic()
+        self.requests += 1
+
+        cached = self.cache.get(ctx.cache_key, ctx.text_before)
+        if cached is not None:
+            self.cache_hits += 1
+            copilot_requests_total.labels(outcome="cache_hit").inc()
+            self._observe(started, first_line=True)
+            yield cached
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._produce(ctx, queue))
+        handle = self.inflight.register(ctx.user_id, task)
+        first = True
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                if first:
+                    first = False
+                    elapsed = time.monotonic() - started
+                    self._first_line.append(elapsed)
+                    copilot_first_line_seconds.observe(elapsed)
+                yield item
+
+            if handle.superseded:
+                self.cancelled += 1
+                copilot_requests_total.labels(outcome="cancelled").inc()
+                raise CompletionCancelled()
+        except (CompletionCancelled, asyncio.CancelledError):
+            raise
+        except Exception:
+            self.errors += 1
+            copilot_requests_total.labels(outcome="error").inc()
+            raise
+        else:
+            copilot_requests_total.labels(outcome="generated").inc()
+            self._observe(started, first_line=False)
+        finally:
+            if not task.done():
+                task.cancel()
+            self.inflight.release(ctx.user_id, handle)
+
+    async def _produce(self, ctx: CompletionContext, queue: asyncio.Queue) -> None:
+        """Run the LLM call and push cleaned lines onto *queue*."""
+        single_line = ctx.mode == "complete"
+        try:
+            response = await self.llm.complete(
+                messages=build_completion_messages(ctx),
+                max_tokens=MAX_TOKENS,
+                temperature=0.2,  # Lower temperature for more deterministic code
+                stream=True,
+                user_id=ctx.user_id,
+                feature="copilot",
+            )
+
+            if not hasattr(response, "__aiter__"):
+                # Reasoning models silently fall back to non-streaming.
+                text = clean_completion(_response_text(response))
+                if single_line:
+                    text = text.split("\n", 1)[0]
+                if text:
+                    queue.put_nowait(text)
+                self.cache.put(ctx.cache_key, ctx.text_before, text)
+                return
+
+            raw = ""
+            emitted: List[str] = []
+            stop = False
+            async for chunk in response:
+                raw += chunk
+                while "\n" in raw and not stop:
+                    line, raw = raw.split("\n", 1)
+                    stop = not self._emit_line(line, emitted, queue, single_line)
+                    stop = stop or (single_line and bool(emitted))
+                if stop:
+                    break
+            else:
+                if raw:
+                    self._emit_line(raw, emitted, queue, last=True)
+
+            if stop and hasattr(response, "aclose"):
+                # Closing the stream early stops paying for unused tokens.
+                await response.aclose()
+
+            self.cache.put(ctx.cache_key, ctx.text_before, "".join(emitted).strip())
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001 – surfaced to the consumer
+            queue.put_nowait(exc)
+        finally:
+            queue.put_nowait(_DONE)
+
+    @staticmethod
+    def _emit_line(
+        line: str, emitted: List[str], queue: asyncio.Queue, last: bool = False
+    ) -> bool:
+        """Apply the :func:`clean_completion` rules to one streamed line.
+
+        Returns ``False`` once the rest of the output should be discarded.
+        """
+        stripped = line.strip()
+        if not emitted:
+            if not stripped or stripped.startswith("```"):
+                return True  # leading blank line / opening fence
+            for prefix in _UNWANTED_PREFIXES:
+                if stripped.lower().startswith(prefix.lower()):
+                    line = stripped[len(prefix) :].strip()
+                    if not line:
+                        return True
+                    break
+        if stripped == "```" or stripped.lower().startswith(_EXPLANATION_MARKERS):
+            return False
+
+        text = line if last else line + "\n"
+        emitted.append(text)
+        queue.put_nowait(text)
+        return True
+
+    def _observe(self, started: float, first_line: bool) -> None:
+        """Record end-to-end latency (and first-line latency for cache hits)."""
+        elapsed = time.monotonic() - started
+        self._latencies.append(elapsed)
+        copilot_latency_seconds.observe(elapsed)
+        if first_line:
+            self._first_line.append(elapsed)
+            copilot_first_line_seconds.observe(elapsed)
+
+    @staticmethod
+    def _percentile(values: Deque[float], pct: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return round(ordered[idx] * 1000, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency percentiles (ms), cache hit rate and cancellation rate."""
+        total = self.requests or 1
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "cache_hit_rate": round(self.cache_hits / total, 4),
+            "cancelled": self.cancelled,
+            "cancellation_rate": round(self.cancelled / total, 4),
+            "errors": self.errors,
+            "in_flight": len(self.inflight),
+            "latency_p50_ms": self._percentile(self._latencies, 50),
+            "latency_p95_ms": self._percentile(self._latencies, 95),
+            "first_line_p50_ms": self._percentile(self._first_line, 50),
+        }
+
+
+completion_engine = CompletionEngine()
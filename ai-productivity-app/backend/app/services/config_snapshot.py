@@ -0,0 +1,350 @@
+# backend/app/services/config_snapshot.py
+"""Process-wide, immutable snapshot of the AI runtime configuration.
+
+``LLMClient`` and ``UnifiedConfigService`` used to query ``runtime_config`` /
+``model_configurations`` through a fresh ``SessionLocal()`` whenever their
+private TTL caches expired – i.e. blocking DB round-trips from inside async
+chat and completion handlers, with one cache per service instance.
+
+All readers now share one :class:`ConfigSnapshot`.  It is built once, never
+mutated, and swapped atomically, so hot paths read ``config_snapshot.get()``
+without locks or I/O.  A snapshot is rebuilt only when the configuration
+changes:
+
+* ``UnifiedConfigService._save_config`` queues a Postgres ``NOTIFY`` inside
+  the saving transaction (delivered on commit) and rebuilds the local
+  snapshot right after the commit, bumping :attr:`ConfigSnapshot.version`;
+* every other replica ``LISTEN``\\s on the channel and rebuilds on receipt;
+* a cheap ``count``/``max(updated_at)`` stamp check runs in the background as
+  a safety net (every second when ``LISTEN`` is unavailable, e.g. SQLite, and
+  also catches writes that bypass the service such as the model seeders).
+
+Subscribers registered with :meth:`ConfigSnapshotStore.subscribe` (the
+``/ws/config`` router) are called with each new snapshot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.config import ModelConfiguration, RuntimeConfig
+from app.schemas.generation import ModelInfo, UnifiedModelConfig
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "config_updates"
+POLL_INTERVAL_SECONDS = float(os.getenv("CONFIG_SNAPSHOT_POLL_INTERVAL", "1.0"))
+SAFETY_POLL_SECONDS = float(os.getenv("CONFIG_SNAPSHOT_SAFETY_POLL", "30"))
+RETRY_AFTER_FAILURE_SECONDS = 5.0
+
+SnapshotListener = Callable[["ConfigSnapshot"], Awaitable[None]]
+
+
+# ---------------------------------------------------------------------------
+# Row → value helpers (shared with UnifiedConfigService)
+# ---------------------------------------------------------------------------
+
+
+def parse_runtime_rows(rows) -> Dict[str, Any]:
+    """Turn ``RuntimeConfig`` rows into a plain ``key → value`` dict."""
+    cfg: Dict[str, Any] = {}
+    for row in rows:
+        try:
+            if row.value_type == "boolean":
+                cfg[row.key] = row.value in (True, "true", "True", "1", 1)
+            else:
+                cfg[row.key] = row.value
+        except Exception as e:  # pragma: no cover
+            logger.warning("Could not parse RuntimeConfig[%s]: %s", row.key, e)
+    return cfg
+
+
+def model_config_to_info(mc: ModelConfiguration) -> ModelInfo:
+    from app.schemas.generation import ModelCapabilities
+
+    caps = ModelCapabilities(**(mc.capabilities or {}))
+    return ModelInfo(
+        model_id=mc.model_id,
+        display_name=mc.name,
+        provider=mc.provider,
+        model_family=mc.model_family,
+        capabilities=caps,
+        cost_per_1k_input_tokens=mc.cost_input_per_1k,
+        cost_per_1k_output_tokens=mc.cost_output_per_1k,
+        performance_tier="balanced",
+        average_latency_ms=mc.avg_response_time_ms,
+        is_available=mc.is_available,
+        is_deprecated=mc.is_deprecated,
+        deprecation_date=getattr(mc, "deprecated_at", None),
+        recommended_use_cases=getattr(mc, "model_metadata", {}).get(
+            "recommended_use_cases", []
+        ),
+    )
+
+
+def _client_model_info(info: ModelInfo) -> Dict[str, Any]:
+    """The flattened model view ``LLMClient`` works with."""
+    caps = info.capabilities
+    return {
+        "provider": info.provider,
+        "capabilities": caps.model_dump() if caps else {},
+        "cost_per_1k_input": info.cost_per_1k_input_tokens,
+        "cost_per_1k_output": info.cost_per_1k_output_tokens,
+        "max_tokens": caps.max_output_tokens if caps else 4096,
+        "supports_reasoning": getattr(caps, "supports_reasoning", False),
+        "supports_streaming": getattr(caps, "supports_streaming", True),
+        "supports_functions": getattr(caps, "supports_functions", True),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable view of ``runtime_config`` + ``model_configurations``."""
+
+    version: int
+    stamp: Tuple[Any, ...]
+    # Raw RuntimeConfig key → value
+    runtime: Mapping[str, Any]
+    unified: UnifiedModelConfig
+    # ``unified.to_runtime_config()`` – the dict LLMClient reads
+    runtime_config: Mapping[str, Any]
+    models: Mapping[str, ModelInfo]
+    model_info: Mapping[str, Mapping[str, Any]]
+    loaded_at: float
+    fallback: bool = False
+
+
+def _stamp(db: Session) -> Tuple[Any, ...]:
+    """Cheap change detector: row counts and latest ``updated_at`` per table."""
+    rc = db.execute(
+        select(func.count(), func.max(RuntimeConfig.updated_at))
+    ).one()
+    mc = db.execute(
+        select(func.count(), func.max(ModelConfiguration.updated_at))
+    ).one()
+    return (rc[0], str(rc[1]), mc[0], str(mc[1]))
+
+
+def build_snapshot(db: Session, version: int) -> ConfigSnapshot:
+    stamp = _stamp(db)
+    runtime = parse_runtime_rows(db.query(RuntimeConfig).all())
+    models = {
+        mc.model_id: model_config_to_info(mc)
+        for mc in db.query(ModelConfiguration).all()
+    }
+
+    try:
+        unified = UnifiedModelConfig.from_runtime_config(runtime)
+    except Exception as e:  # pragma: no cover
+        from app.services.unified_config_service import UnifiedConfigService
+
+        logger.warning("Falling back to built-in defaults: %s", e)
+        unified = UnifiedConfigService(db)._get_default_config()
+
+    return ConfigSnapshot(
+        version=version,
+        stamp=stamp,
+        runtime=MappingProxyType(runtime),
+        unified=unified,
+        runtime_config=MappingProxyType(unified.to_runtime_config()),
+        models=MappingProxyType(models),
+        model_info=MappingProxyType(
+            {mid: MappingProxyType(_client_model_info(i)) for mid, i in models.items()}
+        ),
+        loaded_at=time.time(),
+    )
+
+
+def _fallback_snapshot(version: int) -> ConfigSnapshot:
+    """Static-settings snapshot used while the database is unreachable."""
+    model = settings.llm_default_model or "o3"
+    unified = UnifiedModelConfig(provider=settings.llm_provider, model_id=model)
+    return ConfigSnapshot(
+        version=version,
+        stamp=(),
+        runtime=MappingProxyType({}),
+        unified=unified,
+        runtime_config=MappingProxyType(
+            {
+                "provider": settings.llm_provider,
+                "chat_model": settings.llm_default_model,
+                "use_responses_api": False,
+            }
+        ),
+        models=MappingProxyType({}),
+        model_info=MappingProxyType({}),
+        loaded_at=time.time(),
+        fallback=True,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+
+class ConfigSnapshotStore:
+    """Holds the current snapshot and keeps it in sync across replicas."""
+
+    def __init__(self):
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._build_lock = threading.Lock()
+        self._listeners: List[SnapshotListener] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self.node_id = uuid.uuid4().hex
+
+    # ------------------------------------------------------------------ read
+    def get(self, db: Optional[Session] = None) -> ConfigSnapshot:
+        """Return the current snapshot (built on first use only)."""
+        snap = self._snapshot
+        if snap is not None and (not snap.fallback or time.monotonic() < self._retry_at):
+            return snap
+        return self.rebuild(db)
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot else 0
+
+    # ----------------------------------------------------------------- write
+    def rebuild(self, db: Optional[Session] = None) -> ConfigSnapshot:
+        """Reload from the database and publish a new version."""
+        with self._build_lock:
+            version = self.version + 1
+            try:
+                if db is not None:
+                    snap = build_snapshot(db, version)
+                else:
+                    from app.database import SessionLocal
+
+                    with SessionLocal() as session:
+                        snap = build_snapshot(session, version)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Config snapshot rebuild failed: %s", exc)
+                current = self._snapshot
+                if current is not None and not current.fallback:
+                    return current
+                snap = _fallback_snapshot(version)
+                self._retry_at = time.monotonic() + RETRY_AFTER_FAILURE_SECONDS
+            self._snapshot = snap
+
+        logger.info("Config snapshot v%s loaded", snap.version)
+        self._dispatch(snap)
+        return snap
+
+    def announce(self, db: Session, updated_by: Optional[str] = None) -> None:
+        """Queue a cross-replica change notification in *db*'s transaction.
+
+        Postgres delivers ``NOTIFY`` on commit, so listeners never see a
+        change that was rolled back.  Other databases rely on stamp polling.
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        payload = json.dumps({"origin": self.node_id, "updated_by": updated_by})
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": NOTIFY_CHANNEL, "payload": payload},
+        )
+
+    # ------------------------------------------------------------ listeners
+    def subscribe(self, callback: SnapshotListener) -> None:
+        """Call *callback(snapshot)* on the event loop after every rebuild."""
+        self._listeners.append(callback)
+
+    def _dispatch(self, snap: ConfigSnapshot) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._listeners:
+            return
+        for callback in self._listeners:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                loop.create_task(callback(snap))
+            else:
+                asyncio.run_coroutine_threadsafe(callback(snap), loop)
+
+    # -------------------------------------------------------------- lifecycle
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await asyncio.to_thread(self.rebuild)
+        self._task = asyncio.create_task(self._watch(), name="config-snapshot")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self):
+        """Open a dedicated ``LISTEN`` connection (Postgres/asyncpg only)."""
+        from app.database import async_engine
+
+        if async_engine.dialect.name != "postgresql":
+            return None
+        try:
+            conn = await async_engine.connect()
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Config LISTEN unavailable, polling instead: %s", exc)
+            return None
+        return conn
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            origin = json.loads(payload).get("origin")
+        except (TypeError, ValueError):
+            origin = None
+        if origin == self.node_id:
+            return  # already rebuilt locally after the commit
+        asyncio.get_running_loop().create_task(asyncio.to_thread(self.rebuild))
+
+    def _changed(self) -> bool:
+        from app.database import SessionLocal
+
+        with SessionLocal() as session:
+            stamp = _stamp(session)
+        snap = self._snapshot
+        return snap is None or snap.fallback or stamp != snap.stamp
+
+    async def _watch(self) -> None:
+        conn = await self._listen()
+        interval = SAFETY_POLL_SECONDS if conn is not None else POLL_INTERVAL_SECONDS
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    if await asyncio.to_thread(self._changed):
+                        await asyncio.to_thread(self.rebuild)
+                except Exception as exc:  # noqa: BLE001
+                    logger.debug("Config stamp check failed: %s", exc)
+        finally:
+            if conn is not None:
+                await conn.close()
+
+
+config_snapshot = ConfigSnapshotStore()
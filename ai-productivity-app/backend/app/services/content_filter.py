@@ -1,70 +1,109 @@
 # backend/app/services/content_filter.py
-"""Content filtering service for sensitive data in retrieved content."""
+"""Content filtering service for sensitive data in retrieved content.
+
+Chunks indexed by ``_process_code_file`` or knowledge ingestion carry the
+findings of an index-time scan under ``secret_scan``; as long as its
+version matches :data:`~app.chat.secret_scanner.SCANNER_VERSION` those
+offsets are reused and filtering costs no regex work at all.  Other chunks
+are scanned once: redacted chunks are stamped as clean and clean content is
+remembered, so a second filtering pass (``ContextBuilder.extract_context``)
+skips both.
+"""
 
 import logging
+import os
 from typing import List, Dict, Any, Optional
-from app.chat.secret_scanner import secret_scanner
+from app.chat.secret_scanner import (
+    SCANNER_VERSION,
+    secret_scanner,
+    stored_findings,
+)
 
 logger = logging.getLogger(__name__)
 
+CLEAN_MEMO_SIZE = int(os.getenv("CONTENT_FILTER_CLEAN_MEMO", "1024"))
+
 
 class ContentFilter:
     """Service for filtering sensitive content from retrieved chunks."""
 
     def __init__(self):
         self.scanner = secret_scanner
-
-    def filter_chunk(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        # Recently scanned texts without secrets (keyed by the text itself,
+        # so a hit can never be a different string)
+        self._clean: Dict[str, None] = {}
+
+    def chunk_findings(self, chunk: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Secrets in a chunk – persisted offsets when current, else a scan."""
+        content = chunk.get("content") or ""
+        record = chunk.get("secret_scan") or (chunk.get("metadata") or {}).get(
+            "secret_scan"
+        )
+        findings = stored_findings(record)
+        # Offsets only hold for the text that was scanned
+        if findings is None or any(f["end"] > len(content) for f in findings):
+            if content in self._clean:
+                return []
+            findings = self.scanner.scan(content)
+            if not findings:
+                if len(self._clean) >= CLEAN_MEMO_SIZE:
+                    self._clean.clear()
+                self._clean[content] = None
+        return findings
+
+    def filter_chunk(
+        self,
+        chunk: Dict[str, Any],
+        findings: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
         """Filter a single chunk for sensitive content."""
         content = chunk.get("content", "")
         if not content:
             return chunk
 
-        # Scan for secrets
-        findings = self.scanner.scan(content)
+        if findings is None:
+            findings = self.chunk_findings(chunk)
 
-        if findings:
-            # Redact secrets from content
-            filtered_content = self.scanner.redact(content, findings)
-
-            # Create a copy of the chunk with filtered content
-            filtered_chunk = chunk.copy()
-            filtered_chunk["content"] = filtered_content
-
-            # Add metadata about filtering
-            metadata = filtered_chunk.get("metadata", {})
-            metadata["content_filtered"] = True
-            metadata["redacted_secrets"] = len(findings)
-            metadata["redaction_summary"] = self.scanner.get_redaction_summary(findings)
-            filtered_chunk["metadata"] = metadata
-
-            logger.info(
-                f"Filtered {len(findings)} secrets from chunk in {metadata.get('file_path', 'unknown file')}"
-            )
+        if not findings:
+            return chunk
 
-            return filtered_chunk
+        # Redacted content is clean – later passes must not scan it again
+        filtered_chunk = chunk.copy()
+        filtered_chunk["secret_scan"] = {"version": SCANNER_VERSION, "findings": []}
 
-        return chunk
+        # Redact secrets from content
+        filtered_chunk["content"] = self.scanner.redact(content, findings)
 
-    def filter_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Filter a list of chunks for sensitive content."""
-        filtered_chunks = []
+        # Add metadata about filtering
+        metadata = dict(filtered_chunk.get("metadata") or {})
+        metadata["content_filtered"] = True
+        metadata["redacted_secrets"] = len(findings)
+        metadata["redaction_summary"] = self.scanner.get_redaction_summary(findings)
+        filtered_chunk["metadata"] = metadata
 
-        for chunk in chunks:
-            filtered_chunk = self.filter_chunk(chunk)
-            filtered_chunks.append(filtered_chunk)
+        logger.info(
+            f"Filtered {len(findings)} secrets from chunk in {metadata.get('file_path', 'unknown file')}"
+        )
 
-        return filtered_chunks
+        return filtered_chunk
+
+    def filter_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Filter a list of chunks for sensitive content."""
+        return [self.filter_chunk(chunk) for chunk in chunks]
 
     def should_exclude_chunk(
-        self, chunk: Dict[str, Any], strict_mode: bool = False
+        self,
+        chunk: Dict[str, Any],
+        strict_mode: bool = False,
+        findings: Optional[List[Dict[str, Any]]] = None,
     ) -> bool:
         """Determine if a chunk should be completely excluded due to sensitive content."""
         content = chunk.get("content", "")
         if not content:
             return False
 
-        findings = self.scanner.scan(content)
+        if findings is None:
+            findings = self.chunk_findings(chunk)
 
         if not findings:
             return False
@@ -92,20 +131,25 @@ class ContentFilter:
         excluded_count = 0
 
         for chunk in chunks:
+            # One scan (or none, for index-time scanned chunks) per chunk
+            findings = self.chunk_findings(chunk)
+
             # Check if chunk should be excluded entirely
-            if self.should_exclude_chunk(chunk, strict_mode):
+            if self.should_exclude_chunk(chunk, strict_mode, findings):
                 excluded_count += 1
-                file_path = chunk.get("metadata", {}).get("file_path", "unknown")
+                file_path = (chunk.get("metadata") or {}).get(
+                    "file_path", chunk.get("file_path", "unknown")
+                )
                 warnings.append(
                     f"Excluded chunk from {file_path} due to sensitive content"
                 )
                 continue
 
             # Filter the chunk
-            filtered_chunk = self.filter_chunk(chunk)
+            filtered_chunk = self.filter_chunk(chunk, findings)
 
             # Check if any content was redacted
-            if filtered_chunk.get("metadata", {}).get("content_filtered"):
+            if findings:
                 redaction_summary = filtered_chunk["metadata"]["redaction_summary"]
                 warnings.append(f"Redacted content: {redaction_summary}")
 
@@ -8,6 +8,7 @@ import asyncio
 from contextlib import asynccontextmanager
 
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, desc
 from pydantic import BaseModel, Field
@@ -16,6 +17,7 @@ from app.models.config import ModelConfiguration, ModelUsageMetrics
 from app.models.user import User
 from app.models.chat import ChatSession
 from app.database import get_db
+from app.services.analytics_rollups import merge_rollups, read_rollups
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +33,9 @@ class UsageEvent(BaseModel):
     # Token usage
     input_tokens: int = Field(ge=0)
     output_tokens: int = Field(ge=0)
+    # Parts of *input_tokens* served from / written to the provider prompt cache
+    cached_input_tokens: int = Field(default=0, ge=0)
+    cache_write_tokens: int = Field(default=0, ge=0)
 
     # Performance metrics
     response_time_ms: float = Field(ge=0)
@@ -54,6 +59,9 @@ class CostCalculation(BaseModel):
     input_rate_per_1k: Decimal = Field(decimal_places=6)
     output_rate_per_1k: Decimal = Field(decimal_places=6)
 
+    # Input cost avoided by prompt caching (negative while the cache is written)
+    cache_savings: Decimal = Field(default=Decimal("0"), decimal_places=6)
+
     # Currency
     currency: str = "USD"
 
@@ -77,6 +85,67 @@ class UsageAggregates(BaseModel):
     detailed_metrics: Dict[str, Any] = Field(default_factory=dict)
 
 
+# Prompt-cache prices relative to the input rate: (cache read, cache write).
+# Anthropic charges a premium for writing the cache; OpenAI/Azure cache
+# automatically and only discount the hits.
+CACHE_PRICE_MULTIPLIERS = {
+    "anthropic": (Decimal("0.1"), Decimal("1.25")),
+    "openai": (Decimal("0.5"), Decimal("1")),
+    "azure": (Decimal("0.5"), Decimal("1")),
+}
+_DEFAULT_CACHE_MULTIPLIERS = (Decimal("0.5"), Decimal("1"))
+
+_MICRO = Decimal("0.000001")
+
+
+def usage_metrics_query(
+    model_id: Optional[str] = None,
+    provider: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+):
+    """``SELECT`` of the hourly usage rows matching the given filters."""
+    stmt = select(ModelUsageMetrics)
+    if model_id:
+        stmt = stmt.where(ModelUsageMetrics.model_id == model_id)
+    if start_date:
+        stmt = stmt.where(ModelUsageMetrics.period_start >= start_date)
+    if end_date:
+        stmt = stmt.where(ModelUsageMetrics.period_end <= end_date)
+    if provider:
+        stmt = stmt.where(
+            ModelUsageMetrics.detailed_metrics["provider"].astext == provider
+        )
+    if user_id:
+        stmt = stmt.where(ModelUsageMetrics.detailed_metrics.has_key(f"user_{user_id}"))
+    return stmt
+
+
+def _cache_stats(cache: Dict[str, Any], input_tokens: int) -> Dict[str, Any]:
+    read = int(cache.get("read_tokens", 0))
+    return {
+        "read_tokens": read,
+        "write_tokens": int(cache.get("write_tokens", 0)),
+        "hit_ratio": round(read / input_tokens, 4) if input_tokens else 0.0,
+        "savings": round(cache.get("savings", 0.0), 4),
+    }
+
+
+def _add_cache_usage(
+    metrics: Dict[str, Any], event: UsageEvent, cost_calc: CostCalculation
+) -> None:
+    """Add *event*'s prompt-cache tokens and savings to ``metrics["prompt_cache"]``."""
+    if not (event.cached_input_tokens or event.cache_write_tokens):
+        return
+    cache = metrics.setdefault(
+        "prompt_cache", {"read_tokens": 0, "write_tokens": 0, "savings": 0.0}
+    )
+    cache["read_tokens"] += event.cached_input_tokens
+    cache["write_tokens"] += event.cache_write_tokens
+    cache["savings"] += float(cost_calc.cache_savings)
+
+
 class CostTrackingService:
     """Service for tracking LLM usage costs and performance metrics."""
 
@@ -93,20 +162,8 @@ class CostTrackingService:
         cache_key = f"{event.model_id}_{event.provider}"
         if self._is_cache_valid() and cache_key in self._cost_cache:
             cached_calc = self._cost_cache[cache_key]
-            return CostCalculation(
-                input_cost=cached_calc.input_rate_per_1k
-                * Decimal(event.input_tokens)
-                / 1000,
-                output_cost=cached_calc.output_rate_per_1k
-                * Decimal(event.output_tokens)
-                / 1000,
-                total_cost=cached_calc.input_rate_per_1k
-                * Decimal(event.input_tokens)
-                / 1000
-                + cached_calc.output_rate_per_1k * Decimal(event.output_tokens) / 1000,
-                input_rate_per_1k=cached_calc.input_rate_per_1k,
-                output_rate_per_1k=cached_calc.output_rate_per_1k,
-                currency="USD",
+            return self._price(
+                event, cached_calc.input_rate_per_1k, cached_calc.output_rate_per_1k
             )
 
         # Fetch model configuration for pricing
@@ -148,31 +205,43 @@ class CostTrackingService:
             input_rate = Decimal(str(model_config.cost_input_per_1k or 0.001))
             output_rate = Decimal(str(model_config.cost_output_per_1k or 0.002))
 
-        # Calculate costs
-        input_cost = (input_rate * Decimal(event.input_tokens) / 1000).quantize(
-            Decimal("0.000001"), rounding=ROUND_HALF_UP
+        # Cache the rates
+        cost_calc = self._price(event, input_rate, output_rate)
+        self._cost_cache[cache_key] = cost_calc
+        return cost_calc
+
+    @staticmethod
+    def _price(
+        event: UsageEvent, input_rate: Decimal, output_rate: Decimal
+    ) -> CostCalculation:
+        """Cost of *event*, with cached input tokens at the provider's cache rates."""
+        read_rate, write_rate = CACHE_PRICE_MULTIPLIERS.get(
+            event.provider, _DEFAULT_CACHE_MULTIPLIERS
         )
-        output_cost = (output_rate * Decimal(event.output_tokens) / 1000).quantize(
-            Decimal("0.000001"), rounding=ROUND_HALF_UP
+        read = min(event.cached_input_tokens, event.input_tokens)
+        written = min(event.cache_write_tokens, event.input_tokens - read)
+        billable = (
+            Decimal(event.input_tokens - read - written)
+            + read * read_rate
+            + written * write_rate
         )
-        total_cost = input_cost + output_cost
 
-        # Cache the rates
-        self._cost_cache[cache_key] = CostCalculation(
-            input_cost=input_cost,
-            output_cost=output_cost,
-            total_cost=total_cost,
-            input_rate_per_1k=input_rate,
-            output_rate_per_1k=output_rate,
-            currency="USD",
+        input_cost = (input_rate * billable / 1000).quantize(
+            _MICRO, rounding=ROUND_HALF_UP
         )
-
+        output_cost = (output_rate * Decimal(event.output_tokens) / 1000).quantize(
+            _MICRO, rounding=ROUND_HALF_UP
+        )
+        full_input_cost = input_rate * Decimal(event.input_tokens) / 1000
         return CostCalculation(
             input_cost=input_cost,
             output_cost=output_cost,
-            total_cost=total_cost,
+            total_cost=input_cost + output_cost,
             input_rate_per_1k=input_rate,
             output_rate_per_1k=output_rate,
+            cache_savings=(full_input_cost - input_cost).quantize(
+                _MICRO, rounding=ROUND_HALF_UP
+            ),
             currency="USD",
         )
 
@@ -271,13 +340,31 @@ class CostTrackingService:
                         "requests": 0,
                         "cost": 0.0,
                     }
-                usage_metric.detailed_metrics[user_key]["requests"] += 1
-                usage_metric.detailed_metrics[user_key]["cost"] += float(
-                    cost_calc.total_cost
+                user_metrics = usage_metric.detailed_metrics[user_key]
+                user_metrics["requests"] += 1
+                user_metrics["cost"] += float(cost_calc.total_cost)
+                # Per-user tokens and features feed the per-user rollups
+                user_metrics["tokens_input"] = (
+                    user_metrics.get("tokens_input", 0) + event.input_tokens
                 )
+                user_metrics["tokens_output"] = (
+                    user_metrics.get("tokens_output", 0) + event.output_tokens
+                )
+                if event.feature:
+                    feature = user_metrics.setdefault("features", {}).setdefault(
+                        event.feature, {"requests": 0, "cost": 0.0}
+                    )
+                    feature["requests"] += 1
+                    feature["cost"] += float(cost_calc.total_cost)
+                _add_cache_usage(user_metrics, event, cost_calc)
+
+            # Prompt cache effectiveness (hit ratio = read tokens / input tokens)
+            _add_cache_usage(usage_metric.detailed_metrics, event, cost_calc)
 
             # Store provider information
             usage_metric.detailed_metrics["provider"] = event.provider
+            # Plain JSONB column: in-place changes are not tracked otherwise
+            flag_modified(usage_metric, "detailed_metrics")
 
             self.db.commit()
 
@@ -299,33 +386,20 @@ class CostTrackingService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         user_id: Optional[int] = None,
+        limit: Optional[int] = None,
     ) -> List[UsageAggregates]:
-        """Get aggregated usage statistics."""
-
-        query = self.db.query(ModelUsageMetrics)
-
-        # Apply filters
-        if model_id:
-            query = query.filter(ModelUsageMetrics.model_id == model_id)
-
-        if start_date:
-            query = query.filter(ModelUsageMetrics.period_start >= start_date)
-
-        if end_date:
-            query = query.filter(ModelUsageMetrics.period_end <= end_date)
-
-        # Filter by provider if specified
-        if provider:
-            query = query.filter(
-                ModelUsageMetrics.detailed_metrics.op("->>")('"provider"') == provider
-            )
-
-        # Filter by user if specified
-        if user_id:
-            user_key = f"user_{user_id}"
-            query = query.filter(ModelUsageMetrics.detailed_metrics.has_key(user_key))
-
-        metrics = query.order_by(desc(ModelUsageMetrics.period_start)).all()
+        """Get aggregated usage statistics, newest first, up to *limit* rows."""
+
+        stmt = usage_metrics_query(
+            model_id=model_id,
+            provider=provider,
+            start_date=start_date,
+            end_date=end_date,
+            user_id=user_id,
+        ).order_by(desc(ModelUsageMetrics.period_start))
+        if limit:
+            stmt = stmt.limit(limit)
+        metrics = self.db.execute(stmt).scalars()
 
         aggregates = []
         for metric in metrics:
@@ -360,53 +434,40 @@ class CostTrackingService:
         if not start_date:
             start_date = end_date - timedelta(days=30)
 
-        query = self.db.query(ModelUsageMetrics).filter(
-            ModelUsageMetrics.period_start >= start_date,
-            ModelUsageMetrics.period_end <= end_date,
+        # Hourly/daily rollups: cost is proportional to the number of buckets
+        rows = read_rollups(
+            self.db, "cost", start_date, end_date, user_id=user_id or 0
         )
+        by_model = merge_rollups(rows)
+
+        total_cost = sum(agg.total for agg in by_model.values())
+        total_requests = sum(agg.count for agg in by_model.values())
+        total_tokens = sum(agg.tokens_in + agg.tokens_out for agg in by_model.values())
+
+        model_costs = {
+            model_id: {
+                "cost": agg.total,
+                "requests": agg.count,
+                "tokens": agg.tokens_in + agg.tokens_out,
+                "provider": agg.data.get("provider", "unknown"),
+                "prompt_cache": _cache_stats(
+                    agg.data.get("prompt_cache", {}), agg.tokens_in
+                ),
+            }
+            for model_id, agg in by_model.items()
+        }
+        cache_totals: Dict[str, float] = {}
+        for agg in by_model.values():
+            for key, value in agg.data.get("prompt_cache", {}).items():
+                cache_totals[key] = cache_totals.get(key, 0) + value
 
-        # Filter by user if specified
-        if user_id:
-            user_key = f"user_{user_id}"
-            query = query.filter(ModelUsageMetrics.detailed_metrics.has_key(user_key))
-
-        metrics = query.all()
-
-        # Calculate totals
-        total_cost = sum(metric.total_cost for metric in metrics)
-        total_requests = sum(metric.total_requests for metric in metrics)
-        total_tokens = sum(
-            metric.total_tokens_input + metric.total_tokens_output for metric in metrics
-        )
-
-        # Calculate costs by model
-        model_costs = {}
-        for metric in metrics:
-            model_id = metric.model_id
-            if model_id not in model_costs:
-                model_costs[model_id] = {
-                    "cost": 0.0,
-                    "requests": 0,
-                    "tokens": 0,
-                    "provider": metric.detailed_metrics.get("provider", "unknown"),
-                }
-
-            model_costs[model_id]["cost"] += metric.total_cost
-            model_costs[model_id]["requests"] += metric.total_requests
-            model_costs[model_id]["tokens"] += (
-                metric.total_tokens_input + metric.total_tokens_output
-            )
-
-        # Calculate costs by feature
         feature_costs = {}
-        for metric in metrics:
-            for key, value in (metric.detailed_metrics or {}).items():
-                if key.startswith("feature_"):
-                    feature_name = key.replace("feature_", "")
-                    if feature_name not in feature_costs:
-                        feature_costs[feature_name] = {"cost": 0.0, "requests": 0}
-                    feature_costs[feature_name]["cost"] += value.get("cost", 0)
-                    feature_costs[feature_name]["requests"] += value.get("requests", 0)
+        for agg in by_model.values():
+            for feature_name, value in agg.data.get("features", {}).items():
+                if feature_name not in feature_costs:
+                    feature_costs[feature_name] = {"cost": 0.0, "requests": 0}
+                feature_costs[feature_name]["cost"] += value.get("cost", 0)
+                feature_costs[feature_name]["requests"] += value.get("requests", 0)
 
         return {
             "period": {"start": start_date.isoformat(), "end": end_date.isoformat()},
@@ -417,6 +478,9 @@ class CostTrackingService:
                 "avg_cost_per_request": round(total_cost / max(total_requests, 1), 4),
                 "avg_cost_per_token": round(total_cost / max(total_tokens, 1), 6),
             },
+            "prompt_cache": _cache_stats(
+                cache_totals, sum(agg.tokens_in for agg in by_model.values())
+            ),
             "by_model": model_costs,
             "by_feature": feature_costs,
             "currency": "USD",
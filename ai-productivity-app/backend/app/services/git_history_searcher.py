@@ -1,8 +1,10 @@
 # backend/app/services/git_history_searcher.py
-import git
+import os
+
 from typing import List, Dict, Optional
 import logging
 from app.config import settings
+from app.services.blame_cache import blame_cache
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +13,9 @@ class GitHistorySearcher:
     """Search git history, including commits and blame."""
 
     def __init__(self, project_path: str):
+        self.repo_path = os.path.abspath(project_path)
+        import git  # GitPython probes the git binary on import
+
         try:
             # The project's git repository should be cloned here by ImportService
             self.repo = git.Repo(project_path)
@@ -54,40 +59,74 @@ class GitHistorySearcher:
             logger.error(f"Error searching commits: {e}")
             return []
 
-    def get_blame(self, file_path: str, line_number: int) -> List[Dict]:
-        """Get git blame information for a specific line."""
+    def _blame_table(self, file_path: str):
+        """Return the cached blame table for *file_path* at ``HEAD``."""
+        return blame_cache.get_table(
+            self.repo, self.repo_path, self.repo.head.commit.hexsha, file_path
+        )
+
+    @staticmethod
+    def _blame_result(
+        file_path: str, start_line: int, end_line: int, info: Dict
+    ) -> Dict:
+        if start_line == end_line:
+            location = f"Line {start_line}"
+        else:
+            location = f"Lines {start_line}-{end_line}"
+        return {
+            "type": "git_blame",
+            "score": 1.0,
+            "content": f"{location} in {file_path} was last changed by {info['author']} in commit {info['commit_hash'][:7]}.\n\nCommit Message:\n{info['message']}",
+            "metadata": {
+                "file_path": file_path,
+                "line_number": start_line,
+                "end_line": end_line,
+                "commit_hash": info["commit_hash"],
+                "author": info["author"],
+                "date": info["date"],
+            },
+        }
+
+    def get_blame(
+        self, file_path: str, line_number: int, context_lines: int = 0
+    ) -> List[Dict]:
+        """Get git blame information for a specific line.
+
+        When *context_lines* is positive the blame for the *context_lines*
+        lines starting at *line_number* is returned instead (one result per
+        commit hunk).
+        """
+        if context_lines > 0:
+            return self.get_blame_range(
+                file_path, line_number, line_number + context_lines - 1
+            )
+
         if not self.repo:
             return []
 
         try:
-            blame_entries = self.repo.blame(rev="HEAD", file=file_path)
-            # Find the blame entry for the specific line
-            target_entry = None
-            current_line = 0
-            for entry in blame_entries:
-                if current_line + len(entry.lines) >= line_number:
-                    target_entry = entry
-                    break
-                current_line += len(entry.lines)
-
-            if not target_entry:
+            info = self._blame_table(file_path).lookup(line_number)
+            if not info:
                 return []
+            return [self._blame_result(file_path, line_number, line_number, info)]
+        except Exception as e:
+            logger.error(f"Error getting git blame for {file_path}:{line_number}: {e}")
+            return []
 
-            commit = target_entry.commit
+    def get_blame_range(
+        self, file_path: str, start_line: int, end_line: int
+    ) -> List[Dict]:
+        """Get git blame hunks for lines *start_line*..*end_line* (inclusive)."""
+        if not self.repo:
+            return []
+
+        try:
+            hunks = self._blame_table(file_path).range(start_line, end_line)
             return [
-                {
-                    "type": "git_blame",
-                    "score": 1.0,
-                    "content": f"Line {line_number} in {file_path} was last changed by {commit.author.name} in commit {commit.hexsha[:7]}.\n\nCommit Message:\n{commit.message}",
-                    "metadata": {
-                        "file_path": file_path,
-                        "line_number": line_number,
-                        "commit_hash": commit.hexsha,
-                        "author": commit.author.name,
-                        "date": commit.committed_datetime.isoformat(),
-                    },
-                }
+                self._blame_result(file_path, lo, hi, info) for lo, hi, info in hunks
             ]
         except Exception as e:
-            logger.error(f"Error getting git blame for {file_path}:{line_number}: {e}")
+            logger.error(
+                f"Error getting git blame for {file_path}:{start_line}-{end_line}: {e}"
+            )
             return []
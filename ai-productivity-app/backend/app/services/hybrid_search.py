@@ -1,11 +1,15 @@
 # backend/app/services/hybrid_search.py
 """Unified hybrid search combining vector, keyword, and structural search."""
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, List, Dict, Optional, Tuple
 import asyncio
+import os
+import time
+from collections import defaultdict
 from sqlalchemy.orm import Session
 import numpy as np
 import logging
 import hashlib
+import re
 
 from app.services.vector_service import VectorService
 from app.services.keyword_search import KeywordSearch
@@ -13,41 +17,58 @@ from app.services.structural_search import StructuralSearch
 from app.services.git_history_searcher import GitHistorySearcher
 from app.services.static_analysis_searcher import StaticAnalysisSearcher
 from app.services.summarization_service import SummarizationService
+from app.services.postgresql_functions import PostgreSQLFunctions
 from app.embeddings.generator import EmbeddingGenerator
 from app.utils.token_counter import count_tokens
 
 logger = logging.getLogger(__name__)
 
+# Latency objective of a search request; query expansion only runs in what
+# is left of it after the primary modalities.
+SEARCH_SLO_SECONDS = float(os.getenv("SEARCH_SLO_MS", "800")) / 1000
+# "python": one query per modality, fused here; "sql": one round-trip to the
+# ``fused_code_search`` stored function (PostgreSQL only)
+SEARCH_FUSION = os.getenv("SEARCH_FUSION", "python").lower()
+
 
 class HybridSearch:
     """Unified search across all modalities."""
 
+    # Default search weights
+    default_weights = {"semantic": 0.5, "keyword": 0.3, "structural": 0.2}
+
+    # Query type specific weights
+    query_type_weights = {
+        "error_debug": {"semantic": 0.3, "keyword": 0.6, "structural": 0.1},
+        "api_usage": {"semantic": 0.6, "keyword": 0.2, "structural": 0.2},
+        "implementation": {"semantic": 0.7, "keyword": 0.2, "structural": 0.1},
+        "conceptual": {"semantic": 0.8, "keyword": 0.1, "structural": 0.1},
+        "specific_code": {"semantic": 0.2, "keyword": 0.3, "structural": 0.5},
+        "performance": {"semantic": 0.4, "keyword": 0.4, "structural": 0.2},
+        "testing": {"semantic": 0.4, "keyword": 0.5, "structural": 0.1},
+    }
+
     def __init__(
         self,
         db: Session,
         vector_service: VectorService,
         embedding_generator: Optional[EmbeddingGenerator] = None,
     ):
+        # Construction is kept trivial (no per-request tables or clients) as
+        # the search router builds one instance per request.
         self.db = db
         self.vector_service = vector_service
         self.embedding_generator = embedding_generator
         self.keyword_search = KeywordSearch(db)
         self.structural_search = StructuralSearch(db)
-        self.summarization_service = SummarizationService()
-
-        # Default search weights
-        self.default_weights = {"semantic": 0.5, "keyword": 0.3, "structural": 0.2}
-
-        # Query type specific weights
-        self.query_type_weights = {
-            "error_debug": {"semantic": 0.3, "keyword": 0.6, "structural": 0.1},
-            "api_usage": {"semantic": 0.6, "keyword": 0.2, "structural": 0.2},
-            "implementation": {"semantic": 0.7, "keyword": 0.2, "structural": 0.1},
-            "conceptual": {"semantic": 0.8, "keyword": 0.1, "structural": 0.1},
-            "specific_code": {"semantic": 0.2, "keyword": 0.3, "structural": 0.5},
-            "performance": {"semantic": 0.4, "keyword": 0.4, "structural": 0.2},
-            "testing": {"semantic": 0.4, "keyword": 0.5, "structural": 0.1},
-        }
+        self._summarization_service: Optional[SummarizationService] = None
+
+    @property
+    def summarization_service(self) -> SummarizationService:
+        # Only get_context_for_query needs it – create on first use.
+        if self._summarization_service is None:
+            self._summarization_service = SummarizationService()
+        return self._summarization_service
 
     async def search(
         self,
@@ -56,8 +77,201 @@ class HybridSearch:
         filters: Optional[Dict] = None,
         limit: int = 20,
         search_types: Optional[List[str]] = None,
+        expand: bool = False,
+        fused: Optional[bool] = None,
     ) -> List[Dict]:
-        """Execute hybrid search across all modalities."""
+        """Execute hybrid search across all modalities.
+
+        With *expand*, keyword search also runs for expanded variants of the
+        query (see :mod:`app.services.query_expansion`) as long as that fits
+        in ``SEARCH_SLO_MS``.  *fused* (default: ``SEARCH_FUSION == "sql"``)
+        runs the modalities as one stored-function call on PostgreSQL.
+        """
+        deadline = time.monotonic() + SEARCH_SLO_SECONDS
+        direct, modalities = self._plan(
+            query, project_ids, filters, limit, search_types, fused
+        )
+        if direct is not None:
+            return direct
+        if not modalities:
+            return []
+
+        # An LLM expansion overlaps with the primary searches
+        pending = None
+        if expand:
+            from app.services.query_expansion import query_expansion_service
+
+            if query_expansion_service.mode == "llm":
+                pending = asyncio.ensure_future(
+                    query_expansion_service.expand_query(
+                        query,
+                        scope=self._scope(project_ids),
+                        budget=deadline - time.monotonic(),
+                    )
+                )
+
+        # Wait for all searches
+        names = list(modalities)
+        results = await asyncio.gather(
+            *(modalities[name] for name in names), return_exceptions=True
+        )
+
+        # Merge results
+        all_results = []
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"Search failed ({name}): {result}")
+                continue
+            all_results.extend(result)
+
+        if expand:
+            all_results.extend(
+                await self._expansion_results(
+                    query, project_ids, filters, limit, all_results, deadline, pending
+                )
+            )
+
+        # Deduplicate and rank
+        return self._rank_and_dedupe(all_results, limit)
+
+    @staticmethod
+    def _scope(project_ids: List[int]) -> str:
+        return ",".join(str(pid) for pid in sorted(project_ids or []))
+
+    @staticmethod
+    def _result_key(result: Dict) -> Tuple[Any, Any]:
+        return result.get("document_id"), result.get("chunk_id")
+
+    async def _expansion_results(
+        self,
+        query: str,
+        project_ids: List[int],
+        filters: Optional[Dict],
+        limit: int,
+        found: List[Dict],
+        deadline: float,
+        pending: Optional[Awaitable[Dict[str, Any]]] = None,
+    ) -> List[Dict]:
+        """Keyword results of expanded queries, within the search deadline.
+
+        Records per technique how many results the variants found that the
+        original query had not (the recall gain of expansion).
+        """
+        from app.services.query_expansion import query_expansion_service
+
+        if pending is not None:
+            expansion = await pending
+        else:
+            # Local expansion from the semantic hits already in hand
+            expansion = await query_expansion_service.expand_query(
+                query,
+                neighbours=[
+                    r
+                    for r in found
+                    if r.get("type") == "semantic"
+                    or r.get("modality_scores", {}).get("semantic")
+                ],
+                scope=self._scope(project_ids),
+                budget=deadline - time.monotonic(),
+            )
+        variants = expansion["expanded_queries"]
+        if not variants:
+            return []
+
+        weights = self.query_type_weights.get(
+            self._detect_query_type(query), self.default_weights
+        )
+        seen = {self._result_key(r) for r in found}
+        gains: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        extra: List[Dict] = []
+        for variant in variants:
+            # Keyword search blocks the loop, so the budget is checked between
+            # variants rather than enforced with a timeout.
+            if time.monotonic() >= deadline:
+                break
+            technique = variant["technique"]
+            try:
+                results = await self._keyword_search_with_weight(
+                    variant["query"],
+                    project_ids,
+                    filters,
+                    limit,
+                    weights["keyword"] * variant.get("confidence", 1.0),
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(f"Expanded query search failed: {exc}")
+                continue
+            gains[technique][0] += 1
+            for result in results:
+                key = self._result_key(result)
+                if key not in seen:
+                    seen.add(key)
+                    gains[technique][1] += 1
+                result["expansion"] = {
+                    "query": variant["query"],
+                    "technique": technique,
+                }
+                extra.append(result)
+
+        for technique, (queries, new_results) in gains.items():
+            query_expansion_service.record_gain(technique, queries, new_results)
+        return extra
+
+    async def iter_search(
+        self,
+        query: str,
+        project_ids: List[int],
+        filters: Optional[Dict] = None,
+        limit: int = 20,
+        search_types: Optional[List[str]] = None,
+        fused: Optional[bool] = None,
+    ) -> AsyncIterator[Tuple[str, List[Dict]]]:
+        """Yield ``(modality, results)`` as each modality finishes.
+
+        Results of every modality are yielded unranked as soon as they are
+        available (fastest first); the last item is ``("final", ranked)``
+        with the same output :meth:`search` would return.
+        """
+        direct, modalities = self._plan(
+            query, project_ids, filters, limit, search_types, fused
+        )
+        if direct is not None:
+            yield "final", direct
+            return
+
+        async def _named(name: str, coro):
+            try:
+                return name, await coro
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"Search failed ({name}): {exc}")
+                return name, []
+
+        all_results: List[Dict] = []
+        for next_done in asyncio.as_completed(
+            [_named(name, coro) for name, coro in modalities.items()]
+        ):
+            name, results = await next_done
+            all_results.extend(results)
+            yield name, results
+
+        yield "final", self._rank_and_dedupe(all_results, limit)
+
+    def _plan(
+        self,
+        query: str,
+        project_ids: List[int],
+        filters: Optional[Dict],
+        limit: int,
+        search_types: Optional[List[str]],
+        fused: Optional[bool] = None,
+    ) -> Tuple[Optional[List[Dict]], Dict[str, Awaitable[List[Dict]]]]:
+        """Resolve special query forms and build the per-modality coroutines.
+
+        Returns ``(direct_results, {})`` for queries answered without the
+        regular modalities (git history, lint) and ``(None, modalities)``
+        otherwise; with server-side fusion the single modality is
+        ``"fused"``.
+        """
         # ------------------------------------------------------------------
         # `filters` can either be a plain ``dict`` **or** a Pydantic model
         # (``SearchFilters``) depending on where `HybridSearch.search` is being
@@ -108,12 +322,27 @@ class HybridSearch:
                     git_searcher = GitHistorySearcher(project_repo_path)
 
                     if search_type == "commit":
-                        return git_searcher.search_commits(
-                            structural_parsed["term"], limit
+                        return (
+                            git_searcher.search_commits(
+                                structural_parsed["term"], limit
+                            ),
+                            {},
                         )
                     elif search_type == "blame":
-                        return git_searcher.get_blame(
-                            structural_parsed["file"], structural_parsed["line"]
+                        if structural_parsed["end_line"] > structural_parsed["line"]:
+                            return (
+                                git_searcher.get_blame_range(
+                                    structural_parsed["file"],
+                                    structural_parsed["line"],
+                                    structural_parsed["end_line"],
+                                ),
+                                {},
+                            )
+                        return (
+                            git_searcher.get_blame(
+                                structural_parsed["file"], structural_parsed["line"]
+                            ),
+                            {},
                         )
 
             # Handle documentation searches
@@ -132,51 +361,137 @@ class HybridSearch:
                 if project_ids:
                     project_repo_path = f"repos/project_{project_ids[0]}"
                     analysis_searcher = StaticAnalysisSearcher(project_repo_path)
-                    return analysis_searcher.run_pylint(structural_parsed["term"])
+                    return analysis_searcher.run_pylint(structural_parsed["term"]), {}
 
             else:
                 # Prioritize structural search for other specific queries
                 search_types = ["structural"]
 
-        # Execute searches in parallel
-        tasks = []
-        if "semantic" in search_types and self.embedding_generator:
-            tasks.append(
-                self._semantic_search(
-                    query, project_ids, filters, limit, weights["semantic"]
+        if fused is None:
+            fused = SEARCH_FUSION == "sql"
+        # Structural query syntax (``func:``, ``calls:`` …) needs StructuralSearch
+        plain = not structural_parsed or structural_parsed.get("type") == "doc"
+        if fused and plain and self.keyword_search.is_postgresql:
+            return None, {
+                "fused": self._fused_search(
+                    query, project_ids, filters, limit, search_types, weights
                 )
+            }
+
+        return None, self._modalities(
+            query, project_ids, filters, limit, search_types, weights
+        )
+
+    def _modalities(
+        self,
+        query: str,
+        project_ids: List[int],
+        filters: Optional[Dict],
+        limit: int,
+        search_types: List[str],
+        weights: Dict[str, float],
+    ) -> Dict[str, Awaitable[List[Dict]]]:
+        modalities: Dict[str, Awaitable[List[Dict]]] = {}
+        if "semantic" in search_types and self.embedding_generator:
+            modalities["semantic"] = self._semantic_search(
+                query, project_ids, filters, limit, weights["semantic"]
             )
         if "keyword" in search_types:
-            tasks.append(
-                self._keyword_search_with_weight(
-                    query, project_ids, filters, limit, weights["keyword"]
-                )
+            modalities["keyword"] = self._keyword_search_with_weight(
+                query, project_ids, filters, limit, weights["keyword"]
             )
         if "structural" in search_types:
-            tasks.append(
-                self._structural_search_with_weight(
-                    query, project_ids, filters, limit, weights["structural"]
-                )
+            modalities["structural"] = self._structural_search_with_weight(
+                query, project_ids, filters, limit, weights["structural"]
             )
+        return modalities
 
-        if not tasks:
-            return []
+    async def _fused_search(
+        self,
+        query: str,
+        project_ids: List[int],
+        filters: Optional[Dict],
+        limit: int,
+        search_types: List[str],
+        weights: Dict[str, float],
+    ) -> List[Dict]:
+        """All modalities in one ``fused_code_search`` round-trip.
+
+        Falls back to the per-modality searches if the stored function is
+        not installed or fails (e.g. pgvector missing or a dimension
+        mismatch); the failed call only rolls back its own savepoint.
+        """
+        filters = filters or {}
+        functions = PostgreSQLFunctions(self.db)
+        if not functions.has_fused_search():
+            return await self._per_modality(
+                query, project_ids, filters, limit, search_types, weights
+            )
+        path_pattern = filters.get("file_path_pattern")
+        if path_pattern:
+            path_pattern = path_pattern.replace("**", "%").replace("*", "%")
+        elif filters.get("file_type") == "test":
+            path_pattern = "%test%"
 
-        # Wait for all searches
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            query_vector = None
+            if "semantic" in search_types and self.embedding_generator:
+                query_vector = (
+                    await self.embedding_generator.generate_single_embedding(query)
+                )
+            rows = functions.fused_search(
+                query,
+                query_vector or None,
+                project_ids,
+                language=filters.get("language"),
+                path_pattern=path_pattern,
+                symbol_names=self._symbol_terms(query),
+                weights={
+                    name: weight if name in search_types else 0.0
+                    for name, weight in weights.items()
+                },
+                candidates=limit * 2,
+                limit=limit,
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Fused search failed, searching per modality: {exc}")
+            return await self._per_modality(
+                query, project_ids, filters, limit, search_types, weights
+            )
 
-        # Merge results
-        all_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Search failed: {result}")
-                continue
-            all_results.extend(result)
+        return [self._fused_result(row) for row in rows]
 
-        # Deduplicate and rank
-        ranked_results = self._rank_and_dedupe(all_results, limit)
+    async def _per_modality(self, *args) -> List[Dict]:
+        """Results of every modality of :meth:`_modalities`, concatenated."""
+        modalities = self._modalities(*args)
+        results = await asyncio.gather(*modalities.values(), return_exceptions=True)
+        return [
+            r for group in results if not isinstance(group, Exception) for r in group
+        ]
 
-        return ranked_results
+    @staticmethod
+    def _symbol_terms(query: str) -> List[str]:
+        """Identifiers in *query* to match against symbol names."""
+        terms = re.findall(r"[A-Za-z_][A-Za-z0-9_]{2,}", query)
+        return list(dict.fromkeys(terms))[:10]
+
+    @staticmethod
+    def _fused_result(row: Dict[str, Any]) -> Dict[str, Any]:
+        scores = {
+            "semantic": row["semantic_score"] or 0.0,
+            "keyword": row["keyword_score"] or 0.0,
+            "structural": row["structural_score"] or 0.0,
+        }
+        matched = [name for name, score in scores.items() if score > 0]
+        return {
+            "type": matched[0] if len(matched) == 1 else "hybrid",
+            "score": float(row["score"] or 0.0),
+            "document_id": row["document_id"],
+            "chunk_id": row["chunk_id"],
+            "content": row["content"],
+            "metadata": row["metadata"] or {},
+            "modality_scores": scores,
+        }
 
     async def _semantic_search(
         self,
@@ -0,0 +1,361 @@
+# backend/app/services/knowledge_ingest.py
+"""Durable, batched ingestion of knowledge documents.
+
+Uploads and ``KnowledgeService.add_knowledge_entry`` only store the
+:class:`KnowledgeDocument` row with ``ingest_status = 'pending'``; the row
+*is* the queue entry, so nothing is lost when a request ends or a replica
+restarts.  :class:`KnowledgeIngestWorker` claims pending rows with
+``SELECT … FOR UPDATE SKIP LOCKED`` (replicas never claim the same
+document) and for each one
+
+1. splits the text along headings and paragraphs into token windows
+   (:func:`app.embeddings.batching.split_structured_text`) and redacts
+   secrets in them, so neither the embedding API nor the vector store ever
+   sees one and retrieval needs no further scanning;
+2. embeds the chunks with one shared :class:`EmbeddingGenerator`, in
+   token-limited batches issued concurrently up to
+   ``embedding_max_concurrency``;
+3. replaces the document's vectors with one bulk insert.  The delete is
+   scoped by the ``knowledge_doc_id`` metadata as well, since the integer
+   :func:`vector_document_id` is a hash that two documents may share.
+
+A document stuck in ``processing`` longer than the lease (a crashed worker)
+is claimed again, unless it has used up its attempts, in which case it is
+marked ``failed``.  A failed one goes back to ``pending`` with an
+exponentially growing ``next_attempt_at`` and is not claimed before then;
+one that keeps failing ends up ``failed`` with its last error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, update
+
+from app.chat.secret_scanner import SCANNER_VERSION, secret_scanner
+from app.embeddings.batching import TextSection, split_structured_text
+from app.models.knowledge import KnowledgeDocument
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = int(os.getenv("KNOWLEDGE_CHUNK_TOKENS", "512"))
+CLAIM_BATCH = int(os.getenv("KNOWLEDGE_INGEST_BATCH_DOCS", "4"))
+EMBED_GROUP = int(os.getenv("KNOWLEDGE_EMBED_GROUP", "64"))
+MAX_ATTEMPTS = int(os.getenv("KNOWLEDGE_INGEST_MAX_ATTEMPTS", "5"))
+LEASE_SECONDS = float(os.getenv("KNOWLEDGE_INGEST_LEASE_SECONDS", "900"))
+POLL_SECONDS = float(os.getenv("KNOWLEDGE_INGEST_POLL_SECONDS", "10"))
+RETRY_BASE_SECONDS = float(os.getenv("KNOWLEDGE_INGEST_RETRY_BASE_SECONDS", "30"))
+RETRY_MAX_SECONDS = float(os.getenv("KNOWLEDGE_INGEST_RETRY_MAX_SECONDS", "3600"))
+
+PENDING, PROCESSING, INDEXED, FAILED = "pending", "processing", "indexed", "failed"
+_POINT_NAMESPACE = uuid.UUID("6f1d3c6e-6b0e-4a8e-9f3e-6b1c2d4e5f70")
+
+
+def vector_document_id(doc_id: str) -> int:
+    """Stable integer id for a knowledge document's vectors.
+
+    Negative so it can never collide with a ``CodeDocument`` id sharing the
+    same ``document_id`` column of the vector store.  Two knowledge documents
+    may still share one (31 bits), so deletes also match ``knowledge_doc_id``.
+    """
+    digest = hashlib.sha256(doc_id.encode()).digest()
+    return -(int.from_bytes(digest[:4], "big") & 0x7FFFFFFF) - 1
+
+
+def point_id(doc_id: str, index: int) -> str:
+    """Deterministic vector-store id of chunk *index* (a UUID for Qdrant)."""
+    return str(uuid.uuid5(_POINT_NAMESPACE, f"{doc_id}:{index}"))
+
+
+def redact_sections(
+    sections: List[TextSection],
+) -> Tuple[List[TextSection], List[int]]:
+    """Sections with secrets redacted, and how many each one had."""
+    redacted, counts = [], []
+    for section in sections:
+        findings = secret_scanner.scan(section.text)
+        if findings:
+            section = TextSection(
+                section.index,
+                secret_scanner.redact(section.text, findings),
+                section.heading,
+            )
+        redacted.append(section)
+        counts.append(len(findings))
+    return redacted, counts
+
+
+@dataclass
+class IngestJob:
+    doc_id: str
+    project_id: int
+    title: str
+    source: Optional[str]
+    category: Optional[str]
+    content: str
+    tags: List[str] = field(default_factory=list)
+
+    def embedding_input(self, section: TextSection) -> str:
+        """Chunk text prefixed with where it sits in the document."""
+        where = f"{self.title} > {section.heading}" if section.heading else self.title
+        return f"{where}\n\n{section.text}"
+
+    def vectors(
+        self,
+        sections: List[TextSection],
+        embeddings: List[List[float]],
+        redactions: Optional[List[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        doc_vec_id = vector_document_id(self.doc_id)
+        redactions = redactions or [0] * len(sections)
+        return [
+            {
+                "id": point_id(self.doc_id, section.index),
+                "vector": vector,
+                "document_id": doc_vec_id,
+                "chunk_id": section.index,
+                "project_id": self.project_id,
+                "content": section.text,
+                "content_hash": hashlib.sha256(section.text.encode()).hexdigest(),
+                "metadata": {
+                    "title": self.title,
+                    "source": self.source,
+                    "category": self.category,
+                    "project_id": self.project_id,
+                    "document_type": "knowledge",
+                    "knowledge_doc_id": self.doc_id,
+                    "heading": section.heading,
+                    "chunk_index": section.index,
+                    "chunk_count": len(sections),
+                    "tags": self.tags,
+                    "schema_version": 2,
+                    # Content is already redacted: nothing left to find
+                    "secret_scan": {"version": SCANNER_VERSION, "findings": []},
+                    "redacted_secrets": redacted,
+                },
+            }
+            for section, vector, redacted in zip(
+                sections, embeddings, redactions, strict=True
+            )
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Queue operations (sync, run in a worker thread on the "worker" pool)
+# ---------------------------------------------------------------------------
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before retrying a document that failed *attempts* times."""
+    seconds = RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, RETRY_MAX_SECONDS))
+
+
+def _claim(limit: int) -> List[IngestJob]:
+    from app.database import session_for
+
+    now = datetime.utcnow()
+    lease_expired = now - timedelta(seconds=LEASE_SECONDS)
+    stale = and_(
+        KnowledgeDocument.ingest_status == PROCESSING,
+        KnowledgeDocument.updated_at < lease_expired,
+    )
+    with session_for("worker") as db:
+        # A worker crashed on this document on every attempt: give up on it
+        db.execute(
+            update(KnowledgeDocument)
+            .where(stale, KnowledgeDocument.ingest_attempts >= MAX_ATTEMPTS)
+            .values(
+                ingest_status=FAILED,
+                ingest_error="Ingestion lease expired after the last attempt",
+                next_attempt_at=None,
+            )
+        )
+        stmt = (
+            select(KnowledgeDocument)
+            .where(
+                or_(
+                    and_(
+                        KnowledgeDocument.ingest_status == PENDING,
+                        or_(
+                            KnowledgeDocument.next_attempt_at.is_(None),
+                            KnowledgeDocument.next_attempt_at <= now,
+                        ),
+                    ),
+                    and_(stale, KnowledgeDocument.ingest_attempts < MAX_ATTEMPTS),
+                )
+            )
+            .order_by(KnowledgeDocument.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = []
+        for doc in db.execute(stmt).scalars():
+            doc.ingest_status = PROCESSING
+            doc.ingest_attempts = (doc.ingest_attempts or 0) + 1
+            jobs.append(
+                IngestJob(
+                    doc_id=doc.id,
+                    project_id=doc.project_id,
+                    title=doc.title,
+                    source=doc.source,
+                    category=doc.category,
+                    content=doc.content,
+                    tags=list(doc.tags or []),
+                )
+            )
+        db.commit()
+        return jobs
+
+
+def _finish(doc_id: str, chunk_count: int) -> None:
+    from app.database import session_for
+
+    with session_for("worker") as db:
+        db.execute(
+            update(KnowledgeDocument)
+            .where(KnowledgeDocument.id == doc_id)
+            .values(
+                ingest_status=INDEXED,
+                ingest_error=None,
+                next_attempt_at=None,
+                chunk_count=chunk_count,
+                indexed_at=datetime.utcnow(),
+            )
+        )
+        db.commit()
+
+
+def _fail(doc_id: str, error: str) -> None:
+    from app.database import session_for
+
+    with session_for("worker") as db:
+        doc = db.get(KnowledgeDocument, doc_id)
+        if doc is None:
+            return
+        doc.ingest_error = error[:2000]
+        if doc.ingest_attempts >= MAX_ATTEMPTS:
+            doc.ingest_status = FAILED
+        else:
+            doc.ingest_status = PENDING
+            doc.next_attempt_at = datetime.utcnow() + retry_delay(doc.ingest_attempts)
+        db.commit()
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+
+def _prepare(job: IngestJob) -> Tuple[List[TextSection], List[int]]:
+    """Split and redact a document (CPU-bound, runs in a thread)."""
+    return redact_sections(split_structured_text(job.content, CHUNK_TOKENS))
+
+
+class KnowledgeIngestWorker:
+    """Background consumer of the ``knowledge_documents`` ingestion queue."""
+
+    def __init__(self, generator=None, vector_store=None):
+        self._generator = generator
+        self._vector_store = vector_store
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.indexed = 0
+        self.failed = 0
+
+    @property
+    def generator(self):
+        # One generator (HTTP client + concurrency semaphore) for all documents
+        if self._generator is None:
+            from app.embeddings.generator import EmbeddingGenerator
+
+            self._generator = EmbeddingGenerator()
+        return self._generator
+
+    @property
+    def vector_store(self):
+        if self._vector_store is None:
+            from app.services.vector_service import vector_service
+
+            self._vector_store = vector_service
+        return self._vector_store
+
+    def wake(self) -> None:
+        """Process newly queued documents now instead of at the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            # Created here so it belongs to the loop the worker runs on
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="knowledge-ingest")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                jobs = await asyncio.to_thread(_claim, CLAIM_BATCH)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Knowledge ingestion claim failed: %s", exc)
+                jobs = []
+            if jobs:
+                await asyncio.gather(*(self._ingest(job) for job in jobs))
+                continue  # drain the queue before sleeping
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _ingest(self, job: IngestJob) -> None:
+        try:
+            sections, redactions = await asyncio.to_thread(_prepare, job)
+            embeddings = await self._embed([job.embedding_input(s) for s in sections])
+            doc_vec_id = vector_document_id(job.doc_id)
+            # Idempotent: a retried or re-queued document replaces its vectors
+            await self.vector_store.delete_by_document(
+                doc_vec_id, metadata={"knowledge_doc_id": job.doc_id}
+            )
+            if sections:
+                await self.vector_store.insert_embeddings(
+                    job.vectors(sections, embeddings, redactions)
+                )
+            await asyncio.to_thread(_finish, job.doc_id, len(sections))
+            self.indexed += 1
+            logger.info(
+                "Indexed knowledge document %s (%d chunks)", job.doc_id, len(sections)
+            )
+        except Exception as exc:  # noqa: BLE001
+            self.failed += 1
+            logger.exception("Knowledge ingestion failed for %s", job.doc_id)
+            try:
+                await asyncio.to_thread(_fail, job.doc_id, str(exc))
+            except Exception:  # noqa: BLE001 – lease expiry will retry it
+                logger.warning("Could not record failure of %s", job.doc_id)
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed *texts* in groups issued concurrently, order preserved."""
+        groups = [texts[i : i + EMBED_GROUP] for i in range(0, len(texts), EMBED_GROUP)]
+        results = await asyncio.gather(
+            *(self.generator.generate_embeddings(group) for group in groups)
+        )
+        return [vector for group in results for vector in group]
+
+
+knowledge_ingest_worker = KnowledgeIngestWorker()
@@ -6,16 +6,6 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 import numpy as np
 
-# ---------------------------------------------------------------------------
-# ``tiktoken`` is an optional dependency used for accurate token counting.  In
-# minimal CI environments the wheel might be missing.  We therefore import it
-# lazily and fall back to a **very small** stub that provides the limited API
-# (`get_encoding`, `encoding_for_model`, `encode`) required by this module so
-# that the remainder of the application can still start and the unit tests can
-# run without the heavy binary dependency.
-# ---------------------------------------------------------------------------
-
-import tiktoken
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
@@ -54,15 +44,19 @@ class KnowledgeService:
         project_id: int = 1,
         db: Session = None,
     ) -> str:
-        """Add entry to knowledge base."""
+        """Add entry to knowledge base.
+
+        The document is stored and queued; the ingestion worker chunks and
+        embeds it (see :mod:`app.services.knowledge_ingest`).
+        """
         if not db:
             raise ValueError("Database session is required")
 
         import uuid
 
-        doc_id = f"kb_{uuid.uuid4().hex[:12]}"
+        from app.services.knowledge_ingest import knowledge_ingest_worker
 
-        embedding = await self.embedding_generator.generate_single_embedding(content)
+        doc_id = f"kb_{uuid.uuid4().hex[:12]}"
 
         knowledge_doc = KnowledgeDocument(
             id=doc_id,
@@ -71,38 +65,15 @@ class KnowledgeService:
             title=title,
             source=source,
             category=category,
+            tags=tags or [],
+            ingest_status="pending",
         )
 
         db.add(knowledge_doc)
         db.commit()
-        db.refresh(knowledge_doc)
-        logger.info(f"Persisted knowledge document to database: {doc_id}")
-
-        metadata = {
-            "title": title,
-            "source": source,
-            "category": category,
-            "project_id": project_id,
-            "document_type": "knowledge",
-            "knowledge_doc_id": doc_id,
-            "tags": tags or [],
-            "schema_version": 1,
-        }
-
-        await self.vector_store.insert_embeddings(
-            [
-                {
-                    "id": doc_id,
-                    "vector": embedding,
-                    "document_id": knowledge_doc.id,
-                    "project_id": project_id,
-                    "content": content,
-                    "metadata": metadata,
-                }
-            ]
-        )
+        knowledge_ingest_worker.wake()
 
-        logger.info(f"Added knowledge entry with embedding: {title}")
+        logger.info(f"Queued knowledge entry for indexing: {title} ({doc_id})")
         return doc_id
 
     async def search_knowledge(
@@ -0,0 +1,277 @@
+# backend/app/services/multimodal_extract.py
+"""CPU-bound extraction steps of the multimodal pipeline.
+
+Everything here is a plain top-level function over a *source* – either the
+raw ``bytes`` of an upload or the path of a file on disk – so it can run in
+a worker process (``ProcessPoolExecutor`` pickles the function by name) as
+well as in a thread.  The module deliberately imports nothing from ``app``
+so worker processes start quickly.
+
+PDFs are scanned as bytes over a memory map instead of a decoded copy,
+images and Word documents are read straight from the file by PIL/zipfile,
+and the scanners stop as soon as they have what the pipeline keeps (the
+first few PDF text objects, the first ``MAX_TEXT_CHARS`` of a Word
+document).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import mmap
+import re
+import zipfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Union
+
+Source = Union[bytes, str]
+
+# Only the first 2000 characters end up in searchable content; keep a margin
+MAX_TEXT_CHARS = 8000
+MAX_PDF_TEXT_OBJECTS = 10
+HASH_CHUNK = 1024 * 1024
+
+_PDF_TITLE = re.compile(rb"/Title\s*\(([^)]+)\)")
+_PDF_AUTHOR = re.compile(rb"/Author\s*\(([^)]+)\)")
+_PDF_TEXT_OBJECT = re.compile(rb"BT\s+.*?ET", re.DOTALL)
+_PDF_STRING = re.compile(rb"\(([^)]+)\)")
+
+_SVG_TEXT = re.compile(r"<text[^>]*>(.*?)</text>", re.DOTALL | re.IGNORECASE)
+_SVG_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.DOTALL | re.IGNORECASE)
+_SVG_DESC = re.compile(r"<desc[^>]*>(.*?)</desc>", re.DOTALL | re.IGNORECASE)
+_SVG_ELEMENT = re.compile(r"<(\w+)[^>]*>")
+_SVG_ARROW = re.compile(r"marker|arrow", re.IGNORECASE)
+
+
+def _is_bytes(source: Source) -> bool:
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+def _as_file(source: Source):
+    """Something ``PIL.Image.open``/``ZipFile`` accept, without copying."""
+    return io.BytesIO(source) if _is_bytes(source) else source
+
+
+def read_text(source: Source) -> str:
+    if _is_bytes(source):
+        return bytes(source).decode("utf-8")
+    with open(source, "r", encoding="utf-8") as fh:
+        return fh.read()
+
+
+@contextmanager
+def open_source(source: Source) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Yield a bytes-like view of *source* (``mmap`` for paths)."""
+    if _is_bytes(source):
+        yield source
+        return
+    with open(source, "rb") as fh:
+        try:
+            view = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file cannot be mapped
+            yield b""
+            return
+        try:
+            yield view
+        finally:
+            view.close()
+
+
+def content_hash(source: Source) -> str:
+    """SHA-256 of *source*, streamed in chunks for paths."""
+    digest = hashlib.sha256()
+    if _is_bytes(source):
+        digest.update(source)
+    else:
+        with open(source, "rb") as fh:
+            for chunk in iter(lambda: fh.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Per-format extractors
+# ---------------------------------------------------------------------------
+
+
+def extract_image(source: Source) -> Dict[str, Any]:
+    """Header-level image facts and EXIF text from a single ``Image.open``.
+
+    PIL only parses the header here; pixels are never decoded.
+    """
+    from PIL import Image
+
+    with Image.open(_as_file(source)) as image:
+        width, height = image.size
+        info = {
+            "width": width,
+            "height": height,
+            "mode": image.mode,
+            "format": image.format,
+            "has_transparency": image.mode in ("RGBA", "LA"),
+            "aspect_ratio": round(width / height, 2) if height else 0.0,
+            "megapixels": round((width * height) / 1000000, 2),
+        }
+        exif_text = ""
+        try:
+            exif = image.getexif()
+        except Exception:  # noqa: BLE001 – corrupt EXIF blocks are common
+            exif = {}
+        # ImageDescription, Make, Model
+        fields = [str(exif[tag]) for tag in (270, 271, 272) if tag in exif]
+        if fields:
+            exif_text = " ".join(fields)
+    return {"image_info": info, "exif_text": exif_text}
+
+
+def extract_pdf(source: Source) -> Dict[str, Any]:
+    """Title/author and the first text objects, scanned as bytes."""
+    with open_source(source) as buf:
+        title = _PDF_TITLE.search(buf)
+        author = _PDF_AUTHOR.search(buf)
+        parts = []
+        for i, obj in enumerate(_PDF_TEXT_OBJECT.finditer(buf)):
+            if i >= MAX_PDF_TEXT_OBJECTS:
+                break
+            texts = _PDF_STRING.findall(obj.group(0))
+            parts.append(b" ".join(texts).decode("latin-1") + " ")
+    return {
+        "title": title.group(1).decode("latin-1") if title else None,
+        "author": author.group(1).decode("latin-1") if author else None,
+        "text": "".join(parts),
+    }
+
+
+def _iter_xml_text(stream, suffix: str) -> Iterator[str]:
+    import xml.etree.ElementTree as ET
+
+    for _event, elem in ET.iterparse(stream, events=("end",)):
+        if elem.tag.endswith(suffix) and elem.text:
+            yield elem.text
+        elem.clear()
+
+
+def extract_docx(source: Source) -> Dict[str, Any]:
+    """Body text (streamed, capped) and core properties of a ``.docx``."""
+    import xml.etree.ElementTree as ET
+
+    text_parts = []
+    size = 0
+    meta: Dict[str, str] = {}
+    found_body = True
+    with zipfile.ZipFile(_as_file(source)) as docx_zip:
+        try:
+            with docx_zip.open("word/document.xml") as stream:
+                for text in _iter_xml_text(stream, "}t"):
+                    text_parts.append(text + " ")
+                    size += len(text) + 1
+                    if size >= MAX_TEXT_CHARS:
+                        break
+        except KeyError:
+            found_body = False
+
+        try:
+            core_root = ET.fromstring(docx_zip.read("docProps/core.xml"))
+        except KeyError:
+            core_root = None  # Metadata extraction is optional
+        if core_root is not None:
+            for elem in core_root.iter():
+                if not elem.text:
+                    continue
+                if elem.tag.endswith("}title"):
+                    meta["title"] = elem.text
+                elif elem.tag.endswith("}creator"):
+                    meta["author"] = elem.text
+                elif elem.tag.endswith("}description"):
+                    meta["description"] = elem.text
+    return {"text": "".join(text_parts), "found_body": found_body, "meta": meta}
+
+
+def analyze_svg_structure(svg_text: str) -> Dict[str, Any]:
+    """Element counts and common diagram markers of an SVG document."""
+    elements = _SVG_ELEMENT.findall(svg_text)
+    element_counts: Dict[str, int] = {}
+    for element in elements:
+        element_counts[element] = element_counts.get(element, 0) + 1
+
+    return {
+        "elements": list(element_counts.keys()),
+        "element_counts": element_counts,
+        "has_arrows": bool(_SVG_ARROW.search(svg_text)),
+        "has_shapes": any(
+            shape in element_counts
+            for shape in ("rect", "circle", "ellipse", "polygon")
+        ),
+        "has_paths": "path" in element_counts,
+        "total_elements": len(elements),
+        "summary": f"SVG with {len(elements)} elements including {', '.join(list(element_counts.keys())[:5])}",
+    }
+
+
+def extract_svg(source: Source) -> Dict[str, Any]:
+    svg_text = read_text(source)
+    text_elements = _SVG_TEXT.findall(svg_text)
+    extracted = " ".join(
+        [
+            *_SVG_TITLE.findall(svg_text),
+            *_SVG_DESC.findall(svg_text),
+            *[text.strip() for text in text_elements if text.strip()],
+        ]
+    )
+    return {
+        "text": svg_text[:1000],  # prompt excerpt for the description
+        "extracted_text": extracted,
+        "text_elements": text_elements,
+        "structure_info": analyze_svg_structure(svg_text),
+    }
+
+
+def extract_drawio(source: Source) -> Dict[str, Any]:
+    import xml.etree.ElementTree as ET
+
+    drawio_text = read_text(source)
+    root = ET.fromstring(drawio_text)
+    total = 0
+    text_elements = []
+    for elem in root.iter():
+        total += 1
+        if elem.text and elem.text.strip():
+            text_elements.append(elem.text.strip())
+    return {
+        "text": drawio_text[:1000],
+        "text_elements": text_elements,
+        "structure_info": {
+            "total_elements": total,
+            "text_elements": len(text_elements),
+            "pages": len(root.findall(".//diagram")),
+        },
+    }
+
+
+def extract_text(source: Source) -> Dict[str, Any]:
+    """UTF-8 text if the file is text, else its digest (generic files)."""
+    if _is_bytes(source):
+        data = bytes(source)
+    else:
+        with open(source, "rb") as fh:
+            data = fh.read()
+    try:
+        text: Optional[str] = data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = None
+    return {"text": text, "md5": hashlib.md5(data).hexdigest()}
+
+
+EXTRACTORS = {
+    "image": extract_image,
+    "pdf": extract_pdf,
+    "docx": extract_docx,
+    "svg": extract_svg,
+    "drawio": extract_drawio,
+    "text": extract_text,
+}
+
+
+def extract(kind: str, source: Source) -> Dict[str, Any]:
+    """Process-pool entry point: run the extractor registered for *kind*."""
+    return EXTRACTORS[kind](source)
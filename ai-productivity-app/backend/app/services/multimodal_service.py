@@ -1,30 +1,121 @@
-"""Multi-modal document support for images, diagrams, and other media."""
+"""Multi-modal document support for images, diagrams, and other media.
+
+Ingestion is split in three stages so that large uploads never stall the
+event loop that also serves chat traffic:
+
+* **Extraction** – PIL header parsing and PDF/DOCX/SVG/draw.io scanning –
+  lives in :mod:`app.services.multimodal_extract`.  Files larger than
+  ``MULTIMODAL_INLINE_BYTES`` go to a bounded process pool (at most
+  ``MULTIMODAL_WORKERS`` processes, with a matching cap on queued jobs);
+  smaller ones run in a thread, where IPC would cost more than the work.
+  Hashing always runs in a thread: ``hashlib`` releases the GIL, and
+  pickling the payload to a worker would cost more than the digest.
+* **Caching** – extraction results, together with the LLM description of
+  diagrams, are stored under the SHA-256 of the content (in process and in
+  Redis), so re-uploaded screenshots and diagrams are never processed twice.
+* **Rendering** – the searchable text depends on the file name as well, so
+  it is rebuilt from the cached record on every call; it is cheap.
+"""
 
 import asyncio
-import base64
-import io
+import json
 import logging
 import mimetypes
+import os
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple, Union
-import hashlib
+from typing import Dict, Optional, Any, Union
+
+from app.services import multimodal_extract
+
+logger = logging.getLogger(__name__)
+
+MULTIMODAL_WORKERS = int(os.getenv("MULTIMODAL_WORKERS", "2"))
+MULTIMODAL_INLINE_BYTES = int(os.getenv("MULTIMODAL_INLINE_BYTES", str(256 * 1024)))
+MULTIMODAL_MAX_FILE_BYTES = int(
+    os.getenv("MULTIMODAL_MAX_FILE_BYTES", str(10 * 1024 * 1024))
+)
+MULTIMODAL_CACHE_ENTRIES = int(os.getenv("MULTIMODAL_CACHE_ENTRIES", "512"))
+MULTIMODAL_CACHE_TTL = int(os.getenv("MULTIMODAL_CACHE_TTL", str(7 * 24 * 3600)))
 
-try:
-    from PIL import Image, ImageDraw, ImageFont
+# Bump when an extractor's output changes so stale cache entries are ignored
+CACHE_VERSION = 1
 
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
+
+def _pil_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+PIL_AVAILABLE = _pil_available()
+if not PIL_AVAILABLE:
     logger.warning("PIL not available - image processing will be limited")
 
-from sqlalchemy.orm import Session
-from app.models.code_document import CodeDocument
-from app.services.embedding_service import embedding_service
-from app.llm.client import llm_client
-from app.core.config import settings
 
-logger = logging.getLogger(__name__)
+class ExtractionCache:
+    """Content-hash → extraction record, in process (LRU) and in Redis."""
+
+    def __init__(self, max_entries: int = MULTIMODAL_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._local: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(digest: str, kind: str) -> str:
+        return f"multimodal:v{CACHE_VERSION}:{kind}:{digest}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._local.get(key)
+            if record is not None:
+                self._local.move_to_end(key)
+        if record is None:
+            record = await self._redis_get(key)
+            if record is not None:
+                self._remember(key, record)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    async def set(self, key: str, record: Dict[str, Any]) -> None:
+        self._remember(key, record)
+        try:
+            from app.utils.redis_client import get_redis
+
+            redis = await get_redis()
+            await redis.set(key, json.dumps(record), ex=MULTIMODAL_CACHE_TTL)
+        except Exception as exc:  # noqa: BLE001 – the cache is best-effort
+            logger.debug("Multimodal cache write skipped: %s", exc)
+
+    def _remember(self, key: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._local[key] = record
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    async def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            from app.utils.redis_client import get_redis
+
+            redis = await get_redis()
+            raw = await redis.get(key)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Multimodal cache read skipped: %s", exc)
+            return None
+        return json.loads(raw) if raw else None
 
 
 class MultiModalProcessor:
@@ -44,31 +135,70 @@ class MultiModalProcessor:
             ".svg",
             ".drawio",
             ".mermaid",
+            ".mmd",
             ".puml",
             ".plantuml",
         }
         self.supported_document_types = {".pdf", ".docx", ".pptx", ".xlsx"}
-        self.max_image_size = (1920, 1080)  # Max resolution for processing
-        self.max_file_size = 10 * 1024 * 1024  # 10MB limit
-
+        self.max_file_size = MULTIMODAL_MAX_FILE_BYTES
+        self.inline_bytes = MULTIMODAL_INLINE_BYTES
+
+        self.cache = ExtractionCache()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # Bounds jobs queued on the pool (and the payloads they pin in memory);
+        # created on the running loop by ``_slots``
+        self._pool_slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ------------------------------------------------------------------ API
     async def process_file(
-        self, file_path: str, content: bytes, mime_type: Optional[str] = None
+        self,
+        file_path: str,
+        content: Optional[bytes] = None,
+        mime_type: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Process a multi-modal file and extract knowledge."""
+        """Process a multi-modal file and extract knowledge.
+
+        Pass the upload's *content*, or leave it ``None`` to read *file_path*
+        from disk inside the extractor (memory-mapped where it helps).
+        """
         if not mime_type:
             mime_type, _ = mimetypes.guess_type(file_path)
 
         file_ext = Path(file_path).suffix.lower()
+        source: Union[bytes, str] = content if content is not None else file_path
 
         try:
-            if file_ext in self.supported_image_types:
-                return await self._process_image(file_path, content, mime_type)
-            elif file_ext in self.supported_diagram_types:
-                return await self._process_diagram(file_path, content, mime_type)
-            elif file_ext in self.supported_document_types:
-                return await self._process_document(file_path, content, mime_type)
-            else:
-                return await self._process_generic_file(file_path, content, mime_type)
+            size = len(content) if content is not None else os.path.getsize(file_path)
+            if size > self.max_file_size:
+                return self._create_fallback_result(
+                    file_path,
+                    f"File is {size} bytes; the limit is {self.max_file_size} bytes",
+                )
+
+            kind = self._kind(file_ext)
+            if kind == "document":
+                return self._render_document_metadata(file_path, mime_type, size)
+            if kind == "image" and not PIL_AVAILABLE:
+                return self._create_fallback_result(
+                    file_path, "Image processing unavailable"
+                )
+
+            digest = await asyncio.to_thread(multimodal_extract.content_hash, source)
+            cache_key = ExtractionCache.key(digest, kind)
+            record = await self.cache.get(cache_key)
+            if record is None:
+                try:
+                    record = await self._analyse(kind, source, size)
+                except Exception as e:
+                    logger.error(f"{kind} processing failed for {file_path}: {e}")
+                    return self._create_fallback_result(
+                        file_path, f"{kind.upper()} processing error: {e}"
+                    )
+                await self.cache.set(cache_key, record)
+
+            return self._render(kind, file_path, mime_type, size, record)
 
         except Exception as e:
             logger.error(f"Failed to process file {file_path}: {e}")
@@ -79,260 +209,244 @@ class MultiModalProcessor:
                 "metadata": {"file_path": file_path, "mime_type": mime_type},
             }
 
-    async def _process_image(
-        self, file_path: str, content: bytes, mime_type: str
+    async def shutdown(self) -> None:
+        """Stop the worker processes (application shutdown)."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+
+    # ------------------------------------------------------------ execution
+    def _kind(self, file_ext: str) -> str:
+        if file_ext in self.supported_image_types:
+            return "image"
+        if file_ext == ".svg":
+            return "svg"
+        if file_ext == ".drawio":
+            return "drawio"
+        if file_ext in {".mermaid", ".mmd"}:
+            return "mermaid"
+        if file_ext in {".puml", ".plantuml"}:
+            return "plantuml"
+        if file_ext == ".pdf":
+            return "pdf"
+        if file_ext == ".docx":
+            return "docx"
+        if file_ext in self.supported_document_types:
+            return "document"
+        return "text"
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=MULTIMODAL_WORKERS)
+            return self._pool
+
+    def _slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._pool_slots is None or self._slots_loop is not loop:
+            self._pool_slots = asyncio.Semaphore(MULTIMODAL_WORKERS * 2)
+            self._slots_loop = loop
+        return self._pool_slots
+
+    async def _run(self, fn, source: Union[bytes, str], size: int, *args):
+        """Run CPU-bound *fn(*args, source)* off the event loop, size-aware."""
+        call_args = (*args, source)
+        if size <= self.inline_bytes:
+            return await asyncio.to_thread(fn, *call_args)
+
+        async with self._slots():
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_pool(), fn, *call_args)
+            except BrokenProcessPool:
+                # A worker died (OOM, segfault in a decoder): start a fresh
+                # pool for the next job and finish this one in a thread.
+                logger.warning("Multimodal process pool broke; recreating")
+                with self._pool_lock:
+                    self._pool = None
+                return await asyncio.to_thread(fn, *call_args)
+
+    async def _analyse(
+        self, kind: str, source: Union[bytes, str], size: int
     ) -> Dict[str, Any]:
-        """Process image files using vision models."""
-        if not PIL_AVAILABLE:
-            return self._create_fallback_result(
-                file_path, "Image processing unavailable"
-            )
-
-        try:
-            # Load and analyze image
-            image = Image.open(io.BytesIO(content))
-            image_info = self._analyze_image(image)
-
-            # Extract text using vision model if available
-            extracted_text = await self._extract_text_from_image(content, file_path)
-
-            # Generate description using vision model
-            description = await self._describe_image(content, file_path)
-
-            # Create searchable content
-            searchable_content = self._create_image_searchable_content(
-                file_path, description, extracted_text, image_info
-            )
-
+        """Content-derived facts for *kind* – the part worth caching."""
+        if kind in ("mermaid", "plantuml"):
+            text = await self._run(multimodal_extract.read_text, source, size)
+            if kind == "mermaid":
+                info = self._parse_mermaid_syntax(text)
+                label = "Mermaid diagram"
+            else:
+                info = self._parse_plantuml_syntax(text)
+                label = "PlantUML diagram"
             return {
-                "success": True,
-                "content_type": "image",
-                "extracted_text": searchable_content,
-                "metadata": {
-                    "file_path": file_path,
-                    "mime_type": mime_type,
-                    "image_info": image_info,
-                    "description": description,
-                    "ocr_text": extracted_text,
-                    "processing_method": "vision_model",
-                },
+                "text": text,
+                "diagram_info": info,
+                "description": await self._describe_diagram(text, label, info),
             }
 
-        except Exception as e:
-            logger.error(f"Image processing failed for {file_path}: {e}")
-            return self._create_fallback_result(
-                file_path, f"Image processing error: {e}"
+        record = await self._run(multimodal_extract.extract, source, size, kind)
+        if kind == "svg":
+            record["description"] = await self._describe_diagram(
+                record["text"], "SVG diagram", record["structure_info"]
             )
-
-    async def _process_diagram(
-        self, file_path: str, content: bytes, mime_type: str
-    ) -> Dict[str, Any]:
-        """Process diagram files (SVG, PlantUML, Mermaid, etc.)."""
-        file_ext = Path(file_path).suffix.lower()
-
-        try:
-            if file_ext == ".svg":
-                return await self._process_svg(file_path, content)
-            elif file_ext in {".mermaid", ".mmd"}:
-                return await self._process_mermaid(file_path, content)
-            elif file_ext in {".puml", ".plantuml"}:
-                return await self._process_plantuml(file_path, content)
-            elif file_ext == ".drawio":
-                return await self._process_drawio(file_path, content)
-            else:
-                return self._create_fallback_result(
-                    file_path, "Unsupported diagram format"
-                )
-
-        except Exception as e:
-            logger.error(f"Diagram processing failed for {file_path}: {e}")
-            return self._create_fallback_result(
-                file_path, f"Diagram processing error: {e}"
+        elif kind == "drawio":
+            record["description"] = await self._describe_diagram(
+                record["text"], "Draw.io diagram", record["structure_info"]
             )
+        return record
 
-    async def _process_svg(self, file_path: str, content: bytes) -> Dict[str, Any]:
-        """Process SVG diagrams."""
-        try:
-            svg_text = content.decode("utf-8")
-
-            # Extract text content from SVG
-            import re
-
-            text_pattern = r"<text[^>]*>(.*?)</text>"
-            title_pattern = r"<title[^>]*>(.*?)</title>"
-            desc_pattern = r"<desc[^>]*>(.*?)</desc>"
+    # ------------------------------------------------------------ rendering
+    def _render(
+        self,
+        kind: str,
+        file_path: str,
+        mime_type: Optional[str],
+        size: int,
+        record: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        if kind == "image":
+            return self._render_image(file_path, mime_type, record)
+        if kind == "svg":
+            return self._render_svg(file_path, record)
+        if kind == "mermaid":
+            return self._render_mermaid(file_path, record)
+        if kind == "plantuml":
+            return self._render_plantuml(file_path, record)
+        if kind == "drawio":
+            return self._render_drawio(file_path, record)
+        if kind == "pdf":
+            return self._render_pdf(file_path, size, record)
+        if kind == "docx":
+            return self._render_docx(file_path, size, record)
+        return self._render_generic(file_path, mime_type, size, record)
+
+    def _render_image(
+        self, file_path: str, mime_type: Optional[str], record: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Image metadata plus text and description from one header parse."""
+        image_info = record["image_info"]
+        extracted_text = record["exif_text"] or self._text_from_filename(file_path)
+        description = self._describe_image(file_path, image_info)
 
-            text_elements = re.findall(
-                text_pattern, svg_text, re.DOTALL | re.IGNORECASE
-            )
-            titles = re.findall(title_pattern, svg_text, re.DOTALL | re.IGNORECASE)
-            descriptions = re.findall(desc_pattern, svg_text, re.DOTALL | re.IGNORECASE)
-
-            # Combine extracted text
-            extracted_text = " ".join(
-                [
-                    *titles,
-                    *descriptions,
-                    *[text.strip() for text in text_elements if text.strip()],
-                ]
-            )
+        searchable_content = self._create_image_searchable_content(
+            file_path, description, extracted_text, image_info
+        )
 
-            # Analyze SVG structure
-            structure_info = self._analyze_svg_structure(svg_text)
+        return {
+            "success": True,
+            "content_type": "image",
+            "extracted_text": searchable_content,
+            "metadata": {
+                "file_path": file_path,
+                "mime_type": mime_type,
+                "image_info": image_info,
+                "description": description,
+                "ocr_text": extracted_text,
+                "processing_method": "vision_model",
+            },
+        }
 
-            # Generate comprehensive description
-            diagram_description = await self._describe_diagram(
-                svg_text, "SVG diagram", structure_info
-            )
+    def _render_svg(self, file_path: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        structure_info = record["structure_info"]
+        diagram_description = record["description"]
 
-            searchable_content = f"""
+        searchable_content = f"""
 SVG Diagram: {file_path}
 
 Description: {diagram_description}
 
-Text Content: {extracted_text}
+Text Content: {record['extracted_text']}
 
 Structure: {structure_info['summary']}
 
 Elements: {', '.join(structure_info['elements'])}
 """
 
-            return {
-                "success": True,
-                "content_type": "diagram",
-                "extracted_text": searchable_content.strip(),
-                "metadata": {
-                    "file_path": file_path,
-                    "diagram_type": "svg",
-                    "structure_info": structure_info,
-                    "description": diagram_description,
-                    "text_elements": text_elements,
-                    "processing_method": "svg_parser",
-                },
-            }
-
-        except Exception as e:
-            logger.error(f"SVG processing failed: {e}")
-            return self._create_fallback_result(file_path, f"SVG processing error: {e}")
-
-    async def _process_mermaid(self, file_path: str, content: bytes) -> Dict[str, Any]:
-        """Process Mermaid diagrams."""
-        try:
-            mermaid_text = content.decode("utf-8")
-
-            # Parse Mermaid syntax
-            diagram_info = self._parse_mermaid_syntax(mermaid_text)
+        return {
+            "success": True,
+            "content_type": "diagram",
+            "extracted_text": searchable_content.strip(),
+            "metadata": {
+                "file_path": file_path,
+                "diagram_type": "svg",
+                "structure_info": structure_info,
+                "description": diagram_description,
+                "text_elements": record["text_elements"],
+                "processing_method": "svg_parser",
+            },
+        }
 
-            # Generate description
-            description = await self._describe_diagram(
-                mermaid_text, "Mermaid diagram", diagram_info
-            )
+    def _render_mermaid(
+        self, file_path: str, record: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        diagram_info = record["diagram_info"]
+        description = record["description"]
 
-            searchable_content = f"""
+        searchable_content = f"""
 Mermaid Diagram: {file_path}
 
 Type: {diagram_info['type']}
 Description: {description}
 
 Content:
-{mermaid_text}
+{record['text']}
 
 Nodes: {', '.join(diagram_info.get('nodes', []))}
 Relationships: {len(diagram_info.get('edges', []))} connections
 """
 
-            return {
-                "success": True,
-                "content_type": "diagram",
-                "extracted_text": searchable_content.strip(),
-                "metadata": {
-                    "file_path": file_path,
-                    "diagram_type": "mermaid",
-                    "diagram_info": diagram_info,
-                    "description": description,
-                    "processing_method": "mermaid_parser",
-                },
-            }
-
-        except Exception as e:
-            logger.error(f"Mermaid processing failed: {e}")
-            return self._create_fallback_result(
-                file_path, f"Mermaid processing error: {e}"
-            )
-
-    async def _process_plantuml(self, file_path: str, content: bytes) -> Dict[str, Any]:
-        """Process PlantUML diagrams."""
-        try:
-            plantuml_text = content.decode("utf-8")
-
-            # Parse PlantUML syntax
-            diagram_info = self._parse_plantuml_syntax(plantuml_text)
+        return {
+            "success": True,
+            "content_type": "diagram",
+            "extracted_text": searchable_content.strip(),
+            "metadata": {
+                "file_path": file_path,
+                "diagram_type": "mermaid",
+                "diagram_info": diagram_info,
+                "description": description,
+                "processing_method": "mermaid_parser",
+            },
+        }
 
-            # Generate description
-            description = await self._describe_diagram(
-                plantuml_text, "PlantUML diagram", diagram_info
-            )
+    def _render_plantuml(
+        self, file_path: str, record: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        diagram_info = record["diagram_info"]
+        description = record["description"]
 
-            searchable_content = f"""
+        searchable_content = f"""
 PlantUML Diagram: {file_path}
 
 Type: {diagram_info['type']}
 Description: {description}
 
 Content:
-{plantuml_text}
+{record['text']}
 
 Components: {', '.join(diagram_info.get('components', []))}
 Relationships: {len(diagram_info.get('relationships', []))} connections
 """
 
-            return {
-                "success": True,
-                "content_type": "diagram",
-                "extracted_text": searchable_content.strip(),
-                "metadata": {
-                    "file_path": file_path,
-                    "diagram_type": "plantuml",
-                    "diagram_info": diagram_info,
-                    "description": description,
-                    "processing_method": "plantuml_parser",
-                },
-            }
-
-        except Exception as e:
-            logger.error(f"PlantUML processing failed: {e}")
-            return self._create_fallback_result(
-                file_path, f"PlantUML processing error: {e}"
-            )
-
-    async def _process_drawio(self, file_path: str, content: bytes) -> Dict[str, Any]:
-        """Process Draw.io diagrams."""
-        try:
-            # Draw.io files are XML-based
-            import xml.etree.ElementTree as ET
-
-            drawio_text = content.decode("utf-8")
-            root = ET.fromstring(drawio_text)
-
-            # Extract text from draw.io elements
-            text_elements = []
-            for elem in root.iter():
-                if elem.text and elem.text.strip():
-                    text_elements.append(elem.text.strip())
-
-            # Analyze structure
-            structure_info = {
-                "total_elements": len(list(root.iter())),
-                "text_elements": len(text_elements),
-                "pages": len(root.findall(".//diagram")),
-            }
+        return {
+            "success": True,
+            "content_type": "diagram",
+            "extracted_text": searchable_content.strip(),
+            "metadata": {
+                "file_path": file_path,
+                "diagram_type": "plantuml",
+                "diagram_info": diagram_info,
+                "description": description,
+                "processing_method": "plantuml_parser",
+            },
+        }
 
-            # Generate description
-            description = await self._describe_diagram(
-                drawio_text, "Draw.io diagram", structure_info
-            )
+    def _render_drawio(self, file_path: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        structure_info = record["structure_info"]
+        text_elements = record["text_elements"]
+        description = record["description"]
 
-            searchable_content = f"""
+        searchable_content = f"""
 Draw.io Diagram: {file_path}
 
 Description: {description}
@@ -342,106 +456,61 @@ Text Elements: {' | '.join(text_elements)}
 Structure: {structure_info['total_elements']} total elements, {structure_info['pages']} pages
 """
 
-            return {
-                "success": True,
-                "content_type": "diagram",
-                "extracted_text": searchable_content.strip(),
-                "metadata": {
-                    "file_path": file_path,
-                    "diagram_type": "drawio",
-                    "structure_info": structure_info,
-                    "description": description,
-                    "text_elements": text_elements,
-                    "processing_method": "xml_parser",
-                },
-            }
-
-        except Exception as e:
-            logger.error(f"Draw.io processing failed: {e}")
-            return self._create_fallback_result(
-                file_path, f"Draw.io processing error: {e}"
-            )
+        return {
+            "success": True,
+            "content_type": "diagram",
+            "extracted_text": searchable_content.strip(),
+            "metadata": {
+                "file_path": file_path,
+                "diagram_type": "drawio",
+                "structure_info": structure_info,
+                "description": description,
+                "text_elements": text_elements,
+                "processing_method": "xml_parser",
+            },
+        }
 
-    async def _process_document(
-        self, file_path: str, content: bytes, mime_type: str
+    def _render_document_metadata(
+        self, file_path: str, mime_type: Optional[str], size: int
     ) -> Dict[str, Any]:
-        """Process document files (PDF, Word, etc.)."""
+        """Document types without an extractor (pptx, xlsx): metadata only."""
         file_ext = Path(file_path).suffix.lower()
-
-        try:
-            if file_ext == ".pdf":
-                return await self._process_pdf(file_path, content)
-            elif file_ext == ".docx":
-                return await self._process_docx(file_path, content)
-            else:
-                # For unsupported document types, extract basic metadata
-                searchable_content = f"""
+        searchable_content = f"""
 Document: {file_path}
 Type: {mime_type or 'unknown document'}
-Size: {len(content)} bytes
+Size: {size} bytes
 
 This document type is not fully supported for text extraction.
 File extension: {file_ext}
 """
-                return {
-                    "success": True,
-                    "content_type": "document",
-                    "extracted_text": searchable_content.strip(),
-                    "metadata": {
-                        "file_path": file_path,
-                        "mime_type": mime_type,
-                        "file_size": len(content),
-                        "processing_method": "metadata_only",
-                    },
-                }
-
-        except Exception as e:
-            logger.error(f"Document processing failed for {file_path}: {e}")
-            return self._create_fallback_result(
-                file_path, f"Document processing error: {e}"
-            )
-
-    async def _process_pdf(self, file_path: str, content: bytes) -> Dict[str, Any]:
-        """Process PDF documents with text extraction."""
-        try:
-            # Try to extract text using basic text extraction
-            # In a production environment, you'd use libraries like PyPDF2, pdfplumber, or pymupdf
-
-            # For now, we'll simulate PDF text extraction
-            # This would be replaced with actual PDF processing
-
-            # Check if it's a text-based PDF by looking for common PDF markers
-            content_str = content.decode(
-                "latin-1", errors="ignore"
-            )  # PDFs use latin-1 encoding
-
-            # Extract basic metadata from PDF structure
-            title_match = re.search(r"/Title\s*\(([^)]+)\)", content_str)
-            author_match = re.search(r"/Author\s*\(([^)]+)\)", content_str)
-
-            title = title_match.group(1) if title_match else Path(file_path).stem
-            author = author_match.group(1) if author_match else "Unknown"
-
-            # Simple text extraction by looking for readable text patterns
-            # This is a basic approximation - real implementation would use proper PDF libraries
-            text_content = ""
+        return {
+            "success": True,
+            "content_type": "document",
+            "extracted_text": searchable_content.strip(),
+            "metadata": {
+                "file_path": file_path,
+                "mime_type": mime_type,
+                "file_size": size,
+                "processing_method": "metadata_only",
+            },
+        }
 
-            # Look for text objects in PDF
-            text_objects = re.findall(r"BT\s+.*?ET", content_str, re.DOTALL)
-            for obj in text_objects[:10]:  # Limit to first 10 text objects
-                # Extract text between parentheses (simplified)
-                texts = re.findall(r"\(([^)]+)\)", obj)
-                text_content += " ".join(texts) + " "
+    def _render_pdf(
+        self, file_path: str, size: int, record: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        title = record["title"] or Path(file_path).stem
+        author = record["author"] or "Unknown"
+        text_content = record["text"]
 
-            # If no text found, indicate it might be image-based
-            if not text_content.strip():
-                text_content = f"PDF document '{title}' - text extraction may require OCR for image-based content."
+        # If no text found, indicate it might be image-based
+        if not text_content.strip():
+            text_content = f"PDF document '{title}' - text extraction may require OCR for image-based content."
 
-            searchable_content = f"""
+        searchable_content = f"""
 PDF Document: {file_path}
 Title: {title}
 Author: {author}
-Size: {len(content)} bytes
+Size: {size} bytes
 
 Content:
 {text_content[:2000]}...
@@ -449,78 +518,38 @@ Content:
 This is a PDF document that may contain additional text, images, or formatted content.
 """
 
-            return {
-                "success": True,
-                "content_type": "document",
-                "extracted_text": searchable_content.strip(),
-                "metadata": {
-                    "file_path": file_path,
-                    "document_type": "pdf",
-                    "title": title,
-                    "author": author,
-                    "file_size": len(content),
-                    "processing_method": "basic_pdf_extraction",
-                },
-            }
-
-        except Exception as e:
-            logger.error(f"PDF processing failed: {e}")
-            return self._create_fallback_result(file_path, f"PDF processing error: {e}")
-
-    async def _process_docx(self, file_path: str, content: bytes) -> Dict[str, Any]:
-        """Process Word documents with text extraction."""
-        try:
-            # Word documents are actually ZIP files containing XML
-            import zipfile
-            import xml.etree.ElementTree as ET
-
-            # Extract text from DOCX
-            text_content = ""
-            metadata = {"file_path": file_path, "document_type": "docx"}
-
-            with zipfile.ZipFile(io.BytesIO(content), "r") as docx_zip:
-                # Read document.xml which contains the main text
-                try:
-                    doc_xml = docx_zip.read("word/document.xml")
-                    root = ET.fromstring(doc_xml)
-
-                    # Extract all text elements
-                    # Word XML uses namespaces, so we look for text elements
-                    for elem in root.iter():
-                        if elem.tag.endswith("}t"):  # Text elements end with }t
-                            if elem.text:
-                                text_content += elem.text + " "
-
-                except KeyError:
-                    # If document.xml not found, try to extract any readable content
-                    text_content = "DOCX structure detected but text extraction failed."
+        return {
+            "success": True,
+            "content_type": "document",
+            "extracted_text": searchable_content.strip(),
+            "metadata": {
+                "file_path": file_path,
+                "document_type": "pdf",
+                "title": title,
+                "author": author,
+                "file_size": size,
+                "processing_method": "basic_pdf_extraction",
+            },
+        }
 
-                # Try to extract metadata from core.xml
-                try:
-                    core_xml = docx_zip.read("docProps/core.xml")
-                    core_root = ET.fromstring(core_xml)
-
-                    for elem in core_root.iter():
-                        if elem.tag.endswith("}title") and elem.text:
-                            metadata["title"] = elem.text
-                        elif elem.tag.endswith("}creator") and elem.text:
-                            metadata["author"] = elem.text
-                        elif elem.tag.endswith("}description") and elem.text:
-                            metadata["description"] = elem.text
-
-                except KeyError:
-                    pass  # Metadata extraction is optional
-
-            if not text_content.strip():
-                text_content = (
-                    "Word document detected but text content could not be extracted."
-                )
+    def _render_docx(
+        self, file_path: str, size: int, record: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        metadata = {"file_path": file_path, "document_type": "docx"}
+        metadata.update(record["meta"])
+        text_content = record["text"]
+        if not record["found_body"]:
+            text_content = "DOCX structure detected but text extraction failed."
+        elif not text_content.strip():
+            text_content = (
+                "Word document detected but text content could not be extracted."
+            )
 
-            searchable_content = f"""
+        searchable_content = f"""
 Word Document: {file_path}
 Title: {metadata.get('title', Path(file_path).stem)}
 Author: {metadata.get('author', 'Unknown')}
-Size: {len(content)} bytes
+Size: {size} bytes
 
 Content:
 {text_content[:2000]}...
@@ -528,53 +557,39 @@ Content:
 This is a Microsoft Word document.
 """
 
-            metadata.update(
-                {"file_size": len(content), "processing_method": "docx_xml_extraction"}
-            )
+        metadata.update({"file_size": size, "processing_method": "docx_xml_extraction"})
 
+        return {
+            "success": True,
+            "content_type": "document",
+            "extracted_text": searchable_content.strip(),
+            "metadata": metadata,
+        }
+
+    def _render_generic(
+        self,
+        file_path: str,
+        mime_type: Optional[str],
+        size: int,
+        record: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Unsupported file types: text if decodable, else basic metadata."""
+        text_content = record["text"]
+        if text_content and text_content.strip():
             return {
                 "success": True,
-                "content_type": "document",
-                "extracted_text": searchable_content.strip(),
-                "metadata": metadata,
+                "content_type": "text",
+                "extracted_text": text_content,
+                "metadata": {
+                    "file_path": file_path,
+                    "mime_type": mime_type,
+                    "processing_method": "text_decode",
+                },
             }
 
-        except Exception as e:
-            logger.error(f"DOCX processing failed: {e}")
-            return self._create_fallback_result(
-                file_path, f"DOCX processing error: {e}"
-            )
+        file_info = {"size": size, "hash": record["md5"], "is_binary": True}
 
-    async def _process_generic_file(
-        self, file_path: str, content: bytes, mime_type: str
-    ) -> Dict[str, Any]:
-        """Process unsupported file types with basic metadata extraction."""
-        try:
-            # Try to decode as text
-            try:
-                text_content = content.decode("utf-8")
-                if len(text_content.strip()) > 0:
-                    return {
-                        "success": True,
-                        "content_type": "text",
-                        "extracted_text": text_content,
-                        "metadata": {
-                            "file_path": file_path,
-                            "mime_type": mime_type,
-                            "processing_method": "text_decode",
-                        },
-                    }
-            except UnicodeDecodeError:
-                pass
-
-            # Fallback to binary analysis
-            file_info = {
-                "size": len(content),
-                "hash": hashlib.md5(content).hexdigest(),
-                "is_binary": True,
-            }
-
-            searchable_content = f"""
+        searchable_content = f"""
 File: {file_path}
 Type: {mime_type or 'unknown'}
 Size: {file_info['size']} bytes
@@ -583,61 +598,78 @@ Hash: {file_info['hash']}
 This is a binary file that cannot be processed for text content.
 """
 
-            return {
-                "success": True,
-                "content_type": "binary",
-                "extracted_text": searchable_content.strip(),
-                "metadata": {
-                    "file_path": file_path,
-                    "mime_type": mime_type,
-                    "file_info": file_info,
-                    "processing_method": "binary_analysis",
-                },
-            }
-
-        except Exception as e:
-            return self._create_fallback_result(
-                file_path, f"Generic processing error: {e}"
-            )
-
-    def _analyze_image(self, image: Image.Image) -> Dict[str, Any]:
-        """Analyze image properties."""
         return {
-            "width": image.width,
-            "height": image.height,
-            "mode": image.mode,
-            "format": image.format,
-            "has_transparency": image.mode in ("RGBA", "LA"),
-            "aspect_ratio": round(image.width / image.height, 2),
-            "megapixels": round((image.width * image.height) / 1000000, 2),
+            "success": True,
+            "content_type": "binary",
+            "extracted_text": searchable_content.strip(),
+            "metadata": {
+                "file_path": file_path,
+                "mime_type": mime_type,
+                "file_info": file_info,
+                "processing_method": "binary_analysis",
+            },
         }
 
-    def _analyze_svg_structure(self, svg_text: str) -> Dict[str, Any]:
-        """Analyze SVG structure and elements."""
-        import re
-
-        # Count different element types
-        elements = re.findall(r"<(\w+)[^>]*>", svg_text)
-        element_counts = {}
-        for element in elements:
-            element_counts[element] = element_counts.get(element, 0) + 1
-
-        # Look for common diagram patterns
-        has_arrows = bool(re.search(r"marker|arrow", svg_text, re.IGNORECASE))
-        has_shapes = any(
-            shape in elements for shape in ["rect", "circle", "ellipse", "polygon"]
-        )
-        has_paths = "path" in elements
-
-        return {
-            "elements": list(element_counts.keys()),
-            "element_counts": element_counts,
-            "has_arrows": has_arrows,
-            "has_shapes": has_shapes,
-            "has_paths": has_paths,
-            "total_elements": len(elements),
-            "summary": f"SVG with {len(elements)} elements including {', '.join(list(element_counts.keys())[:5])}",
-        }
+    # -------------------------------------------------------------- helpers
+    def _text_from_filename(self, file_path: str) -> str:
+        """Readable words from the file name when the image carries no text."""
+        filename = Path(file_path).stem
+
+        # If filename contains meaningful text, use it
+        if len(filename) > 3 and not filename.isdigit():
+            # Convert camelCase and snake_case to readable text
+            readable_name = re.sub(r"([a-z])([A-Z])", r"\1 \2", filename)
+            readable_name = readable_name.replace("_", " ").replace("-", " ")
+            return f"Image filename suggests content: {readable_name}"
+
+        return ""  # No text found
+
+    def _describe_image(self, file_path: str, image_info: Dict[str, Any]) -> str:
+        """Describe an image from its header facts and file name."""
+        width, height = image_info["width"], image_info["height"]
+        mode = image_info["mode"]
+        format_name = image_info["format"] or "Unknown"
+
+        # Determine image characteristics
+        aspect_ratio = width / height if height else 0.0
+        megapixels = (width * height) / 1000000
+
+        # Analyze image content based on properties
+        description_parts = [f"{format_name} image"]
+
+        if aspect_ratio > 2:
+            description_parts.append("wide banner or panoramic format")
+        elif aspect_ratio < 0.5:
+            description_parts.append("tall or portrait format")
+        else:
+            description_parts.append("standard rectangular format")
+
+        if megapixels > 10:
+            description_parts.append("high resolution")
+        elif megapixels < 0.5:
+            description_parts.append("low resolution or thumbnail")
+
+        # Analyze filename for context
+        filename = Path(file_path).stem.lower()
+
+        if any(word in filename for word in ["diagram", "chart", "graph", "plot"]):
+            description_parts.append("likely contains charts or diagrams")
+        elif any(
+            word in filename for word in ["screenshot", "screen", "ui", "interface"]
+        ):
+            description_parts.append("appears to be a user interface screenshot")
+        elif any(word in filename for word in ["logo", "icon", "button"]):
+            description_parts.append("appears to be a logo or icon")
+        elif any(word in filename for word in ["architecture", "flow", "design"]):
+            description_parts.append("likely shows system architecture or design")
+
+        # Color analysis
+        if mode == "L":
+            description_parts.append("grayscale image")
+        elif mode == "RGBA":
+            description_parts.append("with transparency")
+
+        return f"{Path(file_path).name}: {', '.join(description_parts)} ({width}x{height} pixels)"
 
     def _parse_mermaid_syntax(self, mermaid_text: str) -> Dict[str, Any]:
         """Parse Mermaid diagram syntax."""
@@ -711,157 +743,46 @@ This is a binary file that cannot be processed for text content.
             "total_lines": len(lines),
         }
 
-    async def _extract_text_from_image(self, content: bytes, file_path: str) -> str:
-        """Extract text from image using OCR or vision models."""
-        try:
-            # Basic text extraction attempt
-            # In production, this would use Tesseract OCR, Google Vision API, or similar
-
-            # For now, we'll look for any embedded text in image metadata
-            # and provide a meaningful fallback
-
-            if PIL_AVAILABLE:
-                try:
-                    image = Image.open(io.BytesIO(content))
-
-                    # Check EXIF data for any text information
-                    exif_data = {}
-                    if hasattr(image, "_getexif") and image._getexif():
-                        exif_data = image._getexif()
-
-                    # Look for common text fields in EXIF
-                    text_fields = []
-                    for tag_id in [270, 271, 272]:  # ImageDescription, Make, Model
-                        if tag_id in exif_data:
-                            text_fields.append(str(exif_data[tag_id]))
-
-                    if text_fields:
-                        return " ".join(text_fields)
-
-                except Exception:
-                    pass  # Continue to fallback
-
-            # Fallback: analyze filename for text content
-            filename = Path(file_path).stem
-
-            # If filename contains meaningful text, use it
-            if len(filename) > 3 and not filename.isdigit():
-                # Convert camelCase and snake_case to readable text
-                readable_name = re.sub(r"([a-z])([A-Z])", r"\1 \2", filename)
-                readable_name = readable_name.replace("_", " ").replace("-", " ")
-                return f"Image filename suggests content: {readable_name}"
+    def _create_image_searchable_content(
+        self,
+        file_path: str,
+        description: str,
+        ocr_text: str,
+        image_info: Dict[str, Any],
+    ) -> str:
+        """Create searchable content for images."""
+        return f"""
+Image: {file_path}
 
-            return ""  # No text found
+Description: {description}
 
-        except Exception as e:
-            logger.error(f"Text extraction from image failed: {e}")
-            return ""
+Extracted Text: {ocr_text}
 
-    async def _describe_image(self, content: bytes, file_path: str) -> str:
-        """Generate description of image using vision models."""
-        try:
-            # Analyze image properties for description
-            if PIL_AVAILABLE:
-                try:
-                    image = Image.open(io.BytesIO(content))
-                    width, height = image.size
-                    mode = image.mode
-                    format_name = image.format or "Unknown"
-
-                    # Determine image characteristics
-                    aspect_ratio = width / height
-                    megapixels = (width * height) / 1000000
-
-                    # Analyze image content based on properties
-                    description_parts = [f"{format_name} image"]
-
-                    if aspect_ratio > 2:
-                        description_parts.append("wide banner or panoramic format")
-                    elif aspect_ratio < 0.5:
-                        description_parts.append("tall or portrait format")
-                    else:
-                        description_parts.append("standard rectangular format")
-
-                    if megapixels > 10:
-                        description_parts.append("high resolution")
-                    elif megapixels < 0.5:
-                        description_parts.append("low resolution or thumbnail")
-
-                    # Analyze filename for context
-                    filename = Path(file_path).stem.lower()
-
-                    if any(
-                        word in filename
-                        for word in ["diagram", "chart", "graph", "plot"]
-                    ):
-                        description_parts.append("likely contains charts or diagrams")
-                    elif any(
-                        word in filename
-                        for word in ["screenshot", "screen", "ui", "interface"]
-                    ):
-                        description_parts.append(
-                            "appears to be a user interface screenshot"
-                        )
-                    elif any(word in filename for word in ["logo", "icon", "button"]):
-                        description_parts.append("appears to be a logo or icon")
-                    elif any(
-                        word in filename for word in ["architecture", "flow", "design"]
-                    ):
-                        description_parts.append(
-                            "likely shows system architecture or design"
-                        )
-
-                    # Color analysis
-                    if mode == "L":
-                        description_parts.append("grayscale image")
-                    elif mode == "RGBA":
-                        description_parts.append("with transparency")
-
-                    return f"{Path(file_path).name}: {', '.join(description_parts)} ({width}x{height} pixels)"
+Properties: {image_info['width']}x{image_info['height']} pixels, {image_info['format']} format
 
-                except Exception as e:
-                    logger.debug(f"PIL analysis failed: {e}")
-
-            # Fallback description based on filename analysis
-            filename = Path(file_path).stem.lower()
-            file_ext = Path(file_path).suffix.lower()
-
-            if file_ext in [".png", ".jpg", ".jpeg"]:
-                base_desc = "Digital image"
-            elif file_ext in [".svg"]:
-                base_desc = "Vector graphic"
-            elif file_ext in [".gif"]:
-                base_desc = "Animated image"
-            else:
-                base_desc = "Image file"
-
-            # Enhanced filename analysis
-            context_clues = []
-            if "api" in filename:
-                context_clues.append("API-related")
-            if any(word in filename for word in ["test", "spec", "example"]):
-                context_clues.append("test or example content")
-            if any(word in filename for word in ["error", "exception", "fail"]):
-                context_clues.append("error or failure documentation")
-            if any(word in filename for word in ["flow", "process", "workflow"]):
-                context_clues.append("process or workflow diagram")
-
-            if context_clues:
-                return (
-                    f"{base_desc}: {Path(file_path).name} - {', '.join(context_clues)}"
-                )
-            else:
-                return f"{base_desc}: {Path(file_path).name}"
+Type: Visual content, {image_info.get('megapixels', 0)}MP image
+""".strip()
 
-        except Exception as e:
-            logger.error(f"Image description failed: {e}")
-            return f"Image: {Path(file_path).name}"
+    def _create_fallback_result(self, file_path: str, error_msg: str) -> Dict[str, Any]:
+        """Create fallback result for failed processing."""
+        return {
+            "success": False,
+            "content_type": "unknown",
+            "extracted_text": f"File: {file_path}\nProcessing failed: {error_msg}",
+            "metadata": {
+                "file_path": file_path,
+                "error": error_msg,
+                "processing_method": "fallback",
+            },
+        }
 
     async def _describe_diagram(
         self, content: str, diagram_type: str, structure_info: Dict[str, Any]
     ) -> str:
         """Generate description of diagram using LLM."""
         try:
+            from app.llm.client import llm_client
+
             prompt = f"""Analyze this {diagram_type} and provide a brief description:
 
 Content:
@@ -887,39 +808,6 @@ Provide a 2-3 sentence description of what this diagram shows and its purpose.""
 
         return f"{diagram_type} with {structure_info.get('total_elements', 'unknown')} elements"
 
-    def _create_image_searchable_content(
-        self,
-        file_path: str,
-        description: str,
-        ocr_text: str,
-        image_info: Dict[str, Any],
-    ) -> str:
-        """Create searchable content for images."""
-        return f"""
-Image: {file_path}
-
-Description: {description}
-
-Extracted Text: {ocr_text}
-
-Properties: {image_info['width']}x{image_info['height']} pixels, {image_info['format']} format
-
-Type: Visual content, {image_info.get('megapixels', 0)}MP image
-""".strip()
-
-    def _create_fallback_result(self, file_path: str, error_msg: str) -> Dict[str, Any]:
-        """Create fallback result for failed processing."""
-        return {
-            "success": False,
-            "content_type": "unknown",
-            "extracted_text": f"File: {file_path}\nProcessing failed: {error_msg}",
-            "metadata": {
-                "file_path": file_path,
-                "error": error_msg,
-                "processing_method": "fallback",
-            },
-        }
-
 
 # Global instance
 multimodal_processor = MultiModalProcessor()
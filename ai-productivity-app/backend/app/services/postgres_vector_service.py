@@ -73,7 +73,7 @@ from sqlalchemy.engine import Engine
 from pgvector.sqlalchemy import Vector
 
 from app.config import settings
-from app.database import get_engine_sync
+from app.database import engines
 
 # Avoid circular import - define protocol locally or use TYPE_CHECKING
 from typing import TYPE_CHECKING
@@ -90,8 +90,9 @@ class PostgresVectorService:
     def __init__(self) -> None:
         self.table_name: str = settings.postgres_vector_table
         self.vector_size: int = settings.embedding_vector_size
-        # Use synchronous engine with anyio.to_thread for async compatibility
-        self.engine: Engine = get_engine_sync(echo=False)
+        # Synchronous engine (used via anyio.to_thread) on the dedicated
+        # vector-search pool
+        self.engine: Engine = engines.sync("vector")
 
     # --------------------------------------------------------------------- #
     # Initialisation                                                        #
@@ -177,32 +178,46 @@ class PostgresVectorService:
         return "[" + ",".join(f"{x:.6f}" for x in vec) + "]"
 
     async def insert_embeddings(self, embeddings: List[Dict[str, Any]]) -> List[str]:
+        """Bulk insert; one multi-row ``INSERT … RETURNING`` per page of rows."""
+        if not embeddings:
+            return []
+
+        table = sa.table(
+            self.table_name,
+            sa.column("id"),
+            sa.column("document_id"),
+            sa.column("chunk_id"),
+            sa.column("project_id"),
+            sa.column("embedding"),
+            sa.column("content"),
+            sa.column("content_hash"),
+            sa.column("metadata"),
+        )
+        rows = [
+            {
+                "document_id": emb.get("document_id"),
+                "chunk_id": emb.get("chunk_id"),
+                "project_id": emb.get("project_id"),
+                "embedding": self._to_pgvector(emb["vector"]),
+                "content": emb.get("content", ""),
+                "content_hash": emb.get("content_hash", ""),
+                # The vector already has its own column
+                "metadata": json.dumps(
+                    {k: v for k, v in emb.items() if k != "vector"}, default=str
+                ),
+            }
+            for emb in embeddings
+        ]
+
         def _insert():
-            row_ids: List[str] = []
+            # SQLAlchemy batches executemany + RETURNING into multi-row
+            # INSERTs ("insertmanyvalues"), preserving row order
             with self.engine.begin() as conn:
-                for emb in embeddings:
-                    row = conn.execute(
-                        sa.text(
-                            f"""INSERT INTO {self.table_name}
-                                   (document_id, chunk_id, project_id,
-                                    embedding, content, content_hash, metadata)
-                                   VALUES
-                                   (:document_id, :chunk_id, :project_id,
-                                    :embedding, :content, :content_hash, :metadata)
-                                   RETURNING id"""
-                        ),
-                        {
-                            "document_id": emb.get("document_id"),
-                            "chunk_id": emb.get("chunk_id"),
-                            "project_id": emb.get("project_id"),
-                            "embedding": self._to_pgvector(emb["vector"]),
-                            "content": emb.get("content", ""),
-                            "content_hash": emb.get("content_hash", ""),
-                            "metadata": json.dumps(emb, default=str),
-                        },
-                    ).scalar_one()
-                    row_ids.append(str(row))
-            return row_ids
+                result = conn.execute(
+                    sa.insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                    rows,
+                )
+                return [str(row_id) for row_id in result.scalars()]
 
         return await anyio.to_thread.run_sync(_insert)
 
@@ -278,12 +293,24 @@ class PostgresVectorService:
     # Delete / stats                                                        #
     # --------------------------------------------------------------------- #
 
-    async def delete_by_document(self, document_id: int) -> None:
+    async def delete_by_document(
+        self, document_id: int, metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        where = ["document_id = :doc"]
+        params: Dict[str, Any] = {"doc": document_id}
+        # The caller's metadata is stored nested under the "metadata" key
+        for i, (key, value) in enumerate((metadata or {}).items()):
+            where.append(f"metadata->'metadata'->>:mk{i} = :mv{i}")
+            params[f"mk{i}"] = key
+            params[f"mv{i}"] = str(value)
+
         def _delete():
             with self.engine.begin() as conn:
                 conn.execute(
-                    sa.text(f"DELETE FROM {self.table_name} WHERE document_id = :doc"),
-                    {"doc": document_id},
+                    sa.text(
+                        f"DELETE FROM {self.table_name} WHERE {' AND '.join(where)}"
+                    ),
+                    params,
                 )
 
         await anyio.to_thread.run_sync(_delete)
@@ -1,19 +1,98 @@
-"""PostgreSQL-specific functions and utilities for advanced database operations."""
+"""PostgreSQL-specific functions and utilities for advanced database operations.
 
-from typing import List, Dict, Any, Optional, Tuple
+Query vectors are bound as float32 arrays: with psycopg 3 and pgvector's
+adapter registered on the connection they travel in pgvector's binary
+format, otherwise as a compact text literal.  Function arguments are typed
+``vector`` without a dimension – the configured
+``settings.embedding_vector_size`` is enforced when binding instead.
+"""
+
+from typing import List, Dict, Any, Optional, Sequence
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
 
+import numpy as np
+
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+_FUSED_SEARCH_SIGNATURE = (
+    "fused_code_search(text,vector,integer[],text,text,text[],"
+    "double precision,double precision,double precision,integer,integer)"
+)
+# Serialises concurrent installs of fused_code_search across replicas
+_FUSED_SEARCH_LOCK = 0x66757365
+
 
 class PostgreSQLFunctions:
     """PostgreSQL-specific database functions and utilities."""
 
-    def __init__(self, db: Session):
+    # Set once the fused search function is known to exist (per process)
+    _fused_search_ready = False
+
+    @classmethod
+    def install_fused_search(cls, engine: Optional[Engine] = None) -> bool:
+        """Create or replace ``fused_code_search`` on a connection of its own.
+
+        Runs once at startup, so search requests never issue DDL or commit
+        on their session.  Returns ``False`` on databases other than
+        PostgreSQL.
+        """
+        if engine is None:
+            from app.database import engines
+
+            engine = engines.sync("worker")
+        if engine.dialect.name != "postgresql":
+            return False
+        with engine.begin() as conn:
+            conn.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": _FUSED_SEARCH_LOCK}
+            )
+            conn.execute(text(cls.fused_search_ddl()))
+        cls._fused_search_ready = True
+        logger.info("Installed fused_code_search function")
+        return True
+
+    def __init__(self, db: Session, dimension: Optional[int] = None):
         self.db = db
         self.is_postgresql = db.bind.dialect.name == "postgresql"
+        self.dimension = dimension or settings.embedding_vector_size
+
+    def _vector_param(self, vector: Sequence[float]) -> Any:
+        """Bind value for a query vector of the configured dimension."""
+        array = np.asarray(vector, dtype=np.float32)
+        if array.shape != (self.dimension,):
+            raise ValueError(
+                f"Query vector has shape {array.shape}, expected ({self.dimension},)"
+            )
+        if self._register_vector_adapter():
+            return array
+        return "[" + ",".join(repr(x) for x in array.tolist()) + "]"
+
+    def _register_vector_adapter(self) -> bool:
+        """Register pgvector's (binary) adapter on this session's connection."""
+        connection = self.db.connection().connection
+        registered = connection.info.get("pgvector_adapter")
+        if registered is None:
+            registered = False
+            try:
+                dbapi = connection.dbapi_connection
+                if type(dbapi).__module__.startswith("psycopg."):
+                    from pgvector.psycopg import register_vector
+                elif type(dbapi).__module__.startswith("psycopg2"):
+                    from pgvector.psycopg2 import register_vector
+                else:
+                    register_vector = None
+                if register_vector is not None:
+                    register_vector(dbapi)
+                    registered = True
+            except Exception as exc:  # noqa: BLE001 – fall back to text
+                logger.debug("pgvector adapter unavailable: %s", exc)
+            connection.info["pgvector_adapter"] = registered
+        return registered
 
     def create_advanced_functions(self):
         """Create advanced PostgreSQL functions for enhanced search and analytics."""
@@ -26,7 +105,7 @@ class PostgreSQLFunctions:
             text(
                 """
             CREATE OR REPLACE FUNCTION find_similar_code(
-                query_vector vector(1536),
+                query_vector vector,
                 project_filter int[] DEFAULT NULL,
                 language_filter text DEFAULT NULL,
                 similarity_threshold float DEFAULT 0.8,
@@ -72,7 +151,7 @@ class PostgreSQLFunctions:
                 """
             CREATE OR REPLACE FUNCTION hybrid_code_search(
                 search_query text,
-                query_vector vector(1536) DEFAULT NULL,
+                query_vector vector DEFAULT NULL,
                 project_filter int[] DEFAULT NULL,
                 vector_weight float DEFAULT 0.6,
                 text_weight float DEFAULT 0.4,
@@ -144,6 +223,8 @@ class PostgreSQLFunctions:
             )
         )
 
+        self.create_fused_search_function()
+
         # Function for advanced chat search with context
         self.db.execute(
             text(
@@ -351,9 +432,9 @@ class PostgreSQLFunctions:
 
         result = self.db.execute(
             text(
-                """
+                f"""
             SELECT * FROM find_similar_code(
-                :query_vector::vector(1536),
+                CAST(:query_vector AS vector({self.dimension})),
                 :project_filter,
                 :language_filter,
                 :similarity_threshold,
@@ -362,7 +443,7 @@ class PostgreSQLFunctions:
         """
             ),
             {
-                "query_vector": str(query_vector),
+                "query_vector": self._vector_param(query_vector),
                 "project_filter": project_ids,
                 "language_filter": language,
                 "similarity_threshold": threshold,
@@ -370,7 +451,7 @@ class PostgreSQLFunctions:
             },
         )
 
-        return [dict(row) for row in result]
+        return [dict(row._mapping) for row in result]
 
     def hybrid_search(
         self,
@@ -387,10 +468,10 @@ class PostgreSQLFunctions:
 
         result = self.db.execute(
             text(
-                """
+                f"""
             SELECT * FROM hybrid_code_search(
                 :search_query,
-                :query_vector::vector(1536),
+                CAST(:query_vector AS vector({self.dimension})),
                 :project_filter,
                 :vector_weight,
                 :text_weight,
@@ -400,7 +481,9 @@ class PostgreSQLFunctions:
             ),
             {
                 "search_query": query,
-                "query_vector": str(query_vector) if query_vector else None,
+                "query_vector": (
+                    self._vector_param(query_vector) if query_vector else None
+                ),
                 "project_filter": project_ids,
                 "vector_weight": vector_weight,
                 "text_weight": text_weight,
@@ -408,7 +491,210 @@ class PostgreSQLFunctions:
             },
         )
 
-        return [dict(row) for row in result]
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def fused_search_ddl() -> str:
+        """``CREATE OR REPLACE`` for ``fused_code_search``: semantic,
+        full-text and symbol candidates fused server-side in one round-trip.
+
+        Semantic candidates come from the pgvector table the vector service
+        writes (``settings.postgres_vector_table``); full-text and symbol
+        candidates from ``code_embeddings``.  Every modality is cut to
+        ``candidate_limit`` rows before fusing; a chunk scores the best of
+        its weighted modality scores, as in ``HybridSearch._rank_and_dedupe``.
+        """
+        table = settings.postgres_vector_table
+        return f"""
+            CREATE OR REPLACE FUNCTION fused_code_search(
+                search_query text,
+                query_vector vector DEFAULT NULL,
+                project_filter int[] DEFAULT NULL,
+                language_filter text DEFAULT NULL,
+                path_pattern text DEFAULT NULL,
+                symbol_names text[] DEFAULT NULL,
+                semantic_weight float DEFAULT 0.5,
+                keyword_weight float DEFAULT 0.3,
+                structural_weight float DEFAULT 0.2,
+                candidate_limit int DEFAULT 50,
+                result_limit int DEFAULT 20
+            )
+            RETURNS TABLE(
+                document_id int,
+                chunk_id int,
+                score float,
+                semantic_score float,
+                keyword_score float,
+                structural_score float,
+                content text,
+                metadata jsonb
+            ) AS $$
+            BEGIN
+                RETURN QUERY
+                WITH semantic AS (
+                    SELECT
+                        v.document_id AS doc_id,
+                        v.chunk_id AS chk_id,
+                        (1 - (v.embedding <=> query_vector))::float AS s,
+                        v.content AS body,
+                        v.metadata AS meta
+                    FROM {table} v
+                    WHERE
+                        query_vector IS NOT NULL
+                        AND semantic_weight > 0
+                        AND (project_filter IS NULL OR v.project_id = ANY(project_filter))
+                        AND (language_filter IS NULL OR v.metadata->>'language' = language_filter)
+                        AND (path_pattern IS NULL OR v.metadata->>'file_path' LIKE path_pattern)
+                    ORDER BY v.embedding <=> query_vector
+                    LIMIT candidate_limit
+                ),
+                chunks AS (
+                    SELECT
+                        ce.document_id AS doc_id,
+                        ce.id AS chk_id,
+                        ce.chunk_content AS body,
+                        ce.symbol_name,
+                        to_tsvector('ai_english', ce.chunk_content || ' ' || COALESCE(ce.symbol_name, '')) AS doc_tsv,
+                        jsonb_build_object(
+                            'file_path', cd.file_path,
+                            'language', cd.language,
+                            'symbol_name', ce.symbol_name,
+                            'symbol_type', ce.symbol_type,
+                            'start_line', ce.start_line,
+                            'end_line', ce.end_line
+                        ) AS meta
+                    FROM code_embeddings ce
+                    JOIN code_documents cd ON ce.document_id = cd.id
+                    WHERE
+                        (project_filter IS NULL OR cd.project_id = ANY(project_filter))
+                        AND (language_filter IS NULL OR cd.language = language_filter)
+                        AND (path_pattern IS NULL OR cd.file_path LIKE path_pattern)
+                ),
+                keyword AS (
+                    SELECT c.doc_id, c.chk_id,
+                        ts_rank(c.doc_tsv, plainto_tsquery('ai_english', search_query))::float AS s,
+                        c.body, c.meta
+                    FROM chunks c
+                    WHERE keyword_weight > 0
+                        AND c.doc_tsv @@ plainto_tsquery('ai_english', search_query)
+                    ORDER BY s DESC
+                    LIMIT candidate_limit
+                ),
+                structural AS (
+                    SELECT c.doc_id, c.chk_id, 1.0::float AS s, c.body, c.meta
+                    FROM chunks c
+                    WHERE structural_weight > 0
+                        AND symbol_names IS NOT NULL
+                        AND c.symbol_name = ANY(symbol_names)
+                    LIMIT candidate_limit
+                ),
+                candidates AS (
+                    SELECT doc_id, chk_id, s AS sem, 0::float AS kw, 0::float AS st, body, meta FROM semantic
+                    UNION ALL
+                    SELECT doc_id, chk_id, 0, s, 0, body, meta FROM keyword
+                    UNION ALL
+                    SELECT doc_id, chk_id, 0, 0, s, body, meta FROM structural
+                ),
+                fused AS (
+                    SELECT
+                        doc_id, chk_id,
+                        max(sem) AS sem, max(kw) AS kw, max(st) AS st,
+                        (array_agg(body))[1] AS body,
+                        (array_agg(meta))[1] AS meta
+                    FROM candidates
+                    GROUP BY doc_id, chk_id
+                )
+                SELECT
+                    f.doc_id, f.chk_id,
+                    GREATEST(
+                        f.sem * semantic_weight,
+                        f.kw * keyword_weight,
+                        f.st * structural_weight
+                    ) AS score,
+                    f.sem, f.kw, f.st, f.body, f.meta
+                FROM fused f
+                ORDER BY score DESC
+                LIMIT result_limit;
+            END;
+            $$ LANGUAGE plpgsql STABLE;
+        """
+
+    def create_fused_search_function(self) -> None:
+        """Create ``fused_code_search`` on this session's connection."""
+        self.db.execute(text(self.fused_search_ddl()))
+
+    def has_fused_search(self) -> bool:
+        """Whether ``fused_code_search`` exists (see :meth:`install_fused_search`)."""
+        if not self.is_postgresql:
+            return False
+        if not PostgreSQLFunctions._fused_search_ready:
+            PostgreSQLFunctions._fused_search_ready = bool(
+                self.db.execute(
+                    text("SELECT to_regprocedure(:signature) IS NOT NULL"),
+                    {"signature": _FUSED_SEARCH_SIGNATURE},
+                ).scalar()
+            )
+        return PostgreSQLFunctions._fused_search_ready
+
+    def fused_search(
+        self,
+        query: str,
+        query_vector: Optional[Sequence[float]] = None,
+        project_ids: Optional[List[int]] = None,
+        language: Optional[str] = None,
+        path_pattern: Optional[str] = None,
+        symbol_names: Optional[List[str]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        candidates: int = 50,
+        limit: int = 20,
+    ) -> List[Dict]:
+        """Semantic, full-text and symbol search fused in one round-trip.
+
+        Parameters are cast explicitly: psycopg 3 sends typed values (e.g.
+        ``int8`` for Python ints) that would otherwise not resolve the
+        function signature.  The call runs in a savepoint, so a failure
+        leaves the caller's transaction usable.
+        """
+        if not self.has_fused_search():
+            return []
+
+        weights = weights or {}
+        with self.db.begin_nested():
+            result = self.db.execute(
+                text(
+                    f"""
+            SELECT * FROM fused_code_search(
+                CAST(:search_query AS text),
+                CAST(:query_vector AS vector({self.dimension})),
+                CAST(:project_filter AS int[]),
+                CAST(:language_filter AS text),
+                CAST(:path_pattern AS text),
+                CAST(:symbol_names AS text[]),
+                CAST(:semantic_weight AS float),
+                CAST(:keyword_weight AS float),
+                CAST(:structural_weight AS float),
+                CAST(:candidate_limit AS int),
+                CAST(:result_limit AS int)
+            )
+        """
+                ),
+                {
+                    "search_query": query,
+                    "query_vector": (
+                        self._vector_param(query_vector) if query_vector else None
+                    ),
+                    "project_filter": project_ids or None,
+                    "language_filter": language,
+                    "path_pattern": path_pattern,
+                    "symbol_names": symbol_names or None,
+                    "semantic_weight": weights.get("semantic", 0.0),
+                    "keyword_weight": weights.get("keyword", 0.0),
+                    "structural_weight": weights.get("structural", 0.0),
+                    "candidate_limit": max(candidates, limit),
+                    "result_limit": limit,
+                },
+            )
+            return [dict(row._mapping) for row in result]
 
     def search_chat_with_context(
         self,
@@ -498,13 +784,29 @@ class PostgreSQLFunctions:
 
         return [dict(row) for row in result]
 
-    def refresh_materialized_views(self):
-        """Refresh all materialized views for updated analytics."""
+    def refresh_materialized_views(self, concurrently: bool = True):
+        """Refresh all materialized views for updated analytics.
+
+        ``CONCURRENTLY`` (possible thanks to the views' unique indexes) keeps
+        them readable during the refresh; a view that was never populated
+        falls back to a plain refresh.
+        """
         if not self.is_postgresql:
             return
 
-        self.db.execute(text("REFRESH MATERIALIZED VIEW project_analytics"))
-        self.db.commit()
+        for view in ("project_analytics",):
+            if self.db.execute(text("SELECT to_regclass(:v)"), {"v": view}).scalar() is None:
+                continue
+            if concurrently:
+                try:
+                    self.db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+                    self.db.commit()
+                    continue
+                except Exception as exc:  # noqa: BLE001
+                    self.db.rollback()
+                    logger.info("Concurrent refresh of %s failed (%s), retrying", view, exc)
+            self.db.execute(text(f"REFRESH MATERIALIZED VIEW {view}"))
+            self.db.commit()
         logger.info("Materialized views refreshed")
 
     def get_performance_metrics(self) -> Dict[str, Any]:
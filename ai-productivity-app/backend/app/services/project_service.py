@@ -4,10 +4,10 @@ Handles complex project operations, timeline tracking, and statistics.
 """
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
+from sqlalchemy import or_
 from typing import List, Optional
 
-from app.models.project import Project, ProjectStatus
+from app.models.project import Project, ProjectStatsRollup, ProjectStatus
 from app.models.timeline import TimelineEvent
 from app.schemas.project import (
     ProjectCreate,
@@ -16,6 +16,7 @@ from app.schemas.project import (
     ProjectStats,
     TimelineEventCreate,
 )
+from app.services import project_stats
 
 
 class ProjectService:
@@ -163,38 +164,28 @@ class ProjectService:
         # Get total count
         total = query.count()
 
-        # Apply pagination
+        # Apply pagination – stats come from the rollup in the same query
         offset = (filters.page - 1) * filters.per_page
-        projects = query.offset(offset).limit(filters.per_page).all()
+        rows = (
+            query.outerjoin(
+                ProjectStatsRollup, ProjectStatsRollup.project_id == Project.id
+            )
+            .add_entity(ProjectStatsRollup)
+            .offset(offset)
+            .limit(filters.per_page)
+            .all()
+        )
 
-        # Load statistics for each project
-        for project in projects:
-            project.stats = self._get_project_stats(project.id)
+        projects = []
+        for project, rollup in rows:
+            project.stats = project_stats.to_schema(rollup)
+            projects.append(project)
 
         return projects, total
 
-    def _get_project_stats(self, project_id: int) -> ProjectStats:
-        """Calculate statistics for a project."""
-        # Count timeline events
-        event_count = (
-            self.db.query(func.count(TimelineEvent.id))
-            .filter(TimelineEvent.project_id == project_id)
-            .scalar()
-        )
-
-        # Get last activity
-        last_event = (
-            self.db.query(TimelineEvent.created_at)
-            .filter(TimelineEvent.project_id == project_id)
-            .order_by(TimelineEvent.created_at.desc())
-            .first()
-        )
-
-        return ProjectStats(
-            files=0,  # Will be implemented in Phase 4
-            timeline_events=event_count or 0,
-            last_activity=last_event[0] if last_event else None,
-        )
+    def get_project_stats(self, project_id: int) -> ProjectStats:
+        """Return the rolled-up statistics for a project."""
+        return project_stats.get_stats(self.db, project_id)
 
     def add_timeline_event(
         self, project_id: int, event_data: TimelineEventCreate, user_id: int
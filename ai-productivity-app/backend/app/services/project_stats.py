@@ -0,0 +1,360 @@
+# backend/app/services/project_stats.py
+"""Per-project statistics rollup (``project_stats`` table).
+
+The project list used to run two aggregate queries *per project* on every
+page (timeline count + last activity) and never reported files at all.  The
+numbers now live in one denormalised row per project that is read with a
+single join.
+
+The row is maintained in two ways:
+
+* **Incrementally** – an ``after_flush`` hook on every ORM session turns the
+  inserts/deletes of ``CodeDocument``, ``CodeEmbedding`` and
+  ``TimelineEvent`` (and ``is_indexed``/``file_size`` changes) into
+  ``col = col + delta`` updates inside the *same* transaction.  All writers
+  (uploads, git import, the embedding worker, chat and timeline services)
+  go through the ORM, so none of them needs to know about the rollup.
+* **Reconciliation** – a background job recounts everything from the source
+  tables every ``PROJECT_STATS_RECONCILE_INTERVAL`` seconds, repairing drift
+  caused by bulk/raw SQL writes that bypass the ORM.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import case, event, func, insert, inspect, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.models.code import CodeDocument, CodeEmbedding
+from app.models.project import Project, ProjectStatsRollup
+from app.models.timeline import TimelineEvent
+from app.schemas.project import ProjectStats
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL_SECONDS = float(
+    os.getenv("PROJECT_STATS_RECONCILE_INTERVAL", "900")
+)
+
+_COUNTERS = (
+    "files",
+    "chunks",
+    "indexed_files",
+    "pending_files",
+    "timeline_events",
+    "storage_bytes",
+)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+
+def to_schema(row: Optional[ProjectStatsRollup]) -> ProjectStats:
+    """Convert a rollup row (or ``None`` for a missing row) to the API schema."""
+    if row is None:
+        return ProjectStats()
+    return ProjectStats(
+        files=row.files,
+        chunks=row.chunks,
+        indexed_files=row.indexed_files,
+        pending_files=row.pending_files,
+        timeline_events=row.timeline_events,
+        storage_bytes=row.storage_bytes,
+        last_activity=row.last_activity_at,
+    )
+
+
+def get_stats(db: Session, project_id: int) -> ProjectStats:
+    return to_schema(db.get(ProjectStatsRollup, project_id))
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance (ORM flush hook)
+# ---------------------------------------------------------------------------
+
+
+class _FlushDeltas:
+    """Counter deltas gathered from one flush, keyed by project id."""
+
+    def __init__(self):
+        self.counters: Dict[int, Counter] = defaultdict(Counter)
+        self.last_activity: Dict[int, datetime] = {}
+        self.new_projects: Set[int] = set()
+        self.dead_projects: Set[int] = set()
+        # Chunks whose document is not in the identity map: document_id → n
+        self.chunks_by_document: Counter = Counter()
+
+    def document(self, doc: CodeDocument, sign: int) -> None:
+        c = self.counters[doc.project_id]
+        c["files"] += sign
+        c["storage_bytes"] += sign * (doc.file_size or 0)
+        c["indexed_files" if doc.is_indexed else "pending_files"] += sign
+
+    def chunk(self, session: Session, chunk: CodeEmbedding, sign: int) -> None:
+        doc = session.identity_map.get(identity_key(CodeDocument, chunk.document_id))
+        if doc is not None:
+            self.counters[doc.project_id]["chunks"] += sign
+        else:
+            self.chunks_by_document[chunk.document_id] += sign
+
+    def timeline(self, ev: TimelineEvent, sign: int) -> None:
+        self.counters[ev.project_id]["timeline_events"] += sign
+        if sign > 0 and ev.created_at is not None:
+            prev = self.last_activity.get(ev.project_id)
+            if prev is None or ev.created_at > prev:
+                self.last_activity[ev.project_id] = ev.created_at
+
+    def document_changed(self, doc: CodeDocument) -> None:
+        state = inspect(doc)
+        indexed = state.attrs.is_indexed.history
+        if indexed.added and indexed.deleted:
+            was, now = bool(indexed.deleted[0]), bool(indexed.added[0])
+            if was != now:
+                c = self.counters[doc.project_id]
+                c["indexed_files"] += 1 if now else -1
+                c["pending_files"] += -1 if now else 1
+        size = state.attrs.file_size.history
+        if size.added and size.deleted:
+            self.counters[doc.project_id]["storage_bytes"] += (
+                size.added[0] or 0
+            ) - (size.deleted[0] or 0)
+
+
+def _collect(session: Session) -> _FlushDeltas:
+    deltas = _FlushDeltas()
+    for obj in session.new:
+        if isinstance(obj, Project):
+            deltas.new_projects.add(obj.id)
+        elif isinstance(obj, CodeDocument):
+            deltas.document(obj, 1)
+        elif isinstance(obj, CodeEmbedding):
+            deltas.chunk(session, obj, 1)
+        elif isinstance(obj, TimelineEvent):
+            deltas.timeline(obj, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            deltas.dead_projects.add(obj.id)
+        elif isinstance(obj, CodeDocument):
+            deltas.document(obj, -1)
+        elif isinstance(obj, CodeEmbedding):
+            deltas.chunk(session, obj, -1)
+        elif isinstance(obj, TimelineEvent):
+            deltas.timeline(obj, -1)
+    for obj in session.dirty:
+        if isinstance(obj, CodeDocument) and obj not in session.deleted:
+            deltas.document_changed(obj)
+    return deltas
+
+
+def _increments(counter: Counter) -> Dict[str, object]:
+    table = ProjectStatsRollup
+    return {
+        name: getattr(table, name) + delta
+        for name, delta in counter.items()
+        if delta and name in _COUNTERS
+    }
+
+
+def _apply(session: Session, deltas: _FlushDeltas) -> None:
+    table = ProjectStatsRollup
+    conn = session.connection()
+
+    if deltas.new_projects:
+        conn.execute(
+            insert(table), [{"project_id": pid} for pid in deltas.new_projects]
+        )
+
+    for pid in set(deltas.counters) | set(deltas.last_activity):
+        if pid is None or pid in deltas.dead_projects:
+            continue
+        values = _increments(deltas.counters.get(pid, Counter()))
+        ts = deltas.last_activity.get(pid)
+        if ts is not None:
+            col = table.last_activity_at
+            values["last_activity_at"] = case(
+                (or_(col.is_(None), col < ts), ts), else_=col
+            )
+        if values:
+            conn.execute(update(table).where(table.project_id == pid).values(**values))
+
+    for doc_id, delta in deltas.chunks_by_document.items():
+        if not delta:
+            continue
+        owner = (
+            select(CodeDocument.project_id)
+            .where(CodeDocument.id == doc_id)
+            .scalar_subquery()
+        )
+        conn.execute(
+            update(table)
+            .where(table.project_id == owner)
+            .values(chunks=table.chunks + delta)
+        )
+
+
+def _after_flush(session: Session, _flush_context) -> None:  # noqa: D401 – SQLA signature
+    """Translate the flushed changes into rollup counter updates."""
+    deltas = _collect(session)
+    if deltas.new_projects or deltas.counters or deltas.chunks_by_document:
+        _apply(session, deltas)
+
+
+# Registered on the Session *class* so every session – sync, the sync half of
+# AsyncSession, and test sessions – keeps the rollup current.
+event.listen(Session, "after_flush", _after_flush)
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# ``document_changed`` diffs attribute history, which only records the old
+# value if it was loaded.  Documents expired by a commit would otherwise change
+# ``is_indexed``/``file_size`` without a delta, so load it on assignment.
+for _attr in (CodeDocument.is_indexed, CodeDocument.file_size):
+    event.listen(_attr, "set", _load_previous_value, active_history=True)
+
+
+# ---------------------------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------------------------
+
+
+def _scoped(stmt, column, project_ids: Optional[List[int]]):
+    return stmt.where(column.in_(project_ids)) if project_ids is not None else stmt
+
+
+def reconcile(db: Session, project_ids: Optional[Iterable[int]] = None) -> int:
+    """Recount the rollup from the source tables; returns rows written.
+
+    Uses one grouped query per source table regardless of the number of
+    projects.  Rows for projects without one are created.
+    """
+    ids = list(project_ids) if project_ids is not None else None
+
+    project_rows = db.execute(_scoped(select(Project.id), Project.id, ids)).scalars()
+    fresh: Dict[int, Dict[str, object]] = {
+        pid: dict.fromkeys(_COUNTERS, 0) | {"project_id": pid, "last_activity_at": None}
+        for pid in project_rows
+    }
+    if not fresh:
+        return 0
+
+    docs = db.execute(
+        _scoped(
+            select(
+                CodeDocument.project_id,
+                func.count(CodeDocument.id),
+                func.sum(case((CodeDocument.is_indexed.is_(True), 1), else_=0)),
+                func.sum(func.coalesce(CodeDocument.file_size, 0)),
+            ),
+            CodeDocument.project_id,
+            ids,
+        ).group_by(CodeDocument.project_id)
+    )
+    for pid, files, indexed, size in docs:
+        if pid in fresh:
+            fresh[pid].update(
+                files=files,
+                indexed_files=indexed or 0,
+                pending_files=files - (indexed or 0),
+                storage_bytes=size or 0,
+            )
+
+    chunks = db.execute(
+        _scoped(
+            select(CodeDocument.project_id, func.count(CodeEmbedding.id)).join(
+                CodeDocument, CodeDocument.id == CodeEmbedding.document_id
+            ),
+            CodeDocument.project_id,
+            ids,
+        ).group_by(CodeDocument.project_id)
+    )
+    for pid, count in chunks:
+        if pid in fresh:
+            fresh[pid]["chunks"] = count
+
+    events = db.execute(
+        _scoped(
+            select(
+                TimelineEvent.project_id,
+                func.count(TimelineEvent.id),
+                func.max(TimelineEvent.created_at),
+            ),
+            TimelineEvent.project_id,
+            ids,
+        ).group_by(TimelineEvent.project_id)
+    )
+    for pid, count, last_at in events:
+        if pid in fresh:
+            fresh[pid].update(timeline_events=count, last_activity_at=last_at)
+
+    now = datetime.utcnow()
+    for row in fresh.values():
+        row["reconciled_at"] = now
+
+    existing = set(
+        db.execute(
+            select(ProjectStatsRollup.project_id).where(
+                ProjectStatsRollup.project_id.in_(list(fresh))
+            )
+        ).scalars()
+    )
+    updates = [row for pid, row in fresh.items() if pid in existing]
+    inserts = [row for pid, row in fresh.items() if pid not in existing]
+    if updates:
+        db.execute(update(ProjectStatsRollup), updates)
+    if inserts:
+        db.execute(insert(ProjectStatsRollup), inserts)
+    db.commit()
+    return len(fresh)
+
+
+def _reconcile_all() -> int:
+    from app.database import session_for
+
+    with session_for("analytics") as db:
+        return reconcile(db)
+
+
+class ProjectStatsReconciler:
+    """Background task that periodically runs :func:`reconcile`."""
+
+    def __init__(self, interval: float = RECONCILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="project-stats")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                count = await asyncio.to_thread(_reconcile_all)
+                logger.debug("Reconciled stats for %d projects", count)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Project stats reconciliation failed: %s", exc)
+            await asyncio.sleep(self.interval)
+
+
+project_stats_reconciler = ProjectStatsReconciler()
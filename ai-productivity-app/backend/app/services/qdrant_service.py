@@ -164,18 +164,25 @@ class QdrantService:
         ]
 
     @VECTOR_DELETE_LAT.time()
-    async def delete_by_document(self, document_id: int) -> None:
+    async def delete_by_document(
+        self, document_id: int, metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
         """Delete vectors associated with a specific document ID."""
+        must = [
+            models.FieldCondition(
+                key="document_id", match=models.MatchValue(value=document_id)
+            )
+        ]
+        for key, value in (metadata or {}).items():
+            must.append(
+                models.FieldCondition(
+                    key=f"metadata.{key}", match=models.MatchValue(value=value)
+                )
+            )
         await _run_blocking(
             self.client.delete,
             collection_name=self.collection_name,
-            points_selector=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="document_id", match=models.MatchValue(value=document_id)
-                    )
-                ]
-            ),
+            points_selector=models.Filter(must=must),
         )
         logger.info(
             "Removed vectors for document %s from '%s'",
@@ -1,226 +1,468 @@
-"""Advanced query expansion and semantic similarity service."""
+# backend/app/services/query_expansion.py
+"""Query expansion with bounded cost and latency.
+
+Two ways to produce alternative phrasings of a search query:
+
+``llm``
+    **One** structured call returns every variant – synonyms, technical
+    terms and context-aware rewrites – as JSON, instead of one call per
+    technique.
+``local``
+    No LLM at all: identifiers and terms that dominate the query's nearest
+    neighbours in the vector index (the semantic results the search already
+    holds) are turned into extra queries – pseudo-relevance feedback.
+
+Expansions are cached for ``QUERY_EXPANSION_CACHE_TTL`` seconds in a bounded
+in-process LRU and in Redis, so all workers share them.  Callers pass a
+latency *budget*: expansion is skipped when its recent latency would not
+fit and abandoned when it overruns.  Either way the LLM call runs (or keeps
+running) in the background, warming the cache for the next identical query
+and refreshing the latency estimate; at most ``QUERY_EXPANSION_MAX_BACKGROUND``
+skipped queries are warmed at a time.  The ``query_expansion_*`` Prometheus
+metrics count outcomes per mode and the results each technique adds that
+the original query did not find (:meth:`QueryExpansionService.record_gain`).
+"""
+
+from __future__ import annotations
 
 import asyncio
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-from collections import defaultdict
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-
-from app.llm.client import llm_client
-from app.services.embedding_service import embedding_service
-from app.core.config import settings
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.monitoring.metrics import (
+    query_expansion_latency_seconds,
+    query_expansion_new_results_total,
+    query_expansion_queries_total,
+    query_expansion_requests_total,
+)
 
 logger = logging.getLogger(__name__)
 
-
-class QueryExpansionService:
-    """Advanced query expansion using semantic similarity and LLM assistance."""
-
-    def __init__(self):
-        self.cache = {}  # Simple in-memory cache for expanded queries
-        self.synonym_cache = {}
-        self.max_expansions = 5
-        self.similarity_threshold = 0.7
-
-    async def expand_query(
+QUERY_EXPANSION_MODE = os.getenv("QUERY_EXPANSION_MODE", "local")  # off|local|llm
+QUERY_EXPANSION_MAX = int(os.getenv("QUERY_EXPANSION_MAX", "5"))
+QUERY_EXPANSION_CACHE_TTL = int(os.getenv("QUERY_EXPANSION_CACHE_TTL", "3600"))
+QUERY_EXPANSION_CACHE_ENTRIES = int(os.getenv("QUERY_EXPANSION_CACHE_ENTRIES", "2048"))
+QUERY_EXPANSION_MAX_BACKGROUND = int(os.getenv("QUERY_EXPANSION_MAX_BACKGROUND", "4"))
+CACHE_VERSION = 1
+
+MODES = ("off", "local", "llm")
+# Latency assumed before the first measurement (seconds).  Kept below the
+# search SLO (SEARCH_SLO_MS) so the first LLM calls run and get measured.
+_INITIAL_LATENCY = {"local": 0.005, "llm": 0.4}
+_EWMA_ALPHA = 0.2
+
+TECHNIQUE_CONFIDENCE = {
+    "technical": 0.9,
+    "context": 0.85,
+    "synonyms": 0.8,
+    "neighbour_symbols": 0.8,
+    "neighbour_terms": 0.7,
+}
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+_CAMEL_PART = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+_STOPWORDS = frozenset(
+    """
+    the and for with from that this are was were not but you your how what why
+    when where which who can use using into than then there their them these
+    those have has had does did get set let var const def class self return
+    import export function async await true false none null new try except
+    catch finally raise throw public private static void int str string bool
+    elif else while break continue pass yield lambda print
+    """.split()
+)
+
+
+def _identifier_words(text: str) -> set:
+    """Lower-cased identifiers of *text* and their snake/camel-case parts."""
+    words = set()
+    for ident in _IDENTIFIER.findall(text):
+        words.add(ident.lower())
+        for part in ident.split("_"):
+            words.update(p.lower() for p in _CAMEL_PART.findall(part))
+    return words
+
+
+def expand_from_neighbours(
+    query: str, neighbours: Sequence[Dict[str, Any]], limit: int = QUERY_EXPANSION_MAX
+) -> List[Dict[str, Any]]:
+    """Extra queries from the symbols and terms shared by *neighbours*.
+
+    Neighbours are weighted by rank (``1 / (rank + 1)``) so the score scale
+    of the vector backend does not matter.  Terms must occur in at least two
+    neighbours; a term seen once is more likely noise than vocabulary.
+    """
+    known = _identifier_words(query)
+    symbols: Dict[str, float] = defaultdict(float)
+    terms: Dict[str, float] = defaultdict(float)
+    term_df: Dict[str, int] = defaultdict(int)
+
+    for rank, hit in enumerate(neighbours):
+        weight = 1.0 / (rank + 1)
+        metadata = hit.get("metadata") or {}
+        symbol = metadata.get("symbol_name") or hit.get("symbol_name")
+        if symbol and not symbol.startswith("__") and symbol.lower() not in known:
+            symbols[symbol] += weight
+        for term in {t.lower() for t in _IDENTIFIER.findall(hit.get("content") or "")}:
+            if term in known or term in _STOPWORDS:
+                continue
+            terms[term] += weight
+            term_df[term] += 1
+
+    ranked_symbols = sorted(symbols, key=symbols.get, reverse=True)
+    ranked_terms = sorted(
+        (t for t in terms if term_df[t] >= 2), key=terms.get, reverse=True
+    )
+
+    expansions: List[Dict[str, Any]] = []
+    for symbol in ranked_symbols[: max(1, limit // 2)]:
+        expansions.append(
+            {
+                "query": symbol,
+                "technique": "neighbour_symbols",
+                "confidence": TECHNIQUE_CONFIDENCE["neighbour_symbols"],
+            }
+        )
+    for term in ranked_terms[: limit - len(expansions)]:
+        expansions.append(
+            {
+                "query": f"{query} {term}",
+                "technique": "neighbour_terms",
+                "confidence": TECHNIQUE_CONFIDENCE["neighbour_terms"],
+            }
+        )
+    return expansions
+
+
+_LLM_PROMPT = """Rewrite a search query for a code and documentation search engine.
+
+Query: "{query}"
+{extra}
+Reply with one JSON object and nothing else. Each key maps to a list of short
+alternative queries:
+- "synonyms": 3 rephrasings that use different words for the same meaning
+- "technical": 3 variants using precise technical terms, acronyms or identifiers
+{context_key}"""
+
+
+def build_llm_prompt(
+    query: str, context: Optional[str], domain_hints: Optional[List[str]]
+) -> str:
+    extra = []
+    if domain_hints:
+        extra.append(f"Domain: {', '.join(domain_hints)}")
+    if context:
+        extra.append(f'Context: "{context[:500]}"')
+    return _LLM_PROMPT.format(
+        query=query,
+        extra="\n".join(extra),
+        context_key=(
+            '- "context": 2 variants that make assumptions from the context explicit'
+            if context
+            else ""
+        ),
+    )
+
+
+def parse_llm_expansions(query: str, text: str) -> List[Dict[str, Any]]:
+    """Expansions from the JSON reply; plain lines count as synonyms."""
+    start, end = text.find("{"), text.rfind("}")
+    groups: Dict[str, Any] = {}
+    if start != -1 and end > start:
+        try:
+            groups = json.loads(text[start : end + 1])
+        except ValueError:
+            groups = {}
+    if not isinstance(groups, dict) or not groups:
+        groups = {"synonyms": text.splitlines()}
+
+    expansions = []
+    for technique, variants in groups.items():
+        if technique not in TECHNIQUE_CONFIDENCE or not isinstance(variants, list):
+            continue
+        for variant in variants:
+            variant = str(variant).strip().strip("-*\"' ")
+            if variant and variant.lower() != query.lower():
+                expansions.append(
+                    {
+                        "query": variant,
+                        "technique": technique,
+                        "confidence": TECHNIQUE_CONFIDENCE[technique],
+                    }
+                )
+    return expansions
+
+
+class ExpansionCache:
+    """Expansions by query, in process (bounded LRU + TTL) and in Redis."""
+
+    def __init__(
         self,
+        max_entries: int = QUERY_EXPANSION_CACHE_ENTRIES,
+        ttl: int = QUERY_EXPANSION_CACHE_TTL,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._local: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        mode: str,
         query: str,
         context: Optional[str] = None,
         domain_hints: Optional[List[str]] = None,
-    ) -> Dict[str, Any]:
-        """
-        Expand a query using multiple techniques:
-        1. Semantic synonyms and related terms
-        2. Technical term expansion
-        3. Context-aware expansion
-        4. Domain-specific expansion
-        """
-        cache_key = f"{query}:{context or ''}:{','.join(domain_hints or [])}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-
-        try:
-            # Generate multiple expansion strategies in parallel
-            tasks = [
-                self._expand_with_synonyms(query),
-                self._expand_with_technical_terms(query, domain_hints),
-                self._expand_with_context(query, context),
-                self._expand_with_semantic_similarity(query),
-            ]
-
-            expansions = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Combine and rank expansions
-            combined_expansions = self._combine_expansions(query, expansions)
-
-            result = {
-                "original_query": query,
-                "expanded_queries": combined_expansions[: self.max_expansions],
-                "expansion_metadata": {
-                    "techniques_used": ["synonyms", "technical", "context", "semantic"],
-                    "total_candidates": len(combined_expansions),
-                    "confidence_score": self._calculate_expansion_confidence(
-                        combined_expansions
-                    ),
-                },
-            }
-
-            self.cache[cache_key] = result
-            return result
-
-        except Exception as e:
-            logger.error(f"Query expansion failed: {e}")
-            return {
-                "original_query": query,
-                "expanded_queries": [query],
-                "expansion_metadata": {"error": str(e)},
-            }
-
-    async def _expand_with_synonyms(self, query: str) -> List[Dict[str, Any]]:
-        """Expand query using synonyms and related terms."""
-        if query in self.synonym_cache:
-            return self.synonym_cache[query]
-
+        scope: str = "",
+    ) -> str:
+        raw = "\x1f".join(
+            [query.strip().lower(), context or "", ",".join(domain_hints or []), scope]
+        )
+        digest = hashlib.sha256(raw.encode()).hexdigest()
+        return f"qexp:v{CACHE_VERSION}:{mode}:{digest}"
+
+    async def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        now = self.clock()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._local.move_to_end(key)
+                    return entry[1]
+                del self._local[key]
+        value = await self._redis_get(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    async def set(self, key: str, value: List[Dict[str, Any]]) -> None:
+        self._remember(key, value)
         try:
-            prompt = f"""Given the query: "{query}"
-            
-Generate 3-5 alternative phrasings that maintain the same meaning but use different words.
-Focus on:
-- Technical synonyms
-- Alternative terminology
-- Different ways to express the same concept
-
-Return only the alternative queries, one per line, without explanations."""
-
-            response = await llm_client.complete(
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=200,
-                temperature=0.3,
-            )
-
-            content = self._extract_content(response)
-            synonyms = [
-                {"query": line.strip(), "technique": "synonyms", "confidence": 0.8}
-                for line in content.split("\n")
-                if line.strip() and line.strip() != query
-            ]
-
-            self.synonym_cache[query] = synonyms
-            return synonyms
+            from app.utils.redis_client import get_redis
 
-        except Exception as e:
-            logger.error(f"Synonym expansion failed: {e}")
-            return []
+            redis = await get_redis()
+            await redis.set(key, json.dumps(value), ex=self.ttl)
+        except Exception as exc:  # noqa: BLE001 – the cache is best-effort
+            logger.debug("Query expansion cache write skipped: %s", exc)
 
-    async def _expand_with_technical_terms(
-        self, query: str, domain_hints: Optional[List[str]] = None
-    ) -> List[Dict[str, Any]]:
-        """Expand query with technical terms and domain-specific language."""
-        domain_context = (
-            f"Domain context: {', '.join(domain_hints)}" if domain_hints else ""
-        )
+    def _remember(self, key: str, value: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._local[key] = (self.clock() + self.ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
 
+    async def _redis_get(self, key: str) -> Optional[List[Dict[str, Any]]]:
         try:
-            prompt = f"""Given the query: "{query}"
-{domain_context}
+            from app.utils.redis_client import get_redis
 
-Generate 3-4 technical variations that:
-- Use more specific technical terminology
-- Include relevant acronyms or abbreviations
-- Add domain-specific context
-- Use formal/informal variations
+            redis = await get_redis()
+            raw = await redis.get(key)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Query expansion cache read skipped: %s", exc)
+            return None
+        return json.loads(raw) if raw else None
 
-Return only the technical variations, one per line."""
 
-            response = await llm_client.complete(
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=200,
-                temperature=0.4,
-            )
+class QueryExpansionService:
+    """Cached, budgeted query expansion (one LLM call or none)."""
+
+    def __init__(self, mode: str = QUERY_EXPANSION_MODE, cache=None, llm=None):
+        if mode not in MODES:
+            logger.warning("Unknown QUERY_EXPANSION_MODE %r, using 'local'", mode)
+            mode = "local"
+        self.mode = mode
+        self.max_expansions = QUERY_EXPANSION_MAX
+        self.cache = cache or ExpansionCache()
+        self._llm = llm
+        self._latency = dict(_INITIAL_LATENCY)
+        # Expansions being computed, by cache key (also keeps the tasks alive)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.gain: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"queries": 0, "new_results": 0}
+        )
 
-            content = self._extract_content(response)
-            technical_terms = [
-                {"query": line.strip(), "technique": "technical", "confidence": 0.9}
-                for line in content.split("\n")
-                if line.strip() and line.strip() != query
-            ]
+    @property
+    def llm(self):
+        if self._llm is None:
+            from app.llm.client import llm_client
 
-            return technical_terms
+            self._llm = llm_client
+        return self._llm
 
-        except Exception as e:
-            logger.error(f"Technical term expansion failed: {e}")
-            return []
+    def expected_latency(self, mode: Optional[str] = None) -> float:
+        """Recent latency of an uncached expansion (EWMA, seconds)."""
+        return self._latency.get(mode or self.mode, 0.0)
 
-    async def _expand_with_context(
-        self, query: str, context: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Expand query using contextual information."""
-        if not context:
-            return []
+    async def expand_query(
+        self,
+        query: str,
+        context: Optional[str] = None,
+        domain_hints: Optional[List[str]] = None,
+        *,
+        neighbours: Optional[Sequence[Dict[str, Any]]] = None,
+        scope: str = "",
+        budget: Optional[float] = None,
+        mode: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Alternative queries for *query* within *budget* seconds.
 
+        ``local`` mode needs the query's *neighbours* (search hits with
+        ``content``/``metadata``); *scope* keys the cache by what they were
+        drawn from (e.g. the project ids).  Never raises: failures, skips
+        and timeouts return no expansions and say why in
+        ``expansion_metadata["outcome"]``.
+        """
+        mode = mode or self.mode
+        started = time.monotonic()
+        if mode == "off":
+            return self._result(query, [], mode, "disabled", started)
+
+        key = ExpansionCache.key(mode, query, context, domain_hints, scope)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return self._result(query, cached, mode, "cache_hit", started)
+
+        if mode == "local" and not neighbours:
+            return self._result(query, [], mode, "no_neighbours", started)
+
+        def work():
+            if mode == "local":
+                return self._run_local(key, query, neighbours)
+            return self._run_llm(key, query, context, domain_hints)
+
+        if budget is not None and budget < self.expected_latency(mode):
+            if mode == "llm" and (
+                key in self._inflight
+                or len(self._inflight) < QUERY_EXPANSION_MAX_BACKGROUND
+            ):
+                self._spawn(key, work)  # warm the cache for the next query
+            return self._result(query, [], mode, "skipped_budget", started)
+
+        # An abandoned LLM call still completes and caches
+        task = self._spawn(key, work)
         try:
-            prompt = f"""Given the query: "{query}"
-And this context: "{context[:500]}..."
-
-Generate 2-3 context-aware variations of the query that:
-- Incorporate relevant context information
-- Make implicit assumptions explicit
-- Add clarifying details from the context
-
-Return only the context-aware queries, one per line."""
-
-            response = await llm_client.complete(
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=150,
-                temperature=0.3,
-            )
-
-            content = self._extract_content(response)
-            context_expansions = [
-                {"query": line.strip(), "technique": "context", "confidence": 0.85}
-                for line in content.split("\n")
-                if line.strip() and line.strip() != query
-            ]
-
-            return context_expansions
-
-        except Exception as e:
-            logger.error(f"Context expansion failed: {e}")
-            return []
-
-    async def _expand_with_semantic_similarity(
-        self, query: str
+            expansions = await asyncio.wait_for(asyncio.shield(task), budget)
+        except asyncio.TimeoutError:
+            return self._result(query, [], mode, "timeout", started)
+        except Exception as exc:  # noqa: BLE001 – search works without it
+            logger.warning("Query expansion (%s) failed: %s", mode, exc)
+            result = self._result(query, [], mode, "error", started)
+            result["expansion_metadata"]["error"] = str(exc)
+            return result
+        return self._result(query, expansions, mode, "expanded", started)
+
+    def _spawn(self, key: str, work) -> asyncio.Future:
+        """The in-flight expansion for *key*, started from *work()* if none."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(work())
+            task.add_done_callback(lambda t: self._finished(key, t))
+        return task
+
+    def _finished(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Background query expansion failed: %s", task.exception())
+
+    async def _run_local(
+        self, key: str, query: str, neighbours: Sequence[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """Expand query using semantic similarity analysis."""
-        try:
-            # Generate query embedding
-            query_embedding = await embedding_service.generate_embedding(query)
-            if not query_embedding:
-                return []
+        started = time.monotonic()
+        expansions = expand_from_neighbours(query, neighbours, self.max_expansions)
+        self._observe("local", time.monotonic() - started)
+        await self.cache.set(key, expansions)
+        return expansions
 
-            # Generate semantic variations
-            semantic_variants = [
-                f"How to {query.lower()}",
-                f"What is {query.lower()}",
-                f"Examples of {query.lower()}",
-                f"Best practices for {query.lower()}",
-                f"Common issues with {query.lower()}",
-            ]
-
-            # Filter variants that are semantically different enough
-            valid_variants = []
-            for variant in semantic_variants:
-                if len(variant.split()) >= 2:  # Basic length check
-                    valid_variants.append(
-                        {"query": variant, "technique": "semantic", "confidence": 0.75}
-                    )
+    async def _run_llm(
+        self,
+        key: str,
+        query: str,
+        context: Optional[str],
+        domain_hints: Optional[List[str]],
+    ) -> List[Dict[str, Any]]:
+        started = time.monotonic()
+        response = await self.llm.complete(
+            messages=[
+                {
+                    "role": "user",
+                    "content": build_llm_prompt(query, context, domain_hints),
+                }
+            ],
+            max_tokens=300,
+            temperature=0.3,
+            feature="query_expansion",
+        )
+        self._observe("llm", time.monotonic() - started)
+        expansions = parse_llm_expansions(query, self._extract_content(response))
+        await self.cache.set(key, expansions)
+        return expansions
 
-            return valid_variants[:3]  # Return top 3
+    def _observe(self, mode: str, seconds: float) -> None:
+        previous = self._latency.get(mode, seconds)
+        self._latency[mode] = previous + _EWMA_ALPHA * (seconds - previous)
+        query_expansion_latency_seconds.labels(mode=mode).observe(seconds)
 
-        except Exception as e:
-            logger.error(f"Semantic similarity expansion failed: {e}")
-            return []
+    def _result(
+        self,
+        query: str,
+        expansions: List[Dict[str, Any]],
+        mode: str,
+        outcome: str,
+        started: float,
+    ) -> Dict[str, Any]:
+        query_expansion_requests_total.labels(mode=mode, outcome=outcome).inc()
+        ranked = self._combine_expansions(query, [expansions])
+        return {
+            "original_query": query,
+            "expanded_queries": ranked[: self.max_expansions],
+            "expansion_metadata": {
+                "mode": mode,
+                "outcome": outcome,
+                "techniques_used": sorted({e["technique"] for e in ranked}),
+                "total_candidates": len(ranked),
+                "confidence_score": self._calculate_expansion_confidence(ranked),
+                "latency_ms": round((time.monotonic() - started) * 1000, 2),
+            },
+        }
+
+    def record_gain(self, technique: str, queries: int, new_results: int) -> None:
+        """Record that *queries* variants of *technique* found *new_results*
+        results the original query had not."""
+        query_expansion_queries_total.labels(technique=technique).inc(queries)
+        query_expansion_new_results_total.labels(technique=technique).inc(new_results)
+        self.gain[technique]["queries"] += queries
+        self.gain[technique]["new_results"] += new_results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "expected_latency_ms": {
+                mode: round(seconds * 1000, 2) for mode, seconds in self._latency.items()
+            },
+            "recall_gain": {
+                technique: {
+                    **counts,
+                    "new_results_per_query": (
+                        counts["new_results"] / counts["queries"]
+                        if counts["queries"]
+                        else 0.0
+                    ),
+                }
+                for technique, counts in self.gain.items()
+            },
+        }
 
     def _combine_expansions(
         self, original_query: str, expansions: List[List[Dict[str, Any]]]
@@ -254,48 +496,45 @@ Return only the context-aware queries, one per line."""
 
     def _extract_content(self, response) -> str:
         """Extract content from LLM response."""
+        if isinstance(response, str):
+            return response
         if hasattr(response, "choices") and response.choices:
-            return response.choices[0].message.content
+            return response.choices[0].message.content or ""
         elif hasattr(response, "output") and response.output:
             return response.output[0].content
         return ""
 
     async def find_similar_queries(
-        self, query: str, query_history: List[str], similarity_threshold: float = 0.7
+        self,
+        query: str,
+        query_history: List[str],
+        similarity_threshold: float = 0.7,
+        generator=None,
     ) -> List[Dict[str, Any]]:
         """Find similar queries from history using semantic similarity."""
         if not query_history:
             return []
 
         try:
-            # Generate embeddings for query and history
-            query_embedding = await embedding_service.generate_embedding(query)
-            if not query_embedding:
-                return []
-
-            history_embeddings = []
-            for hist_query in query_history[-50]:  # Limit to recent queries
-                embedding = await embedding_service.generate_embedding(hist_query)
-                if embedding:
-                    history_embeddings.append((hist_query, embedding))
-
-            if not history_embeddings:
+            if generator is None:
+                from app.embeddings.generator import EmbeddingGenerator
+
+                generator = EmbeddingGenerator()
+            recent = query_history[-50:]  # Limit to recent queries
+            # One batched request for the query and its history
+            vectors = await generator.generate_embeddings([query, *recent])
+            if not vectors or not vectors[0]:
                 return []
 
-            # Calculate similarities
-            query_vec = np.array([query_embedding])
-            history_vecs = np.array([emb[1] for emb in history_embeddings])
-
-            similarities = cosine_similarity(query_vec, history_vecs)[0]
-
-            # Find similar queries above threshold
+            query_vec = vectors[0]
             similar_queries = []
-            for i, (hist_query, _) in enumerate(history_embeddings):
-                if similarities[i] >= similarity_threshold:
+            for hist_query, vector in zip(recent, vectors[1:]):
+                similarity = _cosine(query_vec, vector)
+                if similarity >= similarity_threshold:
                     similar_queries.append(
                         {
                             "query": hist_query,
-                            "similarity": float(similarities[i]),
+                            "similarity": similarity,
                             "technique": "history_similarity",
                         }
                     )
@@ -309,5 +548,11 @@ Return only the context-aware queries, one per line."""
             return []
 
 
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
 # Global instance
 query_expansion_service = QueryExpansionService()
@@ -0,0 +1,133 @@
+# backend/app/services/search_history_writer.py
+"""Deferred, batched writer for :class:`~app.models.search_history.SearchHistory`.
+
+The ``/api/search`` handler used to ``INSERT`` + ``COMMIT`` a history row
+before responding, putting a write round-trip on the critical path of every
+search.  History is best-effort analytics, so we now buffer rows in memory
+and flush them in one bulk insert every few seconds (or as soon as a batch
+fills up) from a background task.
+
+The buffer is bounded: if the database is unavailable for a long time the
+oldest pending rows are dropped instead of growing memory without limit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("SEARCH_HISTORY_FLUSH_INTERVAL", "2.0"))
+BATCH_SIZE = int(os.getenv("SEARCH_HISTORY_BATCH_SIZE", "200"))
+MAX_PENDING = int(os.getenv("SEARCH_HISTORY_MAX_PENDING", "10000"))
+
+
+def _write_batch(rows: List[Dict[str, Any]]) -> None:
+    """Bulk-insert *rows* on a fresh synchronous session (runs in a thread)."""
+    from app.database import session_for
+    from app.models.search_history import SearchHistory
+
+    with session_for("worker") as db:
+        db.bulk_insert_mappings(SearchHistory, rows)
+        db.commit()
+
+
+class SearchHistoryWriter:
+    """Buffers search-history rows and flushes them in the background."""
+
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        batch_size: int = BATCH_SIZE,
+        max_pending: int = MAX_PENDING,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: Deque[Dict[str, Any]] = deque(maxlen=max_pending)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(
+        self,
+        user_id: int,
+        query_text: str,
+        filters: Optional[Dict] = None,
+        project_ids: Optional[List[int]] = None,
+    ) -> None:
+        """Queue one history row.  Never blocks and never raises."""
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(
+            {
+                "user_id": user_id,
+                "query_text": query_text.strip()[:255],
+                "filters": filters,
+                "project_ids": project_ids,
+            }
+        )
+
+        self._ensure_started()
+        if len(self._pending) >= self.batch_size and self._wakeup:
+            self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # flushed on the next call made from inside the loop
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run(), name="search-history-writer")
+
+    async def start(self) -> None:
+        self._ensure_started()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything currently buffered; returns rows written."""
+        written = 0
+        while self._pending:
+            batch = [
+                self._pending.popleft()
+                for _ in range(min(self.batch_size, len(self._pending)))
+            ]
+            try:
+                await asyncio.to_thread(_write_batch, batch)
+            except Exception as exc:  # noqa: BLE001 – history is best-effort
+                self.dropped += len(batch)
+                logger.warning(
+                    "Failed to persist %d search history rows: %s", len(batch), exc
+                )
+                break
+            written += len(batch)
+        self.written += written
+        return written
+
+    async def stop(self) -> None:
+        """Cancel the background task and flush what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+search_history_writer = SearchHistoryWriter()
@@ -2,7 +2,7 @@
 
 import logging
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Set, Any, Tuple
 from enum import Enum
 import hashlib
@@ -14,6 +14,7 @@ from app.models.user import User
 from app.models.project import Project
 from app.models.code_document import CodeDocument
 from app.core.config import settings
+from app.utils.rate_limiter import Bucket, rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -101,7 +102,7 @@ class SecurityService:
     def __init__(self):
         self.access_rules: Dict[int, List[AccessRule]] = {}  # user_id -> rules
         self.security_policies: Dict[str, Dict[str, Any]] = {}
-        self.rate_limits: Dict[str, Dict[str, Any]] = {}
+        self.rate_limited_users: Set[int] = set()
         self.failed_attempts: Dict[str, List[datetime]] = {}
         self.security_events: List[Dict[str, Any]] = []
 
@@ -327,43 +328,30 @@ class SecurityService:
     async def _check_rate_limit(
         self, context: SecurityContext, resource_type: ResourceType
     ) -> bool:
-        """Check rate limiting for user actions."""
-        rate_key = f"{context.user_id}:{resource_type.value}"
-        current_time = datetime.utcnow()
-
-        # Get rate limit window
-        if rate_key not in self.rate_limits:
-            self.rate_limits[rate_key] = {"requests": [], "window_start": current_time}
-
-        rate_data = self.rate_limits[rate_key]
-
-        # Clean old requests (1 minute window)
-        window_start = current_time - timedelta(minutes=1)
-        rate_data["requests"] = [
-            req_time for req_time in rate_data["requests"] if req_time > window_start
-        ]
-
-        # Check limits based on resource type
+        """Check rate limiting for user actions (shared token buckets)."""
         limits = self.security_policies["rate_limiting"]
         max_requests = limits.get("api_requests_per_minute", 100)
 
         if resource_type == ResourceType.SEARCH:
             max_requests = limits.get("search_queries_per_minute", 20)
 
-        if len(rate_data["requests"]) >= max_requests:
+        bucket = Bucket.per_window(
+            f"security:{context.user_id}:{resource_type.value}", max_requests, 60
+        )
+        decision = await rate_limiter.acquire([bucket])
+        if not decision.allowed:
+            self.rate_limited_users.add(context.user_id)
             await self._log_security_event(
                 "rate_limit_exceeded",
                 {
                     "user_id": context.user_id,
                     "resource_type": resource_type.value,
-                    "request_count": len(rate_data["requests"]),
                     "limit": max_requests,
+                    "retry_after": decision.retry_after_seconds,
                 },
             )
             return False
 
-        # Add current request
-        rate_data["requests"].append(current_time)
         return True
 
     async def _check_resource_access(
@@ -639,7 +627,7 @@ class SecurityService:
                 "event_breakdown": event_counts,
                 "active_users": len(self.access_rules),
                 "total_rules": sum(len(rules) for rules in self.access_rules.values()),
-                "rate_limited_users": len(self.rate_limits),
+                "rate_limited_users": len(self.rate_limited_users),
                 "security_policies": list(self.security_policies.keys()),
             }
 
@@ -14,22 +14,25 @@ logger = logging.getLogger(__name__)
 class StructuralSearch:
     """Search for code symbols and structures."""
 
+    # Compiled once per process; the search router builds one instance per
+    # request.
+    patterns = {
+        "func": re.compile(r"^func(?:tion)?:(.+)$", re.I),
+        "class": re.compile(r"^class:(.+)$", re.I),
+        "method": re.compile(r"^method:(.+)$", re.I),
+        "interface": re.compile(r"^interface:(.+)$", re.I),
+        "type": re.compile(r"^type:(.+)$", re.I),
+        "import": re.compile(r"^import:(.+)$", re.I),
+        "commit": re.compile(r"^commit:(.+)$", re.I),
+        "blame": re.compile(r"^blame:(.+):(\d+)(?:-(\d+))?$", re.I),
+        "doc": re.compile(r"^doc:(.+)$", re.I),
+        "lint": re.compile(r"^lint:(.+)$", re.I),
+        "file": re.compile(r"^file:(.+)$", re.I),
+        "line": re.compile(r"^(.+):(\d+)$"),
+    }
+
     def __init__(self, db: Session):
         self.db = db
-        self.patterns = {
-            "func": re.compile(r"^func(?:tion)?:(.+)$", re.I),
-            "class": re.compile(r"^class:(.+)$", re.I),
-            "method": re.compile(r"^method:(.+)$", re.I),
-            "interface": re.compile(r"^interface:(.+)$", re.I),
-            "type": re.compile(r"^type:(.+)$", re.I),
-            "import": re.compile(r"^import:(.+)$", re.I),
-            "commit": re.compile(r"^commit:(.+)$", re.I),
-            "blame": re.compile(r"^blame:(.+):(\d+)$", re.I),
-            "doc": re.compile(r"^doc:(.+)$", re.I),
-            "lint": re.compile(r"^lint:(.+)$", re.I),
-            "file": re.compile(r"^file:(.+)$", re.I),
-            "line": re.compile(r"^(.+):(\d+)$"),
-        }
 
     async def search(
         self,
@@ -85,6 +88,7 @@ class StructuralSearch:
                         "type": "blame",
                         "file": match.group(1).strip(),
                         "line": int(match.group(2)),
+                        "end_line": int(match.group(3) or match.group(2)),
                     }
                 elif pattern_name == "commit":
                     return {"type": "commit", "term": match.group(1).strip()}
@@ -1,19 +1,255 @@
 # backend/app/services/summarization_service.py
-"""Intelligent context summarization for overflow content."""
-
+"""Intelligent context summarization for overflow content.
+
+Overflow summaries are built bottom-up from cached parts (map-reduce):
+
+* **leaves** – one summary per chunk, keyed by the SHA-256 of its content
+  and :data:`SUMMARIZER_VERSION`.  Missing leaves are written by batched
+  LLM calls (several chunks per call, answered as JSON).
+* **files** – the leaves of a file are listed locally; only when they
+  exceed ``FILE_SUMMARY_TOKENS`` does the LLM merge them, and that merge is
+  cached under the hash of its inputs.
+* **overflow** – file summaries, most relevant first, joined the same way
+  under ``max_summary_tokens``.
+
+Leaves and file summaries do not depend on the question, so code that has
+been seen before is summarized from cache without calling the LLM.  Only
+the final overflow merge, when one is needed, is told the question.  The cache is a
+bounded in-process LRU in front of Redis (shared by all workers).
+
+Long conversations are summarized incrementally by
+:class:`ConversationSummarizer`: after each reply, messages that fell out
+of the prompt window are folded into ``ChatSession.summary`` together
+with the previous summary – never the whole history again.
+"""
+
+import asyncio
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
 from app.llm.client import llm_client
 from app.utils.token_counter import count_tokens
 
 logger = logging.getLogger(__name__)
 
+# Bump when prompts change so cached summaries are rebuilt
+SUMMARIZER_VERSION = 1
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", str(7 * 24 * 3600)))
+SUMMARY_CACHE_ENTRIES = int(os.getenv("SUMMARY_CACHE_ENTRIES", "4096"))
+# Chunk tokens sent per leaf-summary call, and calls in flight at once
+LEAF_BATCH_TOKENS = int(os.getenv("SUMMARY_LEAF_BATCH_TOKENS", "6000"))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+LEAF_SUMMARY_WORDS = 60
+FILE_SUMMARY_TOKENS = 300
+
+# Incremental conversation summaries
+CONVERSATION_KEEP_RECENT = int(os.getenv("CONVERSATION_SUMMARY_KEEP_RECENT", "20"))
+CONVERSATION_FOLD_BATCH = int(os.getenv("CONVERSATION_SUMMARY_FOLD_BATCH", "6"))
+CONVERSATION_MAX_FOLD = 100
+
+
+def summary_key(kind: str, *parts: str) -> str:
+    digest = hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+    return f"summary:v{SUMMARIZER_VERSION}:{kind}:{digest}"
+
+
+def response_text(response: Any) -> str:
+    """Text of a Chat Completions or Responses API result."""
+    if isinstance(response, str):
+        return response
+    if hasattr(response, "choices") and response.choices:
+        return response.choices[0].message.content or ""
+    if hasattr(response, "output") and response.output:
+        # Handle Azure Responses API format
+        text = ""
+        for item in response.output:
+            content = getattr(item, "content", None)
+            if isinstance(content, str):
+                text += content
+            elif isinstance(content, list):
+                for content_item in content:
+                    if hasattr(content_item, "text"):
+                        text += content_item.text
+        return text
+    return str(response)
+
+
+def chunk_label(chunk: Dict[str, Any]) -> str:
+    metadata = chunk.get("metadata", {})
+    label = metadata.get("file_path", "Unknown")
+    if metadata.get("symbol_name"):
+        label += f" – {metadata.get('symbol_type', 'symbol')} {metadata['symbol_name']}"
+    if metadata.get("start_line"):
+        label += f" (lines {metadata['start_line']}-{metadata['end_line']})"
+    return label
+
+
+def leaf_batches(
+    items: Sequence[Tuple[str, str, str]], max_tokens: int = LEAF_BATCH_TOKENS
+) -> List[List[Tuple[str, str, str]]]:
+    """Group ``(key, label, content)`` items into calls under *max_tokens*."""
+    batches: List[List[Tuple[str, str, str]]] = []
+    current: List[Tuple[str, str, str]] = []
+    size = 0
+    for item in items:
+        tokens = count_tokens(item[2])
+        if current and size + tokens > max_tokens:
+            batches.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_leaf_summaries(text: str, count: int) -> Dict[int, str]:
+    """``{"1": "...", …}`` from a batched leaf reply (1-based ids)."""
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        raw = json.loads(text[start : end + 1]) if 0 <= start < end else None
+    except ValueError:
+        raw = None
+    if raw is None:
+        # A lone snippet answered in plain text is still its summary
+        return {0: text.strip()} if count == 1 and text.strip() else {}
+    summaries = {}
+    for ident, summary in raw.items() if isinstance(raw, dict) else ():
+        try:
+            index = int(ident) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and isinstance(summary, str) and summary.strip():
+            summaries[index] = summary.strip()
+    return summaries
+
+
+def conversation_text(messages: Sequence[Dict[str, Any]]) -> str:
+    parts = []
+    for msg in messages:
+        role = msg.get("role", "unknown")
+        content = msg.get("content", "")
+        if role == "user":
+            parts.append(f"User: {content}")
+        elif role == "assistant":
+            # Truncate very long assistant responses for summarization
+            truncated = content[:1000] + "..." if len(content) > 1000 else content
+            parts.append(f"Assistant: {truncated}")
+    return "\n\n".join(parts)
+
+
+class SummaryCache:
+    """Summaries by key, in process (bounded LRU) and in Redis."""
+
+    def __init__(
+        self, max_entries: int = SUMMARY_CACHE_ENTRIES, ttl: int = SUMMARY_CACHE_TTL
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """Values of *keys* in order; one Redis ``MGET`` for local misses."""
+        values: List[Optional[str]] = []
+        with self._lock:
+            for key in keys:
+                value = self._local.get(key)
+                if value is not None:
+                    self._local.move_to_end(key)
+                values.append(value)
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            remote = await self._redis_mget([keys[i] for i in missing])
+            for i, value in zip(missing, remote):
+                if value is not None:
+                    values[i] = value
+                    self._remember(keys[i], value)
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+        return values
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_many([key]))[0]
+
+    async def set_many(self, items: Dict[str, str]) -> None:
+        if not items:
+            return
+        for key, value in items.items():
+            self._remember(key, value)
+        try:
+            from app.utils.redis_client import get_redis
+
+            redis = await get_redis()
+            pipe = redis.pipeline()
+            for key, value in items.items():
+                pipe.set(key, value, ex=self.ttl)
+            await pipe.execute()
+        except Exception as exc:  # noqa: BLE001 – the cache is best-effort
+            logger.debug("Summary cache write skipped: %s", exc)
+
+    async def set(self, key: str, value: str) -> None:
+        await self.set_many({key: value})
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    async def _redis_mget(self, keys: List[str]) -> List[Optional[str]]:
+        try:
+            from app.utils.redis_client import get_redis
+
+            redis = await get_redis()
+            raw = await redis.mget(keys)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Summary cache read skipped: %s", exc)
+            return [None] * len(keys)
+        return [
+            (value.decode() if isinstance(value, bytes) else value)
+            for value in (raw or [None] * len(keys))
+        ]
+
 
 class SummarizationService:
     """Service for summarizing context when it exceeds token limits."""
 
-    def __init__(self, max_summary_tokens: int = 800):
+    def __init__(self, max_summary_tokens: int = 800, cache=None, llm=None):
         self.max_summary_tokens = max_summary_tokens
+        self.cache = cache or summary_cache
+        self._llm = llm
+        self._semaphore = asyncio.Semaphore(SUMMARY_MAX_CONCURRENCY)
+        self.llm_calls = 0
+
+    @property
+    def llm(self):
+        return self._llm or llm_client
+
+    async def _complete(self, prompt: str, max_tokens: int) -> str:
+        async with self._semaphore:
+            self.llm_calls += 1
+            response = await self.llm.complete(
+                messages=[{"role": "user", "content": prompt}],
+                stream=False,
+                max_tokens=max_tokens,
+                feature="summarization",
+            )
+        return response_text(response).strip()
+
+    # ------------------------------------------------------------------ #
+    # Overflow chunks (map-reduce over cached leaves)
+    # ------------------------------------------------------------------ #
 
     async def summarize_overflow_chunks(
         self,
@@ -21,118 +257,183 @@ class SummarizationService:
         query_context: str = "",
         focus_areas: Optional[List[str]] = None,
     ) -> str:
-        """Summarize chunks that couldn't fit in the main context window."""
+        """Summarize chunks that couldn't fit in the main context window.
+
+        Chunks are expected most relevant first; files keep that order.
+        Leaf and file summaries are question-independent so that they can be
+        cached; *query_context* and *focus_areas* steer the final merge and
+        are named in the heading for the model that reads it.
+        """
 
         if not overflow_chunks:
             return ""
 
-        # Prepare content for summarization
-        content_parts = []
-        for chunk in overflow_chunks:
-            metadata = chunk.get("metadata", {})
-
-            # Format each chunk with context
-            chunk_text = f"## File: {metadata.get('file_path', 'Unknown')}"
-            if metadata.get("symbol_name"):
-                chunk_text += f"\n### {metadata.get('symbol_type', 'Symbol')}: {metadata['symbol_name']}"
-            if metadata.get("start_line"):
-                chunk_text += (
-                    f" (lines {metadata['start_line']}-{metadata['end_line']})"
-                )
-
-            chunk_text += f"\n\n{chunk['content']}\n"
-            content_parts.append(chunk_text)
-
-        combined_content = "\n---\n".join(content_parts)
-
-        # Create focused summarization prompt
-        focus_instruction = ""
-        if focus_areas:
-            focus_instruction = f"\nPay special attention to: {', '.join(focus_areas)}"
-
-        query_instruction = ""
+        focus = []
         if query_context:
-            query_instruction = f"\nThe user is asking about: {query_context}"
-
-        prompt = f"""Please provide a concise summary of the following code snippets and documentation. Focus on the key functionality, important patterns, and how different components relate to each other.{query_instruction}{focus_instruction}
-
-Keep the summary under {self.max_summary_tokens // 4} words and structure it as:
-1. Main components/functions described
-2. Key patterns or architectural decisions
-3. Important implementation details
-4. Relationships between components
-
-Content to summarize:
-
-{combined_content}
-
-Summary:"""
+            focus.append(f"Question: {query_context}")
+        if focus_areas:
+            focus.append(f"Focus: {', '.join(focus_areas)}")
+        focus_line = " | ".join(focus)
 
         try:
-            response = await llm_client.complete(
-                messages=[{"role": "user", "content": prompt}],
-                stream=False,
-                max_tokens=self.max_summary_tokens,
-            )
+            leaves = await self._leaf_summaries(overflow_chunks)
+            leaves = [
+                leaf if leaf is not None else self._outline(chunk)
+                for chunk, leaf in zip(overflow_chunks, leaves)
+            ]
 
-            # Extract content from response
-            if hasattr(response, "choices") and response.choices:
-                summary = response.choices[0].message.content or ""
-            elif hasattr(response, "output") and response.output:
-                # Handle Azure Responses API format
-                summary = ""
-                for item in response.output:
-                    if hasattr(item, "content"):
-                        if isinstance(item.content, str):
-                            summary += item.content
-                        elif isinstance(item.content, list):
-                            for content_item in item.content:
-                                if hasattr(content_item, "text"):
-                                    summary += content_item.text
-            else:
-                summary = str(response)
-
-            # Add prefix to indicate this is a summary
-            if summary.strip():
-                return f"## Summary of Additional Context\n\n{summary.strip()}"
-            else:
-                return ""
+            files: "OrderedDict[str, List[Tuple[str, str]]]" = OrderedDict()
+            for chunk, leaf in zip(overflow_chunks, leaves):
+                path = chunk.get("metadata", {}).get("file_path", "Unknown")
+                files.setdefault(path, []).append((chunk_label(chunk), leaf))
 
+            file_summaries = await asyncio.gather(
+                *(self._file_summary(path, items) for path, items in files.items())
+            )
+            sections = [
+                f"### {path}\n{summary}"
+                for path, summary in zip(files, file_summaries)
+            ]
+            body = await self._reduce(
+                sections, self.max_summary_tokens, "overflow", focus=focus_line
+            )
         except Exception as e:
             logger.error(f"Failed to summarize overflow chunks: {e}")
+            body = ""
+
+        if not body.strip():
             # Fallback: provide a basic summary
             file_list = [
                 chunk.get("metadata", {}).get("file_path", "Unknown")
                 for chunk in overflow_chunks
             ]
-            unique_files = list(set(file_list))
+            unique_files = list(dict.fromkeys(file_list))
 
             return f"## Additional Context Summary\n\nAdditional relevant code found in {len(overflow_chunks)} snippets across {len(unique_files)} files: {', '.join(unique_files[:5])}{'...' if len(unique_files) > 5 else ''}"
 
-    async def summarize_conversation_history(
-        self, old_messages: List[Dict[str, Any]], max_summary_length: int = 500
-    ) -> str:
-        """Summarize old conversation history to maintain context."""
+        intro = f"{focus_line}\n\n" if focus_line else ""
+        return f"## Summary of Additional Context\n\n{intro}{body.strip()}"
+
+    async def _leaf_summaries(
+        self, chunks: List[Dict[str, Any]]
+    ) -> List[Optional[str]]:
+        """One summary per chunk (``None`` where the LLM gave none): cache
+        first, then batched LLM calls.  Raises if every call failed."""
+        keys = [summary_key("leaf", chunk.get("content", "")) for chunk in chunks]
+        leaves = await self.cache.get_many(keys)
+
+        todo: Dict[str, Tuple[str, str, str]] = {}
+        for key, chunk, leaf in zip(keys, chunks, leaves):
+            if leaf is None and key not in todo:
+                todo[key] = (key, chunk_label(chunk), chunk.get("content", ""))
+
+        if todo:
+            results = await asyncio.gather(
+                *(self._summarize_leaves(b) for b in leaf_batches(list(todo.values()))),
+                return_exceptions=True,
+            )
+            failures = [r for r in results if isinstance(r, Exception)]
+            if len(failures) == len(results) and not any(leaves):
+                raise failures[0]
+            fresh: Dict[str, str] = {}
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning("Leaf summarization failed: %s", result)
+                    continue
+                fresh.update(result)
+            await self.cache.set_many(fresh)
+            # Failed leaves stay uncached and are retried on the next turn
+            leaves = [
+                leaf if leaf is not None else fresh.get(key)
+                for key, leaf in zip(keys, leaves)
+            ]
+        return leaves
 
-        if not old_messages:
-            return ""
+    async def _summarize_leaves(
+        self, batch: List[Tuple[str, str, str]]
+    ) -> Dict[str, str]:
+        sections = "\n\n".join(
+            f"[{i}] {label}\n{content}" for i, (_, label, content) in enumerate(batch, 1)
+        )
+        prompt = f"""Summarize each numbered code or documentation snippet below in at most {LEAF_SUMMARY_WORDS} words: what it does, its inputs/outputs and anything notable (side effects, patterns, dependencies).
 
-        # Format conversation for summarization
-        conversation_text = ""
-        for msg in old_messages:
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-
-            if role == "user":
-                conversation_text += f"User: {content}\n\n"
-            elif role == "assistant":
-                # Truncate very long assistant responses for summarization
-                truncated_content = (
-                    content[:1000] + "..." if len(content) > 1000 else content
-                )
-                conversation_text += f"Assistant: {truncated_content}\n\n"
+Reply with one JSON object mapping each snippet number to its summary, e.g. {{"1": "...", "2": "..."}}, and nothing else.
+
+{sections}"""
+        text = await self._complete(prompt, max_tokens=LEAF_SUMMARY_WORDS * 2 * len(batch))
+        parsed = parse_leaf_summaries(text, len(batch))
+        return {batch[index][0]: summary for index, summary in parsed.items()}
 
-        prompt = f"""Please provide a concise summary of this conversation history. Focus on:
+    async def _file_summary(self, path: str, items: List[Tuple[str, str]]) -> str:
+        if len(items) == 1:
+            return items[0][1]
+        lines = [f"- {label}: {leaf}" for label, leaf in items]
+        return await self._reduce(lines, FILE_SUMMARY_TOKENS, "file", path)
+
+    async def _reduce(
+        self,
+        parts: List[str],
+        max_tokens: int,
+        kind: str,
+        title: str = "",
+        focus: str = "",
+    ) -> str:
+        """Join *parts* locally, or merge them with a cached LLM call when
+        they do not fit in *max_tokens*; the merge keeps what matters for
+        *focus* (question and focus areas)."""
+        joined = "\n\n".join(parts) if kind == "overflow" else "\n".join(parts)
+        if count_tokens(joined) <= max_tokens:
+            return joined
+
+        key = summary_key(kind, title, focus, *parts)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        guidance = f"\n\nPrefer what is relevant to this request – {focus}" if focus else ""
+        prompt = f"""Merge the following summaries{f' of {title}' if title else ''} into one summary of at most {max_tokens * 3 // 4} words. Keep the key components, important patterns and architectural decisions, and how the components relate to each other.{guidance}
+
+{joined}"""
+        try:
+            merged = await self._complete(prompt, max_tokens=max_tokens)
+        except Exception as e:  # noqa: BLE001 – a long summary beats none
+            logger.warning(f"Summary merge failed: {e}")
+            merged = ""
+        if not merged:
+            return joined
+        await self.cache.set(key, merged)
+        return merged
+
+    @staticmethod
+    def _outline(chunk: Dict[str, Any]) -> str:
+        """Local stand-in for a leaf summary: the first meaningful lines."""
+        lines = [
+            line.strip()
+            for line in chunk.get("content", "").splitlines()
+            if line.strip()
+        ]
+        return " / ".join(lines[:2])[:200]
+
+    # ------------------------------------------------------------------ #
+    # Conversations
+    # ------------------------------------------------------------------ #
+
+    async def update_conversation_summary(
+        self,
+        previous_summary: Optional[str],
+        new_messages: List[Dict[str, Any]],
+        max_summary_length: int = 500,
+    ) -> str:
+        """Fold *new_messages* into *previous_summary* (plain text)."""
+        if not new_messages:
+            return previous_summary or ""
+
+        earlier = (
+            f"Summary of the conversation so far:\n{previous_summary}\n\n"
+            if previous_summary
+            else ""
+        )
+        prompt = f"""{earlier}Update the conversation summary with the new messages below. Focus on:
 1. Key topics discussed
 2. Important questions asked by the user
 3. Main solutions or information provided
@@ -140,31 +441,28 @@ Summary:"""
 
 Keep the summary under {max_summary_length // 4} words.
 
-Conversation to summarize:
+New messages:
 
-{conversation_text}
+{conversation_text(new_messages)}
 
 Summary:"""
+        return await self._complete(prompt, max_tokens=max_summary_length)
 
-        try:
-            response = await llm_client.complete(
-                messages=[{"role": "user", "content": prompt}],
-                stream=False,
-                max_tokens=max_summary_length,
-            )
+    async def summarize_conversation_history(
+        self,
+        old_messages: List[Dict[str, Any]],
+        max_summary_length: int = 500,
+        previous_summary: Optional[str] = None,
+    ) -> str:
+        """Summarize old conversation history to maintain context."""
 
-            # Extract content (same logic as above)
-            if hasattr(response, "choices") and response.choices:
-                summary = response.choices[0].message.content or ""
-            elif hasattr(response, "output") and response.output:
-                summary = ""
-                for item in response.output:
-                    if hasattr(item, "content"):
-                        if isinstance(item.content, str):
-                            summary += item.content
-            else:
-                summary = str(response)
+        if not old_messages:
+            return ""
 
+        try:
+            summary = await self.update_conversation_summary(
+                previous_summary, old_messages, max_summary_length
+            )
             if summary.strip():
                 return f"## Previous Conversation Summary\n\n{summary.strip()}"
             else:
@@ -263,3 +561,110 @@ Summary:"""
         ]
 
         return kept_messages, old_messages
+
+
+class ConversationSummarizer:
+    """Keeps ``ChatSession.summary`` current as messages arrive.
+
+    ``summary_message_id`` marks the last message folded in.  Once at least
+    ``CONVERSATION_FOLD_BATCH`` messages older than the last
+    ``CONVERSATION_KEEP_RECENT`` (the prompt window) are not yet folded,
+    they are merged into the stored summary in one LLM call.  The update is
+    conditional on the watermark, so concurrent replicas never fold the
+    same messages twice.
+    """
+
+    def __init__(self, service: Optional[SummarizationService] = None):
+        self._service = service
+        self._inflight: set = set()
+        self._tasks: set = set()
+
+    @property
+    def service(self) -> SummarizationService:
+        if self._service is None:
+            self._service = SummarizationService()
+        return self._service
+
+    def schedule(self, session_id: int) -> None:
+        """Refresh *session_id*'s summary in the background."""
+        if session_id in self._inflight:
+            return
+        self._inflight.add(session_id)
+        task = asyncio.create_task(self._refresh_logged(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh_logged(self, session_id: int) -> None:
+        try:
+            await self.refresh(session_id)
+        except Exception:  # noqa: BLE001 – retried after the next message
+            logger.warning("Conversation summary refresh failed", exc_info=True)
+        finally:
+            self._inflight.discard(session_id)
+
+    async def refresh(self, session_id: int) -> bool:
+        """Fold pending messages into the summary; ``True`` if updated."""
+        from sqlalchemy import func, select, update
+
+        from app.database import async_session_for
+        from app.models.chat import ChatMessage, ChatSession
+
+        async with async_session_for("worker") as db:
+            row = (
+                await db.execute(
+                    select(ChatSession.summary, ChatSession.summary_message_id).where(
+                        ChatSession.id == session_id
+                    )
+                )
+            ).first()
+            if row is None:
+                return False
+            previous, watermark = row
+
+            live = (ChatMessage.session_id == session_id, ChatMessage.is_deleted.is_(False))
+            window = (
+                select(ChatMessage.id)
+                .where(*live)
+                .order_by(ChatMessage.id.desc())
+                .limit(CONVERSATION_KEEP_RECENT)
+                .subquery()
+            )
+            stmt = (
+                select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+                .where(*live, ChatMessage.id < select(func.min(window.c.id)).scalar_subquery())
+                .order_by(ChatMessage.id)
+                .limit(CONVERSATION_MAX_FOLD)
+            )
+            if watermark is not None:
+                stmt = stmt.where(ChatMessage.id > watermark)
+            pending = (await db.execute(stmt)).all()
+            if len(pending) < CONVERSATION_FOLD_BATCH:
+                return False
+
+            summary = await self.service.update_conversation_summary(
+                previous,
+                [{"role": m.role, "content": m.content} for m in pending],
+            )
+            if not summary:
+                return False
+
+            guard = (
+                ChatSession.summary_message_id.is_(None)
+                if watermark is None
+                else ChatSession.summary_message_id == watermark
+            )
+            result = await db.execute(
+                update(ChatSession)
+                .where(ChatSession.id == session_id, guard)
+                .values(
+                    summary=summary,
+                    summary_message_id=pending[-1].id,
+                    summary_updated_at=datetime.utcnow(),
+                )
+            )
+            await db.commit()
+            return result.rowcount == 1
+
+
+summary_cache = SummaryCache()
+conversation_summarizer = ConversationSummarizer()
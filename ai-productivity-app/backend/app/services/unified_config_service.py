@@ -12,7 +12,7 @@ from __future__ import annotations
 
 import logging
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy.exc import IntegrityError
@@ -30,6 +30,7 @@ from app.schemas.generation import (
 from app.schemas.generation import validate_config_consistency  # type: ignore
 from app.services.config_validation_service import ConfigValidationService
 from app.services.config_preset_manager import ConfigPresetManager
+from app.services.config_snapshot import config_snapshot, model_config_to_info
 
 logger = logging.getLogger(__name__)
 
@@ -37,18 +38,13 @@ logger = logging.getLogger(__name__)
 class UnifiedConfigService:
     """Centralised service that owns all AI runtime-configuration data."""
 
-    # --------------------------------------------------------------------- #
-    # Constants / settings
-    # --------------------------------------------------------------------- #
-    CACHE_TTL_SECONDS = 300  # 5 min
-
     # --------------------------------------------------------------------- #
     # Construction
     # --------------------------------------------------------------------- #
     def __init__(self, db: Session):
+        # Reads are served from the process-wide ``config_snapshot``; the
+        # session is only used for writes (and the first snapshot build).
         self.db: Session = db
-        self._config_cache: Dict[str, Any] = {}
-        self._cache_ts: Optional[datetime] = None
         self._validation_service = ConfigValidationService(db)
         self._preset_manager = ConfigPresetManager(db)
 
@@ -57,12 +53,7 @@ class UnifiedConfigService:
     # --------------------------------------------------------------------- #
     def get_current_config(self) -> UnifiedModelConfig:
         """Return the current, validated, unified configuration."""
-        run_cfg = self._load_all_config()
-        try:
-            return UnifiedModelConfig.from_runtime_config(run_cfg)
-        except Exception as e:  # pragma: no cover
-            logger.warning("Falling back to built-in defaults: %s", e)
-            return self._get_default_config()
+        return config_snapshot.get(self.db).unified
 
     def get_configuration_snapshot(
         self,
@@ -119,29 +110,22 @@ class UnifiedConfigService:
 
     def get_model_info(self, model_id: str) -> Optional[ModelInfo]:
         """Return `ModelInfo` for a specific `model_id` (or `None`)."""
-        cfg: ModelConfiguration | None = (
-            self.db.query(ModelConfiguration).filter_by(model_id=model_id).first()
-        )
-        return self._model_config_to_info(cfg) if cfg else None
+        return config_snapshot.get(self.db).models.get(model_id)
 
     def get_available_models(
         self, provider: Optional[str] = None, include_deprecated: bool = False
     ) -> List[ModelInfo]:
         """Return all models, optionally filtered."""
-        try:
-            q = self.db.query(ModelConfiguration)
-            if provider:
-                q = q.filter_by(provider=provider)
-            if not include_deprecated:
-                q = q.filter_by(is_deprecated=False)
-            rows = q.all()
-            return sorted(
-                (self._model_config_to_info(r) for r in rows),
-                key=lambda m: (m.provider, m.display_name),
-            )
-        except Exception as e:  # pragma: no cover
-            logger.warning("Could not fetch ModelConfiguration: %s", e)
-            return []
+        models = config_snapshot.get(self.db).models.values()
+        return sorted(
+            (
+                m
+                for m in models
+                if (not provider or m.provider == provider)
+                and (include_deprecated or not m.is_deprecated)
+            ),
+            key=lambda m: (m.provider, m.display_name),
+        )
 
     # --------------------------------------------------------------------- #
     # Public – WRITE
@@ -379,31 +363,7 @@ class UnifiedConfigService:
     # Private helpers – persistence
     # --------------------------------------------------------------------- #
     def _load_all_config(self) -> Dict[str, Any]:
-        if self._config_cache and self._cache_ts:
-            if datetime.utcnow() - self._cache_ts < timedelta(seconds=self.CACHE_TTL_SECONDS):
-                return self._config_cache
-
-        try:
-            rows = self.db.query(RuntimeConfig).all()
-        except Exception as e:  # pragma: no cover
-            logger.warning("RuntimeConfig query failed – using empty config: %s", e)
-            rows = []
-
-        cfg: Dict[str, Any] = {}
-        for row in rows:
-            try:
-                if row.value_type == "boolean":
-                    cfg[row.key] = row.value in (True, "true", "True", "1", 1)
-                elif row.value_type == "number":
-                    cfg[row.key] = row.value
-                else:
-                    cfg[row.key] = row.value
-            except Exception as e:  # pragma: no cover
-                logger.warning("Could not parse RuntimeConfig[%s]: %s", row.key, e)
-
-        self._config_cache = cfg
-        self._cache_ts = datetime.utcnow()
-        return cfg
+        return dict(config_snapshot.get(self.db).runtime)
 
     def _save_config(self, config: Dict[str, Any], updated_by: str) -> None:
         """Persist the runtime configuration dictionary."""
@@ -447,6 +407,8 @@ class UnifiedConfigService:
                     )
                 )
         try:
+            # Other replicas rebuild their snapshot once this commits.
+            config_snapshot.announce(self.db, updated_by)
             self.db.commit()
             self.db.expire_all()
         except IntegrityError as e:
@@ -459,8 +421,8 @@ class UnifiedConfigService:
             raise RuntimeError("Database error while saving configuration") from e
 
     def _invalidate_cache(self) -> None:
-        self._config_cache.clear()
-        self._cache_ts = None
+        """Rebuild the shared snapshot after a committed change."""
+        config_snapshot.rebuild(self.db)
 
     # --------------------------------------------------------------------- #
     # Private helpers – defaults / mapping
@@ -507,26 +469,7 @@ class UnifiedConfigService:
         )
 
     def _model_config_to_info(self, mc: ModelConfiguration) -> ModelInfo:
-        from app.schemas.generation import ModelCapabilities
-
-        caps = ModelCapabilities(**(mc.capabilities or {}))
-        return ModelInfo(
-            model_id=mc.model_id,
-            display_name=mc.name,
-            provider=mc.provider,
-            model_family=mc.model_family,
-            capabilities=caps,
-            cost_per_1k_input_tokens=mc.cost_input_per_1k,
-            cost_per_1k_output_tokens=mc.cost_output_per_1k,
-            performance_tier="balanced",
-            average_latency_ms=mc.avg_response_time_ms,
-            is_available=mc.is_available,
-            is_deprecated=mc.is_deprecated,
-            deprecation_date=getattr(mc, "deprecated_at", None),
-            recommended_use_cases=getattr(mc, "model_metadata", {}).get(
-                "recommended_use_cases", []
-            ),
-        )
+        return model_config_to_info(mc)
 
     # --------------------------------------------------------------------- #
     # Presets & defaults API
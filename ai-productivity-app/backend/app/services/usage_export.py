@@ -0,0 +1,240 @@
+# backend/app/services/usage_export.py
+"""Streaming export of the hourly usage rows (``model_usage_metrics``).
+
+The export endpoint used to load every matching row as an ORM object and
+format the whole file in memory, so a year of a busy tenant's history could
+exhaust a worker.  :func:`export_stream` instead
+
+* reads rows through a server-side cursor (``yield_per``) on its own
+  session – the request's session is closed before a streamed body ends;
+* encodes them one by one as CSV, NDJSON or a JSON array and hands out
+  ~``COST_EXPORT_CHUNK_BYTES`` pieces, the first (CSV header / ``[``) at
+  once;
+* optionally gzips the stream incrementally, flushing after every chunk.
+
+Memory therefore stays constant whatever the export size.  Rows come in
+``(period_start, id)`` order and each carries an opaque ``cursor``; passing
+the last one received as ``after`` resumes the export right after it, and
+``limit`` splits a large range into several requests.  Gzip members can
+simply be concatenated.
+"""
+
+from __future__ import annotations
+
+import base64
+import csv
+import io
+import json
+import logging
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from app.models.config import ModelUsageMetrics
+from app.services.cost_tracking import usage_metrics_query
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = int(os.getenv("COST_EXPORT_BATCH_ROWS", "1000"))
+CHUNK_BYTES = int(os.getenv("COST_EXPORT_CHUNK_BYTES", "65536"))
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "json": ("application/json", "json"),
+}
+
+CSV_COLUMNS = (
+    "model_id",
+    "period_start",
+    "period_end",
+    "total_requests",
+    "total_input_tokens",
+    "total_output_tokens",
+    "total_cost",
+    "avg_response_time_ms",
+    "success_rate",
+    "cursor",
+)
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(period_start: datetime, row_id: int) -> str:
+    raw = f"{period_start.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Inverse of :func:`encode_cursor`; raises ``ValueError`` when malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        stamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(stamp), int(row_id)
+    except (UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid export cursor: {token!r}") from exc
+
+
+def export_record(metric: ModelUsageMetrics, detailed: bool) -> Dict[str, Any]:
+    record = {
+        "model_id": metric.model_id,
+        "period_start": metric.period_start.isoformat(),
+        "period_end": metric.period_end.isoformat(),
+        "total_requests": metric.total_requests,
+        "total_input_tokens": metric.total_tokens_input,
+        "total_output_tokens": metric.total_tokens_output,
+        "total_cost": float(metric.total_cost),
+        "avg_response_time_ms": metric.avg_response_time_ms,
+        "success_rate": metric.success_rate,
+    }
+    if detailed:
+        record["detailed_metrics"] = metric.detailed_metrics or {}
+    record["cursor"] = encode_cursor(metric.period_start, metric.id)
+    return record
+
+
+def iter_usage_rows(
+    db,
+    *,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    model_id: Optional[str] = None,
+    provider: Optional[str] = None,
+    after: Optional[Cursor] = None,
+    limit: Optional[int] = None,
+    detailed: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Matching rows as export records, fetched ``BATCH_ROWS`` at a time."""
+    stmt = usage_metrics_query(
+        model_id=model_id,
+        provider=provider,
+        start_date=start_date,
+        end_date=end_date,
+        user_id=user_id,
+    )
+    if after is not None:
+        stamp, row_id = after
+        stmt = stmt.where(
+            or_(
+                ModelUsageMetrics.period_start > stamp,
+                and_(
+                    ModelUsageMetrics.period_start == stamp,
+                    ModelUsageMetrics.id > row_id,
+                ),
+            )
+        )
+    stmt = stmt.order_by(ModelUsageMetrics.period_start, ModelUsageMetrics.id)
+    if limit:
+        stmt = stmt.limit(limit)
+
+    result = db.execute(stmt.execution_options(yield_per=BATCH_ROWS))
+    for metric in result.scalars():
+        yield export_record(metric, detailed)
+        # Nothing needs the ORM objects afterwards: keep the identity map small
+        db.expunge(metric)
+
+
+# ---------------------------------------------------------------------------
+# Encoders: records -> text pieces of about CHUNK_BYTES
+# ---------------------------------------------------------------------------
+
+
+def _chunked(pieces: Iterable[str], first: str = "") -> Iterator[str]:
+    if first:
+        yield first  # header / opening bracket right away
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def encode_csv(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def _row(values) -> str:
+        line.seek(0)
+        line.truncate()
+        writer.writerow(values)
+        return line.getvalue()
+
+    header = _row(CSV_COLUMNS)
+    return _chunked(
+        (_row([record.get(c) for c in CSV_COLUMNS]) for record in records), header
+    )
+
+
+def encode_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    return _chunked(json.dumps(record) + "\n" for record in records)
+
+
+def encode_json(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    def _items() -> Iterator[str]:
+        separator = ""
+        for record in records:
+            yield separator + json.dumps(record)
+            separator = ","
+        yield "]"
+
+    return _chunked(_items(), "[")
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "json": encode_json}
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Incremental gzip; every chunk is flushed so the client sees progress."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(
+    fmt: str,
+    *,
+    compress: bool = False,
+    db=None,
+    **filters: Any,
+) -> Iterator[bytes]:
+    """Encoded (and optionally gzipped) export of the rows matching *filters*.
+
+    Runs on a fresh "analytics" session unless *db* is given.  A failure
+    half-way cannot change the status any more, so it is logged and
+    re-raised: the server aborts the response instead of ending it cleanly,
+    the client sees a truncated download (no gzip trailer, no final chunk)
+    rather than a complete-looking file, and resumes from the last cursor
+    it received.
+    """
+    detailed = fmt != "csv"
+
+    def _bytes(session) -> Iterator[bytes]:
+        records = iter_usage_rows(session, detailed=detailed, **filters)
+        for chunk in ENCODERS[fmt](records):
+            yield chunk.encode()
+
+    def _run() -> Iterator[bytes]:
+        try:
+            if db is not None:
+                yield from _bytes(db)
+                return
+            from app.database import session_for
+
+            with session_for("analytics") as session:
+                yield from _bytes(session)
+        except Exception:
+            logger.exception("Usage export aborted")
+            raise
+
+    return gzip_stream(_run()) if compress else _run()
@@ -1,5 +1,4 @@
 # backend/app/services/usage_searcher.py
-import jedi
 from typing import List, Dict
 import logging
 import os
@@ -13,6 +12,8 @@ class UsageSearcher:
     def __init__(self, project_path: str):
         self.project_path = project_path
         try:
+            import jedi  # heavy; loaded on first use / by the startup warm-up
+
             self.jedi_project = jedi.Project(path=self.project_path)
         except Exception as e:
             logger.error(
@@ -33,6 +34,8 @@ class UsageSearcher:
             with open(full_file_path, "r") as f:
                 source_code = f.read()
 
+            import jedi
+
             script = jedi.Script(
                 code=source_code, path=full_file_path, project=self.jedi_project
             )
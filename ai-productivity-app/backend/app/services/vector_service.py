@@ -28,7 +28,9 @@ class VectorServiceProtocol(Protocol):
         filters: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]: ...
 
-    async def delete_by_document(self, document_id: int) -> None: ...
+    async def delete_by_document(
+        self, document_id: int, metadata: Optional[Dict[str, Any]] = None
+    ) -> None: ...
 
     async def get_stats(self) -> Dict[str, Any]: ...
 
@@ -88,10 +90,16 @@ class VectorService:
             score_threshold=score_threshold,
         )
 
-    async def delete_by_document(self, document_id: int) -> None:
-        """Delete all embeddings for a document."""
+    async def delete_by_document(
+        self, document_id: int, metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Delete all embeddings for a document.
+
+        *metadata* narrows the delete to vectors whose metadata has these
+        exact values (e.g. to tell apart documents sharing an id).
+        """
         await self.initialize()
-        await self._backend.delete_by_document(document_id)
+        await self._backend.delete_by_document(document_id, metadata)
 
     async def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics."""
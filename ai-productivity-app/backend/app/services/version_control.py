@@ -1,21 +1,23 @@
-"""Document version control and change tracking service."""
+"""Document version control and change tracking service.
+
+Versions are stored as a delta chain: one row per version holding a
+compressed line delta (:mod:`app.utils.line_delta`), with a full-content
+keyframe every ``keyframe_interval`` versions.  Rebuilding any version reads
+the rows from its keyframe onwards in one query and applies at most
+``keyframe_interval`` deltas.
+"""
 
 import hashlib
 import logging
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
-from difflib import unified_diff, SequenceMatcher
-import re
-
-from sqlalchemy.orm import Session
-from app.models.document_version import (
-    DocumentVersion,
-    DocumentChange,
-    DocumentSnapshot,
-    ChangeBaseline,
-)
-from app.models.code_document import CodeDocument
-from app.core.database import get_db
+from typing import List, Dict, Any, Optional, Sequence
+from difflib import unified_diff
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.orm import Session, defer
+from app.models.document_version import DocumentVersion
+from app.models.code import CodeDocument, CodeDocumentContent
+from app.utils import line_delta
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +27,7 @@ class VersionControlService:
 
     def __init__(self):
         self.max_versions_per_document = 100
-        self.major_version_threshold = 10  # Create snapshot every 10 versions
+        self.keyframe_interval = 20  # Full snapshot at most every 20 versions
         self.change_detection_threshold = 0.1  # 10% change for impact scoring
 
     async def create_version(
@@ -38,12 +40,10 @@ class VersionControlService:
         commit_hash: Optional[str] = None,
         branch_name: Optional[str] = None,
     ) -> DocumentVersion:
-        """Create a new version of a document."""
+        """Create a new version of a document (a single row)."""
         try:
             # Get current document
-            document = (
-                db.query(CodeDocument).filter(CodeDocument.id == document_id).first()
-            )
+            document = db.get(CodeDocument, document_id)
             if not document:
                 raise ValueError(f"Document {document_id} not found")
 
@@ -62,9 +62,34 @@ class VersionControlService:
                 (latest_version.version_number + 1) if latest_version else 1
             )
 
-            # Analyze changes
-            old_content = document.content if document.content else ""
-            changes_analysis = self._analyze_changes(old_content, new_content)
+            # Diff against the previous version once; stats and the stored
+            # delta both come from the same opcodes.
+            old_content = (
+                self._reconstruct(db, document_id, latest_version.version_number)
+                if latest_version
+                else ""
+            )
+            ops = line_delta.diff_ops(
+                line_delta.split_lines(old_content), line_delta.split_lines(new_content)
+            )
+            changes_analysis = self._analyze_changes(ops)
+            delta = line_delta.encode(ops)
+
+            # Keyframe on the first version, every ``keyframe_interval``
+            # versions, and whenever the delta is no smaller than a snapshot
+            # (near-total rewrites).
+            full = line_delta.compress_text(new_content)
+            keyframe_version = (
+                latest_version.keyframe_version if latest_version else version_number
+            )
+            snapshot = None
+            if (
+                latest_version is None
+                or version_number - keyframe_version >= self.keyframe_interval
+                or len(delta) >= len(full)
+            ):
+                snapshot = full
+                keyframe_version = version_number
 
             # Create new version
             new_version = DocumentVersion(
@@ -79,31 +104,34 @@ class VersionControlService:
                 lines_added=changes_analysis["lines_added"],
                 lines_deleted=changes_analysis["lines_deleted"],
                 lines_modified=changes_analysis["lines_modified"],
+                delta=delta,
+                snapshot=snapshot,
+                keyframe_version=keyframe_version,
                 commit_hash=commit_hash,
                 branch_name=branch_name,
             )
-
             db.add(new_version)
-            db.flush()  # Get the version ID
-
-            # Create detailed change records
-            await self._create_change_records(
-                db, new_version.id, old_content, new_content
-            )
-
-            # Create snapshot if this is a major version
-            if version_number % self.major_version_threshold == 0:
-                await self._create_snapshot(
-                    db, document_id, new_version.id, new_content
-                )
 
             # Update document content
-            document.content = new_content
+            stored = db.get(CodeDocumentContent, document_id)
+            if stored is None:
+                db.add(
+                    CodeDocumentContent(
+                        document_id=document_id,
+                        project_id=document.project_id,
+                        content=new_content,
+                    )
+                )
+            else:
+                stored.content = new_content
             document.content_hash = content_hash
             document.updated_at = datetime.utcnow()
 
-            # Cleanup old versions if necessary
-            await self._cleanup_old_versions(db, document_id)
+            # Retention only needs checking when a new keyframe appears –
+            # that is the only point where an older chain can become prunable.
+            if keyframe_version == version_number:
+                db.flush()
+                self._prune_versions(db, document_id, version_number)
 
             db.commit()
             logger.info(f"Created version {version_number} for document {document_id}")
@@ -115,29 +143,9 @@ class VersionControlService:
             logger.error(f"Failed to create version: {e}")
             raise
 
-    def _analyze_changes(self, old_content: str, new_content: str) -> Dict[str, Any]:
-        """Analyze changes between two versions of content."""
-        old_lines = old_content.splitlines()
-        new_lines = new_content.splitlines()
-
-        # Calculate line-level changes
-        matcher = SequenceMatcher(None, old_lines, new_lines)
-        changes = {
-            "lines_added": 0,
-            "lines_deleted": 0,
-            "lines_modified": 0,
-            "summary": "",
-        }
-
-        for op, old_start, old_end, new_start, new_end in matcher.get_opcodes():
-            if op == "insert":
-                changes["lines_added"] += new_end - new_start
-            elif op == "delete":
-                changes["lines_deleted"] += old_end - old_start
-            elif op == "replace":
-                changes["lines_modified"] += max(
-                    old_end - old_start, new_end - new_start
-                )
+    def _analyze_changes(self, ops: Sequence[list]) -> Dict[str, Any]:
+        """Summarise line-level changes from delta opcodes."""
+        changes: Dict[str, Any] = line_delta.stats(ops)
 
         # Generate summary
         total_changes = (
@@ -156,69 +164,6 @@ class VersionControlService:
 
         return changes
 
-    async def _create_change_records(
-        self, db: Session, version_id: int, old_content: str, new_content: str
-    ):
-        """Create detailed change records for a version."""
-        old_lines = old_content.splitlines()
-        new_lines = new_content.splitlines()
-
-        matcher = SequenceMatcher(None, old_lines, new_lines)
-
-        for op, old_start, old_end, new_start, new_end in matcher.get_opcodes():
-            if op == "equal":
-                continue
-
-            # Determine change type and content
-            if op == "insert":
-                for i in range(new_start, new_end):
-                    change = DocumentChange(
-                        version_id=version_id,
-                        change_type="line_added",
-                        line_number=i + 1,
-                        new_content=new_lines[i] if i < len(new_lines) else "",
-                        impact_score=self._calculate_impact_score(
-                            new_lines[i] if i < len(new_lines) else ""
-                        ),
-                    )
-                    db.add(change)
-
-            elif op == "delete":
-                for i in range(old_start, old_end):
-                    change = DocumentChange(
-                        version_id=version_id,
-                        change_type="line_deleted",
-                        line_number=i + 1,
-                        old_content=old_lines[i] if i < len(old_lines) else "",
-                        impact_score=self._calculate_impact_score(
-                            old_lines[i] if i < len(old_lines) else ""
-                        ),
-                    )
-                    db.add(change)
-
-            elif op == "replace":
-                # Handle line modifications
-                for i in range(max(old_end - old_start, new_end - new_start)):
-                    old_line = (
-                        old_lines[old_start + i] if old_start + i < old_end else ""
-                    )
-                    new_line = (
-                        new_lines[new_start + i] if new_start + i < new_end else ""
-                    )
-
-                    change = DocumentChange(
-                        version_id=version_id,
-                        change_type="line_modified",
-                        line_number=old_start + i + 1,
-                        old_content=old_line,
-                        new_content=new_line,
-                        impact_score=max(
-                            self._calculate_impact_score(old_line),
-                            self._calculate_impact_score(new_line),
-                        ),
-                    )
-                    db.add(change)
-
     def _calculate_impact_score(self, line: str) -> int:
         """Calculate the impact score of a line change (1-5 scale)."""
         line = line.strip()
@@ -267,53 +212,73 @@ class VersionControlService:
         # Default medium-low impact
         return 2
 
-    async def _create_snapshot(
-        self,
-        db: Session,
-        document_id: int,
-        version_id: int,
-        content: str,
-        snapshot_type: str = "major",
-    ):
-        """Create a full content snapshot."""
-        snapshot = DocumentSnapshot(
-            document_id=document_id,
-            version_id=version_id,
-            full_content=content,
-            snapshot_type=snapshot_type,
-            created_at=datetime.utcnow(),
+    def _prune_versions(self, db: Session, document_id: int, latest: int) -> int:
+        """Drop versions beyond the retention window in one ``DELETE``.
+
+        Everything older than the keyframe that anchors the oldest retained
+        version goes; that keyframe and its chain stay so every retained
+        version remains reconstructible.
+        """
+        cutoff = latest - self.max_versions_per_document + 1
+        if cutoff <= 1:
+            return 0
+        anchor = (
+            select(func.max(DocumentVersion.version_number))
+            .where(
+                DocumentVersion.document_id == document_id,
+                DocumentVersion.snapshot.is_not(None),
+                DocumentVersion.version_number <= cutoff,
+            )
+            .scalar_subquery()
         )
-        db.add(snapshot)
-
-    async def _cleanup_old_versions(self, db: Session, document_id: int):
-        """Clean up old versions to stay within limits."""
-        versions = (
-            db.query(DocumentVersion)
-            .filter(DocumentVersion.document_id == document_id)
-            .order_by(DocumentVersion.version_number.desc())
-            .all()
+        result = db.execute(
+            delete(DocumentVersion)
+            .where(
+                DocumentVersion.document_id == document_id,
+                DocumentVersion.version_number < anchor,
+            )
+            .execution_options(synchronize_session=False)
         )
+        return result.rowcount or 0
 
-        if len(versions) > self.max_versions_per_document:
-            # Keep major versions and recent versions
-            versions_to_delete = []
-            for version in versions[self.max_versions_per_document :]:
-                # Keep major versions (with snapshots)
-                has_snapshot = (
-                    db.query(DocumentSnapshot)
-                    .filter(DocumentSnapshot.version_id == version.id)
-                    .first()
+    def _reconstruct(self, db: Session, document_id: int, version_number: int) -> str:
+        """Rebuild one version from its keyframe plus the deltas after it."""
+        keyframe = (
+            select(DocumentVersion.keyframe_version)
+            .where(
+                DocumentVersion.document_id == document_id,
+                DocumentVersion.version_number == version_number,
+            )
+            .scalar_subquery()
+        )
+        rows = db.execute(
+            select(
+                DocumentVersion.version_number,
+                DocumentVersion.delta,
+                DocumentVersion.snapshot,
+            )
+            .where(
+                and_(
+                    DocumentVersion.document_id == document_id,
+                    DocumentVersion.version_number >= keyframe,
+                    DocumentVersion.version_number <= version_number,
                 )
+            )
+            .order_by(DocumentVersion.version_number)
+        ).all()
+
+        if not rows or rows[-1].version_number != version_number:
+            raise ValueError(f"Version {version_number} not found")
+        if rows[0].snapshot is None:
+            raise ValueError(
+                f"Keyframe for version {version_number} of document "
+                f"{document_id} is missing"
+            )
 
-                if not has_snapshot:
-                    versions_to_delete.append(version)
-
-            # Delete old versions and their changes
-            for version in versions_to_delete:
-                db.query(DocumentChange).filter(
-                    DocumentChange.version_id == version.id
-                ).delete()
-                db.delete(version)
+        lines = line_delta.split_lines(line_delta.decompress_text(rows[0].snapshot))
+        for row in rows[1:]:
+            lines = line_delta.apply_delta(lines, line_delta.decode(row.delta))
+        return "".join(lines)
 
     async def get_version_history(
         self,
@@ -323,8 +288,13 @@ class VersionControlService:
         include_changes: bool = False,
     ) -> List[Dict[str, Any]]:
         """Get version history for a document."""
+        # Blobs are only needed when the per-line changes are requested
+        deferred = [defer(DocumentVersion.snapshot)]
+        if not include_changes:
+            deferred.append(defer(DocumentVersion.delta))
         versions = (
             db.query(DocumentVersion)
+            .options(*deferred)
             .filter(DocumentVersion.document_id == document_id)
             .order_by(DocumentVersion.version_number.desc())
             .limit(limit)
@@ -348,20 +318,20 @@ class VersionControlService:
             }
 
             if include_changes:
-                changes = (
-                    db.query(DocumentChange)
-                    .filter(DocumentChange.version_id == version.id)
-                    .all()
-                )
                 version_data["changes"] = [
                     {
-                        "change_type": change.change_type,
-                        "line_number": change.line_number,
-                        "old_content": change.old_content,
-                        "new_content": change.new_content,
-                        "impact_score": change.impact_score,
+                        "change_type": change_type,
+                        "line_number": line_number,
+                        "old_content": old_line,
+                        "new_content": new_line,
+                        "impact_score": max(
+                            self._calculate_impact_score(old_line),
+                            self._calculate_impact_score(new_line),
+                        ),
                     }
-                    for change in changes
+                    for change_type, line_number, old_line, new_line in (
+                        line_delta.iter_changes(line_delta.decode(version.delta))
+                    )
                 ]
 
             history.append(version_data)
@@ -394,8 +364,8 @@ class VersionControlService:
             raise ValueError("Version not found")
 
         # Get content for both versions
-        from_content = await self._get_version_content(db, from_ver.id)
-        to_content = await self._get_version_content(db, to_ver.id)
+        from_content = self._reconstruct(db, document_id, from_version)
+        to_content = self._reconstruct(db, document_id, to_version)
 
         # Generate diff
         diff_lines = list(
@@ -419,34 +389,11 @@ class VersionControlService:
             },
         }
 
-    async def _get_version_content(self, db: Session, version_id: int) -> str:
-        """Get content for a specific version."""
-        # First try to get from snapshot
-        snapshot = (
-            db.query(DocumentSnapshot)
-            .filter(DocumentSnapshot.version_id == version_id)
-            .first()
-        )
-
-        if snapshot:
-            return snapshot.full_content
-
-        # Otherwise, reconstruct from changes (simplified for now)
-        version = (
-            db.query(DocumentVersion).filter(DocumentVersion.id == version_id).first()
-        )
-
-        if not version:
-            raise ValueError(f"Version {version_id} not found")
-
-        # Get current document content as fallback
-        document = (
-            db.query(CodeDocument)
-            .filter(CodeDocument.id == version.document_id)
-            .first()
-        )
-
-        return document.content if document else ""
+    async def get_version_content(
+        self, db: Session, document_id: int, version_number: int
+    ) -> str:
+        """Return the full content of one version."""
+        return self._reconstruct(db, document_id, version_number)
 
     async def restore_version(
         self,
@@ -470,7 +417,7 @@ class VersionControlService:
             raise ValueError(f"Version {target_version} not found")
 
         # Get content for target version
-        target_content = await self._get_version_content(db, target_ver.id)
+        target_content = self._reconstruct(db, document_id, target_version)
 
         # Create new version with restored content
         new_version = await self.create_version(
@@ -0,0 +1,151 @@
+# backend/app/services/xref_index.py
+"""Symbol cross-reference lookups backed by the ``code_symbol_refs`` table.
+
+The index is populated at ingest time by ``_process_code_file`` so that
+find-usages and go-to-definition are plain indexed queries:
+
+    (project_id, name, kind)  → every occurrence of a symbol
+    (document_id, line)       → the identifier under the cursor
+
+Unlike :class:`~app.services.usage_searcher.UsageSearcher` (Jedi) this works
+for every language supported by ``CodeParser`` and does not need the
+repository clone on disk.
+
+Positions follow the editor convention used by the ``/usages`` endpoint:
+1-based lines, 0-based columns.  Rows are stored 0-based internally.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.selectable import Select
+
+from app.models.code import CodeDocument, CodeSymbolRef
+
+logger = logging.getLogger(__name__)
+
+
+def replace_document_refs(
+    session: Session, project_id: int, document_id: int, refs: Iterable[Dict]
+) -> int:
+    """Swap the xref rows of one document for *refs* (parser output)."""
+    session.execute(
+        delete(CodeSymbolRef).where(CodeSymbolRef.document_id == document_id)
+    )
+    rows = [
+        {
+            "project_id": project_id,
+            "document_id": document_id,
+            "name": ref["name"][:200],
+            "kind": ref["kind"],
+            "symbol_type": ref.get("symbol_type"),
+            "line": ref["line"],
+            "column": ref["column"],
+            "end_line": ref.get("end_line"),
+            "context": ref.get("context"),
+        }
+        for ref in refs
+        if ref.get("name")
+    ]
+    if rows:
+        session.bulk_insert_mappings(CodeSymbolRef, rows)
+    return len(rows)
+
+
+def definitions_stmt(project_id: int, names: List[str]) -> Select:
+    """Statement selecting definition rows for *names* (sync or async use)."""
+    return select(CodeSymbolRef).where(
+        CodeSymbolRef.project_id == project_id,
+        CodeSymbolRef.name.in_(names),
+        CodeSymbolRef.kind == "definition",
+    )
+
+
+class XrefIndex:
+    """Find usages / definitions from the persisted cross-reference index."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def symbol_at(
+        self, project_id: int, file_path: str, line: int, column: int
+    ) -> Optional[CodeSymbolRef]:
+        """Return the indexed identifier covering *line*/*column* (1-based line)."""
+        candidates = self.db.execute(
+            select(CodeSymbolRef)
+            .join(CodeDocument, CodeDocument.id == CodeSymbolRef.document_id)
+            .where(
+                CodeDocument.project_id == project_id,
+                CodeDocument.file_path == file_path,
+                CodeSymbolRef.line == line - 1,
+                CodeSymbolRef.column <= column,
+            )
+            .order_by(CodeSymbolRef.column.desc())
+        ).scalars()
+
+        for ref in candidates:
+            if column <= ref.column + len(ref.name):
+                return ref
+        return None
+
+    def _occurrences(
+        self, project_id: int, name: str, kinds: List[str], limit: int
+    ) -> List[Dict]:
+        rows = self.db.execute(
+            select(CodeSymbolRef, CodeDocument.file_path)
+            .join(CodeDocument, CodeDocument.id == CodeSymbolRef.document_id)
+            .where(
+                CodeSymbolRef.project_id == project_id,
+                CodeSymbolRef.name == name,
+                CodeSymbolRef.kind.in_(kinds),
+            )
+            .order_by(CodeDocument.file_path, CodeSymbolRef.line)
+            .limit(limit)
+        ).all()
+
+        return [
+            {
+                "type": "usage" if ref.kind != "definition" else "definition",
+                "score": 1.0,
+                "content": ref.context or "",
+                "metadata": {
+                    "file_path": file_path,
+                    "line_number": ref.line + 1,
+                    "column": ref.column,
+                    "symbol_name": ref.name,
+                    "kind": ref.kind,
+                    "symbol_type": ref.symbol_type,
+                },
+            }
+            for ref, file_path in rows
+        ]
+
+    def find_usages(
+        self, project_id: int, file_path: str, line: int, column: int, limit: int = 50
+    ) -> List[Dict]:
+        """Return every occurrence of the symbol at the given location."""
+        ref = self.symbol_at(project_id, file_path, line, column)
+        if ref is None:
+            return []
+        return self._occurrences(
+            project_id, ref.name, ["definition", "reference", "import"], limit
+        )
+
+    def find_definitions(
+        self, project_id: int, name: str, limit: int = 20
+    ) -> List[Dict]:
+        """Return definition sites of *name* across the project."""
+        return self._occurrences(project_id, name, ["definition"], limit)
+
+    def goto_definition(
+        self, project_id: int, file_path: str, line: int, column: int
+    ) -> List[Dict]:
+        """Resolve the symbol at the given location to its definition(s)."""
+        ref = self.symbol_at(project_id, file_path, line, column)
+        if ref is None:
+            return []
+        return self.find_definitions(project_id, ref.name)
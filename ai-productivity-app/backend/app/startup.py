@@ -0,0 +1,404 @@
+# backend/app/startup.py
+"""Cold-start profiling and the deferred warm-up behind ``/health/ready``.
+
+Two helpers, both kept free of third-party imports so they can be loaded
+before anything else in :mod:`app.main`:
+
+* :class:`ImportProfiler` – with ``STARTUP_PROFILE=1`` a ``sys.meta_path``
+  hook times every module as it executes (inclusive and self time) until
+  the warm-up finishes.  The slowest modules are logged and returned by
+  ``/health/startup``.
+* :class:`StartupTracker` – times each lifespan step.  Only cheap steps and
+  the schema (which every request depends on, readiness probe or not) run
+  before the lifespan yields; the rest (configuration, model catalogue,
+  heavy parsers/tokenizers) run as a background warm-up so the server
+  accepts connections immediately.  ``/health/ready`` answers 503 until
+  every *required* step has succeeded; optional steps run concurrently in
+  worker threads and never gate readiness.
+
+Required steps are retried with exponential backoff.  If one still fails
+the process terminates itself (``STARTUP_EXIT_ON_FAILURE``) so the
+supervisor restarts it instead of it staying up, unready, forever.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENABLED = os.getenv("STARTUP_PROFILE", "false").lower() in ("1", "true", "yes")
+PROFILE_TOP_N = int(os.getenv("STARTUP_PROFILE_TOP", "40"))
+
+REQUIRED_ATTEMPTS = max(1, int(os.getenv("STARTUP_REQUIRED_ATTEMPTS", "5")))
+RETRY_BASE_SECONDS = float(os.getenv("STARTUP_RETRY_BASE_SECONDS", "1.0"))
+RETRY_MAX_SECONDS = 30.0
+EXIT_ON_FAILURE = os.getenv("STARTUP_EXIT_ON_FAILURE", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+StepFn = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+# ---------------------------------------------------------------------------
+# Import-time profiling
+# ---------------------------------------------------------------------------
+
+
+class _TimedLoader:
+    """Loader proxy that reports how long a module took to create/execute."""
+
+    def __init__(self, loader, profiler: "ImportProfiler", name: str):
+        self._loader = loader
+        self._profiler = profiler
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        # Extension modules do their work here rather than in exec_module
+        with self._profiler.timing(self._name):
+            return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler.timing(self._name):
+            self._loader.exec_module(module)
+
+
+class _ImportTimer:
+    """Times one module; nested imports are subtracted from its self time."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "ImportProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack().append(0.0)  # time spent in nested imports
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_exc):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._stack()
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        self.profiler._record(self.name, elapsed, children)
+        return False
+
+
+class ImportProfiler:
+    """Per-module import timings collected through a meta-path finder."""
+
+    def __init__(self):
+        self.inclusive: Dict[str, float] = {}
+        self.self_time: Dict[str, float] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.installed = False
+
+    # -- finder protocol -----------------------------------------------------
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            if loader is not None and hasattr(loader, "exec_module"):
+                spec.loader = _TimedLoader(loader, self, fullname)
+            return spec
+        return None
+
+    def invalidate_caches(self):  # noqa: D401 – finder protocol
+        return None
+
+    # -- bookkeeping ---------------------------------------------------------
+    def timing(self, name: str) -> "_ImportTimer":
+        return _ImportTimer(self, name)
+
+    def _record(self, name: str, elapsed: float, children: float) -> None:
+        with self._lock:
+            self.inclusive[name] = self.inclusive.get(name, 0.0) + elapsed
+            self.self_time[name] = self.self_time.get(name, 0.0) + elapsed - children
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def install(self) -> None:
+        if not self.installed:
+            sys.meta_path.insert(0, self)
+            self.installed = True
+
+    def uninstall(self) -> None:
+        if self.installed:
+            try:
+                sys.meta_path.remove(self)
+            except ValueError:
+                pass
+            self.installed = False
+
+    def top(self, limit: int = PROFILE_TOP_N) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = sorted(self.self_time.items(), key=lambda kv: kv[1], reverse=True)
+            return [
+                {
+                    "module": name,
+                    "self_ms": round(secs * 1000, 2),
+                    "inclusive_ms": round(self.inclusive[name] * 1000, 2),
+                }
+                for name, secs in rows[:limit]
+            ]
+
+    def top_packages(self, limit: int = 15) -> List[Dict[str, Any]]:
+        """Self time summed per top-level package (``openai``, ``app``, …)."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for name, secs in self.self_time.items():
+                root = name.split(".", 1)[0]
+                totals[root] = totals.get(root, 0.0) + secs
+        rows = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [{"package": p, "self_ms": round(s * 1000, 2)} for p, s in rows]
+
+
+import_profiler = ImportProfiler()
+
+
+# ---------------------------------------------------------------------------
+# Lifespan step tracking
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class StepRecord:
+    name: str
+    required: bool
+    status: str = "running"  # running | ok | failed
+    seconds: float = 0.0
+    error: Optional[str] = None
+    attempts: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        out = {
+            "status": self.status,
+            "required": self.required,
+            "ms": round(self.seconds * 1000, 1),
+        }
+        if self.attempts > 1:
+            out["attempts"] = self.attempts
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class StartupTracker:
+    """Timed lifespan steps plus the readiness gate."""
+
+    def __init__(self):
+        self.process_start = time.monotonic()
+        self.steps: Dict[str, StepRecord] = {}
+        self.ready_at: Optional[float] = None
+        self._gate: Optional[asyncio.Task] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # -- running steps -------------------------------------------------------
+    async def run(
+        self,
+        name: str,
+        fn: StepFn,
+        *,
+        required: bool = True,
+        thread: bool = False,
+        attempts: Optional[int] = None,
+    ) -> bool:
+        """Run *fn* as step *name*; returns False (after logging) on failure.
+
+        ``thread=True`` moves a blocking callable off the event loop.
+        Required steps are tried up to ``STARTUP_REQUIRED_ATTEMPTS`` times
+        with exponential backoff (optional ones once) unless *attempts* is
+        given.
+        """
+        if attempts is None:
+            attempts = REQUIRED_ATTEMPTS if required else 1
+        record = self.steps[name] = StepRecord(name=name, required=required)
+        start = time.perf_counter()
+        try:
+            while True:
+                record.attempts += 1
+                try:
+                    if thread:
+                        result = await asyncio.to_thread(fn)
+                    else:
+                        result = fn()
+                    if asyncio.iscoroutine(result):
+                        await result
+                    record.status = "ok"
+                    break
+                except Exception as exc:  # noqa: BLE001
+                    record.error = str(exc)
+                    if record.attempts >= attempts:
+                        record.status = "failed"
+                        log = logger.error if required else logger.warning
+                        log("Startup step %s failed: %s", name, exc)
+                        break
+                    delay = min(
+                        RETRY_BASE_SECONDS * 2 ** (record.attempts - 1),
+                        RETRY_MAX_SECONDS,
+                    )
+                    logger.warning(
+                        "Startup step %s failed (attempt %d/%d), retrying in %.1fs: %s",
+                        name,
+                        record.attempts,
+                        attempts,
+                        delay,
+                        exc,
+                    )
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            record.status = "failed"
+            record.error = "cancelled"
+            raise
+        finally:
+            record.seconds = time.perf_counter() - start
+        return record.status == "ok"
+
+    @contextmanager
+    def timed(self, name: str):
+        """Record a synchronous block (e.g. a router import) as a step."""
+        record = self.steps[name] = StepRecord(name=name, required=True)
+        start = time.perf_counter()
+        try:
+            yield
+            record.status = "ok"
+        except BaseException as exc:
+            record.status = "failed"
+            record.error = str(exc)
+            raise
+        finally:
+            record.seconds = time.perf_counter() - start
+
+    def background(self, name: str, fn: StepFn, *, thread: bool = True) -> None:
+        """Optional step started now, never awaited by the readiness gate."""
+        task = asyncio.create_task(
+            self.run(name, fn, required=False, thread=thread), name=f"startup-{name}"
+        )
+        self._tasks.append(task)
+
+    def begin(self, warm_up: Callable[[], Awaitable[None]]) -> None:
+        """Run the required warm-up chain in the background."""
+
+        async def _gate():
+            await warm_up()
+            if not self.failed_required():
+                self.ready_at = time.monotonic()
+            self._log_summary()
+            if not self.ready:
+                self.abort()
+                return
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            import_profiler.uninstall()
+            if PROFILE_ENABLED:
+                self._log_profile()
+
+        self._gate = asyncio.create_task(_gate(), name="startup-warmup")
+
+    def abort(self) -> None:
+        """Terminate the process after a required step failed for good.
+
+        Sends ``SIGTERM`` to ourselves so the server shuts down cleanly and
+        the supervisor restarts it.  Never fires under pytest.
+        """
+        if not EXIT_ON_FAILURE or "pytest" in sys.modules:
+            return
+        logger.critical("Required startup steps failed – shutting down")
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    async def stop(self) -> None:
+        for task in [self._gate, *self._tasks]:
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    # -- reporting -----------------------------------------------------------
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def failed_required(self) -> List[str]:
+        return [
+            s.name for s in self.steps.values() if s.required and s.status == "failed"
+        ]
+
+    def pending_required(self) -> List[str]:
+        return [
+            s.name for s in self.steps.values() if s.required and s.status == "running"
+        ]
+
+    def report(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "ready": self.ready,
+            "uptime_seconds": round(time.monotonic() - self.process_start, 3),
+            "seconds_to_ready": (
+                round(self.ready_at - self.process_start, 3) if self.ready_at else None
+            ),
+            "steps": {name: s.as_dict() for name, s in self.steps.items()},
+        }
+        if PROFILE_ENABLED:
+            out["imports"] = import_profiler.top()
+            out["import_packages"] = import_profiler.top_packages()
+        return out
+
+    def _log_summary(self) -> None:
+        steps = ", ".join(
+            f"{s.name}={s.seconds * 1000:.0f}ms{'' if s.status == 'ok' else '!'}"
+            for s in self.steps.values()
+            if s.status != "running"
+        )
+        if self.ready:
+            logger.info(
+                "Ready after %.2fs (%s)", self.ready_at - self.process_start, steps
+            )
+        else:
+            logger.error(
+                "Not ready – required steps failed: %s (%s)",
+                ", ".join(self.failed_required()),
+                steps,
+            )
+
+    def _log_profile(self) -> None:
+        for row in import_profiler.top_packages():
+            logger.info("import %-30s %8.1f ms", row["package"], row["self_ms"])
+        for row in import_profiler.top():
+            logger.info(
+                "import %-50s self %8.1f ms  incl %8.1f ms",
+                row["module"],
+                row["self_ms"],
+                row["inclusive_ms"],
+            )
+
+
+startup = StartupTracker()
+
+if PROFILE_ENABLED:
+    import_profiler.install()
@@ -0,0 +1,81 @@
+"""Keyset (cursor) pagination helpers shared by the listing endpoints.
+
+Every paginated listing (chat sessions, chat messages, timeline events) is
+ordered by ``(timestamp DESC, id DESC)`` and backed by a composite index on
+the same columns.  A page is fetched with ``WHERE (ts, id) < (:ts, :id)``
+instead of ``OFFSET`` so the cost stays proportional to the page size no
+matter how deep the client scrolls.
+
+Cursors are opaque URL-safe strings that encode the sort key of the last row
+returned.  Endpoints accept them as ``?cursor=`` and return the next one in
+the ``X-Next-Cursor`` response header (``None``/absent on the last page).
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+T = TypeVar("T")
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    raw = json.dumps([ts.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Inverse of :func:`encode_cursor`; raises ``ValueError`` on garbage."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception as exc:  # noqa: BLE001 – normalise every failure
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """FastAPI-facing :func:`decode_cursor` (``400`` on an invalid cursor)."""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from None
+
+
+def before(ts_column, id_column, cursor: Cursor):
+    """``(ts, id) < cursor`` – row-value comparison the index can seek on."""
+    return tuple_(ts_column, id_column) < tuple_(*cursor)
+
+
+def paginate(
+    rows: Sequence[T],
+    limit: int,
+    key: Callable[[T], Cursor],
+) -> Tuple[List[T], Optional[str]]:
+    """Split a ``limit + 1`` fetch into ``(page, next_cursor)``."""
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(*key(page[-1]))
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def created_key(row: Any) -> Cursor:
+    return row.created_at, row.id
@@ -0,0 +1,132 @@
+"""Compact, compressed line deltas for document version chains.
+
+A delta turns version *n-1* into version *n*.  It is the
+``SequenceMatcher`` opcode list with the equal runs collapsed to a line
+count, serialised as JSON and zlib-compressed:
+
+    ["=", 12]                   keep the next 12 lines
+    ["-", ["old", ...]]         drop these lines
+    ["+", ["new", ...]]         insert these lines
+    ["~", ["old", ...], ["new", ...]]   replace
+
+Removed lines are kept so a delta is self-describing: per-line change
+records can be derived from it without reconstructing either version.
+Lines keep their terminators, so ``apply_delta`` rebuilds the text
+byte-for-byte.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+Op = list
+Change = Tuple[str, int, str, str]
+
+_LEVEL = 6
+
+
+def split_lines(text: str) -> List[str]:
+    return text.splitlines(keepends=True)
+
+
+def diff_ops(old_lines: Sequence[str], new_lines: Sequence[str]) -> List[Op]:
+    ops: List[Op] = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+        elif tag == "delete":
+            ops.append(["-", list(old_lines[i1:i2])])
+        elif tag == "insert":
+            ops.append(["+", list(new_lines[j1:j2])])
+        else:
+            ops.append(["~", list(old_lines[i1:i2]), list(new_lines[j1:j2])])
+    return ops
+
+
+def stats(ops: Sequence[Op]) -> Dict[str, int]:
+    """Line counts in the shape ``DocumentVersion`` stores them."""
+    added = deleted = modified = 0
+    for op in ops:
+        if op[0] == "+":
+            added += len(op[1])
+        elif op[0] == "-":
+            deleted += len(op[1])
+        elif op[0] == "~":
+            modified += max(len(op[1]), len(op[2]))
+    return {"lines_added": added, "lines_deleted": deleted, "lines_modified": modified}
+
+
+def encode(ops: Sequence[Op]) -> bytes:
+    raw = json.dumps(ops, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(raw.encode("utf-8"), _LEVEL)
+
+
+def decode(blob: bytes) -> List[Op]:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), _LEVEL)
+
+
+def decompress_text(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def apply_delta(base_lines: Sequence[str], ops: Sequence[Op]) -> List[str]:
+    """Apply *ops* to *base_lines*; raises ``ValueError`` if they don't fit."""
+    out: List[str] = []
+    pos = 0
+    for op in ops:
+        kind = op[0]
+        if kind == "=":
+            out.extend(base_lines[pos : pos + op[1]])
+            pos += op[1]
+        elif kind == "+":
+            out.extend(op[1])
+        else:
+            pos += len(op[1])
+            if kind == "~":
+                out.extend(op[2])
+        if pos > len(base_lines):
+            raise ValueError("Delta does not apply to base content")
+    if pos != len(base_lines):
+        raise ValueError("Delta does not apply to base content")
+    return out
+
+
+def iter_changes(ops: Sequence[Op]) -> Iterator[Change]:
+    """Yield ``(change_type, line_number, old, new)`` per changed line.
+
+    Line numbers follow the historical ``DocumentChange`` convention: new
+    line for additions, old line for deletions and modifications.
+    """
+    old_no = new_no = 0
+    for op in ops:
+        kind = op[0]
+        if kind == "=":
+            old_no += op[1]
+            new_no += op[1]
+        elif kind == "+":
+            for line in op[1]:
+                new_no += 1
+                yield "line_added", new_no, "", line.rstrip("\r\n")
+        elif kind == "-":
+            for line in op[1]:
+                old_no += 1
+                yield "line_deleted", old_no, line.rstrip("\r\n"), ""
+        else:
+            old, new = op[1], op[2]
+            for i in range(max(len(old), len(new))):
+                yield (
+                    "line_modified",
+                    old_no + i + 1,
+                    old[i].rstrip("\r\n") if i < len(old) else "",
+                    new[i].rstrip("\r\n") if i < len(new) else "",
+                )
+            old_no += len(old)
+            new_no += len(new)
@@ -0,0 +1,327 @@
+# backend/app/utils/rate_limiter.py
+"""Token-bucket rate limiting shared by every layer of the API.
+
+A limit is a :class:`Bucket` – *capacity* tokens refilled at
+*refill_per_sec* – and a request names every bucket it must fit into
+together with its *cost* in each.  Request-count limits cost ``1``; LLM
+budgets cost the estimated number of tokens (prompt characters / 4 plus
+``max_tokens``) and are keyed by user, project and model so one tenant
+cannot drain the provider quota of the others.
+
+:meth:`RateLimiter.acquire` checks a whole batch in **one** Redis round
+trip: a Lua script refills all buckets from ``TIME``, and either charges
+all of them or none.  Without Redis (``redis-py`` missing, server down,
+tests) the same algorithm runs against a process-local store.
+
+After an LLM call the estimate is corrected with :meth:`RateLimiter.settle`
+– the difference is charged (buckets may go into debt) or refunded.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "tb:"
+LOCAL_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_LOCAL_MAX_BUCKETS", "50000"))
+
+# LLM token budgets per minute; 0 disables the scope
+LLM_USER_TOKENS_PER_MINUTE = int(os.getenv("LLM_USER_TOKENS_PER_MINUTE", "100000"))
+LLM_PROJECT_TOKENS_PER_MINUTE = int(
+    os.getenv("LLM_PROJECT_TOKENS_PER_MINUTE", "300000")
+)
+LLM_MODEL_TOKENS_PER_MINUTE = int(os.getenv("LLM_MODEL_TOKENS_PER_MINUTE", "0"))
+LLM_DEFAULT_COMPLETION_TOKENS = 1024
+CHARS_PER_TOKEN = 4
+
+
+def limiter_disabled() -> bool:
+    return os.getenv("DISABLE_RATE_LIMITER", "false").lower() == "true"
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """One limit and what the current request costs in it."""
+
+    key: str
+    capacity: float
+    refill_per_sec: float
+    cost: float = 1.0
+    # Error message when this bucket is the one that rejects the request
+    detail: Optional[str] = None
+
+    @classmethod
+    def per_window(
+        cls, key: str, limit: int, window: float, *, cost: float = 1.0, **kw
+    ) -> "Bucket":
+        """``limit`` requests per ``window`` seconds, bursts up to ``limit``."""
+        return cls(key, float(limit), limit / float(window), cost, **kw)
+
+    def with_cost(self, cost: float) -> "Bucket":
+        return Bucket(self.key, self.capacity, self.refill_per_sec, cost, self.detail)
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    # Seconds until the rejecting bucket holds enough tokens (0 when allowed)
+    retry_after: float = 0.0
+    # Tokens left in each bucket, in request order (before charging if denied)
+    remaining: List[float] = field(default_factory=list)
+    failed: Optional[Bucket] = None
+    backend: str = "local"
+
+    @property
+    def retry_after_seconds(self) -> int:
+        return max(1, math.ceil(self.retry_after))
+
+
+# ---------------------------------------------------------------------------
+# Redis backend
+# ---------------------------------------------------------------------------
+
+# language=Lua
+_LUA_TOKEN_BUCKETS = """
+-- KEYS[i]        = bucket key
+-- ARGV[1]        = "take" (all-or-nothing) | "force" (charge/refund, never deny)
+-- ARGV[3i-1..3i+1] = capacity, refill per second, cost of bucket i
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local force = ARGV[1] == "force"
+local levels = {}
+local failed = 0
+local retry = 0
+for i = 1, #KEYS do
+  local cap = tonumber(ARGV[3 * i - 1])
+  local rate = tonumber(ARGV[3 * i])
+  local cost = tonumber(ARGV[3 * i + 1])
+  local state = redis.call("HMGET", KEYS[i], "tokens", "ts")
+  local level = tonumber(state[1])
+  if level == nil then
+    level = cap
+  else
+    level = math.min(cap, level + math.max(0, now - tonumber(state[2])) * rate)
+  end
+  levels[i] = level
+  -- A cost above capacity only has to wait for a full bucket
+  local need = math.min(cost, cap)
+  if not force and need > level then
+    local wait = (need - level) / rate
+    if failed == 0 then failed = i end
+    if wait > retry then retry = wait end
+  end
+end
+local out = {failed == 0 and 1 or 0, failed, tostring(retry)}
+for i = 1, #KEYS do
+  local level = levels[i]
+  if failed == 0 then
+    local cap = tonumber(ARGV[3 * i - 1])
+    local rate = tonumber(ARGV[3 * i])
+    level = math.min(cap, level - tonumber(ARGV[3 * i + 1]))
+    redis.call("HSET", KEYS[i], "tokens", tostring(level), "ts", tostring(now))
+    -- Once full again the bucket is indistinguishable from a missing key
+    redis.call("PEXPIRE", KEYS[i], math.ceil((cap - level) / rate * 1000) + 1000)
+  end
+  out[#out + 1] = tostring(level)
+end
+return out
+"""
+
+
+# ---------------------------------------------------------------------------
+# Local backend
+# ---------------------------------------------------------------------------
+
+
+class LocalBucketStore:
+    """Process-local twin of the Lua script (fallback and tests)."""
+
+    def __init__(self, max_buckets: int = LOCAL_MAX_BUCKETS, clock=time.monotonic):
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self._state: Dict[str, List[float]] = {}  # key -> [tokens, ts]
+        self._lock = threading.Lock()
+
+    def _level(self, bucket: Bucket, now: float) -> float:
+        state = self._state.get(bucket.key)
+        if state is None:
+            return bucket.capacity
+        elapsed = max(0.0, now - state[1])
+        return min(bucket.capacity, state[0] + elapsed * bucket.refill_per_sec)
+
+    def apply(self, buckets: Sequence[Bucket], *, force: bool = False) -> Decision:
+        with self._lock:
+            now = self.clock()
+            levels = [self._level(b, now) for b in buckets]
+            failed: Optional[Bucket] = None
+            retry = 0.0
+            if not force:
+                for bucket, level in zip(buckets, levels):
+                    need = min(bucket.cost, bucket.capacity)
+                    if need > level:
+                        failed = failed or bucket
+                        retry = max(retry, (need - level) / bucket.refill_per_sec)
+            if failed is not None:
+                return Decision(False, retry, levels, failed)
+
+            for i, bucket in enumerate(buckets):
+                levels[i] = min(bucket.capacity, levels[i] - bucket.cost)
+                self._state[bucket.key] = [levels[i], now]
+            if len(self._state) > self.max_buckets:
+                self._prune(buckets, now)
+            return Decision(True, 0.0, levels)
+
+    def _prune(self, buckets: Sequence[Bucket], now: float) -> None:
+        """Drop the oldest half – refilled buckets carry no information."""
+        keep = {b.key for b in buckets}
+        by_age = sorted(self._state.items(), key=lambda kv: kv[1][1])
+        for key, _ in by_age[: len(by_age) // 2]:
+            if key not in keep:
+                del self._state[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._state.clear()
+
+
+# ---------------------------------------------------------------------------
+# Public limiter
+# ---------------------------------------------------------------------------
+
+
+class RateLimiter:
+    """Batched token buckets on Redis with a local fallback."""
+
+    def __init__(self, local: Optional[LocalBucketStore] = None):
+        self.local = local or LocalBucketStore()
+        self._script = None
+        self._script_client = None
+        self.fallbacks = 0
+
+    async def acquire(
+        self, buckets: Sequence[Bucket], *, fail_open: bool = True
+    ) -> Decision:
+        """Charge every bucket or none; one round trip for the whole batch.
+
+        With ``fail_open=False`` a Redis failure propagates instead of
+        falling back to the process-local store.
+        """
+        buckets = [b for b in buckets if b.capacity > 0 and b.refill_per_sec > 0]
+        if not buckets or limiter_disabled():
+            return Decision(allowed=True)
+        return await self._apply(buckets, force=False, fail_open=fail_open)
+
+    async def settle(
+        self, buckets: Sequence[Bucket], estimated: float, actual: float
+    ) -> None:
+        """Replace an *estimated* charge by the *actual* cost."""
+        delta = actual - estimated
+        if not delta or limiter_disabled():
+            return
+        adjusted = [
+            b.with_cost(delta)
+            for b in buckets
+            if b.capacity > 0 and b.refill_per_sec > 0
+        ]
+        if adjusted:
+            await self._apply(adjusted, force=True, fail_open=True)
+
+    async def refund(self, buckets: Sequence[Bucket]) -> None:
+        """Give back the charge of a call that failed before using anything."""
+        refunds = [
+            b.with_cost(-b.cost)
+            for b in buckets
+            if b.cost and b.capacity > 0 and b.refill_per_sec > 0
+        ]
+        if refunds and not limiter_disabled():
+            await self._apply(refunds, force=True, fail_open=True)
+
+    async def _apply(
+        self, buckets: Sequence[Bucket], *, force: bool, fail_open: bool
+    ) -> Decision:
+        from app.utils.redis_client import REDIS_AVAILABLE, RedisError, get_redis
+
+        if not REDIS_AVAILABLE:
+            return self.local.apply(buckets, force=force)
+        try:
+            client = await get_redis()
+            script = self._get_script(client)
+            args: List[object] = ["force" if force else "take"]
+            for b in buckets:
+                args.extend((b.capacity, b.refill_per_sec, b.cost))
+            raw = await script(keys=[KEY_PREFIX + b.key for b in buckets], args=args)
+        except (RedisError, OSError) as exc:
+            if not fail_open:
+                raise
+            self.fallbacks += 1
+            logger.warning("Rate limiter using local buckets: %s", exc)
+            return self.local.apply(buckets, force=force)
+
+        allowed, failed_idx, retry = int(raw[0]), int(raw[1]), float(raw[2])
+        return Decision(
+            allowed=bool(allowed),
+            retry_after=retry,
+            remaining=[float(v) for v in raw[3:]],
+            failed=buckets[failed_idx - 1] if failed_idx else None,
+            backend="redis",
+        )
+
+    def _get_script(self, client):
+        # EVALSHA with automatic SCRIPT LOAD on NOSCRIPT
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(_LUA_TOKEN_BUCKETS)
+            self._script_client = client
+        return self._script
+
+
+rate_limiter = RateLimiter()
+
+
+# ---------------------------------------------------------------------------
+# LLM token budgets
+# ---------------------------------------------------------------------------
+
+
+def estimate_tokens(chat_turns, max_tokens: Optional[int] = None) -> int:
+    """Rough prompt + completion size used to pre-charge LLM budgets."""
+    if chat_turns is None:
+        chars = 0
+    elif isinstance(chat_turns, str):
+        chars = len(chat_turns)
+    else:
+        chars = 0
+        for turn in chat_turns:
+            content = turn.get("content") if isinstance(turn, dict) else turn
+            if isinstance(content, str):
+                chars += len(content)
+            elif content is not None:
+                chars += len(str(content))
+    completion = max_tokens or LLM_DEFAULT_COMPLETION_TOKENS
+    return chars // CHARS_PER_TOKEN + completion
+
+
+def llm_buckets(
+    *,
+    user_id: Optional[int],
+    project_id: Optional[int],
+    model: Optional[str],
+    tokens: int,
+) -> List[Bucket]:
+    """Per-user, per-project and per-model token budgets for one call."""
+    scopes = [
+        ("user", user_id, LLM_USER_TOKENS_PER_MINUTE),
+        ("project", project_id, LLM_PROJECT_TOKENS_PER_MINUTE),
+        ("model", model, LLM_MODEL_TOKENS_PER_MINUTE),
+    ]
+    return [
+        Bucket.per_window(f"llm:{scope}:{ident}", per_minute, 60, cost=tokens)
+        for scope, ident, per_minute in scopes
+        if ident is not None and per_minute > 0
+    ]
@@ -1,20 +1,24 @@
 """
 redis_rate_limiter.py – Distributed rate limiter backed by Redis/Lua
-(strict dependency on redis-py >= 5.0, no in-memory fallbacks).
+(redis-py >= 5.0; process-local buckets while Redis is unreachable).
 
 Public API:
     * get_redis()                     – async connection factory
     * close_redis()                   – shutdown hook for FastAPI lifespan
     * rate_limit(...) -> headers dict – raises HTTP 429 on excess
+    * check_rate_limits(buckets)      – several limits in one round trip
+
+The buckets themselves live in :mod:`app.utils.rate_limiter`.
 """
 
 from __future__ import annotations
 
 # stdlib
 import logging
+import math
 import os
 from functools import lru_cache
-from typing import Dict, Final
+from typing import Dict, Sequence
 
 # ---------------------------------------------------------------------------
 # Optional Redis dependency --------------------------------------------------
@@ -33,7 +37,10 @@ from types import SimpleNamespace
 try:
     from redis.asyncio import Redis, from_url  # type: ignore
     from redis.exceptions import RedisError  # type: ignore
+
+    REDIS_AVAILABLE = True
 except ModuleNotFoundError:  # pragma: no cover – CI fallback
+    REDIS_AVAILABLE = False
 
     class _RedisStub:  # pylint: disable=too-few-public-methods
         """Minimal replacement that satisfies the subset used by the codebase."""
@@ -62,6 +69,8 @@ except ModuleNotFoundError:  # pragma: no cover – CI fallback
 
 from fastapi import HTTPException, status
 
+from app.utils.rate_limiter import Bucket, rate_limiter
+
 logger = logging.getLogger(__name__)
 
 # --------------------------------------------------------------------------- #
@@ -110,19 +119,60 @@ async def close_redis() -> None:
 # Rate-limiter
 # --------------------------------------------------------------------------- #
 
-# language=Lua
-_LUA_SLIDING_WINDOW: Final[
-    str
-] = """
--- KEYS[1] = key
--- ARGV[1] = limit
--- ARGV[2] = window (secs)
-local current = redis.call("INCR", KEYS[1])
-if current == 1 then
-  redis.call("EXPIRE", KEYS[1], ARGV[2])
-end
-return current
-"""
+def _limit_headers(bucket: Bucket, remaining: float) -> Dict[str, str]:
+    reset = math.ceil(max(0.0, bucket.capacity - remaining) / bucket.refill_per_sec)
+    return {
+        "X-RateLimit-Limit": str(int(bucket.capacity)),
+        "X-RateLimit-Remaining": str(max(0, int(remaining))),
+        "X-RateLimit-Reset": str(reset),
+    }
+
+
+async def check_rate_limits(
+    buckets: Sequence[Bucket],
+    *,
+    error_detail: str = "Rate limit exceeded. Please try again later.",
+    fail_open: bool = True,
+) -> Dict[str, str]:
+    """
+    Charge all *buckets* in a single Redis round trip.
+
+    Returns the headers of the tightest bucket on success and raises
+    `HTTPException(429)` – with the rejecting bucket's ``detail`` when it has
+    one – on violation.  When Redis is unavailable the process-local buckets
+    apply; set `fail_open=False` to answer 503 instead.
+    """
+    try:
+        decision = await rate_limiter.acquire(buckets, fail_open=fail_open)
+    except RedisError as exc:  # pragma: no cover
+        logger.error("Redis rate-limit error (%s). fail_open=%s", exc, fail_open)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Rate-limiting service temporarily unavailable.",
+        ) from exc
+
+    if not decision.remaining:  # limiter disabled
+        return {}
+
+    if not decision.allowed:
+        failed = decision.failed or buckets[0]
+        retry_after = str(decision.retry_after_seconds)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=failed.detail or error_detail,
+            headers={
+                "Retry-After": retry_after,
+                "X-RateLimit-Limit": str(int(failed.capacity)),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": retry_after,
+            },
+        )
+
+    tightest = min(
+        range(len(buckets)),
+        key=lambda i: decision.remaining[i] / buckets[i].capacity,
+    )
+    return _limit_headers(buckets[tightest], decision.remaining[tightest])
 
 
 async def rate_limit(
@@ -136,56 +186,15 @@ async def rate_limit(
     """
     Enforce <limit> requests per <window> seconds for *key*.
 
+    A token bucket holding <limit> tokens refilled over <window> seconds.
     Returns headers to merge into the FastAPI response on success.
     Raises `HTTPException(429)` on violation.
-
-    Set `fail_open=False` to block requests if Redis is unavailable.
     """
-    # Dev/CI bypass
-    if os.getenv("DISABLE_RATE_LIMITER", "false").lower() == "true":
-        return {}
-
-    try:
-        redis_client = await get_redis()
-
-        count: int = await redis_client.eval(
-            _LUA_SLIDING_WINDOW,
-            1,  # numkeys
-            key,  # KEYS[1]
-            limit,  # ARGV[1]
-            window,  # ARGV[2]
-        )
-
-        if count > limit:
-            ttl = await redis_client.ttl(key)
-            ttl = ttl if ttl and ttl > 0 else window
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=error_detail,
-                headers={
-                    "Retry-After": str(ttl),
-                    "X-RateLimit-Limit": str(limit),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(ttl),
-                },
-            )
-
-        remaining = max(0, limit - count)
-        return {
-            "X-RateLimit-Limit": str(limit),
-            "X-RateLimit-Remaining": str(remaining),
-            "X-RateLimit-Reset": str(await redis_client.ttl(key)),
-        }
-
-    except RedisError as exc:  # pragma: no cover
-        logger.error("Redis rate-limit error (%s). fail_open=%s", exc, fail_open)
-        if not fail_open:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Rate-limiting service temporarily unavailable.",
-            ) from exc
-        # fail-open: allow the request
-        return {}
+    return await check_rate_limits(
+        [Bucket.per_window(key, limit, window)],
+        error_detail=error_detail,
+        fail_open=fail_open,
+    )
 
 
 # --------------------------------------------------------------------------- #
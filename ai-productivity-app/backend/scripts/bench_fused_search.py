@@ -0,0 +1,103 @@
+"""Benchmark server-side fused search against the Python fusion path.
+
+Runs every query through ``HybridSearch.search`` with ``fused=False``
+(one query per modality, fused in Python) and ``fused=True`` (one
+``fused_code_search`` round-trip) and prints latency percentiles and the
+overlap of the two result lists.  Query embeddings are generated once up
+front and served from the embedding cache, so both paths measure search
+only.
+
+Usage::
+
+    python scripts/bench_fused_search.py --project 1 --runs 20 \\
+        "token refresh" "parse_config" "how are websocket messages routed"
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add backend to path - handle both local and Docker environments
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_path = os.path.join(script_dir, "..")
+if "/app/scripts" in script_dir:
+    # Running in Docker container
+    backend_path = "/app"
+sys.path.insert(0, backend_path)
+
+from app.database import SessionLocal  # noqa: E402
+from app.embeddings.generator import EmbeddingGenerator  # noqa: E402
+from app.services.hybrid_search import HybridSearch  # noqa: E402
+from app.services.postgresql_functions import PostgreSQLFunctions  # noqa: E402
+from app.services.vector_service import get_vector_service  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def run(args):
+    vector_service = await get_vector_service()
+    generator = None if args.no_semantic else EmbeddingGenerator()
+    timings = {False: [], True: []}
+    overlaps = []
+    PostgreSQLFunctions.install_fused_search()
+
+    with SessionLocal() as db:
+        search = HybridSearch(db, vector_service, generator)
+        if generator:
+            for query in args.queries:
+                await generator.generate_single_embedding(query)
+
+        for _ in range(args.warmup):
+            for fused in (False, True):
+                await search.search(args.queries[0], [args.project], fused=fused)
+
+        for _ in range(args.runs):
+            for query in args.queries:
+                found = {}
+                for fused in (False, True):
+                    started = time.perf_counter()
+                    results = await search.search(
+                        query, [args.project], limit=args.limit, fused=fused
+                    )
+                    timings[fused].append((time.perf_counter() - started) * 1000)
+                    found[fused] = {(r.get("document_id"), r.get("chunk_id")) for r in results}
+                union = found[False] | found[True]
+                if union:
+                    overlaps.append(len(found[False] & found[True]) / len(union))
+
+    print(f"{len(args.queries)} queries x {args.runs} runs, limit={args.limit}")
+    print(f"{'path':<10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for fused, label in ((False, "python"), (True, "sql")):
+        samples = timings[fused]
+        print(
+            f"{label:<10} {percentile(samples, 50):>8.1f} "
+            f"{percentile(samples, 95):>8.1f} {statistics.mean(samples):>8.1f}"
+        )
+    if overlaps:
+        print(f"result overlap (Jaccard): {statistics.mean(overlaps):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("queries", nargs="+")
+    parser.add_argument("--project", type=int, required=True)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument(
+        "--no-semantic",
+        action="store_true",
+        help="skip query embeddings (no embedding provider configured)",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Tests for the incremental hourly/daily analytics rollups."""
+
+from datetime import datetime, timedelta, timezone
+
+from app.models.analytics_rollup import AnalyticsRollup
+from app.models.config import ModelUsageMetrics
+from app.monitoring.timeseries import QuantileSketch
+from app.services.analytics_rollups import (
+    RollupAggregate,
+    _rebuild_day,
+    merge_rollups,
+    read_rollups,
+    run_rollups,
+)
+
+NOW = datetime(2025, 7, 10, 15, 20)
+
+
+def _usage(hour, requests, cost, users):
+    start = hour.replace(tzinfo=timezone.utc)
+    return ModelUsageMetrics(
+        model_id="gpt-4o",
+        period_start=start,
+        period_end=start + timedelta(hours=1),
+        total_requests=requests,
+        total_tokens_input=requests * 100,
+        total_tokens_output=requests * 10,
+        total_cost=cost,
+        avg_response_time_ms=200.0,
+        success_rate=100.0,
+        detailed_metrics={
+            "provider": "openai",
+            "feature_chat": {"requests": requests, "cost": cost},
+            **{
+                f"user_{uid}": {"requests": n, "cost": c}
+                for uid, (n, c) in users.items()
+            },
+        },
+    )
+
+
+def test_aggregate_merges_sketches_and_additive_data():
+    a, b = QuantileSketch(), QuantileSketch()
+    for v in range(1, 51):
+        a.add(v)
+    for v in range(51, 101):
+        b.add(v)
+    agg = RollupAggregate()
+    chat = {"features": {"chat": {"requests": 2}}}
+    agg.add(50, 1275, lo=1, hi=50, sketch=a, data=chat)
+    agg.add(
+        50,
+        3775,
+        lo=51,
+        hi=100,
+        sketch=b,
+        data={"features": {"chat": {"requests": 3}}, "provider": "x"},
+    )
+
+    assert (agg.count, agg.min, agg.max, agg.avg) == (100, 1, 100, 50.5)
+    p50, p95 = agg.quantiles()
+    assert abs(p50 - 50) < 2 and abs(p95 - 95) < 3
+    assert agg.data == {"features": {"chat": {"requests": 5}}, "provider": "x"}
+
+
+def test_run_rollups_builds_hours_and_days_idempotently(db):
+    ten, eleven = NOW.replace(hour=10, minute=0), NOW.replace(hour=11, minute=0)
+    db.add_all(
+        [
+            _usage(ten, 4, 0.4, {1: (3, 0.3), 2: (1, 0.1)}),
+            _usage(eleven, 6, 0.6, {1: (6, 0.6)}),
+        ]
+    )
+    db.commit()
+
+    run_rollups(db, now=NOW)
+    run_rollups(db, now=NOW)  # reruns replace, never duplicate
+
+    hours = read_rollups(db, "cost", NOW - timedelta(hours=12), NOW)
+    assert [(r.bucket_start.hour, r.count) for r in hours] == [(10, 4), (11, 6)]
+
+    day = merge_rollups(
+        read_rollups(db, "cost", NOW - timedelta(days=5), NOW, granularity="day")
+    )["gpt-4o"]
+    assert (day.count, round(day.total, 6), day.tokens_in) == (10, 1.0, 1000)
+    assert day.data["features"]["chat"]["requests"] == 10
+    assert day.data["latency_ms_sum"] == 2000.0
+
+    user_1 = merge_rollups(
+        read_rollups(db, "cost", NOW - timedelta(days=1), NOW, user_id=1)
+    )
+    assert user_1["gpt-4o"].count == 9
+
+
+def test_daily_active_users_count_distinct_users(db):
+    day = NOW.replace(hour=0, minute=0)
+    rows = [
+        RollupAggregate(count=1).row(
+            "hour", ("usage", "messages", uid, day + timedelta(hours=hour))
+        )
+        for hour, uids in ((9, [1, 2]), (10, [2, 3]))
+        for uid in uids
+    ]
+    rows += [
+        RollupAggregate(count=2).row(
+            "hour", ("usage", "active_users", 0, day + timedelta(hours=hour))
+        )
+        for hour in (9, 10)
+    ]
+    db.bulk_insert_mappings(AnalyticsRollup, rows)
+    _rebuild_day(db, day)
+    db.commit()
+
+    daily = merge_rollups(read_rollups(db, "usage", day, day + timedelta(days=3)))
+    assert daily["active_users"].count == 3  # not 2 + 2
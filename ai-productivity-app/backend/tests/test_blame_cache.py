@@ -0,0 +1,37 @@
+"""Unit-tests for the compact blame table used by GitHistorySearcher."""
+
+from app.services.blame_cache import BlameTable
+
+
+def _commit(sha):
+    return {"commit_hash": sha, "author": "dev", "date": "2025-01-01", "message": sha}
+
+
+def test_lookup_and_merge_adjacent_hunks():
+    a, b = _commit("a" * 40), _commit("b" * 40)
+    # Hunks arrive out of order, as with ``git blame --incremental``.
+    table = BlameTable.from_entries([(11, 20, b), (1, 5, a), (6, 10, a)])
+
+    assert table.starts == [1, 11]
+    assert table.ends == [10, 20]
+    assert table.line_count == 20
+    assert table.lookup(1)["commit_hash"] == a["commit_hash"]
+    assert table.lookup(10)["commit_hash"] == a["commit_hash"]
+    assert table.lookup(11)["commit_hash"] == b["commit_hash"]
+    assert table.lookup(0) is None
+    assert table.lookup(21) is None
+
+
+def test_range_query_clips_hunks():
+    a, b, c = _commit("a" * 40), _commit("b" * 40), _commit("c" * 40)
+    table = BlameTable.from_entries([(1, 10, a), (11, 20, b), (21, 30, c)])
+
+    hunks = table.range(5, 25)
+
+    assert [(lo, hi, info["commit_hash"][0]) for lo, hi, info in hunks] == [
+        (5, 10, "a"),
+        (11, 20, "b"),
+        (21, 25, "c"),
+    ]
+    assert table.range(40, 50) == []
+    assert table.range(10, 5) == []
@@ -0,0 +1,245 @@
+"""Unit-tests for the trigram grep engine (planner, index, pagination)."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+import app.database
+from app.models.code import CodeDocument, CodeDocumentContent, CodeEmbedding
+from app.services import code_grep
+from app.services.code_grep import (
+    MATCH_ALL,
+    CodeGrepEngine,
+    ProjectGrepIndex,
+    plan_query,
+    reassemble_chunks,
+)
+
+
+def test_plan_literal_and_alternation():
+    assert plan_query("foo.*barbaz") == [
+        frozenset({"foo", "bar", "arb", "rba", "baz"})
+    ]
+    assert plan_query("(alpha|beta)") == [
+        frozenset({"alp", "lph", "pha"}),
+        frozenset({"bet", "eta"}),
+    ]
+
+
+def test_plan_without_literals_matches_everything():
+    assert plan_query("a+") == MATCH_ALL
+    assert plan_query("[a-z]{3}") == MATCH_ALL
+    assert plan_query("(unbalanced") == MATCH_ALL
+
+
+def _index():
+    index = ProjectGrepIndex(1)
+    index.add(1, "b.py", "python", "def handle_get():\n    pass\nx = handle_post\n")
+    index.add(2, "a.py", "python", "nothing here\n")
+    index.add(3, "c.py", "python", "def handle_post(): pass\n")
+    return index
+
+
+def test_candidates_prune_and_follow_removals():
+    index = _index()
+    query = plan_query(r"def\s+handle_(get|post)")
+
+    assert index.candidates(query) == [1, 3]
+
+    index.remove(1)
+    assert index.candidates(query) == [3]
+
+
+def test_search_pages_with_cursor():
+    index = _index()
+
+    class _Engine(CodeGrepEngine):
+        async def ensure_index(self, db, project_id):
+            return index
+
+    engine = _Engine()
+    pattern = r"def\s+handle_(get|post)"
+
+    first = asyncio.run(engine.search(None, 1, pattern, regex=True, limit=1))
+    assert [(m["file_path"], m["line"]) for m in first["matches"]] == [("b.py", 1)]
+    assert first["next_cursor"] == "1:1"
+
+    second = asyncio.run(
+        engine.search(
+            None, 1, pattern, regex=True, limit=5, cursor=first["next_cursor"]
+        )
+    )
+    assert [(m["file_path"], m["line"]) for m in second["matches"]] == [("c.py", 1)]
+    assert second["next_cursor"] is None
+
+
+def test_literal_search_reports_columns():
+    index = _index()
+
+    class _Engine(CodeGrepEngine):
+        async def ensure_index(self, db, project_id):
+            return index
+
+    page = asyncio.run(_Engine().search(None, 1, "PASS", limit=10))
+
+    assert [(m["file_path"], m["line"], m["column"]) for m in page["matches"]] == [
+        ("b.py", 2, 5),
+        ("c.py", 1, 20),
+    ]
+
+
+def _store(db, project_id, path, content, updated_at):
+    doc = CodeDocument(project_id=project_id, file_path=path, language="python")
+    db.add(doc)
+    db.flush()
+    db.add(
+        CodeDocumentContent(
+            document_id=doc.id,
+            project_id=project_id,
+            content=content,
+            updated_at=updated_at,
+        )
+    )
+    db.commit()
+    return doc
+
+
+def test_sync_drops_deleted_documents_when_count_is_unchanged(db, test_project):
+    t0 = datetime(2025, 1, 1)
+    old = _store(db, test_project.id, "old.py", "def handle(): pass\n", t0)
+    _store(db, test_project.id, "keep.py", "x = 1\n", t0)
+    engine = CodeGrepEngine()
+    query = plan_query("handle")
+    assert engine.sync_index(db, test_project.id).candidates(query) == [old.id]
+
+    # One delete plus one add: same count, newer timestamp
+    db.query(CodeDocumentContent).filter_by(document_id=old.id).delete()  # cascade
+    db.delete(old)
+    db.commit()
+    new = _store(
+        db, test_project.id, "new.py", "handle()\n", t0 + timedelta(minutes=1)
+    )
+
+    index = engine.sync_index(db, test_project.id)
+    assert index.candidates(query) == [new.id]
+    assert sorted(path for path, _, _ in index.docs.values()) == ["keep.py", "new.py"]
+
+
+def test_snapshot_is_stable_while_the_index_changes():
+    index = _index()
+    query = plan_query("handle_")
+    stop = threading.Event()
+
+    def churn():
+        n = 10
+        while not stop.is_set():
+            with index.lock:
+                index.add(n, f"z{n}.py", "python", "handle_x\n")
+                index.remove(n - 1)
+            n += 1
+
+    worker = threading.Thread(target=churn)
+    worker.start()
+    try:
+        for _ in range(200):
+            entries = index.snapshot(query)
+            assert all(entry[0].endswith(".py") for entry in entries.values())
+    finally:
+        stop.set()
+        worker.join()
+
+
+def test_reassemble_chunks_keeps_line_numbers():
+    chunks = [
+        (5, 6, "e\nf"),
+        (1, 3, "a\nb\nc"),
+        (3, 4, "c\nd"),  # overlaps the first chunk by one line
+        (None, None, "orphan"),
+    ]
+    assert reassemble_chunks(chunks) == "a\nb\nc\nd\ne\nf\norphan"
+    assert reassemble_chunks([(3, 3, "x")]) == "\n\nx"
+
+
+def test_first_sync_backfills_documents_without_contents(db, test_project, monkeypatch):
+    monkeypatch.setattr(
+        app.database, "session_for", lambda w: sessionmaker(bind=db.get_bind())()
+    )
+    old = CodeDocument(project_id=test_project.id, file_path="old.py")
+    pending = CodeDocument(project_id=test_project.id, file_path="pending.py")
+    db.add_all([old, pending])
+    db.flush()
+    db.add_all(
+        [
+            CodeEmbedding(
+                document_id=old.id, chunk_content=text, start_line=n, end_line=n
+            )
+            for n, text in ((2, "def legacy_handler():"), (1, "import os"))
+        ]
+    )
+    db.commit()
+
+    engine = CodeGrepEngine()
+    index = engine.sync_index(db, test_project.id)
+
+    assert index.candidates(plan_query("legacy_handler")) == [old.id]
+    assert index.unindexed == 1  # no chunks yet: reported, not hidden
+    page = asyncio.run(engine.search(db, test_project.id, "legacy_handler"))
+    assert [(m["file_path"], m["line"]) for m in page["matches"]] == [("old.py", 2)]
+    assert page["unindexed_files"] == 1
+
+
+def test_slow_verification_times_out_with_partial_results(monkeypatch):
+    index = _index()
+
+    class _Engine(CodeGrepEngine):
+        async def ensure_index(self, db, project_id):
+            return index
+
+    monkeypatch.setattr(code_grep, "GREP_TIMEOUT_SECONDS", 0)
+    page = asyncio.run(_Engine().search(None, 1, "handle", limit=10))
+    assert page["timed_out"] and page["matches"] == []
+
+    # A catastrophically backtracking pattern is cut off, not run to the end
+    monkeypatch.setattr(code_grep, "GREP_TIMEOUT_SECONDS", 0.2)
+    index.add(4, "d.py", "python", "x" * 5000 + "!")
+    started = time.monotonic()
+    page = asyncio.run(_Engine().search(None, 1, r"(x+x+)+y", regex=True))
+    assert page["timed_out"]
+    assert time.monotonic() - started < 5
+
+
+def test_closing_the_stream_cancels_queued_batches(monkeypatch):
+    index = ProjectGrepIndex(1)
+    for n in range(20):
+        index.add(n, f"f{n:02}.py", "python", "needle\n")
+    scanned = []
+    scan = code_grep._scan_document
+
+    def counting_scan(*args):
+        scanned.append(1)
+        time.sleep(0.01)
+        return scan(*args)
+
+    class _Engine(CodeGrepEngine):
+        async def ensure_index(self, db, project_id):
+            return index
+
+    monkeypatch.setattr(code_grep, "GREP_VERIFY_BATCH", 1)
+    monkeypatch.setattr(code_grep, "_scan_document", counting_scan)
+    engine = _Engine()
+    engine._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def first_match():
+        matches = engine.iter_matches(None, 1, "needle", limit=100)
+        async with aclosing(matches):
+            async for match in matches:
+                return match
+
+    assert asyncio.run(first_match())["file_path"] == "f00.py"
+    engine._executor.shutdown(wait=True)
+    assert len(scanned) < 20
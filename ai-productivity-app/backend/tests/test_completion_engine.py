@@ -0,0 +1,72 @@
+"""Unit-tests for the inline completion engine (cache, cancellation, streaming)."""
+
+import asyncio
+
+from app.services.completion_engine import CompletionContext, CompletionEngine
+
+
+class _FakeLLM:
+    """Streams *text* three characters at a time."""
+
+    def __init__(self, text, delay=0.0):
+        self.text = text
+        self.delay = delay
+        self.calls = 0
+        self.closed = False
+
+    async def complete(self, **kwargs):
+        self.calls += 1
+
+        async def _gen():
+            try:
+                for i in range(0, len(self.text), 3):
+                    await asyncio.sleep(self.delay)
+                    yield self.text[i : i + 3]
+            finally:
+                self.closed = True
+
+        return _gen()
+
+
+def test_cleans_stream_and_reuses_suggestion_while_typing():
+    llm = _FakeLLM("```python\nreturn a + b\nprint(a)\n```\nThis code adds")
+    engine = CompletionEngine(llm)
+
+    async def run():
+        first = await engine.complete(CompletionContext(1, "python", "def f():\n    "))
+        typed = await engine.complete(
+            CompletionContext(1, "python", "def f():\n    retu")
+        )
+        return first, typed
+
+    first, typed = asyncio.run(run())
+    assert first == "return a + b\nprint(a)"
+    assert typed == "rn a + b\nprint(a)"
+    assert llm.calls == 1
+    assert engine.stats()["cache_hits"] == 1
+
+
+def test_single_line_mode_stops_reading_after_first_line():
+    llm = _FakeLLM("x + 1\ny = 2\nz = 3\n")
+    engine = CompletionEngine(llm)
+    ctx = CompletionContext(1, "python", "value = ", mode="complete")
+
+    assert asyncio.run(engine.complete(ctx)) == "x + 1"
+    assert llm.closed
+
+
+def test_newer_request_cancels_in_flight_one():
+    engine = CompletionEngine(_FakeLLM("abc\ndef\n", delay=0.02))
+
+    async def run():
+        stale = asyncio.create_task(engine.complete(CompletionContext(7, "py", "a")))
+        await asyncio.sleep(0.005)
+        fresh = await engine.complete(CompletionContext(7, "py", "ab"))
+        return await stale, fresh
+
+    stale, fresh = asyncio.run(run())
+    assert stale is None
+    assert fresh == "abc\ndef"
+    stats = engine.stats()
+    assert stats["cancelled"] == 1
+    assert stats["in_flight"] == 0
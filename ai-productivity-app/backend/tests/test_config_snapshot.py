@@ -0,0 +1,70 @@
+"""Tests for the shared runtime-config snapshot."""
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.config import RuntimeConfig
+from app.services import config_snapshot as snapshot_module
+from app.services.config_snapshot import ConfigSnapshotStore
+
+
+def _set(db, key, value):
+    db.merge(RuntimeConfig(key=key, value=value, value_type="string"))
+    db.commit()
+
+
+def test_rebuild_publishes_an_immutable_new_version(db):
+    _set(db, "chat_model", "gpt-4o")
+    store = ConfigSnapshotStore()
+
+    first = store.get(db)
+    assert (first.version, first.fallback) == (1, False)
+    assert first.runtime["chat_model"] == "gpt-4o"
+    assert store.get(db) is first  # served from memory
+    with pytest.raises(TypeError):
+        first.runtime["chat_model"] = "other"
+
+    _set(db, "chat_model", "gpt-4.1")
+    second = store.rebuild(db)
+    assert second.version == 2
+    assert second.runtime["chat_model"] == "gpt-4.1"
+    assert first.runtime["chat_model"] == "gpt-4o"
+
+
+def test_failed_rebuild_keeps_current_or_falls_back(db, monkeypatch):
+    store = ConfigSnapshotStore()
+    good = store.rebuild(db)
+
+    def broken(db, version):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(snapshot_module, "build_snapshot", broken)
+    assert store.rebuild(db) is good
+
+    cold = ConfigSnapshotStore()
+    fallback = cold.get(db)
+    assert fallback.fallback and fallback.runtime_config["provider"]
+    assert cold.get(db) is fallback  # no retry storm while the DB is down
+
+    monkeypatch.undo()
+    cold._retry_at = 0.0  # retry window elapsed
+    recovered = cold.get(db)
+    assert not recovered.fallback and recovered.version == fallback.version + 1
+
+
+def test_stamp_polling_detects_out_of_band_writes(db, monkeypatch):
+    import app.database
+
+    monkeypatch.setattr(
+        app.database, "SessionLocal", sessionmaker(bind=db.get_bind())
+    )
+    store = ConfigSnapshotStore()
+    assert store._changed()  # nothing loaded yet
+
+    store.rebuild(db)
+    assert not store._changed()
+
+    _set(db, "temperature", "0.2")  # e.g. a seeder bypassing the service
+    assert store._changed()
+    store.rebuild()
+    assert not store._changed()
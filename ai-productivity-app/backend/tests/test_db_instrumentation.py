@@ -0,0 +1,101 @@
+"""Tests for the per-workload engine registry and its instrumentation."""
+
+import sqlite3
+
+import pytest
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import text
+
+from app.database import EngineRegistry
+from app.monitoring import metrics
+from app.monitoring.db_instrumentation import (
+    OTHER_SITE,
+    CallSiteStats,
+    call_site_stats,
+    pool_class,
+)
+
+
+def _sample(name, **labels):
+    if not metrics.HAS_PROMETHEUS:
+        pytest.skip("prometheus_client not installed")
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def registry(tmp_path):
+    url = f"sqlite:///{tmp_path / 'registry.db'}"
+    reg = EngineRegistry(url, url.replace("sqlite", "sqlite+aiosqlite"))
+    yield reg
+    for eng in reg._sync.values():
+        eng.dispose()
+
+
+def test_registry_caches_one_engine_per_workload(registry):
+    worker = registry.sync("worker")
+    assert registry.sync("worker") is worker
+    assert registry.sync("analytics") is not worker
+    assert registry.sessionmaker("worker") is registry.sessionmaker("worker")
+
+    with registry.sessionmaker("worker")() as session:
+        assert session.get_bind() is worker
+    assert {(p["workload"], p["engine"]) for p in registry.pool_status()} == {
+        ("worker", "sync"),
+        ("analytics", "sync"),
+    }
+
+
+def test_postgres_pools_are_sized_per_workload(monkeypatch):
+    monkeypatch.setenv("DB_POOL_WORKER_SIZE", "3")
+    reg = EngineRegistry("postgresql://db/app", "postgresql+asyncpg://db/app")
+
+    kwargs = reg._pool_kwargs(reg.sync_url, "worker", is_async=False)
+    assert kwargs["pool_size"] == 3
+    assert kwargs["poolclass"].workload == "worker"
+    assert reg._pool_kwargs("sqlite://", "worker", is_async=False) == {}
+
+
+def test_statements_are_timed_per_workload(registry):
+    workload = "instrumented-test"
+    before = _sample("db_query_seconds_count", workload=workload)
+
+    with registry.sync(workload).connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+
+    assert _sample("db_query_seconds_count", workload=workload) == before + 2
+    rows = [r for r in call_site_stats.top(limit=200) if r["workload"] == workload]
+    assert sum(r["count"] for r in rows) == 2
+
+
+def test_pool_checkout_timeouts_are_counted():
+    timed = pool_class("timeout-test", is_async=False)
+    pool = timed(
+        lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.05
+    )
+    before = _sample("db_pool_timeouts_total", workload="timeout-test")
+
+    held = pool.connect()
+    with pytest.raises(sa_exc.TimeoutError):
+        pool.connect()
+    held.close()
+
+    assert _sample("db_pool_timeouts_total", workload="timeout-test") == before + 1
+    waits = [r for r in call_site_stats.top(200) if r["workload"] == "timeout-test"]
+    assert waits and waits[0]["pool_wait_seconds"] >= 0.05
+
+
+def test_call_site_table_is_bounded():
+    stats = CallSiteStats(max_sites=2)
+    for n in range(5):
+        stats.query("request", f"site{n}", 0.01 * (n + 1), rows=1)
+
+    top = stats.top(sort="count")
+    assert [r["call_site"] for r in top] == [OTHER_SITE, "site0", "site1"]
+    assert top[0]["count"] == 3 and top[0]["max_seconds"] == 0.05
+
+
+def test_database_stats_requires_admin(client):
+    assert client.get("/health/db").status_code in (401, 403)
@@ -0,0 +1,74 @@
+"""Unit-tests for the micro-batching front of query embeddings."""
+
+import asyncio
+
+import pytest
+
+from app.embeddings.coalescer import EmbeddingCoalescer
+
+
+class _Provider:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [[float(len(t))] for t in texts]
+
+
+def test_concurrent_requests_share_one_call_and_duplicates_one_input():
+    provider = _Provider()
+
+    async def main():
+        coalescer = EmbeddingCoalescer(provider.embed, window=0.005)
+        return await asyncio.gather(
+            *(coalescer.embed(t) for t in ["a", "bb", "a", "ccc", "bb"])
+        )
+
+    vectors = asyncio.run(main())
+    assert vectors == [[1.0], [2.0], [1.0], [3.0], [2.0]]
+    assert provider.calls == [["a", "bb", "ccc"]]
+
+
+def test_full_window_flushes_early_and_errors_reach_every_caller():
+    provider = _Provider(fail=True)
+
+    async def main():
+        coalescer = EmbeddingCoalescer(provider.embed, window=60, max_batch=2)
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                coalescer.embed("x"), coalescer.embed("y"), return_exceptions=True
+            ),
+            timeout=1,
+        )
+        # Nothing stays in flight after a failure: the next call retries
+        provider.fail = False
+        again = await asyncio.wait_for(
+            asyncio.gather(coalescer.embed("x"), coalescer.embed("z")), timeout=1
+        )
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert again == [[1.0], [1.0]]
+    assert provider.calls == [["x", "y"], ["x", "z"]]
+
+
+def test_cancelled_caller_does_not_cancel_the_batch():
+    provider = _Provider()
+
+    async def main():
+        coalescer = EmbeddingCoalescer(provider.embed, window=0.001)
+        impatient = asyncio.create_task(coalescer.embed("q"))
+        patient = asyncio.create_task(coalescer.embed("q"))
+        await asyncio.sleep(0.002)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(main()) == [1.0]
@@ -0,0 +1,70 @@
+"""Tests for keyset (cursor) pagination."""
+
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.chat import ChatMessage, ChatSession
+from app.services.chat_service import ChatService
+from app.utils.keyset import (
+    created_key,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+    parse_cursor,
+)
+
+STAMP = datetime(2025, 3, 1, 12, 30, 15, 123456)
+
+
+def test_cursor_round_trip_and_validation():
+    cursor = encode_cursor(STAMP, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (STAMP, 42)
+    assert parse_cursor(None) is None
+
+    with pytest.raises(ValueError):
+        decode_cursor("garbage")
+    with pytest.raises(HTTPException) as exc:
+        parse_cursor("garbage")
+    assert exc.value.status_code == 400
+
+
+def test_paginate_only_returns_cursor_when_more_rows_exist():
+    rows = [ChatMessage(id=n, created_at=STAMP) for n in (5, 4, 3)]
+    page, cursor = paginate(rows, 2, created_key)
+    assert [r.id for r in page] == [5, 4]
+    assert decode_cursor(cursor) == (STAMP, 4)
+    assert paginate(rows, 3, created_key)[1] is None
+
+
+@pytest.mark.asyncio
+async def test_message_pages_break_timestamp_ties_by_id(db, test_project, test_user):
+    session = ChatSession(project_id=test_project.id, title="t")
+    db.add(session)
+    db.flush()
+    # Same created_at for every row: only the id can order them
+    db.add_all(
+        ChatMessage(
+            session_id=session.id,
+            user_id=test_user.id,
+            role="user",
+            content=f"m{n}",
+            created_at=STAMP,
+        )
+        for n in range(5)
+    )
+    db.commit()
+
+    service = ChatService(db)
+    seen, cursor = [], None
+    while True:
+        page, cursor = await service.get_session_messages_page(
+            session.id, limit=2, cursor=decode_cursor(cursor) if cursor else None
+        )
+        seen.append([m.content for m in page])
+        if cursor is None:
+            break
+
+    assert seen == [["m3", "m4"], ["m1", "m2"], ["m0"]]
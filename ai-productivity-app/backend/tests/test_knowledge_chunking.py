@@ -0,0 +1,54 @@
+"""Unit-tests for the structure-aware splitter used by knowledge ingestion."""
+
+from app.embeddings.batching import (
+    simple_tokenizer_estimate,
+    split_long_text,
+    split_structured_text,
+)
+
+DOC = """Preamble paragraph.
+
+# Install
+Run the installer.
+
+```sh
+# a comment, not a heading
+make install
+```
+
+## Docker
+Build the image.
+
+# Usage
+Start it.
+"""
+
+
+def test_chunks_follow_headings_and_ignore_fenced_code():
+    sections = split_structured_text(DOC, max_tokens=512)
+    assert [(s.index, s.heading) for s in sections] == [
+        (0, ""),
+        (1, "Install"),
+        (2, "Install > Docker"),
+        (3, "Usage"),
+    ]
+    assert "# a comment, not a heading" in sections[1].text
+    assert sections[3].text == "Start it."
+
+
+def test_paragraphs_are_packed_and_long_ones_windowed():
+    body = "\n\n".join(f"Paragraph {i} " + "word " * 40 for i in range(30))
+    long_para = "token " * 5000
+    sections = split_structured_text(f"# A\n{body}\n\n{long_para}", max_tokens=256)
+
+    assert all(simple_tokenizer_estimate(s.text) <= 256 for s in sections)
+    assert all(s.heading == "A" for s in sections)
+    # Several paragraphs share a chunk, none is cut in half
+    first = sections[0].text.split("\n\n")
+    assert len(first) > 1 and all(p.startswith("Paragraph") for p in first)
+
+
+def test_split_long_text_is_linear_and_respects_limit():
+    parts = list(split_long_text("lorem ipsum dolor " * 200_000, 512))
+    assert all(simple_tokenizer_estimate(p) <= 512 for p in parts)
+    assert sum(len(p.split()) for p in parts) == 600_000
@@ -0,0 +1,125 @@
+"""Tests for the knowledge ingestion queue: backoff and scoped vector deletes."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.knowledge import KnowledgeDocument
+from app.services import knowledge_ingest
+from app.services.knowledge_ingest import (
+    FAILED,
+    INDEXED,
+    PENDING,
+    KnowledgeIngestWorker,
+    retry_delay,
+)
+
+
+@pytest.fixture
+def worker_db(db, monkeypatch):
+    import app.database
+
+    maker = sessionmaker(bind=db.get_bind())
+    monkeypatch.setattr(app.database, "session_for", lambda workload: maker())
+    return db
+
+
+def _doc(db, project_id, doc_id="kb_1", **fields):
+    doc = KnowledgeDocument(
+        id=doc_id, project_id=project_id, title="Runbook", content="# A\nText.", **fields
+    )
+    db.add(doc)
+    db.commit()
+    return doc
+
+
+def test_retry_delay_grows_exponentially_and_is_capped(monkeypatch):
+    monkeypatch.setattr(knowledge_ingest, "RETRY_BASE_SECONDS", 30)
+    monkeypatch.setattr(knowledge_ingest, "RETRY_MAX_SECONDS", 100)
+    assert [retry_delay(n).total_seconds() for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+
+def test_failed_documents_wait_before_they_are_claimed_again(worker_db, test_project):
+    doc_id = _doc(worker_db, test_project.id).id
+
+    assert [job.doc_id for job in knowledge_ingest._claim(10)] == [doc_id]
+    knowledge_ingest._fail(doc_id, "embedding API down")
+
+    worker_db.expire_all()
+    doc = worker_db.get(KnowledgeDocument, doc_id)
+    assert doc.ingest_status == PENDING and doc.next_attempt_at > datetime.utcnow()
+    assert knowledge_ingest._claim(10) == []  # not due yet
+
+    doc.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    worker_db.commit()
+    assert [job.doc_id for job in knowledge_ingest._claim(10)] == [doc_id]
+
+
+def test_document_fails_for_good_after_max_attempts(
+    worker_db, test_project, monkeypatch
+):
+    monkeypatch.setattr(knowledge_ingest, "MAX_ATTEMPTS", 1)
+    doc_id = _doc(worker_db, test_project.id).id
+    knowledge_ingest._claim(10)
+    knowledge_ingest._fail(doc_id, "boom")
+
+    worker_db.expire_all()
+    assert worker_db.get(KnowledgeDocument, doc_id).ingest_status == FAILED
+
+
+class _Generator:
+    async def generate_embeddings(self, texts):
+        return [[0.1, 0.2] for _ in texts]
+
+
+class _VectorStore:
+    def __init__(self):
+        self.deleted = []
+        self.inserted = []
+
+    async def delete_by_document(self, document_id, metadata=None):
+        self.deleted.append((document_id, metadata))
+
+    async def insert_embeddings(self, rows):
+        self.inserted.extend(rows)
+
+
+@pytest.mark.asyncio
+async def test_reindex_only_deletes_the_documents_own_vectors(
+    worker_db, test_project
+):
+    doc_id = _doc(worker_db, test_project.id).id
+    store = _VectorStore()
+    worker = KnowledgeIngestWorker(generator=_Generator(), vector_store=store)
+
+    (job,) = knowledge_ingest._claim(10)
+    await worker._ingest(job)
+
+    vec_id = knowledge_ingest.vector_document_id(doc_id)
+    assert store.deleted == [(vec_id, {"knowledge_doc_id": doc_id})]
+    assert {row["metadata"]["knowledge_doc_id"] for row in store.inserted} == {doc_id}
+    worker_db.expire_all()
+    doc = worker_db.get(KnowledgeDocument, doc_id)
+    assert (doc.ingest_status, doc.next_attempt_at) == (INDEXED, None)
+
+
+def test_expired_lease_is_not_reclaimed_after_max_attempts(
+    worker_db, test_project, monkeypatch
+):
+    monkeypatch.setattr(knowledge_ingest, "MAX_ATTEMPTS", 2)
+    expired = datetime.utcnow() - timedelta(seconds=knowledge_ingest.LEASE_SECONDS + 60)
+    retry_id = _doc(
+        worker_db, test_project.id, "kb_retry", ingest_status="processing",
+        ingest_attempts=1, updated_at=expired,
+    ).id
+    spent_id = _doc(
+        worker_db, test_project.id, "kb_spent", ingest_status="processing",
+        ingest_attempts=2, updated_at=expired,
+    ).id
+
+    assert [job.doc_id for job in knowledge_ingest._claim(10)] == [retry_id]
+
+    worker_db.expire_all()
+    spent = worker_db.get(KnowledgeDocument, spent_id)
+    assert spent.ingest_status == FAILED and spent.ingest_error
@@ -0,0 +1,118 @@
+"""Tests for multimodal extraction: pool, content-hash cache and fallbacks."""
+
+import asyncio
+import io
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.routers.knowledge import _extract_upload_text
+from app.services import multimodal_extract
+from app.services import multimodal_service
+from app.services.multimodal_service import MultiModalProcessor
+
+PDF = b"%PDF-1.4\n/Title (Design notes)\n/Author (Ann)\nBT (Queue retries) Tj ET\n"
+
+
+def _docx(text):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="urn:w"><w:body><w:p><w:r>'
+            f"<w:t>{text}</w:t></w:r></w:p></w:body></w:document>",
+        )
+    return buf.getvalue()
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    async def no_redis():
+        raise ConnectionError("redis unavailable in tests")
+
+    monkeypatch.setattr("app.utils.redis_client.get_redis", no_redis)
+    proc = MultiModalProcessor()
+    yield proc
+    asyncio.run(proc.shutdown())
+
+
+@pytest.mark.asyncio
+async def test_repeated_content_is_served_from_the_cache(processor, monkeypatch):
+    calls = []
+    real = multimodal_extract.extract
+
+    def counting(kind, source):
+        calls.append(kind)
+        return real(kind, source)
+
+    monkeypatch.setattr(multimodal_extract, "extract", counting)
+
+    first = await processor.process_file("a.pdf", content=PDF)
+    second = await processor.process_file("renamed.pdf", content=PDF)
+
+    assert calls == ["pdf"]
+    assert (processor.cache.hits, processor.cache.misses) == (1, 1)
+    assert "Queue retries" in first["extracted_text"]
+    # Rendering still uses the new name
+    assert "renamed.pdf" in second["extracted_text"]
+
+
+@pytest.mark.asyncio
+async def test_large_files_use_the_process_pool(processor):
+    processor.inline_bytes = 0
+    assert processor._pool_slots is None  # created on the running loop
+
+    result = await processor.process_file("notes.docx", content=_docx("pooled"))
+
+    assert result["success"] and "pooled" in result["extracted_text"]
+    assert processor._pool is not None and processor._pool_slots is not None
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_falls_back_to_a_thread(processor):
+    class _Broken:
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("worker died")
+
+    processor.inline_bytes = 0
+    processor._pool = _Broken()
+
+    result = await processor.process_file("a.pdf", content=PDF)
+    assert result["success"] and processor._pool is None
+
+
+@pytest.mark.asyncio
+async def test_oversized_and_failing_files_get_fallback_results(processor):
+    processor.max_file_size = 10
+    big = await processor.process_file("a.pdf", content=PDF)
+    assert not big["success"] and big["metadata"]["processing_method"] == "fallback"
+
+    processor.max_file_size = multimodal_service.MULTIMODAL_MAX_FILE_BYTES
+    bad = await processor.process_file("broken.docx", content=b"not a zip")
+    assert not bad["success"] and "DOCX processing error" in bad["extracted_text"]
+
+
+class _Upload:
+    def __init__(self, filename, content_type, data):
+        self.filename = filename
+        self.content_type = content_type
+        self._buf = io.BytesIO(data)
+
+    async def read(self, size=-1):
+        return self._buf.read(size)
+
+
+@pytest.mark.asyncio
+async def test_knowledge_upload_extracts_binary_documents(processor, monkeypatch):
+    monkeypatch.setattr(multimodal_service, "multimodal_processor", processor)
+    docx = _docx("Runbook for failover")
+    mime = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+    text, size = await _extract_upload_text(_Upload("runbook", mime, docx), 10**6)
+    assert "Runbook for failover" in text and size == len(docx)
+
+    with pytest.raises(ValueError):
+        await _extract_upload_text(_Upload("x.docx", mime, docx), 10)
+    with pytest.raises(ValueError):
+        await _extract_upload_text(_Upload("x.docx", mime, b"not a zip"), 10**6)
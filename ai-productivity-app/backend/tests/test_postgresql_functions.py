@@ -0,0 +1,87 @@
+"""
+Tests for query-vector binding and fused search in PostgreSQLFunctions.
+"""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+
+from app.services.postgresql_functions import PostgreSQLFunctions
+
+
+def _functions(dbapi, dimension=3):
+    connection = SimpleNamespace(info={}, dbapi_connection=dbapi)
+    db = SimpleNamespace(
+        bind=SimpleNamespace(dialect=SimpleNamespace(name="postgresql")),
+        connection=lambda: SimpleNamespace(connection=connection),
+    )
+    return PostgreSQLFunctions(db, dimension=dimension), connection
+
+
+class TestVectorParam:
+    """Vectors bind as float32 arrays or a compact text literal."""
+
+    def test_unknown_driver_falls_back_to_text(self):
+        functions, connection = _functions(object())
+        assert functions._vector_param([0.5, 0.25, 1.0]) == "[0.5,0.25,1.0]"
+        assert connection.info["pgvector_adapter"] is False
+
+    def test_dimension_is_enforced(self):
+        functions, _ = _functions(object(), dimension=4)
+        with pytest.raises(ValueError, match="expected \\(4,\\)"):
+            functions._vector_param(np.zeros(3))
+
+
+class _Session:
+    """Records statements; DDL, commits and rollbacks are not allowed."""
+
+    def __init__(self, installed):
+        self.bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+        self.installed = installed
+        self.statements = []
+        self.savepoints = 0
+
+    @contextmanager
+    def begin_nested(self):
+        self.savepoints += 1
+        yield
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        assert "CREATE" not in sql
+        self.statements.append(sql)
+        if "to_regprocedure" in sql:
+            return SimpleNamespace(scalar=lambda: self.installed)
+        return [SimpleNamespace(_mapping={"chunk_id": 1})]
+
+    def commit(self):
+        raise AssertionError("the caller owns the transaction")
+
+    rollback = commit
+
+
+class TestFusedSearch:
+    """The stored function is installed at startup, not by requests."""
+
+    @pytest.fixture(autouse=True)
+    def _not_ready(self, monkeypatch):
+        monkeypatch.setattr(PostgreSQLFunctions, "_fused_search_ready", False)
+
+    def test_install_skips_other_databases(self):
+        assert not PostgreSQLFunctions.install_fused_search(create_engine("sqlite://"))
+
+    def test_call_runs_in_a_savepoint(self):
+        db = _Session(installed=True)
+        rows = PostgreSQLFunctions(db, dimension=3).fused_search("parse", limit=5)
+
+        assert rows == [{"chunk_id": 1}]
+        assert db.savepoints == 1
+        assert "fused_code_search(" in db.statements[-1]
+
+    def test_missing_function_is_not_created(self):
+        db = _Session(installed=False)
+        assert PostgreSQLFunctions(db, dimension=3).fused_search("parse") == []
+        assert not PostgreSQLFunctions._fused_search_ready
@@ -0,0 +1,109 @@
+"""Tests for the per-project statistics rollup."""
+
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.models.code import CodeDocument, CodeEmbedding
+from app.models.project import ProjectStatsRollup
+from app.models.timeline import TimelineEvent
+from app.services.project_stats import get_stats, reconcile
+
+
+def _doc(project_id, path, size, indexed=False):
+    return CodeDocument(
+        project_id=project_id,
+        file_path=path,
+        language="python",
+        file_size=size,
+        is_indexed=indexed,
+    )
+
+
+def test_flush_hook_applies_deltas(db, test_project):
+    pid = test_project.id
+    assert get_stats(db, pid).files == 0  # row created with the project
+
+    a, b = _doc(pid, "a.py", 100), _doc(pid, "b.py", 50, indexed=True)
+    db.add_all([a, b])
+    db.flush()
+    db.add_all(
+        [
+            CodeEmbedding(document_id=a.id, chunk_content="x"),
+            CodeEmbedding(document_id=a.id, chunk_content="y"),
+        ]
+    )
+    db.add(
+        TimelineEvent(
+            project_id=pid,
+            event_type="file_added",
+            title="a.py",
+            created_at=datetime(2025, 5, 1),
+        )
+    )
+    db.commit()
+
+    stats = get_stats(db, pid)
+    assert (stats.files, stats.chunks, stats.indexed_files, stats.pending_files) == (
+        2,
+        2,
+        1,
+        1,
+    )
+    assert stats.storage_bytes == 150
+    assert stats.timeline_events == 1
+    assert stats.last_activity == datetime(2025, 5, 1)
+
+    a.is_indexed = True
+    a.file_size = 120
+    db.commit()
+    stats = get_stats(db, pid)
+    assert (stats.indexed_files, stats.pending_files, stats.storage_bytes) == (
+        2,
+        0,
+        170,
+    )
+
+    db.delete(b)
+    db.commit()
+    stats = get_stats(db, pid)
+    assert (stats.files, stats.indexed_files, stats.storage_bytes) == (1, 1, 120)
+
+
+def test_chunk_delta_resolves_document_outside_the_session(db, test_project):
+    pid = test_project.id
+    doc = _doc(pid, "c.py", 10)
+    db.add(doc)
+    db.commit()
+    doc_id = doc.id
+    db.expunge_all()  # the chunk's document is no longer in the identity map
+
+    db.add(CodeEmbedding(document_id=doc_id, chunk_content="z"))
+    db.commit()
+    assert get_stats(db, pid).chunks == 1
+
+
+def test_reconcile_repairs_drift(db, test_project):
+    pid = test_project.id
+    db.add(_doc(pid, "a.py", 100, indexed=True))
+    db.commit()
+
+    db.delete(db.get(ProjectStatsRollup, pid))
+    db.commit()
+    assert get_stats(db, pid).files == 0  # missing row reads as empty
+
+    assert reconcile(db) == 1
+    stats = get_stats(db, pid)
+    assert (stats.files, stats.indexed_files, stats.storage_bytes) == (1, 1, 100)
+
+    # Simulate a write that bypassed the ORM hook
+    db.execute(
+        update(ProjectStatsRollup)
+        .where(ProjectStatsRollup.project_id == pid)
+        .values(files=7)
+    )
+    db.commit()
+    assert reconcile(db, [pid]) == 1
+    db.expire_all()
+    assert get_stats(db, pid).files == 1
+    assert reconcile(db, [pid + 1000]) == 0
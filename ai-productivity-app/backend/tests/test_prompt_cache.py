@@ -0,0 +1,159 @@
+"""Tests for provider prompt caching and cached-token cost tracking."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm import prompt_cache
+from app.llm.prompt_cache import (
+    CACHE_KEY,
+    CONTEXT,
+    EPHEMERAL,
+    SESSION,
+    STATIC,
+    anthropic_request,
+    arrange,
+    cached_tokens,
+    tag,
+)
+from app.services.analytics_rollups import run_rollups
+from app.services.cost_tracking import CostTrackingService, UsageEvent
+
+
+def _chat(knowledge="KB snippets"):
+    return [
+        tag({"role": "system", "content": "You are helpful."}, STATIC),
+        tag({"role": "system", "content": knowledge}, CONTEXT),
+        tag({"role": "system", "content": "Previous summary: ..."}, SESSION),
+        {"role": "user", "content": "first question"},
+        {"role": "assistant", "content": "first answer"},
+        {"role": "user", "content": "follow-up"},
+    ]
+
+
+def test_arrange_puts_stable_prefix_first_and_context_last():
+    arranged = arrange(_chat())
+
+    assert [m["content"] for m in arranged] == [
+        "You are helpful.",
+        "Previous summary: ...",
+        "first question",
+        "first answer",
+        "KB snippets",
+        "follow-up",
+    ]
+    assert not any(CACHE_KEY in m for m in arranged)
+    # A different retrieval leaves the prefix before it untouched
+    assert arrange(_chat("other snippets"))[:4] == arranged[:4]
+
+
+def test_arrange_keeps_untagged_lists_unchanged():
+    plain = [
+        {"role": "system", "content": "s"},
+        {"role": "user", "content": "u"},
+    ]
+    assert arrange(plain) == plain
+
+
+def test_anthropic_request_sets_breakpoints(monkeypatch):
+    monkeypatch.setattr(prompt_cache, "ENABLED", True)
+    tools = [{"name": "a"}, {"name": "b"}]
+
+    system, turns, marked = anthropic_request(_chat(), tools)
+
+    assert [b["text"] for b in system] == ["You are helpful.", "Previous summary: ..."]
+    assert system[-1]["cache_control"] == EPHEMERAL
+    assert marked[-1]["cache_control"] == EPHEMERAL and "cache_control" not in tools[-1]
+    # History is cached up to the previous answer; context joins the new turn
+    assert turns[1]["content"][-1]["cache_control"] == EPHEMERAL
+    assert [b["text"] for b in turns[2]["content"]] == ["KB snippets", "follow-up"]
+    assert "cache_control" not in turns[2]["content"][-1]
+
+
+def test_cached_tokens_reads_both_provider_formats():
+    anthropic = SimpleNamespace(
+        input_tokens=50, cache_read_input_tokens=900, cache_creation_input_tokens=100
+    )
+    openai = SimpleNamespace(
+        prompt_tokens=1000, prompt_tokens_details=SimpleNamespace(cached_tokens=768)
+    )
+    assert cached_tokens(anthropic) == (900, 100)
+    assert cached_tokens(openai) == (768, 0)
+    assert cached_tokens(None) == (0, 0)
+
+
+def test_cost_prices_cached_tokens_at_cache_rates():
+    rate = Decimal("0.003")
+    hit = UsageEvent(
+        model_id="claude",
+        provider="anthropic",
+        input_tokens=10000,
+        output_tokens=0,
+        cached_input_tokens=9000,
+        response_time_ms=1,
+    )
+    cost = CostTrackingService._price(hit, rate, rate)
+    # 1000 uncached + 9000 * 0.1
+    assert cost.input_cost == Decimal("0.005700")
+    assert cost.cache_savings == Decimal("0.024300")
+
+    write = hit.model_copy(
+        update={"cached_input_tokens": 0, "cache_write_tokens": 10000}
+    )
+    assert CostTrackingService._price(write, rate, rate).cache_savings < 0
+
+
+@pytest.mark.asyncio
+async def test_cost_summary_reports_cache_hit_ratio(db):
+    stamp = datetime(2025, 7, 10, 10, 5, tzinfo=timezone.utc)
+    service = CostTrackingService(db)
+    for cached in (0, 3000):
+        await service.record_usage(
+            UsageEvent(
+                model_id="claude",
+                provider="anthropic",
+                input_tokens=4000,
+                output_tokens=100,
+                cached_input_tokens=cached,
+                cache_write_tokens=0 if cached else 3000,
+                response_time_ms=10,
+                timestamp=stamp,
+            )
+        )
+    run_rollups(db, now=stamp + timedelta(hours=2))
+
+    summary = await service.get_cost_summary(
+        stamp - timedelta(hours=1), stamp + timedelta(hours=2)
+    )
+    cache = summary["prompt_cache"]
+    assert (cache["read_tokens"], cache["write_tokens"]) == (3000, 3000)
+    assert cache["hit_ratio"] == 0.375
+    assert summary["by_model"]["claude"]["prompt_cache"]["read_tokens"] == 3000
+
+
+@pytest.mark.asyncio
+async def test_cost_summary_reports_cache_per_user(db):
+    stamp = datetime(2025, 7, 11, 10, 5, tzinfo=timezone.utc)
+    service = CostTrackingService(db)
+    for user_id, cached in ((1, 3000), (2, 0)):
+        await service.record_usage(
+            UsageEvent(
+                model_id="claude",
+                provider="anthropic",
+                input_tokens=4000,
+                output_tokens=100,
+                cached_input_tokens=cached,
+                response_time_ms=10,
+                user_id=user_id,
+                timestamp=stamp,
+            )
+        )
+    run_rollups(db, now=stamp + timedelta(hours=2))
+
+    summary = await service.get_cost_summary(
+        stamp - timedelta(hours=1), stamp + timedelta(hours=2), user_id=1
+    )
+    assert summary["prompt_cache"]["read_tokens"] == 3000
+    assert summary["prompt_cache"]["hit_ratio"] == 0.75
@@ -0,0 +1,102 @@
+"""Unit-tests for single-call / local query expansion."""
+
+import asyncio
+
+from app.services.query_expansion import (
+    ExpansionCache,
+    QueryExpansionService,
+    expand_from_neighbours,
+    parse_llm_expansions,
+)
+
+NEIGHBOURS = [
+    {
+        "content": "def refresh_token(session): rotate jwt_secret and revoke",
+        "metadata": {"symbol_name": "refresh_token"},
+    },
+    {
+        "content": "class TokenStore: revoke expired jwt_secret entries",
+        "metadata": {"symbol_name": "TokenStore"},
+    },
+    {"content": "unrelated words only here once", "metadata": {}},
+]
+
+
+class _MemoryCache(ExpansionCache):
+    """ExpansionCache without the Redis tier."""
+
+    async def _redis_get(self, key):
+        return None
+
+    async def set(self, key, value):
+        self._remember(key, value)
+
+
+class _LLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    async def complete(self, **kwargs):
+        self.calls += 1
+        return self.reply
+
+
+def test_local_expansion_uses_shared_neighbour_vocabulary():
+    expansions = expand_from_neighbours("login session", NEIGHBOURS, limit=4)
+
+    symbols = [e["query"] for e in expansions if e["technique"] == "neighbour_symbols"]
+    terms = [e["query"] for e in expansions if e["technique"] == "neighbour_terms"]
+    assert symbols == ["refresh_token", "TokenStore"]
+    # Only terms shared by two neighbours, never words of the query itself
+    assert set(terms) == {"login session jwt_secret", "login session revoke"}
+
+
+def test_llm_reply_is_parsed_per_technique():
+    reply = 'Sure:\n{"synonyms": ["sign in flow"], "technical": ["OAuth2 login"], "other": ["x"]}'
+    expansions = parse_llm_expansions("login", reply)
+    assert [(e["technique"], e["query"]) for e in expansions] == [
+        ("synonyms", "sign in flow"),
+        ("technical", "OAuth2 login"),
+    ]
+
+
+def test_one_llm_call_cached_and_budget_respected():
+    llm = _LLM('{"synonyms": ["sign in"], "technical": ["auth flow"]}')
+    service = QueryExpansionService(mode="llm", cache=_MemoryCache(), llm=llm)
+
+    async def scenario():
+        skipped = await service.expand_query("login", budget=0.01)
+        first = await service.expand_query("login")
+        again = await service.expand_query("Login ")
+        return skipped, first, again
+
+    skipped, first, again = asyncio.run(scenario())
+
+    assert skipped["expansion_metadata"]["outcome"] == "skipped_budget"
+    assert first["expansion_metadata"]["outcome"] == "expanded"
+    assert again["expansion_metadata"]["outcome"] == "cache_hit"
+    assert [e["query"] for e in first["expanded_queries"]] == ["auth flow", "sign in"]
+    assert llm.calls == 1
+
+    service.record_gain("technical", queries=2, new_results=3)
+    assert service.get_stats()["recall_gain"]["technical"]["new_results_per_query"] == 1.5
+
+
+def test_skipped_llm_expansion_warms_the_cache():
+    from app.services.hybrid_search import SEARCH_SLO_SECONDS
+
+    llm = _LLM('{"synonyms": ["sign in"]}')
+    service = QueryExpansionService(mode="llm", cache=_MemoryCache(), llm=llm)
+    assert service.expected_latency("llm") < SEARCH_SLO_SECONDS
+
+    async def scenario():
+        skipped = await service.expand_query("logout", budget=0.01)
+        await asyncio.gather(*service._inflight.values())
+        return skipped, await service.expand_query("logout", budget=0.01)
+
+    skipped, warmed = asyncio.run(scenario())
+
+    assert skipped["expansion_metadata"]["outcome"] == "skipped_budget"
+    assert warmed["expansion_metadata"]["outcome"] == "cache_hit"
+    assert llm.calls == 1
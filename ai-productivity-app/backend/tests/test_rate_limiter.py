@@ -0,0 +1,65 @@
+"""Unit-tests for the token buckets behind every rate limit."""
+
+from app.utils.rate_limiter import (
+    Bucket,
+    LocalBucketStore,
+    estimate_tokens,
+    llm_buckets,
+)
+
+
+class _Clock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_continuously_and_reports_retry_after():
+    clock = _Clock()
+    store = LocalBucketStore(clock=clock)
+    bucket = Bucket.per_window("login:1.2.3.4", limit=3, window=60)
+
+    assert all(store.apply([bucket]).allowed for _ in range(3))
+    denied = store.apply([bucket])
+    assert not denied.allowed and denied.failed == bucket
+    assert 19 < denied.retry_after <= 20  # one token per 20 seconds
+
+    clock.now += 20
+    assert store.apply([bucket]).allowed
+
+
+def test_batch_is_all_or_nothing():
+    store = LocalBucketStore(clock=_Clock())
+    user = Bucket("llm:user:1", capacity=1000, refill_per_sec=10, cost=600)
+    project = Bucket("llm:project:7", capacity=1000, refill_per_sec=10, cost=600)
+
+    assert store.apply([user, project]).allowed
+    other_user = Bucket("llm:user:2", capacity=1000, refill_per_sec=10, cost=600)
+    decision = store.apply([other_user, project])
+    assert not decision.allowed and decision.failed == project
+    # The rejected batch charged nothing to the user that still had budget
+    assert store.apply([other_user.with_cost(1000)]).allowed
+
+
+def test_oversized_cost_waits_for_a_full_bucket_then_goes_into_debt():
+    clock = _Clock()
+    store = LocalBucketStore(clock=clock)
+    bucket = Bucket("llm:user:1", capacity=100, refill_per_sec=10, cost=250)
+
+    decision = store.apply([bucket])
+    assert decision.allowed and decision.remaining == [-150]
+    assert not store.apply([bucket.with_cost(1)]).allowed
+
+    clock.now += 25  # debt repaid, bucket full again
+    refund = store.apply([bucket.with_cost(-500)], force=True)
+    assert refund.remaining == [100]  # refunds never exceed capacity
+
+
+def test_llm_budgets_skip_unknown_scopes():
+    tokens = estimate_tokens([{"role": "user", "content": "x" * 400}], 50)
+    assert tokens == 150
+    buckets = llm_buckets(user_id=1, project_id=None, model=None, tokens=tokens)
+    assert [b.key for b in buckets] == ["llm:user:1"]
+    assert buckets[0].cost == 150
@@ -0,0 +1,118 @@
+"""Tests for search result hydration, streaming and deferred history."""
+
+import json
+
+import pytest
+
+from app.models.code import CodeDocument
+from app.routers import search as search_router
+from app.schemas.search import SearchRequest
+from app.services import search_history_writer as history_module
+from app.services.search_history_writer import SearchHistoryWriter
+
+
+def _hit(document_id, **metadata):
+    return {
+        "document_id": document_id,
+        "chunk_id": 1,
+        "content": "def f(): pass",
+        "type": "keyword",
+        "score": 0.5,
+        "metadata": {"start_line": 3, **metadata},
+    }
+
+
+class _NoQueries:
+    def query(self, *args, **kwargs):
+        raise AssertionError("metadata was complete, no lookup expected")
+
+
+def test_format_results_skips_lookup_when_metadata_is_complete():
+    results = search_router._format_results(
+        _NoQueries(), [_hit(7, file_path="a.py", language="python")]
+    )
+    assert (results[0].file_path, results[0].language, results[0].id) == (
+        "a.py",
+        "python",
+        "7:1",
+    )
+
+
+def test_format_results_hydrates_missing_metadata(db, test_project):
+    doc = CodeDocument(
+        project_id=test_project.id, file_path="src/b.ts", language="typescript"
+    )
+    db.add(doc)
+    db.commit()
+
+    results = search_router._format_results(
+        db, [_hit(doc.id), _hit(None, file_path="notes.md")]
+    )
+    assert [(r.file_path, r.language) for r in results] == [
+        ("src/b.ts", "typescript"),
+        ("notes.md", "unknown"),
+    ]
+
+
+class _FakeSearch:
+    def __init__(self, db, *args):
+        self.db = db
+
+    async def iter_search(self, **kwargs):
+        yield "keyword", [_hit(1, file_path="a.py", language="python")]
+        yield "final", [_hit(1, file_path="a.py", language="python")]
+
+
+class _Session:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_stream_search_uses_and_closes_its_own_session(monkeypatch):
+    session = _Session()
+    monkeypatch.setattr(search_router, "HybridSearch", _FakeSearch)
+    monkeypatch.setattr(search_router, "session_for", lambda workload: session)
+    monkeypatch.setattr(search_router.search_history_writer, "record", lambda *a: None)
+
+    body = search_router._stream_search(
+        SearchRequest(query="f", project_ids=[1]), None, 1, None
+    )
+    lines = [json.loads(line) async for line in body]
+    assert [line["type"] for line in lines] == ["partial", "final"]
+    assert lines[1]["total"] == 1
+    assert session.closed
+
+
+@pytest.mark.asyncio
+async def test_history_writer_batches_and_bounds_pending(monkeypatch):
+    batches = []
+    monkeypatch.setattr(history_module, "_write_batch", batches.append)
+    writer = SearchHistoryWriter(flush_interval=60, batch_size=2, max_pending=3)
+
+    for n in range(4):
+        writer.record(1, f" query {n} ")
+    assert writer.dropped == 1  # the oldest row made room
+
+    await writer.stop()
+    assert [[row["query_text"] for row in batch] for batch in batches] == [
+        ["query 1", "query 2"],
+        ["query 3"],
+    ]
+    assert writer.written == 3
+
+
+@pytest.mark.asyncio
+async def test_history_writer_counts_failed_batches_as_dropped(monkeypatch):
+    def fail(rows):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(history_module, "_write_batch", fail)
+    writer = SearchHistoryWriter(flush_interval=60, batch_size=10)
+    writer.record(1, "q")
+
+    assert await writer.flush() == 0
+    assert writer.dropped == 1
+    await writer.stop()
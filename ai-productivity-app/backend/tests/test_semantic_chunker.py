@@ -0,0 +1,60 @@
+"""Unit-tests for oversized-symbol windowing in SemanticChunker."""
+
+from app.code_processing.chunker import SemanticChunker
+
+
+def _method(name, body_lines):
+    return [f"    def {name}(self):"] + [
+        f"        value_{i} = compute_something_{i}(self, argument)"
+        for i in range(body_lines)
+    ]
+
+
+def _big_class():
+    lines = ["class Big:"]
+    symbols = [{"name": "Big", "type": "class", "start_line": 0}]
+    for m in range(6):
+        symbols.append(
+            {"name": f"m{m}", "type": "method", "start_line": len(lines)}
+        )
+        lines.extend(_method(f"m{m}", 12))
+        symbols[-1]["end_line"] = len(lines) - 1
+    symbols[0]["end_line"] = len(lines) - 1
+    return "\n".join(lines), symbols
+
+
+def test_oversized_symbol_is_fully_covered_by_overlapping_windows():
+    chunker = SemanticChunker(max_tokens=200, overlap_tokens=20)
+    chunker.encoder = None  # deterministic chars/4 estimate
+    content, symbols = _big_class()
+
+    parts = [
+        c for c in chunker.create_chunks(content, symbols, "python")
+        if c["symbol_name"] == "Big"
+    ]
+
+    assert len(parts) > 1
+    assert all(p["chunk_type"] == "symbol_partial" for p in parts)
+    assert all(p["tokens"] <= 200 for p in parts)
+    assert parts[0]["start_line"] == 0
+    assert parts[-1]["end_line"] == symbols[0]["end_line"]
+    for prev, nxt in zip(parts, parts[1:]):
+        # No gap, some overlap
+        assert prev["start_line"] < nxt["start_line"] <= prev["end_line"]
+    # Windows end right before a method definition where possible
+    method_starts = {s["start_line"] for s in symbols[1:]}
+    assert all(p["end_line"] + 1 in method_starts for p in parts[:-1])
+
+
+def test_symbol_less_file_is_indexed_beyond_the_first_lines():
+    chunker = SemanticChunker(max_tokens=100, overlap_tokens=10)
+    chunker.encoder = None
+    content = "\n".join(f"KEY_{i} = 'some configuration value {i}'" for i in range(400))
+
+    chunks = chunker.create_chunks(content, [], "text")
+
+    assert chunks[-1]["end_line"] == 399
+    covered = set()
+    for c in chunks:
+        covered.update(range(c["start_line"], c["end_line"] + 1))
+    assert covered == set(range(400))
@@ -0,0 +1,48 @@
+"""Unit-tests for the revocation-aware auth session/user cache."""
+
+from app.auth.session_cache import SessionCache
+
+
+class _Clock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_at_ttl_or_token_exp_whichever_is_first():
+    clock = _Clock()
+    cache = SessionCache(ttl=30, clock=clock)
+    gen = cache.generation
+    cache.put_session("a", 1, gen, token_exp=clock.now + 5)
+    cache.put_session("b", 1, gen)
+    cache.put_user(1, {"id": 1}, gen)
+
+    clock.now += 10
+    assert cache.get_session("a") is None
+    assert cache.get_session("b") == 1
+    clock.now += 25
+    assert cache.get_session("b") is None
+    assert cache.get_user(1) is None
+
+
+def test_user_invalidation_drops_the_user_and_all_their_sessions():
+    cache = SessionCache(ttl=30, clock=_Clock())
+    gen = cache.generation
+    for jti, uid in (("a", 1), ("b", 1), ("c", 2)):
+        cache.put_session(jti, uid, gen)
+    cache.put_user(1, {"id": 1}, gen)
+
+    cache.apply_payload(SessionCache.payload(user_id=1))
+    assert cache.get_session("a") is None and cache.get_session("b") is None
+    assert cache.get_user(1) is None
+    assert cache.get_session("c") == 2
+
+
+def test_lookup_started_before_a_revocation_cannot_repopulate():
+    cache = SessionCache(ttl=30, clock=_Clock())
+    gen = cache.generation  # request reads the DB ...
+    cache.invalidate(jti="a")  # ... while the session is revoked
+    cache.put_session("a", 1, gen)
+    assert cache.get_session("a") is None
@@ -0,0 +1,65 @@
+"""Tests for lifespan step tracking, retries and the readiness gate."""
+
+import pytest
+
+from app import startup as startup_module
+from app.startup import StartupTracker
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(startup_module, "RETRY_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(startup_module, "REQUIRED_ATTEMPTS", 3)
+
+
+def _flaky(failures):
+    calls = []
+
+    def step():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ConnectionError("database starting up")
+
+    return step, calls
+
+
+@pytest.mark.asyncio
+async def test_required_steps_are_retried_until_they_succeed():
+    tracker = StartupTracker()
+    step, calls = _flaky(2)
+
+    assert await tracker.run("init_db", step, thread=True)
+    assert len(calls) == 3
+    assert tracker.report()["steps"]["init_db"]["attempts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_exhausted_and_optional_steps_fail():
+    tracker = StartupTracker()
+    required, calls = _flaky(5)
+    optional, optional_calls = _flaky(1)
+
+    assert not await tracker.run("config_defaults", required)
+    assert not await tracker.run("model_catalogue", optional, required=False)
+    assert (len(calls), len(optional_calls)) == (3, 1)
+    assert tracker.failed_required() == ["config_defaults"]
+
+
+@pytest.mark.asyncio
+async def test_gate_aborts_instead_of_staying_unready(monkeypatch):
+    tracker = StartupTracker()
+    aborted = []
+    monkeypatch.setattr(tracker, "abort", lambda: aborted.append(True))
+    step, _ = _flaky(5)
+
+    async def warm_up():
+        await tracker.run("config_defaults", step)
+
+    tracker.begin(warm_up)
+    await tracker._gate
+    assert not tracker.ready and aborted == [True]
+
+    healthy = StartupTracker()
+    healthy.begin(lambda: healthy.run("ok", lambda: None))
+    await healthy._gate
+    assert healthy.ready
@@ -1,8 +1,41 @@
 """Tests for summarization service functionality."""
 
+import json
+import re
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from app.services.summarization_service import SummarizationService
+from app.services.summarization_service import (
+    SummarizationService,
+    SummaryCache,
+    parse_leaf_summaries,
+)
+
+
+class _LLM:
+    """Answers leaf batches with JSON and anything else with a merge."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def complete(self, messages, **kwargs):
+        prompt = messages[0]["content"]
+        self.prompts.append(prompt)
+        ids = re.findall(r"^\[(\d+)\]", prompt, re.M)
+        if ids:
+            return json.dumps({i: f"summary {i}" for i in ids})
+        return "merged summary"
+
+
+class _LocalCache(SummaryCache):
+    """Summary cache without Redis."""
+
+    async def _redis_mget(self, keys):
+        return [None] * len(keys)
+
+    async def set_many(self, items):
+        for key, value in items.items():
+            self._remember(key, value)
 
 
 class TestSummarizationService:
@@ -140,6 +173,8 @@ class TestSummarizationService:
             )
             mock_client.complete = AsyncMock(return_value=mock_response)
 
+            # Too little room for the leaves: the final merge must run
+            self.summarizer.max_summary_tokens = 20
             summary = await self.summarizer.summarize_overflow_chunks(
                 overflow_chunks,
                 query_context="looking for utility functions",
@@ -150,13 +185,17 @@ class TestSummarizationService:
             assert "function1" in summary
             assert "TestClass" in summary
 
-            # Verify LLM was called with appropriate prompt
-            mock_client.complete.assert_called_once()
-            call_args = mock_client.complete.call_args
-            prompt = call_args[1]["messages"][0]["content"]
+            # Leaf prompts are question-independent so they can be cached;
+            # the final merge is told the question
+            leaf_call, merge_call = mock_client.complete.call_args_list
+            assert "looking for utility functions" not in (
+                leaf_call[1]["messages"][0]["content"]
+            )
+            prompt = merge_call[1]["messages"][0]["content"]
 
             assert "looking for utility functions" in prompt
             assert "functions, classes" in prompt
+            assert "Question: looking for utility functions" in summary
             assert "def function1()" in prompt
             assert "class TestClass" in prompt
 
@@ -283,3 +322,57 @@ class TestSummarizationService:
         # Should fit multiple short chunks within token limit
         assert len(kept_chunks) > 1
         assert len(kept_chunks) <= 10
+
+
+class TestCachedSummaries:
+    """Hierarchical overflow summaries and incremental conversation summaries."""
+
+    def setup_method(self):
+        self.llm = _LLM()
+        self.summarizer = SummarizationService(cache=_LocalCache(), llm=self.llm)
+
+    @staticmethod
+    def _chunk(path, name, body):
+        return {
+            "content": body,
+            "metadata": {"file_path": path, "symbol_name": name},
+        }
+
+    @pytest.mark.asyncio
+    async def test_overflow_batches_leaves_then_reuses_cache(self):
+        chunks = [
+            self._chunk("a.py", "load", "def load():\n    return 1"),
+            self._chunk("a.py", "save", "def save():\n    return 2"),
+            self._chunk("b.py", "run", "def run():\n    return 3"),
+        ]
+
+        first = await self.summarizer.summarize_overflow_chunks(chunks, "how?")
+        assert len(self.llm.prompts) == 1
+        assert "### a.py" in first and "summary 2" in first and "### b.py" in first
+
+        # Same code, other question and order: served from the cache
+        second = await self.summarizer.summarize_overflow_chunks(
+            list(reversed(chunks)), "why?"
+        )
+        assert len(self.llm.prompts) == 1
+        assert "Question: why?" in second and "summary 3" in second
+
+    @pytest.mark.asyncio
+    async def test_conversation_summary_only_folds_new_messages(self):
+        new = [
+            {"role": "user", "content": "Now add caching"},
+            {"role": "assistant", "content": "Done"},
+        ]
+
+        summary = await self.summarizer.update_conversation_summary(
+            "We built X.", new
+        )
+
+        assert summary == "merged summary"
+        (prompt,) = self.llm.prompts
+        assert "We built X." in prompt and "User: Now add caching" in prompt
+
+    def test_parse_leaf_summaries_ignores_unknown_ids(self):
+        text = 'Sure: {"1": "first", "3": "out of range", "x": "bad", "2": " "}'
+        assert parse_leaf_summaries(text, 2) == {0: "first"}
+        assert parse_leaf_summaries("plain text", 1) == {0: "plain text"}
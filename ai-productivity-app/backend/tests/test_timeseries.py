@@ -0,0 +1,101 @@
+"""Unit-tests for the ring-buffer metric store, its quantile sketch and rollup flushing."""
+
+import random
+
+import pytest
+
+from app.monitoring.timeseries import QuantileSketch, TimeSeriesStore
+from app.services import analytics_service
+from app.services.analytics_service import MetricsCollector
+
+
+class _Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_sketch_quantiles_are_within_relative_accuracy_and_mergeable():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 1) for _ in range(20_000)]
+    left, right = QuantileSketch(), QuantileSketch()
+    for i, v in enumerate(values):
+        (left if i % 2 else right).add(v)
+    left.merge(QuantileSketch.from_json(right.to_json()))
+
+    values.sort()
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(left.quantile(q) - exact) / exact < 0.02
+    assert left.count == len(values)
+
+
+def test_window_only_merges_recent_buckets_and_memory_stays_flat():
+    clock = _Clock()
+    store = TimeSeriesStore(bucket_seconds=10, slots=6, clock=clock)
+
+    for _ in range(100):  # a long burst that wraps the ring many times
+        for v in range(50):
+            store.record("latency", v, {"route": "/a"})
+        clock.now += 10
+
+    series = store._series["latency"][(("route", "/a"),)]
+    assert len(series._buckets) == 6
+
+    clock.now -= 10  # stay inside the last populated bucket
+    last_30s = store.summary("latency", 30)
+    assert last_30s["count"] == 150
+    assert last_30s["min"] == 0 and last_30s["max"] == 49
+
+
+def test_drain_emits_each_closed_minute_once():
+    clock = _Clock(now=600.0)
+    store = TimeSeriesStore(bucket_seconds=10, slots=360, clock=clock)
+    for _ in range(12):  # two minutes, one sample every 10s
+        store.record("rag.sources_count", 3)
+        clock.now += 10
+
+    rows = store.drain(resolution=60)
+    assert [(name, agg.start, agg.count) for name, _, agg in rows] == [
+        ("rag.sources_count", 600, 6),
+        ("rag.sources_count", 660, 6),
+    ]
+    assert store.drain(resolution=60) == []
+
+
+def test_series_cap_drops_new_label_sets():
+    store = TimeSeriesStore(max_series=2, clock=_Clock())
+    for user in range(5):
+        store.record("user.action", 1, {"user_id": str(user)})
+    assert store.dropped == 3
+    assert store.summary("user.action", 60)["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_rollup_flush_is_retried(monkeypatch):
+    clock = _Clock(now=600.0)
+    collector = MetricsCollector(TimeSeriesStore(bucket_seconds=10, clock=clock))
+    for _ in range(6):
+        collector.record_metric("rag.sources_count", 3)
+        clock.now += 10
+
+    written = []
+
+    def fail(rows, bucket_seconds):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(analytics_service, "_persist_rollups", fail)
+    await collector.flush_metrics()
+    assert collector.store.drain(60) == []  # drained, but held for retry
+
+    clock.now += 60
+    collector.record_metric("rag.sources_count", 5)
+    clock.now += 60
+    monkeypatch.setattr(
+        analytics_service, "_persist_rollups", lambda rows, _: written.extend(rows)
+    )
+    await collector.flush_metrics()
+    assert [(agg.start, agg.count) for _, _, agg in written] == [(600, 6), (720, 1)]
+    assert collector._unsaved == [] and collector.dropped_rollups == 0
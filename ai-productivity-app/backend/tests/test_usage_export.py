@@ -0,0 +1,90 @@
+"""Tests for the streaming usage export."""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.config import ModelUsageMetrics
+from app.services import usage_export
+from app.services.usage_export import (
+    CSV_COLUMNS,
+    decode_cursor,
+    encode_csv,
+    encode_cursor,
+    encode_json,
+    encode_ndjson,
+    export_stream,
+)
+
+START = datetime(2025, 7, 10, tzinfo=timezone.utc)
+
+RECORDS = [
+    {"model_id": "gpt-4o", "total_requests": n, "cursor": f"c{n}"} for n in range(3)
+]
+
+
+def _metric(hour):
+    start = START + timedelta(hours=hour)
+    return ModelUsageMetrics(
+        model_id="gpt-4o",
+        period_start=start,
+        period_end=start + timedelta(hours=1),
+        total_requests=hour + 1,
+        total_tokens_input=100,
+        total_tokens_output=10,
+        total_cost=0.01,
+        avg_response_time_ms=200.0,
+        success_rate=100.0,
+        detailed_metrics={"provider": "openai"},
+    )
+
+
+def test_cursor_round_trip_and_validation():
+    stamp = datetime(2025, 7, 10, 11, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(stamp, 42)) == (stamp, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_encoders_produce_valid_documents():
+    rows = list(csv.DictReader(io.StringIO("".join(encode_csv(RECORDS)))))
+    assert list(rows[0]) == list(CSV_COLUMNS)
+    assert [r["total_requests"] for r in rows] == ["0", "1", "2"]
+
+    lines = "".join(encode_ndjson(RECORDS)).splitlines()
+    assert [json.loads(line) for line in lines] == RECORDS
+
+    assert json.loads("".join(encode_json(RECORDS))) == RECORDS
+    assert json.loads("".join(encode_json([]))) == []
+
+
+def test_export_stream_gzip_and_resume(db):
+    db.add_all([_metric(h) for h in range(5)])
+    db.commit()
+
+    first = b"".join(export_stream("ndjson", compress=True, db=db, limit=2))
+    part = [json.loads(line) for line in gzip.decompress(first).splitlines()]
+    assert [r["total_requests"] for r in part] == [1, 2]
+
+    after = decode_cursor(part[-1]["cursor"])
+    rest = b"".join(export_stream("ndjson", db=db, after=after))
+    assert [json.loads(line)["total_requests"] for line in rest.splitlines()] == [
+        3,
+        4,
+        5,
+    ]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_export_stream_fails_loudly_on_database_errors(monkeypatch, compress):
+    def rows(session, **kwargs):
+        yield RECORDS[0]
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(usage_export, "iter_usage_rows", rows)
+    with pytest.raises(RuntimeError, match="connection lost"):
+        b"".join(export_stream("ndjson", compress=compress, db=object()))
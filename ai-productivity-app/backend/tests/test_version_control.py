@@ -0,0 +1,86 @@
+"""Tests for delta-chain versioning: keyframes, pruning, restore and diff."""
+
+import pytest
+from sqlalchemy import select
+
+from app.models.code import CodeDocument, CodeDocumentContent
+from app.models.document_version import DocumentVersion
+from app.services.version_control import VersionControlService
+
+
+def _content(n):
+    """Version *n* of a 30-line module; each version edits one line."""
+    lines = [f"value_{i} = {i}\n" for i in range(30)]
+    lines[n % 30] = f"value_{n % 30} = {n}  # edited in v{n}\n"
+    if n % 7 == 0:
+        lines.append(f"extra_{n} = True\n")
+    return "".join(lines)
+
+
+@pytest.fixture
+def service():
+    service = VersionControlService()
+    service.keyframe_interval = 4
+    service.max_versions_per_document = 10
+    return service
+
+
+async def _versioned_doc(db, project_id, service):
+    """Store 40 versions of one document and return its id."""
+    doc = CodeDocument(project_id=project_id, file_path="settings.py")
+    db.add(doc)
+    db.commit()
+    for n in range(1, 41):
+        await service.create_version(db, doc.id, _content(n))
+    return doc.id
+
+
+def _stored(db, doc_id):
+    return db.execute(
+        select(DocumentVersion.version_number, DocumentVersion.snapshot)
+        .where(DocumentVersion.document_id == doc_id)
+        .order_by(DocumentVersion.version_number)
+    ).all()
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_the_keyframe_anchoring_the_oldest_retained_version(
+    db, test_project, service
+):
+    versioned_doc = await _versioned_doc(db, test_project.id, service)
+    rows = _stored(db, versioned_doc)
+    numbers = [row.version_number for row in rows]
+    keyframes = [row.version_number for row in rows if row.snapshot is not None]
+
+    # Retention window is 31..40; its chain starts at the keyframe v29, and the
+    # last prune (at keyframe v37) kept everything from keyframe v25 onwards.
+    assert numbers == list(range(25, 41))
+    assert keyframes == [25, 29, 33, 37]
+
+
+@pytest.mark.asyncio
+async def test_every_retained_version_reconstructs_exactly(db, test_project, service):
+    versioned_doc = await _versioned_doc(db, test_project.id, service)
+    for number, _snapshot in _stored(db, versioned_doc):
+        content = await service.get_version_content(db, versioned_doc, number)
+        assert content == _content(number)
+
+    with pytest.raises(ValueError):
+        await service.get_version_content(db, versioned_doc, 10)
+    assert db.get(CodeDocumentContent, versioned_doc).content == _content(40)
+
+
+@pytest.mark.asyncio
+async def test_restore_and_diff_across_a_pruned_chain(db, test_project, service):
+    versioned_doc = await _versioned_doc(db, test_project.id, service)
+    diff = await service.get_version_diff(db, versioned_doc, 26, 39)
+    assert "-value_26 = 26  # edited in v26" in diff["diff"]
+    assert "+value_9 = 39  # edited in v39" in diff["diff"]
+
+    restored = await service.restore_version(db, versioned_doc, 26)
+    assert restored.version_number == 41 and restored.change_type == "restored"
+    assert await service.get_version_content(db, versioned_doc, 41) == _content(26)
+    assert db.get(CodeDocumentContent, versioned_doc).content == _content(26)
+
+    with pytest.raises(ValueError):
+        await service.restore_version(db, versioned_doc, 3)
@@ -0,0 +1,89 @@
+"""Tests for the tree-sitter cross-reference index."""
+
+import pytest
+
+from app.code_processing.parser import CodeParser
+from app.models.code import CodeDocument
+from app.services.xref_index import XrefIndex, replace_document_refs
+
+JS_UTIL = """const add = (x) => x + 1;
+items.map(item => item.id);
+"""
+
+JS_MAIN = """function total(values) {
+  return values.reduce((acc, v) => add(acc, v), 0);
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def parser():
+    parser = CodeParser()
+    if "javascript" not in getattr(parser, "languages", {}):
+        pytest.skip("tree-sitter grammars not available")
+    return parser
+
+
+def _kinds(refs):
+    return {(r["name"], r["line"], r["kind"]) for r in refs}
+
+
+def test_arrow_function_parameters_are_references(parser):
+    refs = parser.parse_file(JS_UTIL, "javascript")["references"]
+
+    assert ("add", 0, "definition") in _kinds(refs)
+    assert [r["symbol_type"] for r in refs if r["name"] == "add"] == [
+        "arrow_function"
+    ]
+    for name in ("x", "item"):
+        assert {r["kind"] for r in refs if r["name"] == name} == {"reference"}
+
+
+def test_named_definitions_and_python(parser):
+    refs = parser.parse_file(JS_MAIN, "javascript")["references"]
+    assert ("total", 0, "definition") in _kinds(refs)
+    assert {r["kind"] for r in refs if r["name"] in ("values", "acc", "v")} == {
+        "reference"
+    }
+
+    py = parser.parse_file("def f(x):\n    return g(x)\n", "python")["references"]
+    assert _kinds(py) == {
+        ("f", 0, "definition"),
+        ("x", 0, "reference"),
+        ("g", 1, "reference"),
+        ("x", 1, "reference"),
+    }
+
+
+def test_index_resolves_definitions_and_usages(db, test_project, parser):
+    docs = {}
+    for path, source in (("util.js", JS_UTIL), ("main.js", JS_MAIN)):
+        doc = CodeDocument(
+            project_id=test_project.id, file_path=path, language="javascript"
+        )
+        db.add(doc)
+        db.flush()
+        refs = parser.parse_file(source, "javascript")["references"]
+        replace_document_refs(db, test_project.id, doc.id, refs)
+        docs[path] = doc
+    db.commit()
+
+    xref = XrefIndex(db)
+    definitions = xref.find_definitions(test_project.id, "add")
+    assert [
+        (d["metadata"]["file_path"], d["metadata"]["line_number"]) for d in definitions
+    ] == [("util.js", 1)]
+
+    # Cursor on the call in main.js (line 2, 1-based) finds both occurrences
+    column = JS_MAIN.splitlines()[1].index("add(")
+    usages = xref.find_usages(test_project.id, "main.js", 2, column)
+    assert sorted((u["metadata"]["file_path"], u["type"]) for u in usages) == [
+        ("main.js", "usage"),
+        ("util.js", "definition"),
+    ]
+    assert xref.goto_definition(test_project.id, "main.js", 2, column) == definitions
+
+    # Re-indexing a document replaces its rows
+    replace_document_refs(db, test_project.id, docs["util.js"].id, [])
+    db.commit()
+    assert xref.find_definitions(test_project.id, "add") == []